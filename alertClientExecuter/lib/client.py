@@ -8,6 +8,7 @@
 # Licensed under the GNU Affero General Public License, version 3.
 
 import socket
+import selectors
 import time
 import ssl
 import threading
@@ -22,6 +23,10 @@ from .smtp import SMTPAlert
 from typing import List, Dict, Any, Optional
 BUFSIZE = 4096
 
+# Maximal number of bytes that are allocated in advance for a message
+# (the buffer grows up to the announced size if more data arrives).
+MAX_PREALLOC_SIZE = 1048576
+
 
 # simple class of an ssl tcp client
 class Client:
@@ -61,6 +66,48 @@ class Client:
         self.sslSocket.settimeout(None)
         return data.decode("ascii")
 
+    # receives a message of the size announced by the RTS message directly into
+    # one buffer and decodes it once it is complete
+    # (returns None if the connection was closed before the message was complete)
+    def recvMessage(self, messageSize: int, timeout: float = 20.0) -> Optional[str]:
+        buffer = bytearray(max(0, min(messageSize, MAX_PREALLOC_SIZE)))
+        received = 0
+        self.sslSocket.settimeout(timeout)
+        try:
+            while received < messageSize:
+
+                # grow the buffer (doubles its size up to the announced size of the message)
+                if received == len(buffer):
+                    buffer.extend(bytes(min(len(buffer), messageSize - len(buffer))))
+
+                with memoryview(buffer) as view:
+                    with view[received:] as chunkView:
+                        count = self.sslSocket.recv_into(chunkView)
+
+                if count == 0:
+                    return None
+
+                received += count
+
+        finally:
+            self.sslSocket.settimeout(None)
+
+        return buffer.decode("ascii")
+
+    # checks if data of the server can be received without blocking
+    # (a closed socket counts as readable, the receive function handles it)
+    def hasPendingData(self) -> bool:
+        try:
+            if self.sslSocket.fileno() == -1 or self.sslSocket.pending() > 0:
+                return True
+
+            with selectors.DefaultSelector() as selector:
+                selector.register(self.sslSocket, selectors.EVENT_READ)
+                return bool(selector.select(timeout=0))
+
+        except Exception as e:
+            return True
+
     def close(self):
         # closing SSLSocket will also close the underlying socket
         self.sslSocket.close()
@@ -115,6 +162,13 @@ class ServerCommunication:
         # transaction with the server
         self.transactionInitiation = False
 
+        # socket pair that wakes up the thread that waits for data of the server
+        # and the id of this thread
+        self._wakeupReader, self._wakeupWriter = socket.socketpair()
+        self._wakeupReader.setblocking(False)
+        self._wakeupWriter.setblocking(False)
+        self._receiverThreadId = None
+
     # internal function that acquires the lock
     def _acquireLock(self):
         logging.debug("[%s]: Acquire lock." % self.fileName)
@@ -125,6 +179,37 @@ class ServerCommunication:
         logging.debug("[%s]: Release lock." % self.fileName)
         self.connectionLock.release()
 
+        # data of the server could have been buffered by the ssl socket while another thread
+        # communicated with the server (or the connection was closed)
+        # => let the receiving thread check it
+        if self._receiverThreadId != threading.get_ident():
+            try:
+                self._wakeupWriter.send(b"\x00")
+            except OSError as e:
+                # buffer full => thread is already woken up
+                pass
+
+    # internal function that waits without holding the lock until data of the server
+    # arrives or the thread is woken up by another thread
+    def _waitForData(self):
+        self._releaseLock()
+        try:
+            with selectors.DefaultSelector() as selector:
+                selector.register(self.client.sslSocket, selectors.EVENT_READ)
+                selector.register(self._wakeupReader, selectors.EVENT_READ)
+                selector.select()
+
+            self._wakeupReader.recv(BUFSIZE)
+
+        except (BlockingIOError, InterruptedError):
+            pass
+
+        except Exception as e:
+            # closed socket is handled by the receive function
+            pass
+
+        self._acquireLock()
+
     # Internal function to check sanity of the alertLevels.
     def _checkMsgAlertLevels(self, alertLevels: List[int], messageType: str) -> bool:
 
@@ -628,6 +713,7 @@ class ServerCommunication:
                    "nodeType": self.nodeType,
                    "instance": self.instance,
                    "persistent": self.persistent,
+                   "supportsBatch": True,
                    "alerts": alerts}
         utcTimestamp = int(time.time())
         message = {"clientTime": utcTimestamp,
@@ -815,7 +901,7 @@ class ServerCommunication:
         return True
 
     # internal function that handles received sensor alerts
-    def _sensorAlertHandler(self, incomingMessage: Dict[str, Any]) -> bool:
+    def _sensorAlertHandler(self, incomingMessage: Dict[str, Any], sendResponse: bool = True) -> bool:
 
         logging.info("[%s]: Received sensor alert." % self.fileName)
 
@@ -917,20 +1003,21 @@ class ServerCommunication:
 
             return False
 
-        # sending sensor alert response
-        logging.debug("[%s]: Sending sensor alert response message." % self.fileName)
-        try:
-            payload = {"type": "response",
-                       "result": "ok"}
-            utcTimestamp = int(time.time())
-            message = {"clientTime": utcTimestamp,
-                       "message": "sensoralert",
-                       "payload": payload}
-            self.client.send(json.dumps(message))
+        if sendResponse:
+            # sending sensor alert response
+            logging.debug("[%s]: Sending sensor alert response message." % self.fileName)
+            try:
+                payload = {"type": "response",
+                           "result": "ok"}
+                utcTimestamp = int(time.time())
+                message = {"clientTime": utcTimestamp,
+                           "message": "sensoralert",
+                           "payload": payload}
+                self.client.send(json.dumps(message))
 
-        except Exception as e:
-            logging.exception("[%s]: Sending sensor alert response failed." % self.fileName)
-            return False
+            except Exception as e:
+                logging.exception("[%s]: Sending sensor alert response failed." % self.fileName)
+                return False
 
         # trigger all alerts that have the same alert level
         atLeastOnceTriggered = False
@@ -994,6 +1081,63 @@ class ServerCommunication:
 
         return True
 
+    # internal function that handles received batch messages
+    # (multiple sensor alerts in one transaction)
+    def _batchHandler(self, incomingMessage: Dict[str, Any]) -> bool:
+
+        logging.debug("[%s]: Received batch." % self.fileName)
+
+        try:
+            if not self._checkMsgServerTime(incomingMessage["serverTime"], incomingMessage["message"]):
+                logging.error("[%s]: Received serverTime invalid." % self.fileName)
+                return False
+
+            batchMessages = incomingMessage["payload"]["messages"]
+            if not isinstance(batchMessages, list):
+                logging.error("[%s]: Received batch messages invalid." % self.fileName)
+                return False
+
+        except Exception as e:
+            logging.exception("[%s]: Received batch invalid." % self.fileName)
+            return False
+
+        # handle each message of the batch without sending a response
+        for batchMessage in batchMessages:
+            try:
+                message = {"serverTime": incomingMessage["serverTime"],
+                           "message": batchMessage["message"],
+                           "payload": batchMessage["payload"]}
+                command = str(message["message"]).upper()
+
+            except Exception as e:
+                logging.exception("[%s]: Received batch message invalid." % self.fileName)
+                return False
+
+            if command == "SENSORALERT":
+                if not self._sensorAlertHandler(message, sendResponse=False):
+                    return False
+
+            else:
+                logging.error("[%s]: Received unknown command in batch: '%s'." % (self.fileName, command))
+                return False
+
+        # sending batch response
+        logging.debug("[%s]: Sending batch response message." % self.fileName)
+        try:
+            payload = {"type": "response",
+                       "result": "ok"}
+            utcTimestamp = int(time.time())
+            message = {"clientTime": utcTimestamp,
+                       "message": "batch",
+                       "payload": payload}
+            self.client.send(json.dumps(message))
+
+        except Exception as e:
+            logging.exception("[%s]: Sending batch response failed." % self.fileName)
+            return False
+
+        return True
+
     # function that initializes the communication to the server
     # for example checks the version and authenticates the client
     def initializeCommunication(self) -> bool:
@@ -1050,6 +1194,8 @@ class ServerCommunication:
     # this function handles the incoming messages from the server
     def handleCommunication(self):
 
+        self._receiverThreadId = threading.get_ident()
+
         self._acquireLock()
 
         # handle commands in an infinity loop
@@ -1057,11 +1203,15 @@ class ServerCommunication:
 
             messageSize = 0
 
+            # wait without holding the lock until the server sends data
+            # (data could also be consumed by a thread that initiated a transaction with the server,
+            # other threads can acquire the lock and send data to the server in the meantime)
+            if not self.client.hasPendingData():
+                self._waitForData()
+                continue
+
             try:
-                # try to receive data for 0.5 seconds and then
-                # timeout to give other threads the possibility
-                # to send acquire the lock and send data to the server
-                data = self.client.recv(BUFSIZE, timeout=0.5)
+                data = self.client.recv(BUFSIZE)
                 if not data:
 
                     # clean up session before exiting
@@ -1103,24 +1253,16 @@ class ServerCommunication:
                     self.client.send(json.dumps(message))
 
                     # After initiating transaction receive actual command.
-                    data = ""
-                    lastSize = 0
-                    while len(data) < messageSize:
-                        data += self.client.recv(BUFSIZE)
-
-                        # Check if the size of the received data has changed.
-                        # If not we detected a possible dead lock.
-                        if lastSize != len(data):
-                            lastSize = len(data)
-                        else:
-                            logging.error("[%s]: Possible dead lock "
-                                          % self.fileName
-                                          + "detected while receiving data. Closing connection to server.")
-
-                            # clean up session before exiting
-                            self._cleanUpSessionForClosing()
-                            self._releaseLock()
-                            return
+                    data = self.client.recvMessage(messageSize)
+                    if data is None:
+                        logging.error("[%s]: Possible dead lock "
+                                      % self.fileName
+                                      + "detected while receiving data. Closing connection to server.")
+
+                        # clean up session before exiting
+                        self._cleanUpSessionForClosing()
+                        self._releaseLock()
+                        return
 
                 # if no RTS was received
                 # => server does not stick to protocol
@@ -1136,18 +1278,8 @@ class ServerCommunication:
                     return
 
             except socket.timeout as e:
-                # release lock and acquire to let other threads send
-                # data to the server
-                # (wait 0.5 seconds in between, because semaphore
-                # are released in random order => other threads could be
-                # unlucky and not be chosen => this has happened when
-                # loglevel was not debug => hdd I/O has slowed this process
-                # down)
-                self._releaseLock()
-                time.sleep(0.5)
-                self._acquireLock()
-
-                # continue receiving
+                # only a part of the data was received in time
+                # => continue waiting for data
                 continue
 
             except Exception as e:
@@ -1231,6 +1363,20 @@ class ServerCommunication:
                         self._releaseLock()
                         return
 
+            # check if BATCH was received
+            # => handle all contained messages
+            elif command == "BATCH":
+
+                    # handle batch message
+                    if not self._batchHandler(message):
+
+                        logging.error("[%s]: Receiving batch failed." % self.fileName)
+
+                        # clean up session before exiting
+                        self._cleanUpSessionForClosing()
+                        self._releaseLock()
+                        return
+
             # unknown command was received
             # => close connection
             else:
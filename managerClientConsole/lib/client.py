@@ -8,6 +8,7 @@
 # Licensed under the GNU Affero General Public License, version 3.
 
 import socket
+import selectors
 import time
 import ssl
 import threading
@@ -15,6 +16,7 @@ import logging
 import os
 import random
 import json
+import collections
 from .localObjects import SensorDataType, Option, Node, Sensor, Manager, Alert, SensorAlert, AlertLevel
 from .manager import ServerEventHandler
 from .globalData import GlobalData
@@ -23,6 +25,10 @@ from typing import List, Dict, Any, Optional
 
 BUFSIZE = 4096
 
+# Maximal number of bytes that are allocated in advance for a message
+# (the buffer grows up to the announced size if more data arrives).
+MAX_PREALLOC_SIZE = 1048576
+
 
 # simple class of an ssl tcp client
 class Client:
@@ -62,6 +68,48 @@ class Client:
         self.sslSocket.settimeout(None)
         return data.decode("ascii")
 
+    # receives a message of the size announced by the RTS message directly into
+    # one buffer and decodes it once it is complete
+    # (returns None if the connection was closed before the message was complete)
+    def recvMessage(self, messageSize: int, timeout: float = 20.0) -> Optional[str]:
+        buffer = bytearray(max(0, min(messageSize, MAX_PREALLOC_SIZE)))
+        received = 0
+        self.sslSocket.settimeout(timeout)
+        try:
+            while received < messageSize:
+
+                # grow the buffer (doubles its size up to the announced size of the message)
+                if received == len(buffer):
+                    buffer.extend(bytes(min(len(buffer), messageSize - len(buffer))))
+
+                with memoryview(buffer) as view:
+                    with view[received:] as chunkView:
+                        count = self.sslSocket.recv_into(chunkView)
+
+                if count == 0:
+                    return None
+
+                received += count
+
+        finally:
+            self.sslSocket.settimeout(None)
+
+        return buffer.decode("ascii")
+
+    # checks if data of the server can be received without blocking
+    # (a closed socket counts as readable, the receive function handles it)
+    def hasPendingData(self) -> bool:
+        try:
+            if self.sslSocket.fileno() == -1 or self.sslSocket.pending() > 0:
+                return True
+
+            with selectors.DefaultSelector() as selector:
+                selector.register(self.sslSocket, selectors.EVENT_READ)
+                return bool(selector.select(timeout=0))
+
+        except Exception as e:
+            return True
+
     def close(self):
         # closing SSLSocket will also close the underlying socket
         self.sslSocket.close()
@@ -119,6 +167,18 @@ class ServerCommunication:
         # transaction with the server
         self.transactionInitiation = False
 
+        # socket pair that wakes up the thread that waits for data of the server
+        # and the id of this thread
+        self._wakeupReader, self._wakeupWriter = socket.socketpair()
+        self._wakeupReader.setblocking(False)
+        self._wakeupWriter.setblocking(False)
+        self._receiverThreadId = None
+
+        # Last received alert system status and its revision (the server only sends
+        # the changes since this revision if it supports it).
+        self._statusPayload = None  # type: Optional[Dict[str, Any]]
+        self._statusRevision = None  # type: Optional[int]
+
     # internal function that acquires the lock
     def _acquireLock(self):
         logging.debug("[%s]: Acquire lock." % self.fileName)
@@ -129,6 +189,37 @@ class ServerCommunication:
         logging.debug("[%s]: Release lock." % self.fileName)
         self.connectionLock.release()
 
+        # data of the server could have been buffered by the ssl socket while another thread
+        # communicated with the server (or the connection was closed)
+        # => let the receiving thread check it
+        if self._receiverThreadId != threading.get_ident():
+            try:
+                self._wakeupWriter.send(b"\x00")
+            except OSError as e:
+                # buffer full => thread is already woken up
+                pass
+
+    # internal function that waits without holding the lock until data of the server
+    # arrives or the thread is woken up by another thread
+    def _waitForData(self):
+        self._releaseLock()
+        try:
+            with selectors.DefaultSelector() as selector:
+                selector.register(self.client.sslSocket, selectors.EVENT_READ)
+                selector.register(self._wakeupReader, selectors.EVENT_READ)
+                selector.select()
+
+            self._wakeupReader.recv(BUFSIZE)
+
+        except (BlockingIOError, InterruptedError):
+            pass
+
+        except Exception as e:
+            # closed socket is handled by the receive function
+            pass
+
+        self._acquireLock()
+
     # Internal function to check sanity of the alertDelay.
     def _checkMsgAlertDelay(self, alertDelay: int, messageType: str) -> bool:
 
@@ -1539,6 +1630,8 @@ class ServerCommunication:
                    "nodeType": self.nodeType,
                    "instance": self.instance,
                    "persistent": self.persistent,
+                   "supportsBatch": True,
+                   "supportsStatusDelta": True,
                    "manager": manager}
         utcTimestamp = int(time.time())
         message = {"clientTime": utcTimestamp,
@@ -1728,6 +1821,46 @@ class ServerCommunication:
     # internal function that handles received status updates
     def _statusUpdateHandler(self, incomingMessage):
 
+        # Status only contains the changes since the last received status
+        # => apply them to get the complete status.
+        try:
+            if incomingMessage["payload"].get("delta") is True:
+                statusPayload = self._applyStatusDelta(incomingMessage["payload"])
+                if statusPayload is None:
+                    logging.error("[%s]: Received status changes do not match last received status."
+                                  % self.fileName)
+
+                    # send error message back
+                    try:
+                        utcTimestamp = int(time.time())
+                        message = {"clientTime": utcTimestamp,
+                                   "message": incomingMessage["message"],
+                                   "error": "status revision mismatch"}
+                        self.client.send(json.dumps(message))
+                    except Exception as e:
+                        pass
+
+                    return False
+
+                incomingMessage = {"serverTime": incomingMessage["serverTime"],
+                                   "message": incomingMessage["message"],
+                                   "payload": statusPayload}
+
+        except Exception as e:
+            logging.exception("[%s]: Received status changes invalid." % self.fileName)
+
+            # send error message back
+            try:
+                utcTimestamp = int(time.time())
+                message = {"clientTime": utcTimestamp,
+                           "message": incomingMessage["message"],
+                           "error": "received status invalid"}
+                self.client.send(json.dumps(message))
+            except Exception as e:
+                pass
+
+            return False
+
         options = list()
         nodes = list()
         sensors = list()
@@ -2025,6 +2158,10 @@ class ServerCommunication:
             alertLevel.rulesActivated = rulesActivated
             alertLevels.append(alertLevel)
 
+        # Remember status in order to apply the changes of the next status to it.
+        self._statusPayload = incomingMessage["payload"]
+        self._statusRevision = incomingMessage["payload"].get("revision")
+
         # handle received status update
         if not self.serverEventHandler.receivedStatusUpdate(serverTime,
                                                             options,
@@ -2067,8 +2204,40 @@ class ServerCommunication:
 
         return True
 
+    # internal function that applies the received changes of the alert system status
+    # to the last received status (returns None if they do not belong to it)
+    def _applyStatusDelta(self, deltaPayload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+
+        if self._statusPayload is None or deltaPayload["fromRevision"] != self._statusRevision:
+            return None
+
+        listKeys = [("options", "type"),
+                    ("nodes", "nodeId"),
+                    ("sensors", "sensorId"),
+                    ("managers", "managerId"),
+                    ("alerts", "alertId"),
+                    ("alertLevels", "alertLevel")]
+
+        entries = dict()
+        for listName, key in listKeys:
+            entries[listName] = collections.OrderedDict((x[key], x) for x in self._statusPayload[listName])
+
+        for change in deltaPayload["changes"]:
+            listEntries = entries[change["list"]]
+            if change["action"] == "delete":
+                listEntries.pop(change["key"], None)
+            else:
+                listEntries[change["key"]] = change["entry"]
+
+        statusPayload = {"type": "request",
+                         "revision": deltaPayload["revision"]}
+        for listName, _ in listKeys:
+            statusPayload[listName] = list(entries[listName].values())
+
+        return statusPayload
+
     # internal function that handles received sensor alerts
-    def _sensorAlertHandler(self, incomingMessage: Dict[str, Any]) -> bool:
+    def _sensorAlertHandler(self, incomingMessage: Dict[str, Any], sendResponse: bool = True) -> bool:
 
         logging.info("[%s]: Received sensor alert." % self.fileName)
 
@@ -2180,20 +2349,21 @@ class ServerCommunication:
 
             return False
 
-        # sending sensor alert response
-        logging.debug("[%s]: Sending sensor alert response message." % self.fileName)
-        try:
-            payload = {"type": "response",
-                       "result": "ok"}
-            utcTimestamp = int(time.time())
-            message = {"clientTime": utcTimestamp,
-                       "message": "sensoralert",
-                       "payload": payload}
-            self.client.send(json.dumps(message))
+        if sendResponse:
+            # sending sensor alert response
+            logging.debug("[%s]: Sending sensor alert response message." % self.fileName)
+            try:
+                payload = {"type": "response",
+                           "result": "ok"}
+                utcTimestamp = int(time.time())
+                message = {"clientTime": utcTimestamp,
+                           "message": "sensoralert",
+                           "payload": payload}
+                self.client.send(json.dumps(message))
 
-        except Exception as e:
-            logging.exception("[%s]: Sending sensor alert response failed." % self.fileName)
-            return False
+            except Exception as e:
+                logging.exception("[%s]: Sending sensor alert response failed." % self.fileName)
+                return False
 
         # handle received sensor alert
         if self.serverEventHandler.receivedSensorAlert(serverTime, sensorAlert):
@@ -2202,7 +2372,7 @@ class ServerCommunication:
         return False
 
     # internal function that handles received state changes of sensors
-    def _stateChangeHandler(self, incomingMessage: Dict[str, Any]) -> bool:
+    def _stateChangeHandler(self, incomingMessage: Dict[str, Any], sendResponse: bool = True) -> bool:
 
         logging.debug("[%s]: Received state change." % self.fileName)
 
@@ -2257,20 +2427,21 @@ class ServerCommunication:
 
             return False
 
-        # sending state change response
-        logging.debug("[%s]: Sending state change response message." % self.fileName)
-        try:
-            payload = {"type": "response",
-                       "result": "ok"}
-            utcTimestamp = int(time.time())
-            message = {"clientTime": utcTimestamp,
-                       "message": "statechange",
-                       "payload": payload}
-            self.client.send(json.dumps(message))
+        if sendResponse:
+            # sending state change response
+            logging.debug("[%s]: Sending state change response message." % self.fileName)
+            try:
+                payload = {"type": "response",
+                           "result": "ok"}
+                utcTimestamp = int(time.time())
+                message = {"clientTime": utcTimestamp,
+                           "message": "statechange",
+                           "payload": payload}
+                self.client.send(json.dumps(message))
 
-        except Exception as e:
-            logging.exception("[%s]: Sending state change response failed." % self.fileName)
-            return False
+            except Exception as e:
+                logging.exception("[%s]: Sending state change response failed." % self.fileName)
+                return False
 
         # handle received state change
         if self.serverEventHandler.receivedStateChange(serverTime,
@@ -2282,6 +2453,66 @@ class ServerCommunication:
 
         return False
 
+    # internal function that handles received batch messages
+    # (multiple sensor alerts and state changes in one transaction)
+    def _batchHandler(self, incomingMessage: Dict[str, Any]) -> bool:
+
+        logging.debug("[%s]: Received batch." % self.fileName)
+
+        try:
+            if not self._checkMsgServerTime(incomingMessage["serverTime"], incomingMessage["message"]):
+                logging.error("[%s]: Received serverTime invalid." % self.fileName)
+                return False
+
+            batchMessages = incomingMessage["payload"]["messages"]
+            if not isinstance(batchMessages, list):
+                logging.error("[%s]: Received batch messages invalid." % self.fileName)
+                return False
+
+        except Exception as e:
+            logging.exception("[%s]: Received batch invalid." % self.fileName)
+            return False
+
+        # handle each message of the batch without sending a response
+        for batchMessage in batchMessages:
+            try:
+                message = {"serverTime": incomingMessage["serverTime"],
+                           "message": batchMessage["message"],
+                           "payload": batchMessage["payload"]}
+                command = str(message["message"]).upper()
+
+            except Exception as e:
+                logging.exception("[%s]: Received batch message invalid." % self.fileName)
+                return False
+
+            if command == "SENSORALERT":
+                if not self._sensorAlertHandler(message, sendResponse=False):
+                    return False
+
+            elif command == "STATECHANGE":
+                if not self._stateChangeHandler(message, sendResponse=False):
+                    return False
+            else:
+                logging.error("[%s]: Received unknown command in batch: '%s'." % (self.fileName, command))
+                return False
+
+        # sending batch response
+        logging.debug("[%s]: Sending batch response message." % self.fileName)
+        try:
+            payload = {"type": "response",
+                       "result": "ok"}
+            utcTimestamp = int(time.time())
+            message = {"clientTime": utcTimestamp,
+                       "message": "batch",
+                       "payload": payload}
+            self.client.send(json.dumps(message))
+
+        except Exception as e:
+            logging.exception("[%s]: Sending batch response failed." % self.fileName)
+            return False
+
+        return True
+
     # function that initializes the communication to the server
     # for example checks the version and authenticates the client
     def initializeCommunication(self) -> bool:
@@ -2359,22 +2590,14 @@ class ServerCommunication:
                 self.client.send(json.dumps(message))
 
                 # After initiating transaction receive actual command.
-                data = ""
-                lastSize = 0
-                while len(data) < messageSize:
-                    data += self.client.recv(BUFSIZE)
-
-                    # Check if the size of the received data has changed.
-                    # If not we detected a possible dead lock.
-                    if lastSize != len(data):
-                        lastSize = len(data)
-                    else:
-                        logging.error("[%s]: Possible dead lock "
-                                      % self.fileName
-                                      + "detected while receiving data. Closing connection to server.")
+                data = self.client.recvMessage(messageSize)
+                if data is None:
+                    logging.error("[%s]: Possible dead lock "
+                                  % self.fileName
+                                  + "detected while receiving data. Closing connection to server.")
 
-                        self._releaseLock()
-                        return False
+                    self._releaseLock()
+                    return False
 
             # if no RTS was received
             # => server does not stick to protocol
@@ -2466,6 +2689,8 @@ class ServerCommunication:
     # this function handles the incoming messages from the server
     def handleCommunication(self):
 
+        self._receiverThreadId = threading.get_ident()
+
         self._acquireLock()
 
         # handle commands in an infinity loop
@@ -2473,11 +2698,15 @@ class ServerCommunication:
 
             messageSize = 0
 
+            # wait without holding the lock until the server sends data
+            # (data could also be consumed by a thread that initiated a transaction with the server,
+            # other threads can acquire the lock and send data to the server in the meantime)
+            if not self.client.hasPendingData():
+                self._waitForData()
+                continue
+
             try:
-                # try to receive data for 0.5 seconds and then
-                # timeout to give other threads the possibility
-                # to send acquire the lock and send data to the server
-                data = self.client.recv(BUFSIZE, timeout=0.5)
+                data = self.client.recv(BUFSIZE)
                 if not data:
 
                     # clean up session before exiting
@@ -2519,24 +2748,16 @@ class ServerCommunication:
                     self.client.send(json.dumps(message))
 
                     # After initiating transaction receive actual command.
-                    data = ""
-                    lastSize = 0
-                    while len(data) < messageSize:
-                        data += self.client.recv(BUFSIZE)
-
-                        # Check if the size of the received data has changed.
-                        # If not we detected a possible dead lock.
-                        if lastSize != len(data):
-                            lastSize = len(data)
-                        else:
-                            logging.error("[%s]: Possible dead lock "
-                                          % self.fileName
-                                          + "detected while receiving data. Closing connection to server.")
-
-                            # clean up session before exiting
-                            self._cleanUpSessionForClosing()
-                            self._releaseLock()
-                            return
+                    data = self.client.recvMessage(messageSize)
+                    if data is None:
+                        logging.error("[%s]: Possible dead lock "
+                                      % self.fileName
+                                      + "detected while receiving data. Closing connection to server.")
+
+                        # clean up session before exiting
+                        self._cleanUpSessionForClosing()
+                        self._releaseLock()
+                        return
 
                 # if no RTS was received
                 # => server does not stick to protocol
@@ -2552,18 +2773,8 @@ class ServerCommunication:
                     return
 
             except socket.timeout as e:
-                # release lock and acquire to let other threads send
-                # data to the server
-                # (wait 0.5 seconds in between, because semaphore
-                # are released in random order => other threads could be
-                # unlucky and not be chosen => this has happened when
-                # loglevel was not debug => hdd I/O has slowed this process
-                # down)
-                self._releaseLock()
-                time.sleep(0.5)
-                self._acquireLock()
-
-                # continue receiving
+                # only a part of the data was received in time
+                # => continue waiting for data
                 continue
 
             except Exception as e:
@@ -2663,6 +2874,20 @@ class ServerCommunication:
                         self._releaseLock()
                         return
 
+            # check if BATCH was received
+            # => handle all contained messages
+            elif command == "BATCH":
+
+                    # handle batch message
+                    if not self._batchHandler(message):
+
+                        logging.error("[%s]: Receiving batch failed." % self.fileName)
+
+                        # clean up session before exiting
+                        self._cleanUpSessionForClosing()
+                        self._releaseLock()
+                        return
+
             else:
                 logging.error("[%s]: Received unknown command. Server sent: '%s'." % (self.fileName, data))
 
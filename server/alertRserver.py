@@ -9,11 +9,18 @@
 
 import sys
 import os
+import atexit
+import signal
 from lib import ConnectionWatchdog, CSVWatchdog
-from lib import ServerSession, ThreadedTCPServer
+from lib import ServerSession, ThreadedTCPServer, AsyncServer
 from lib import VersionInformerSensor
 from lib import SensorAlertExecuter
 from lib import ManagerUpdateExecuter
+from lib import SenderPool
+from lib import AlertSystemStateCache
+from lib import AlertLevelDispatchTable
+from lib import ServerSslContext
+from lib import MetricsServer
 from lib import GlobalData
 from lib import SurveyExecuter
 from lib import parse_config
@@ -22,6 +29,16 @@ import threading
 import random
 
 
+def stop_sensor_history(sensor_history):
+    """
+    Stops the sensor history thread and waits until all collected values are written to the database.
+
+    :param sensor_history:
+    """
+    sensor_history.exit()
+    sensor_history.join(30.0)
+
+
 if __name__ == '__main__':
 
     # generate object of the global needed data
@@ -37,6 +54,32 @@ if __name__ == '__main__':
 
     random.seed()
 
+    # create the cache of the alert system status that is shared by all manager clients
+    globalData.alertSystemStateCache = AlertSystemStateCache(globalData)
+
+    # create the table that maps the alert levels to the clients that handle them
+    globalData.alertLevelDispatchTable = AlertLevelDispatchTable(globalData)
+
+    # start the worker threads that send messages to the clients
+    globalData.logger.info("[%s] Starting sender pool threads." % fileName)
+    globalData.senderPool = SenderPool(globalData,
+                                       globalData.senderPoolWorkers,
+                                       globalData.batchFlushWindow)
+    globalData.senderPool.start()
+
+    # start the thread that writes the history of the sensor data (if activated)
+    if globalData.sensorHistory is not None:
+        globalData.logger.info("[%s] Starting sensor history thread." % fileName)
+        # set thread to daemon
+        # => threads terminates when main thread terminates
+        globalData.sensorHistory.daemon = True
+        globalData.sensorHistory.start()
+
+        # write the collected values when the server shuts down
+        # (SIGTERM is turned into a normal exit in order to run the exit handlers)
+        atexit.register(stop_sensor_history, globalData.sensorHistory)
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
     # start the thread that handles all sensor alerts
     globalData.logger.info("[%s] Starting sensor alert manage thread." % fileName)
     globalData.sensorAlertExecuter = SensorAlertExecuter(globalData)
@@ -53,22 +96,46 @@ if __name__ == '__main__':
     globalData.managerUpdateExecuter.daemon = True
     globalData.managerUpdateExecuter.start()
 
+    # Create the SSL context that is used for all client connections.
+    globalData.serverSslContext = ServerSslContext(globalData)
+
     # start server process
-    while True:
+    # (the asyncio server runs its event loop in the main thread at the end)
+    server = None
+    if globalData.serverMode == "asyncio":
+        server = AsyncServer(globalData, ('0.0.0.0', globalData.server_port))
+
+    else:
+        while True:
+            try:
+                server = ThreadedTCPServer(globalData, ('0.0.0.0', globalData.server_port), ServerSession)
+                break
+
+            except Exception as e:
+                globalData.logger.exception("[%s]: Starting server failed. Try again in 5 seconds." % fileName)
+                time.sleep(5)
+
+        globalData.logger.info("[%s] Starting server thread." % fileName)
+        serverThread = threading.Thread(target=server.serve_forever)
+        # set thread to daemon
+        # => threads terminates when main thread terminates
+        serverThread.daemon = True
+        serverThread.start()
+
+    # start the thread that serves the metrics (if activated)
+    if globalData.metricsActivated:
+        globalData.logger.info("[%s] Starting metrics server thread." % fileName)
         try:
-            server = ThreadedTCPServer(globalData, ('0.0.0.0', globalData.server_port), ServerSession)
-            break
+            globalData.metricsServer = MetricsServer(globalData.metricsRegistry,
+                                                     globalData.metricsPort,
+                                                     globalData.logger)
+            # set thread to daemon
+            # => threads terminates when main thread terminates
+            globalData.metricsServer.daemon = True
+            globalData.metricsServer.start()
 
         except Exception as e:
-            globalData.logger.exception("[%s]: Starting server failed. Try again in 5 seconds." % fileName)
-            time.sleep(5)
-
-    globalData.logger.info("[%s] Starting server thread." % fileName)
-    serverThread = threading.Thread(target=server.serve_forever)
-    # set thread to daemon
-    # => threads terminates when main thread terminates
-    serverThread.daemon = True
-    serverThread.start()
+            globalData.logger.exception("[%s]: Starting metrics server failed." % fileName)
 
     # start a watchdog thread that controls all server sessions
     globalData.logger.info("[%s] Starting connection watchdog thread." % fileName)
@@ -117,5 +184,10 @@ if __name__ == '__main__':
         time.sleep(0.5)
 
     # handle requests in an infinity loop
-    while True:
-        server.handle_request()
+    if globalData.serverMode == "asyncio":
+        globalData.logger.info("[%s] Starting asyncio server." % fileName)
+        server.serve_forever()
+
+    else:
+        while True:
+            server.handle_request()
@@ -0,0 +1,625 @@
+#!/usr/bin/python3
+
+# written by sqall
+# twitter: https://twitter.com/sqall01
+# blog: https://h4des.org
+# github: https://github.com/sqall01
+#
+# Licensed under the GNU Affero General Public License, version 3.
+
+# End-to-end benchmark of the server. It starts the server with a temporary
+# database and a self-signed certificate and connects simulated sensor, alert and
+# manager clients (using the client libraries of sensorClientDevelopment,
+# alertClientTemplate and managerClientConsole in a separate process) to it.
+# The sensor clients send state changes and sensor alerts with the configured
+# rates. It reports the end-to-end latency of the sensor alerts (sent by a sensor
+# client until received by an alert client), the number of messages per second,
+# the number of threads of the server and the time waited for the database lock.
+
+import os
+import sys
+import time
+import random
+import socket
+import logging
+import optparse
+import tempfile
+import threading
+import subprocess
+import importlib.util
+import multiprocessing
+import bcrypt
+from typing import Any, Dict, List
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lib import ConnectionWatchdog
+from lib import ServerSession, ThreadedTCPServer, AsyncServer
+from lib import SensorAlertExecuter
+from lib import ManagerUpdateExecuter
+from lib import SenderPool
+from lib import AlertSystemStateCache
+from lib import AlertLevelDispatchTable
+from lib import ServerSslContext
+from lib import GlobalData
+from lib import parse_config
+
+# Directory of the alertR repository (contains the server and the clients).
+REPOSITORY_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Password of all simulated clients.
+PASSWORD = "benchmark"
+
+# Alert level used by all sensors and alerts.
+ALERT_LEVEL = 0
+
+
+# This class wraps the lock of the storage backend and measures the time waited to acquire it.
+class TimedLock:
+
+    def __init__(self, lock: Any):
+        self._lock = lock
+        self._statsLock = threading.Lock()
+        self.acquisitions = 0
+        self.waitTotal = 0.0
+        self.waitMax = 0.0
+
+    def acquire(self, *args, **kwargs) -> bool:
+        startTime = time.perf_counter()
+        result = self._lock.acquire(*args, **kwargs)
+        waitTime = time.perf_counter() - startTime
+        with self._statsLock:
+            self.acquisitions += 1
+            self.waitTotal += waitTime
+            self.waitMax = max(self.waitMax, waitTime)
+        return result
+
+    def release(self):
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.release()
+
+
+# This class counts the messages received by the simulated clients.
+class MessageCounter:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = dict()  # type: Dict[str, int]
+
+    def add(self, name: str):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+
+# This class is used as alert of the simulated alert clients and records the latency of the sensor alerts.
+class BenchmarkAlert:
+
+    def __init__(self, alertId: int, latencies: List[float], counter: MessageCounter):
+        self.id = alertId
+        self.description = "Benchmark alert %d" % alertId
+        self.alertLevels = [ALERT_LEVEL]
+        self._latencies = latencies
+        self._counter = counter
+
+    def _record(self, sensor_alert: Any):
+        receivedTime = time.time()
+        self._counter.add("alertSensorAlerts")
+        if sensor_alert.hasOptionalData and "benchmarkTime" in sensor_alert.optionalData:
+            self._latencies.append(receivedTime - sensor_alert.optionalData["benchmarkTime"])
+
+    def alert_triggered(self, sensor_alert: Any):
+        self._record(sensor_alert)
+
+    def alert_normal(self, sensor_alert: Any):
+        self._record(sensor_alert)
+
+    def alert_off(self):
+        pass
+
+    def initialize(self):
+        pass
+
+
+# This class replaces the event handler of the simulated manager clients and counts the received events.
+class BenchmarkEventHandler:
+
+    def __init__(self, counter: MessageCounter):
+        self._counter = counter
+
+    def receivedStatusUpdate(self, serverTime: int, options: List[Any], nodes: List[Any], sensors: List[Any],
+                             managers: List[Any], alerts: List[Any], alertLevels: List[Any]) -> bool:
+        self._counter.add("managerStatusUpdates")
+        return True
+
+    def receivedSensorAlert(self, serverTime: int, sensorAlert: Any) -> bool:
+        self._counter.add("managerSensorAlerts")
+        return True
+
+    def receivedStateChange(self, serverTime: int, sensorId: int, state: int, dataType: int, sensorData: Any) -> bool:
+        self._counter.add("managerStateChanges")
+        return True
+
+    def handleEvent(self):
+        pass
+
+
+def loadClientLib(clientDir: str, moduleName: str) -> Any:
+    """
+    Loads the "lib" package of a client under the given module name
+    (all clients and the server name their package "lib").
+
+    :param clientDir:
+    :param moduleName:
+    :return:
+    """
+    libDir = os.path.join(REPOSITORY_DIR, clientDir, "lib")
+    spec = importlib.util.spec_from_file_location(moduleName,
+                                                  os.path.join(libDir, "__init__.py"),
+                                                  submodule_search_locations=[libDir])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[moduleName] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def getFreePort() -> int:
+    """
+    Gets a free TCP port.
+
+    :return:
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def createCertificate(tempDir: str):
+    """
+    Creates a self-signed certificate with openssl.
+
+    :param tempDir:
+    :return: tuple of the certificate and key file
+    """
+    certFile = os.path.join(tempDir, "server.crt")
+    keyFile = os.path.join(tempDir, "server.key")
+    subprocess.check_call(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+                           "-subj", "/CN=localhost", "-days", "1",
+                           "-keyout", keyFile, "-out", certFile],
+                          stdout=subprocess.DEVNULL,
+                          stderr=subprocess.DEVNULL)
+    return certFile, keyFile
+
+
+def createUsers(csvFile: str, users: List[List[str]]):
+    """
+    Creates the users.csv file for the given users.
+
+    :param csvFile:
+    :param users: list of [username, node type, instance]
+    """
+    # Hash all passwords with the lowest cost (verifying the passwords is not part of the benchmark).
+    pwhash = bcrypt.hashpw(PASSWORD.encode("ascii"), bcrypt.gensalt(4)).decode("ascii")
+    with open(csvFile, "w") as fp:
+        fp.write("Version:1\n")
+        for username, nodeType, instance in users:
+            fp.write("\"%s\",\"%s\",\"%s\",\"%s\"\n" % (username, pwhash, nodeType, instance))
+
+
+def createConfig(configFile: str, tempDir: str, certFile: str, keyFile: str, port: int, options: Any):
+    """
+    Creates the configuration file of the server.
+
+    :param configFile:
+    :param tempDir:
+    :param certFile:
+    :param keyFile:
+    :param port:
+    :param options:
+    """
+    config = """<?xml version="1.0"?>
+<config version="%.3f">
+    <general>
+        <log dir="%s" level="WARNING" />
+        <server certFile="%s" keyFile="%s" port="%d" mode="%s" batchFlushWindow="%f" />
+        <storage mode="%s" />
+        <client useClientCertificates="False" clientCAFile="" />
+        <ssl noSSLv2="True" noSSLv3="True" noTLSv1_0="True" noTLSv1_1="True" noTLSv1_2="False" />
+        <survey participate="False" />
+    </general>
+    <update>
+        <server url="https://127.0.0.1/" />
+    </update>
+    <alertLevels>
+        <alertLevel>
+            <general level="%d" name="benchmark" triggerAlways="True"
+                triggerAlertTriggered="True" triggerAlertNormal="True" />
+            <rules activated="False"></rules>
+        </alertLevel>
+    </alertLevels>
+    <internalSensors>
+        <sensorTimeout activated="False" description="Internal: Sensor Timeout" />
+        <nodeTimeout activated="False" description="Internal: Node Timeout" />
+        <alertSystemActive activated="False" description="Internal: Alert System Active" />
+        <versionInformer activated="False" description="Internal: Version Informer" interval="86400" />
+    </internalSensors>
+</config>
+""" % (GlobalData().version, tempDir, certFile, keyFile, port, options.mode, options.batchFlushWindow,
+       options.storageMode, ALERT_LEVEL)
+    with open(configFile, "w") as fp:
+        fp.write(config)
+
+    # The server refuses configuration files that are accessible by others.
+    os.chmod(configFile, 0o600)
+
+
+def startServer(globalData: GlobalData):
+    """
+    Starts the server threads (the same way the server main script does).
+
+    :param globalData:
+    """
+    globalData.alertSystemStateCache = AlertSystemStateCache(globalData)
+    globalData.alertLevelDispatchTable = AlertLevelDispatchTable(globalData)
+
+    globalData.senderPool = SenderPool(globalData,
+                                       globalData.senderPoolWorkers,
+                                       globalData.batchFlushWindow)
+    globalData.senderPool.start()
+
+    if globalData.sensorHistory is not None:
+        globalData.sensorHistory.daemon = True
+        globalData.sensorHistory.start()
+
+    globalData.sensorAlertExecuter = SensorAlertExecuter(globalData)
+    globalData.sensorAlertExecuter.daemon = True
+    globalData.sensorAlertExecuter.start()
+
+    globalData.managerUpdateExecuter = ManagerUpdateExecuter(globalData)
+    globalData.managerUpdateExecuter.daemon = True
+    globalData.managerUpdateExecuter.start()
+
+    globalData.serverSslContext = ServerSslContext(globalData)
+
+    if globalData.serverMode == "asyncio":
+        server = AsyncServer(globalData, ("127.0.0.1", globalData.server_port))
+        serverThread = threading.Thread(target=server.serve_forever)
+
+    else:
+        server = ThreadedTCPServer(globalData, ("127.0.0.1", globalData.server_port), ServerSession)
+        serverThread = threading.Thread(target=server.serve_forever)
+    serverThread.daemon = True
+    serverThread.start()
+
+    globalData.connectionWatchdog = ConnectionWatchdog(globalData,
+                                                       globalData.connectionTimeout)
+    globalData.connectionWatchdog.daemon = True
+    globalData.connectionWatchdog.start()
+
+    while not globalData.connectionWatchdog.isInitialized():
+        time.sleep(0.1)
+
+
+def driveSensorNode(serverComm: Any, sensorLib: Any, sensorIds: List[int], stateChangeRate: float,
+                    sensorAlertRate: float, startTime: float, endTime: float, counter: MessageCounter):
+    """
+    Sends state changes and sensor alerts of a sensor node with the given rates (per second).
+
+    :param serverComm:
+    :param sensorLib:
+    :param sensorIds:
+    :param stateChangeRate:
+    :param sensorAlertRate:
+    :param startTime:
+    :param endTime:
+    :param counter:
+    """
+    rand = random.Random()
+    states = dict((x, 0) for x in sensorIds)
+    totalRate = stateChangeRate + sensorAlertRate
+    if totalRate <= 0.0:
+        return
+
+    nextTime = startTime + rand.expovariate(totalRate)
+    while nextTime < endTime:
+        time.sleep(max(0.0, nextTime - time.time()))
+        nextTime += rand.expovariate(totalRate)
+
+        sensorId = rand.choice(sensorIds)
+        states[sensorId] = 1 - states[sensorId]
+
+        if rand.random() * totalRate < sensorAlertRate:
+            sensorAlert = sensorLib.localObjects.SensorAlert()
+            sensorAlert.clientSensorId = sensorId
+            sensorAlert.state = 1
+            sensorAlert.changeState = False
+            sensorAlert.hasLatestData = False
+            sensorAlert.dataType = sensorLib.SensorDataType.NONE
+            sensorAlert.hasOptionalData = True
+            sensorAlert.optionalData = {"benchmarkTime": time.time()}
+            if serverComm.sendSensorAlert(sensorAlert):
+                counter.add("sentSensorAlerts")
+            else:
+                counter.add("failedSensorAlerts")
+
+        else:
+            stateChange = sensorLib.localObjects.StateChange()
+            stateChange.clientSensorId = sensorId
+            stateChange.state = states[sensorId]
+            stateChange.dataType = sensorLib.SensorDataType.NONE
+            if serverComm.sendStateChange(stateChange):
+                counter.add("sentStateChanges")
+            else:
+                counter.add("failedStateChanges")
+
+
+def runClients(options: Dict[str, Any], port: int, certFile: str, resultQueue: Any):
+    """
+    Connects the simulated clients to the server and sends the messages (runs in its own process).
+
+    :param options:
+    :param port:
+    :param certFile:
+    :param resultQueue:
+    """
+    logging.basicConfig(level=logging.CRITICAL)
+
+    sensorLib = loadClientLib("sensorClientDevelopment", "benchmarkSensorLib")
+    alertLib = loadClientLib("alertClientTemplate", "benchmarkAlertLib")
+    managerLib = loadClientLib("managerClientConsole", "benchmarkManagerLib")
+
+    counter = MessageCounter()
+    latencies = list()  # type: List[float]
+    connections = list()
+
+    # Connect alert clients.
+    for i in range(options["alertClients"]):
+        globalData = alertLib.GlobalData()
+        globalData.persistent = 0
+        globalData.alerts = [BenchmarkAlert(0, latencies, counter)]
+        serverComm = alertLib.ServerCommunication("127.0.0.1", port, certFile, "alert_%d" % i, PASSWORD,
+                                                  None, None, globalData)
+        if not serverComm.initializeCommunication():
+            raise ValueError("Connecting alert client %d failed." % i)
+        receiver = alertLib.Receiver(serverComm)
+        receiverThread = threading.Thread(target=receiver.run)
+        receiverThread.daemon = True
+        receiverThread.start()
+        connections.append((serverComm, alertLib.ConnectionWatchdog, globalData.pingInterval))
+
+    # Connect manager clients.
+    for i in range(options["managers"]):
+        globalData = managerLib.GlobalData()
+        globalData.persistent = 0
+        globalData.description = "Benchmark manager %d" % i
+        serverComm = managerLib.ServerCommunication("127.0.0.1", port, certFile, "manager_%d" % i, PASSWORD,
+                                                    None, None, globalData)
+        serverComm.serverEventHandler = BenchmarkEventHandler(counter)
+        if not serverComm.initializeCommunication():
+            raise ValueError("Connecting manager client %d failed." % i)
+        receiver = managerLib.Receiver(serverComm)
+        receiver.daemon = True
+        receiver.start()
+        connections.append((serverComm, managerLib.ConnectionWatchdog, globalData.pingInterval))
+
+    # Connect sensor clients.
+    sensorNodes = list()
+    for i in range(options["sensorNodes"]):
+        globalData = sensorLib.GlobalData()
+        globalData.persistent = 0
+        for sensorId in range(options["sensorsPerNode"]):
+            sensor = sensorLib.SensorDev()
+            sensor.id = sensorId
+            sensor.description = "Benchmark sensor %d" % sensorId
+            sensor.alertDelay = 0
+            sensor.alertLevels = [ALERT_LEVEL]
+            sensor.triggerAlert = True
+            sensor.triggerAlertNormal = True
+            sensor.triggerState = 1
+            sensor.state = 0
+            sensor.sensorDataType = sensorLib.SensorDataType.NONE
+            globalData.sensors.append(sensor)
+        serverComm = sensorLib.ServerCommunication("127.0.0.1", port, certFile, "sensor_%d" % i, PASSWORD,
+                                                   None, None, globalData)
+        if not serverComm.initializeCommunication():
+            raise ValueError("Connecting sensor client %d failed." % i)
+        sensorNodes.append(serverComm)
+        connections.append((serverComm, sensorLib.ConnectionWatchdog, globalData.pingInterval))
+
+    # Keep the connections alive (the clients send pings like they do when started normally).
+    for serverComm, watchdogClass, pingInterval in connections:
+        connectionWatchdog = watchdogClass(serverComm, pingInterval, None)
+        connectionWatchdog.daemon = True
+        connectionWatchdog.start()
+
+    resultQueue.put({"type": "connected"})
+
+    # Send messages of all sensor nodes in parallel.
+    startTime = time.time() + 0.5
+    endTime = startTime + options["duration"]
+    sensorIds = list(range(options["sensorsPerNode"]))
+    threads = list()
+    for serverComm in sensorNodes:
+        thread = threading.Thread(target=driveSensorNode,
+                                  args=(serverComm,
+                                        sensorLib,
+                                        sensorIds,
+                                        options["stateChangeRate"] / len(sensorNodes),
+                                        options["sensorAlertRate"] / len(sensorNodes),
+                                        startTime,
+                                        endTime,
+                                        counter))
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    sendDuration = time.time() - startTime
+
+    # Wait for the messages that are still on their way.
+    time.sleep(options["drainTime"])
+
+    resultQueue.put({"type": "result",
+                     "duration": sendDuration,
+                     "counts": dict(counter.counts),
+                     "latencies": list(latencies)})
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Gets the given percentile of the sorted values.
+
+    :param values:
+    :param fraction:
+    :return:
+    """
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+if __name__ == '__main__':
+
+    parser = optparse.OptionParser()
+    parser.add_option("-s", "--sensor-nodes", dest="sensorNodes", type="int", default=20,
+                      help="Number of simulated sensor clients.")
+    parser.add_option("-n", "--sensors-per-node", dest="sensorsPerNode", type="int", default=5,
+                      help="Number of sensors per sensor client.")
+    parser.add_option("-a", "--alert-clients", dest="alertClients", type="int", default=5,
+                      help="Number of simulated alert clients.")
+    parser.add_option("-m", "--managers", dest="managers", type="int", default=2,
+                      help="Number of simulated manager clients.")
+    parser.add_option("-c", "--state-change-rate", dest="stateChangeRate", type="float", default=50.0,
+                      help="State changes per second (all sensor clients together).")
+    parser.add_option("-r", "--sensor-alert-rate", dest="sensorAlertRate", type="float", default=5.0,
+                      help="Sensor alerts per second (all sensor clients together).")
+    parser.add_option("-d", "--duration", dest="duration", type="float", default=30.0,
+                      help="Time in seconds the messages are sent.")
+    parser.add_option("--drain-time", dest="drainTime", type="float", default=3.0,
+                      help="Time in seconds to wait for outstanding messages after sending stopped.")
+    parser.add_option("--mode", dest="mode", type="choice", choices=["threaded", "asyncio"], default="threaded",
+                      help="Mode of the server (threaded or asyncio).")
+    parser.add_option("-b", "--batch-flush-window", dest="batchFlushWindow", type="float",
+                      default=GlobalData().batchFlushWindow,
+                      help="Time in seconds messages for a client are collected before they are sent in one "
+                           + "batch (0 sends them right away).")
+    parser.add_option("--storage-mode", dest="storageMode", type="choice", choices=["default", "wal"],
+                      default="default", help="Journal mode of the database (default or wal).")
+    (options, args) = parser.parse_args()
+
+    if options.sensorNodes <= 0 or options.sensorsPerNode <= 0:
+        parser.error("At least one sensor client with one sensor is needed.")
+
+    tempDir = tempfile.mkdtemp()
+    certFile, keyFile = createCertificate(tempDir)
+    port = getFreePort()
+
+    users = list()
+    for i in range(options.sensorNodes):
+        users.append(["sensor_%d" % i, "sensor", "sensorClientDevelopment"])
+    for i in range(options.alertClients):
+        users.append(["alert_%d" % i, "alert", "alertClientTemplate"])
+    for i in range(options.managers):
+        users.append(["manager_%d" % i, "manager", "managerClientConsole"])
+
+    globalData = GlobalData()
+    globalData.configFile = os.path.join(tempDir, "config.xml")
+    globalData.userBackendCsvFile = os.path.join(tempDir, "users.csv")
+    globalData.storageBackendSqliteFile = os.path.join(tempDir, "database.db")
+    createUsers(globalData.userBackendCsvFile, users)
+    createConfig(globalData.configFile, tempDir, certFile, keyFile, port, options)
+
+    if not parse_config(globalData):
+        print("Parsing configuration failed (see logs in %s)." % tempDir)
+        sys.exit(1)
+
+    # Measure the time waited for the database lock.
+    dbLock = TimedLock(globalData.storage.dbLock)
+    globalData.storage.dbLock = dbLock
+
+    startServer(globalData)
+    serverThreadsIdle = threading.active_count()
+
+    # The clients run in their own process, so they do not compete with the server for the interpreter lock.
+    context = multiprocessing.get_context("spawn")
+    resultQueue = context.Queue()
+    clientProcess = context.Process(target=runClients,
+                                    args=(dict(vars(options)), port, certFile, resultQueue))
+    clientProcess.start()
+
+    # Wait for the clients to connect (the client process fails for example if a client library
+    # can not be loaded).
+    message = None
+    connectTimeout = time.time() + 300
+    while message is None:
+        try:
+            message = resultQueue.get(timeout=0.5)
+        except Exception:
+            if not clientProcess.is_alive():
+                print("Client process failed.")
+                sys.exit(1)
+            if time.time() > connectTimeout:
+                print("Connecting the clients timed out.")
+                clientProcess.terminate()
+                sys.exit(1)
+    if message["type"] != "connected":
+        print("Connecting the clients failed.")
+        sys.exit(1)
+    serverThreadsConnected = threading.active_count()
+
+    # Sample the number of threads of the server while the messages are sent.
+    serverThreadsMax = serverThreadsConnected
+    result = None
+    while result is None:
+        try:
+            result = resultQueue.get(timeout=0.5)
+        except Exception:
+            if not clientProcess.is_alive():
+                print("Client process failed.")
+                sys.exit(1)
+        serverThreadsMax = max(serverThreadsMax, threading.active_count())
+    clientProcess.join()
+
+    duration = result["duration"]
+    counts = result["counts"]
+    latencies = sorted(result["latencies"])
+
+    print("Sensor clients: %d (sensors: %d), alert clients: %d, manager clients: %d, server mode: %s"
+          % (options.sensorNodes, options.sensorNodes * options.sensorsPerNode, options.alertClients,
+             options.managers, options.mode))
+    print("Duration: %.1f s" % duration)
+    messageCount = 0
+    for name, description in [("sentStateChanges", "State changes sent by sensor clients"),
+                              ("sentSensorAlerts", "Sensor alerts sent by sensor clients"),
+                              ("alertSensorAlerts", "Sensor alerts received by alert clients"),
+                              ("managerStateChanges", "State changes received by manager clients"),
+                              ("managerSensorAlerts", "Sensor alerts received by manager clients"),
+                              ("managerStatusUpdates", "Status updates received by manager clients")]:
+        messageCount += counts.get(name, 0)
+        print("%s: %d (%.1f/s)" % (description, counts.get(name, 0), counts.get(name, 0) / duration))
+    print("Failed state changes: %d, failed sensor alerts: %d"
+          % (counts.get("failedStateChanges", 0), counts.get("failedSensorAlerts", 0)))
+    print("Messages per second: %.1f" % (messageCount / duration))
+    print("Sensor alert latency: p50 %.2f ms, p90 %.2f ms, p99 %.2f ms, max %.2f ms (%d received)"
+          % (percentile(latencies, 0.5) * 1000.0,
+             percentile(latencies, 0.9) * 1000.0,
+             percentile(latencies, 0.99) * 1000.0,
+             (latencies[-1] if latencies else 0.0) * 1000.0,
+             len(latencies)))
+    senderStatistics = globalData.senderPool.get_statistics()
+    print("Sender dispatch latency (queued until sent to the client): avg %.3f ms, max %.3f ms (%d sent)"
+          % (senderStatistics["send_latency_avg"] * 1000.0,
+             senderStatistics["send_latency_max"] * 1000.0,
+             senderStatistics["send_count"]))
+    print("Server threads: %d idle, %d connected, %d max"
+          % (serverThreadsIdle, serverThreadsConnected, serverThreadsMax))
+    print("Database lock: %d acquisitions, %.3f s waited, avg %.3f ms, max %.3f ms"
+          % (dbLock.acquisitions,
+             dbLock.waitTotal,
+             (dbLock.waitTotal / dbLock.acquisitions * 1000.0) if dbLock.acquisitions else 0.0,
+             dbLock.waitMax * 1000.0))
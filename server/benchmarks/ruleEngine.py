@@ -0,0 +1,194 @@
+#!/usr/bin/python3
+
+# written by sqall
+# twitter: https://twitter.com/sqall01
+# blog: https://h4des.org
+# github: https://github.com/sqall01
+#
+# Licensed under the GNU Affero General Public License, version 3.
+
+# Benchmark of the rule engine. It creates a configurable number of alert levels
+# with deep boolean rule trees over the sensors of a temporary database and
+# measures the number of evaluated boolean rule elements and the wall time
+# per processed sensor alert.
+
+import os
+import sys
+import time
+import random
+import logging
+import optparse
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lib import GlobalData
+from lib import Sqlite
+from lib import AlertLevelDispatchTable
+from lib.localObjects import AlertLevel, SensorAlert
+from lib.rules import RuleEngine, RuleElement, RuleStart, RuleBoolean, RuleSensor
+from storageSystemInformation import fillStorage
+
+
+def createRuleElement(depth: int,
+                      sensorCount: int,
+                      sensorsPerNode: int,
+                      rand: random.Random) -> RuleElement:
+    """
+    Creates a random rule element tree with the given depth of boolean elements.
+
+    :param depth:
+    :param sensorCount:
+    :param sensorsPerNode:
+    :param rand:
+    :return:
+    """
+    if depth == 0:
+        sensorIdx = rand.randrange(sensorCount)
+        ruleSensor = RuleSensor()
+        ruleSensor.username = "sensor_%d" % (sensorIdx // sensorsPerNode)
+        ruleSensor.remoteSensorId = sensorIdx
+
+        ruleElement = RuleElement()
+        ruleElement.type = "sensor"
+        ruleElement.element = ruleSensor
+        ruleElement.timeTriggeredFor = 30.0
+        return ruleElement
+
+    ruleBoolean = RuleBoolean()
+    ruleBoolean.type = rand.choice(["and", "or", "or"])
+    for _ in range(rand.randint(2, 3)):
+        ruleBoolean.elements.append(createRuleElement(depth - 1, sensorCount, sensorsPerNode, rand))
+
+    ruleElement = RuleElement()
+    ruleElement.type = "boolean"
+    ruleElement.element = ruleBoolean
+    return ruleElement
+
+
+def createAlertLevels(alertLevelCount: int,
+                      depth: int,
+                      sensorCount: int,
+                      sensorsPerNode: int,
+                      rand: random.Random):
+    """
+    Creates alert levels with one rule of the given depth each.
+
+    :param alertLevelCount:
+    :param depth:
+    :param sensorCount:
+    :param sensorsPerNode:
+    :param rand:
+    :return:
+    """
+    alertLevels = list()
+    for level in range(alertLevelCount):
+        ruleElement = createRuleElement(depth, sensorCount, sensorsPerNode, rand)
+
+        ruleStart = RuleStart()
+        ruleStart.type = ruleElement.type
+        ruleStart.element = ruleElement.element
+        ruleStart.order = 0
+        ruleStart.minTimeAfterPrev = 0.0
+        ruleStart.maxTimeAfterPrev = 0.0
+        ruleStart.counterActivated = False
+
+        alertLevel = AlertLevel()
+        alertLevel.level = level
+        alertLevel.name = "rule level %d" % level
+        alertLevel.triggerAlways = False
+        alertLevel.rulesActivated = True
+        alertLevel.rules = [ruleStart]
+        alertLevels.append(alertLevel)
+
+    return alertLevels
+
+
+def countBooleanElements(ruleElement: RuleElement) -> int:
+    """
+    Counts the boolean elements of the given rule element tree (the elements a full evaluation visits).
+
+    :param ruleElement:
+    :return:
+    """
+    if ruleElement.type != "boolean":
+        return 0
+    return 1 + sum(countBooleanElements(x) for x in ruleElement.element.elements)
+
+
+if __name__ == '__main__':
+
+    parser = optparse.OptionParser()
+    parser.add_option("-s", "--sensors", dest="sensors", type="int", default=1000,
+                      help="Number of sensors in the database.")
+    parser.add_option("-n", "--sensors-per-node", dest="sensorsPerNode", type="int", default=20,
+                      help="Number of sensors per sensor node.")
+    parser.add_option("-l", "--alert-levels", dest="alertLevels", type="int", default=300,
+                      help="Number of alert levels with rules.")
+    parser.add_option("-d", "--depth", dest="depth", type="int", default=6,
+                      help="Depth of the boolean rule trees.")
+    parser.add_option("-a", "--sensor-alerts", dest="sensorAlerts", type="int", default=2000,
+                      help="Number of processed sensor alerts.")
+    (options, args) = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    logger = logging.getLogger("benchmark")
+    rand = random.Random(0)
+
+    tempDir = tempfile.mkdtemp()
+
+    globalData = GlobalData()
+    globalData.logger = logger
+    globalData.storage = Sqlite(os.path.join(tempDir, "benchmark.db"), globalData)
+    fillStorage(globalData.storage, options.sensors, options.sensorsPerNode, logger)
+
+    alertLevels = createAlertLevels(options.alertLevels,
+                                    options.depth,
+                                    options.sensors,
+                                    options.sensorsPerNode,
+                                    rand)
+    elementCounts = dict((x.level, countBooleanElements(x.rules[0])) for x in alertLevels)
+    totalElements = sum(elementCounts.values())
+
+    globalData.alertLevels = alertLevels
+    globalData.alertLevelDispatchTable = AlertLevelDispatchTable(globalData)
+
+    ruleEngine = RuleEngine(globalData)
+
+    # Database ids of the sensors (rule elements reference the sensors by username and remote sensor id).
+    sensorIds = list()
+    for sensorIdx in range(options.sensors):
+        nodeId = globalData.storage.getNodeId("sensor_%d" % (sensorIdx // options.sensorsPerNode))
+        sensorIds.append(globalData.storage.getSensorId(nodeId, sensorIdx))
+
+    processedAlertLevels = 0
+    fullEvaluationElements = 0
+    startTime = time.time()
+    for _ in range(options.sensorAlerts):
+        sensorAlert = SensorAlert()
+        sensorAlert.sensorId = rand.choice(sensorIds)
+        sensorAlert.timeReceived = int(time.time())
+        sensorAlert.alertDelay = 0
+        sensorAlert.state = 1
+
+        # Worst case: every sensor alert is handled by all alert levels with rules.
+        for alertLevel in alertLevels:
+            ruleEngine.add_sensor_alert(sensorAlert, alertLevel)
+        for sensorAlertToHandle in ruleEngine.sensorAlertsToHandleWithRules:
+            processedAlertLevels += 1
+            fullEvaluationElements += elementCounts[sensorAlertToHandle[1].level]
+        ruleEngine.processSensorAlertsRules()
+    duration = time.time() - startTime
+
+    evaluatedElements = 0
+    for compiledRules in ruleEngine._compiledRules.values():
+        for compiledRule in compiledRules:
+            evaluatedElements += compiledRule.evaluation_count
+
+    print("Alert levels: %d (boolean elements: %d, depth: %d)"
+          % (options.alertLevels, totalElements, options.depth))
+    print("Sensor alerts: %d (alert level evaluations: %d)" % (options.sensorAlerts, processedAlertLevels))
+    print("Boolean elements evaluated per sensor alert: %.1f (full evaluation: %.1f)"
+          % (float(evaluatedElements) / options.sensorAlerts,
+             float(fullEvaluationElements) / options.sensorAlerts))
+    print("Time per sensor alert: %.3f ms" % (duration * 1000.0 / options.sensorAlerts))
+
+    globalData.storage.close(logger)
@@ -0,0 +1,184 @@
+#!/usr/bin/python3
+
+# written by sqall
+# twitter: https://twitter.com/sqall01
+# blog: https://h4des.org
+# github: https://github.com/sqall01
+#
+# Licensed under the GNU Affero General Public License, version 3.
+
+# Benchmark of Sqlite.getAlertSystemInformation(). It fills a temporary
+# database with a configurable number of sensors and measures the number
+# of executed SQL queries and the wall time of the bulk implementation
+# compared to querying each sensor, manager and alert separately.
+
+import os
+import sys
+import time
+import logging
+import optparse
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lib import GlobalData
+from lib import Sqlite
+from lib.localObjects import SensorDataType
+
+
+# This class counts the sql statements that are executed on a sqlite connection.
+class QueryCounter:
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, statement: str):
+        self.count += 1
+
+
+def fillStorage(storage: Sqlite,
+                sensorCount: int,
+                sensorsPerNode: int,
+                logger: logging.Logger):
+    """
+    Adds sensor nodes with the given number of sensors and one alert and manager node to the database.
+
+    :param storage:
+    :param sensorCount:
+    :param sensorsPerNode:
+    :param logger:
+    """
+    nodeCount = (sensorCount + sensorsPerNode - 1) // sensorsPerNode
+    sensorId = 0
+    for nodeIdx in range(nodeCount):
+        username = "sensor_%d" % nodeIdx
+        storage.addNode(username, "host_%d" % nodeIdx, "sensor", "benchmark", 0.6, 0, 1, logger)
+
+        sensors = list()
+        for _ in range(min(sensorsPerNode, sensorCount - sensorId)):
+            dataType = sensorId % 3
+            if dataType == SensorDataType.NONE:
+                data = None
+            elif dataType == SensorDataType.INT:
+                data = sensorId
+            else:
+                data = float(sensorId) / 10.0
+            sensors.append({"clientSensorId": sensorId,
+                            "description": "sensor %d" % sensorId,
+                            "state": 0,
+                            "alertDelay": 0,
+                            "alertLevels": [0, 1],
+                            "dataType": dataType,
+                            "data": data})
+            sensorId += 1
+
+        storage.addSensors(username, sensors, logger)
+
+    storage.addNode("alert_0", "host_alert", "alert", "benchmark", 0.6, 0, 1, logger)
+    storage.addAlerts("alert_0",
+                      [{"clientAlertId": 0, "description": "alert 0", "alertLevels": [0, 1]}],
+                      logger)
+
+    storage.addNode("manager_0", "host_manager", "manager", "benchmark", 0.6, 0, 1, logger)
+    storage.addManager("manager_0", {"description": "manager 0"}, logger)
+
+
+def getAlertSystemInformationPerRow(storage: Sqlite,
+                                    logger: logging.Logger):
+    """
+    Gets the sensors, managers and alerts by querying each object separately
+    (the way getAlertSystemInformation() did before it used bulk queries).
+
+    :param storage:
+    :param logger:
+    """
+    storage._acquireLock(logger)
+    try:
+        storage.cursor.execute("SELECT type, value FROM options")
+        storage.cursor.fetchall()
+        storage.cursor.execute("SELECT * FROM nodes")
+        storage.cursor.fetchall()
+        storage.cursor.execute("SELECT id FROM sensors")
+        for resultTuple in storage.cursor.fetchall():
+            storage._getSensorById(resultTuple[0], logger)
+        storage.cursor.execute("SELECT id FROM managers")
+        for resultTuple in storage.cursor.fetchall():
+            storage._getManagerById(resultTuple[0], logger)
+        storage.cursor.execute("SELECT id FROM alerts")
+        for resultTuple in storage.cursor.fetchall():
+            storage._getAlertById(resultTuple[0], logger)
+    finally:
+        storage._releaseLock(logger)
+
+
+def measure(storage: Sqlite,
+            function,
+            iterations: int) -> (int, float):
+    """
+    Measures the queries per call and the average wall time of the given function.
+
+    :param storage:
+    :param function:
+    :param iterations:
+    :return: tuple of (queries per call, average wall time in ms)
+    """
+    counter = QueryCounter()
+    storage.conn.set_trace_callback(counter)
+    function()
+    storage.conn.set_trace_callback(None)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    elapsed = time.perf_counter() - start
+
+    return counter.count, (elapsed / iterations) * 1000.0
+
+
+if __name__ == '__main__':
+
+    parser = optparse.OptionParser()
+    parser.add_option("-s",
+                      "--sensors",
+                      dest="sensors",
+                      action="store",
+                      help="Comma separated list of sensor counts to benchmark. (Default: 10,100,1000)",
+                      default="10,100,1000")
+    parser.add_option("-n",
+                      "--sensors-per-node",
+                      dest="sensorsPerNode",
+                      action="store",
+                      type="int",
+                      help="Number of sensors per sensor node. (Default: 10)",
+                      default=10)
+    parser.add_option("-i",
+                      "--iterations",
+                      dest="iterations",
+                      action="store",
+                      type="int",
+                      help="Number of measured calls per sensor count. (Default: 20)",
+                      default=20)
+    (options, args) = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s %(levelname)s: %(message)s', level=logging.WARNING)
+
+    globalData = GlobalData()
+    globalData.logger = logging.getLogger("benchmark")
+
+    print("%8s | %14s | %14s | %15s | %14s"
+          % ("sensors", "bulk queries", "bulk ms", "per-row queries", "per-row ms"))
+
+    for sensorCount in [int(x) for x in options.sensors.split(",")]:
+        with tempfile.TemporaryDirectory() as tempDir:
+            storage = Sqlite(os.path.join(tempDir, "benchmark.db"), globalData)
+            fillStorage(storage, sensorCount, options.sensorsPerNode, globalData.logger)
+
+            bulkQueries, bulkTime = measure(storage,
+                                            lambda: storage.getAlertSystemInformation(globalData.logger),
+                                            options.iterations)
+            rowQueries, rowTime = measure(storage,
+                                          lambda: getAlertSystemInformationPerRow(storage, globalData.logger),
+                                          options.iterations)
+
+            storage.close(globalData.logger)
+
+        print("%8d | %14d | %14.2f | %15d | %14.2f"
+              % (sensorCount, bulkQueries, bulkTime, rowQueries, rowTime))
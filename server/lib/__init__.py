@@ -8,14 +8,20 @@
 # Licensed under the GNU Affero General Public License, version 3.
 
 from .watchdogs import ConnectionWatchdog, CSVWatchdog
-from .server import ServerSession, ThreadedTCPServer, AsynchronousSender
+from .server import ServerSession, ThreadedTCPServer, AsyncServer
 from .storage import Sqlite
+from .history import SensorHistory
 from .alert import SensorAlertExecuter
 from .localObjects import SensorDataType, Sensor, AlertLevel
 from .internalSensors import SensorTimeoutSensor, NodeTimeoutSensor, AlertSystemActiveSensor, VersionInformerSensor
 from .config import parse_config
 from .users import CSVBackend
 from .manager import ManagerUpdateExecuter
+from .sender import SenderPool
+from .statusCache import AlertSystemStateCache
+from .dispatch import AlertLevelDispatchTable
+from .sslContext import ServerSslContext
+from .metrics import MetricsRegistry, MetricsServer
 from .update import Updater
 from .globalData import GlobalData
 from .survey import SurveyExecuter
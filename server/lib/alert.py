@@ -10,8 +10,11 @@
 import threading
 import os
 import time
-from typing import List, Optional
-from .server import AsynchronousSender
+import heapq
+import itertools
+import collections
+import logging
+from typing import Any, List, Optional
 from .localObjects import SensorAlert, AlertLevel
 from .globalData import GlobalData
 from .rules import RuleEngine
@@ -39,8 +42,8 @@ class SensorAlertExecuter(threading.Thread):
         self.logger = self.globalData.logger
         self.manager_update_executer = self.globalData.managerUpdateExecuter
         self.storage = self.globalData.storage
-        self.alert_levels = self.globalData.alertLevels
-        self.server_sessions = self.globalData.serverSessions
+        self.alert_level_dispatch_table = self.globalData.alertLevelDispatchTable
+        self.sender_pool = self.globalData.senderPool
 
         # file nme of this file (used for logging)
         self.log_tag = os.path.basename(__file__)
@@ -57,6 +60,82 @@ class SensorAlertExecuter(threading.Thread):
 
         self.sensor_alerts_to_handle = list()  # type: List[SensorAlertToHandle]
 
+        # Sensor alerts that were added via add_sensor_alert() and are not processed yet. The database
+        # is only used as journal (sensor alerts that were not processed before a restart are read once
+        # from the database at the start).
+        self._incoming_sensor_alerts = collections.deque()
+        self._recover_from_storage = True
+
+        # Heap of (time the sensor alert triggers, sequence number, sensor alert to handle)
+        # that is used to wake up exactly when the alert delay of a sensor alert elapsed.
+        self._sensor_alert_timers = list()
+        self._timer_sequence = itertools.count()
+
+        # Metrics of the sensor alert executer (only collected if the metrics are activated).
+        metrics_registry = self.globalData.metricsRegistry
+        self._added_sensor_alerts_metric = metrics_registry.counter("alertr_sensor_alerts_total",
+                                                                    "Number of sensor alerts added for processing.")
+        metrics_registry.function("alertr_sensor_alert_queue_depth",
+                                  "Number of sensor alerts that are queued or wait for their alert delay.",
+                                  lambda: len(self._incoming_sensor_alerts) + len(self.sensor_alerts_to_handle))
+
+    def _add_sensor_alert_to_handle(self,
+                                    sensor_alert_to_handle: SensorAlertToHandle):
+        """
+        Internal function that adds a sensor alert to the list of sensor alerts to handle and schedules it
+        for the time its alert delay elapses.
+
+        :param sensor_alert_to_handle:
+        """
+        sensor_alert = sensor_alert_to_handle.sensor_alert
+        trigger_time = sensor_alert.timeReceived + sensor_alert.alertDelay
+        self.sensor_alerts_to_handle.append(sensor_alert_to_handle)
+        heapq.heappush(self._sensor_alert_timers, (trigger_time, next(self._timer_sequence), sensor_alert_to_handle))
+
+    def _get_new_sensor_alerts(self) -> List[SensorAlert]:
+        """
+        Internal function that gets all sensor alerts that were added since the last call (on the first call
+        also all sensor alerts that are still stored in the database).
+
+        :return: list of sensor alerts
+        """
+        # Query the database before taking the queued sensor alerts, so a sensor alert that is added
+        # in between is either recovered from the database and queued (removed below) or only queued.
+        new_sensor_alerts = list()
+        recovered_ids = set()
+        if self._recover_from_storage:
+            stored_sensor_alerts = self.storage.getSensorAlerts()
+            if stored_sensor_alerts is not None:
+                self._recover_from_storage = False
+
+                if stored_sensor_alerts:
+                    self.logger.info("[%s]: Processing %d sensor alerts stored in the database."
+                                     % (self.log_tag, len(stored_sensor_alerts)))
+                new_sensor_alerts.extend(stored_sensor_alerts)
+                recovered_ids = set([x.sensorAlertId for x in stored_sensor_alerts])
+
+        while self._incoming_sensor_alerts:
+            sensor_alert = self._incoming_sensor_alerts.popleft()
+            if sensor_alert.sensorAlertId not in recovered_ids:
+                new_sensor_alerts.append(sensor_alert)
+
+        return new_sensor_alerts
+
+    def _get_wait_timeout(self) -> Optional[float]:
+        """
+        Internal function that gets the time until the next sensor alert to handle triggers.
+
+        :return: time in seconds or None if no sensor alert is waiting
+        """
+        # Remove sensor alerts that were removed from the sensor alerts to handle in the meantime.
+        while self._sensor_alert_timers and self._sensor_alert_timers[0][2] not in self.sensor_alerts_to_handle:
+            heapq.heappop(self._sensor_alert_timers)
+
+        if not self._sensor_alert_timers:
+            return None
+
+        return max(0.0, self._sensor_alert_timers[0][0] - time.time())
+
     def _preprocess_sensor_alerts(self,
                                   sensorAlertList: Optional[List[SensorAlert]]):
         """
@@ -82,36 +161,39 @@ class SensorAlertExecuter(threading.Thread):
             # get all alert levels that are triggered
             # because of this sensor alert (used as a pre filter)
             triggered_alert_levels = list()
-            for configured_alert_level in self.alert_levels:
-                for sensor_alert_level_int in sensor_alert.alertLevels:
-                    if configured_alert_level.level == sensor_alert_level_int:
-                        # check if alert system is active
-                        # or alert level triggers always
-                        if is_alert_system_active or configured_alert_level.triggerAlways:
-
-                            # check if the configured alert level
-                            # should trigger a sensor alert message
-                            # when the sensor goes to state "triggered"
-                            # => if not skip configured alert level
-                            if not configured_alert_level.triggerAlertTriggered and sensor_alert.state == 1:
-                                continue
-
-                            # check if the configured alert level
-                            # should trigger a sensor alert message
-                            # when the sensor goes to state "normal"
-                            # => if not skip configured alert level
-                            if not configured_alert_level.triggerAlertNormal and sensor_alert.state == 0:
-                                continue
-
-                            if not configured_alert_level.rulesActivated:
-                                # Create a list of sensor alerts to handle without rules activated.
-                                triggered_alert_levels.append(configured_alert_level)
-
-                            else:
-                                # Split sensor alerts into alerts with rules
-                                # (each alert level with a rule is handled as a single sensor alert
-                                # and processed by rule engine)
-                                self.rule_engine.add_sensor_alert(sensor_alert, configured_alert_level)
+            for sensor_alert_level_int in set(sensor_alert.alertLevels):
+                configured_alert_level = self.alert_level_dispatch_table.get_alert_level(sensor_alert_level_int)
+                if configured_alert_level is None:
+                    continue
+
+                # check if alert system is active
+                # or alert level triggers always
+                if not is_alert_system_active and not configured_alert_level.triggerAlways:
+                    continue
+
+                # check if the configured alert level
+                # should trigger a sensor alert message
+                # when the sensor goes to state "triggered"
+                # => if not skip configured alert level
+                if not configured_alert_level.triggerAlertTriggered and sensor_alert.state == 1:
+                    continue
+
+                # check if the configured alert level
+                # should trigger a sensor alert message
+                # when the sensor goes to state "normal"
+                # => if not skip configured alert level
+                if not configured_alert_level.triggerAlertNormal and sensor_alert.state == 0:
+                    continue
+
+                if not configured_alert_level.rulesActivated:
+                    # Create a list of sensor alerts to handle without rules activated.
+                    triggered_alert_levels.append(configured_alert_level)
+
+                else:
+                    # Split sensor alerts into alerts with rules
+                    # (each alert level with a rule is handled as a single sensor alert
+                    # and processed by rule engine)
+                    self.rule_engine.add_sensor_alert(sensor_alert, configured_alert_level)
 
             # check if an alert level to trigger was found
             # if not => just ignore it
@@ -130,8 +212,9 @@ class SensorAlertExecuter(threading.Thread):
                                           + "notification.")
 
                     else:
-                        manager_state_tuple = (sensor_alert.sensorId, sensor_alert.state, sensor_data_obj)
-                        self.manager_update_executer.queueStateChange.append(manager_state_tuple)
+                        self.manager_update_executer.addStateChange(sensor_alert.sensorId,
+                                                                    sensor_alert.state,
+                                                                    sensor_data_obj)
 
                 continue
 
@@ -139,7 +222,7 @@ class SensorAlertExecuter(threading.Thread):
             else:
                 # add sensor alert with alert levels
                 # to the list of sensor alerts to handle
-                self.sensor_alerts_to_handle.append(SensorAlertToHandle(sensor_alert, triggered_alert_levels))
+                self._add_sensor_alert_to_handle(SensorAlertToHandle(sensor_alert, triggered_alert_levels))
 
     def _process_sensor_alerts(self):
         """
@@ -154,14 +237,9 @@ class SensorAlertExecuter(threading.Thread):
 
             # get all alert levels that are triggered
             # because of this sensor alert
-            triggered_alert_levels = list()
-            for configured_alert_level in self.alert_levels:
-                for sensor_alert_level in sensor_alert_to_handle.alert_levels:
-                    if configured_alert_level.level == sensor_alert_level.level:
-                        # check if alert system is active
-                        # or alert level triggers always
-                        if is_alert_system_active or configured_alert_level.triggerAlways:
-                            triggered_alert_levels.append(configured_alert_level)
+            # (check if alert system is active or alert level triggers always)
+            triggered_alert_levels = [x for x in sensor_alert_to_handle.alert_levels
+                                      if is_alert_system_active or x.triggerAlways]
 
             # check if an alert level to trigger remains
             # if not => just remove sensor alert to handle from the list
@@ -176,52 +254,40 @@ class SensorAlertExecuter(threading.Thread):
             else:
                 sensor_alert_to_handle.alert_levels = triggered_alert_levels
 
-            # check if sensor alert has triggered
-            utc_timestamp = int(time.time())
-            if (utc_timestamp - sensor_alert.timeReceived) > sensor_alert.alertDelay:
-
-                # generate integer list of alert levels that have triggered
-                # (needed for sensor alert message)
-                sensor_alert.triggeredAlertLevels = list()
-                for triggeredAlertLevel in triggered_alert_levels:
-                    sensor_alert.triggeredAlertLevels.append(triggeredAlertLevel.level)
-
-                # send sensor alert to all manager and alert clients
-                for server_session in self.server_sessions:
-                    # ignore sessions which do not exist yet
-                    # and that are not managers
-                    if server_session.clientComm is None:
-                        continue
-                    if (server_session.clientComm.nodeType != "manager"
-                       and server_session.clientComm.nodeType != "alert"):
-                        continue
-                    if not server_session.clientComm.clientInitialized:
-                        continue
-
-                    # Only send a sensor alert to a client that actually
-                    # handles a triggered alert level.
-                    client_alert_levels = server_session.clientComm.clientAlertLevels
-                    at_least_one = any(al.level in client_alert_levels for al in triggered_alert_levels)
-                    if not at_least_one:
-                        continue
-
-                    # sending sensor alert to manager/alert node
-                    # via a thread to not block the sensor alert executer
-                    sensor_alert_process = AsynchronousSender(self.globalData, server_session.clientComm)
-                    # set thread to daemon
-                    # => threads terminates when main thread terminates
-                    sensor_alert_process.daemon = True
-                    sensor_alert_process.sendSensorAlert = True
-                    sensor_alert_process.sensorAlert = sensor_alert
-
-                    self.logger.debug("[%s]: Sending sensor alert to manager/alert (%s:%d)."
-                                      % (self.log_tag, server_session.clientComm.clientAddress,
-                                         server_session.clientComm.clientPort))
-                    sensor_alert_process.start()
-
-                # after sensor alert was triggered
-                # => remove sensor alert to handle
-                self.sensor_alerts_to_handle.remove(sensor_alert_to_handle)
+        # Trigger all sensor alerts which alert delay has elapsed.
+        utc_timestamp = time.time()
+        while self._sensor_alert_timers and self._sensor_alert_timers[0][0] <= utc_timestamp:
+            _, _, sensor_alert_to_handle = heapq.heappop(self._sensor_alert_timers)
+
+            # Ignore sensor alerts that were removed in the meantime.
+            if sensor_alert_to_handle not in self.sensor_alerts_to_handle:
+                continue
+
+            sensor_alert = sensor_alert_to_handle.sensor_alert
+            triggered_alert_levels = sensor_alert_to_handle.alert_levels
+
+            # generate integer list of alert levels that have triggered
+            # (needed for sensor alert message)
+            sensor_alert.triggeredAlertLevels = list()
+            for triggeredAlertLevel in triggered_alert_levels:
+                sensor_alert.triggeredAlertLevels.append(triggeredAlertLevel.level)
+
+            # send sensor alert to all manager and alert clients
+            # that actually handle a triggered alert level
+            for client_comm in self.alert_level_dispatch_table.get_clients(sensor_alert.triggeredAlertLevels):
+                # ignore clients that are closing their session
+                if not client_comm.clientInitialized:
+                    continue
+
+                # sending sensor alert to manager/alert node
+                # via the sender pool to not block the sensor alert executer
+                self.logger.debug("[%s]: Sending sensor alert to manager/alert (%s:%d)."
+                                  % (self.log_tag, client_comm.clientAddress, client_comm.clientPort))
+                self.sender_pool.queue_sensor_alert(client_comm, sensor_alert)
+
+            # after sensor alert was triggered
+            # => remove sensor alert to handle
+            self.sensor_alerts_to_handle.remove(sensor_alert_to_handle)
 
     def run(self):
         """
@@ -238,25 +304,26 @@ class SensorAlertExecuter(threading.Thread):
             if self.manager_update_executer is None:
                 self.manager_update_executer = self.globalData.managerUpdateExecuter
 
-            # Get a list of all sensor alert objects.
-            sensor_alert_list = self.storage.getSensorAlerts()
+            # Get a list of all sensor alert objects that were added since the last round.
+            sensor_alert_list = self._get_new_sensor_alerts()
 
-            # Check if no sensor alerts are to handle and exist in database.
+            # Check if no sensor alerts are to handle and no new exist.
             if (not self.sensor_alerts_to_handle
                and not self.rule_engine.has_sensor_alerts_to_handle()
-               and (sensor_alert_list is None or not sensor_alert_list)):
+               and not sensor_alert_list):
                 self.sensorAlertEvent.wait()
                 self.sensorAlertEvent.clear()
                 continue
 
-            # Filter and separate sensor alerts from the database.
-            self._preprocess_sensor_alerts(sensor_alert_list)
+            # Filter and separate new sensor alerts.
+            if sensor_alert_list:
+                self._preprocess_sensor_alerts(sensor_alert_list)
 
-            # wake up manager update executer
-            # => state change will be transmitted
-            # (because it is in the queue)
-            if self.manager_update_executer is not None:
-                self.manager_update_executer.managerUpdateEvent.set()
+                # wake up manager update executer
+                # => state change will be transmitted
+                # (because it is in the queue)
+                if self.manager_update_executer is not None:
+                    self.manager_update_executer.managerUpdateEvent.set()
 
             # when no sensor alerts exist to handle => restart loop
             if not self.sensor_alerts_to_handle and not self.rule_engine.has_sensor_alerts_to_handle():
@@ -268,7 +335,56 @@ class SensorAlertExecuter(threading.Thread):
             # Process sensor alerts that affect rules.
             self.rule_engine.processSensorAlertsRules()
 
-            time.sleep(0.5)
+            # Sleep until the next delayed sensor alert triggers, the rules of an alert level can change
+            # or a new sensor alert is added.
+            timeout = self._get_wait_timeout()
+            rule_timeout = self.rule_engine.get_wait_timeout()
+            if rule_timeout is not None:
+                timeout = rule_timeout if timeout is None else min(timeout, rule_timeout)
+            if timeout is None or timeout > 0.0:
+                self.sensorAlertEvent.wait(timeout)
+                self.sensorAlertEvent.clear()
+
+    def add_sensor_alert(self,
+                         node_id: int,
+                         sensor_id: int,
+                         state: int,
+                         data_json: str,
+                         change_state: bool,
+                         has_latest_data: bool,
+                         data_type: int,
+                         sensor_data: Any,
+                         logger: logging.Logger = None) -> bool:
+        """
+        Adds a sensor alert to the database (as journal) and queues it for processing. The sensor alert
+        executer has to be woken up via the sensorAlertEvent afterwards.
+
+        :param node_id:
+        :param sensor_id:
+        :param state:
+        :param data_json:
+        :param change_state:
+        :param has_latest_data:
+        :param data_type:
+        :param sensor_data:
+        :param logger:
+        :return: Success or Failure
+        """
+        sensor_alert = self.storage.createSensorAlert(node_id,
+                                                      sensor_id,
+                                                      state,
+                                                      data_json,
+                                                      change_state,
+                                                      has_latest_data,
+                                                      data_type,
+                                                      sensor_data,
+                                                      logger)
+        if sensor_alert is None:
+            return False
+
+        self._incoming_sensor_alerts.append(sensor_alert)
+        self._added_sensor_alerts_metric.inc()
+        return True
 
     def exit(self):
         """
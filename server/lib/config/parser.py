@@ -16,6 +16,7 @@ import xml.etree.ElementTree
 import logging
 from ..users import CSVBackend
 from ..storage import Sqlite
+from ..history import SensorHistory
 from ..globalData import GlobalData
 from ..localObjects import AlertLevel
 from ..rules import parse_rule
@@ -102,12 +103,18 @@ def parse_main_config(configRoot: xml.etree.ElementTree.Element, global_data: Gl
     if not configure_update(configRoot, global_data):
         return False
 
+    if not configure_metrics(configRoot, global_data):
+        return False
+
     if not configure_user_backend(configRoot, global_data):
         return False
 
     if not configure_storage(configRoot, global_data):
         return False
 
+    if not configure_history(configRoot, global_data):
+        return False
+
     if not configure_survey(configRoot, global_data):
         return False
 
@@ -158,8 +165,57 @@ def configure_update(configRoot: xml.etree.ElementTree.Element, global_data: Glo
     return True
 
 
+def configure_metrics(configRoot: xml.etree.ElementTree.Element, global_data: GlobalData) -> bool:
+
+    # Optional settings for the metrics of the server (deactivated if not set).
+    try:
+        metricsElement = configRoot.find("general").find("metrics")
+        if metricsElement is not None:
+            metricsAttributes = metricsElement.attrib
+            global_data.metricsActivated = (str(metricsAttributes["activated"]).upper() == "TRUE")
+            if "port" in metricsAttributes:
+                global_data.metricsPort = int(metricsAttributes["port"])
+
+    except Exception:
+        global_data.logger.exception("[%s]: Configuring metrics failed." % log_tag)
+        return False
+
+    if not global_data.metricsActivated:
+        return True
+
+    if not 0 < global_data.metricsPort < 65536:
+        global_data.logger.error("[%s]: Metrics port has to be between 1 and 65535." % log_tag)
+        return False
+
+    global_data.metricsRegistry.enable()
+
+    return True
+
+
 def configure_user_backend(configRoot: xml.etree.ElementTree.Element, global_data: GlobalData) -> bool:
 
+    # Optional settings for the user backend (fall back to the default values if not set).
+    try:
+        userBackendElement = configRoot.find("general").find("userBackend")
+        if userBackendElement is not None:
+            userBackendAttributes = userBackendElement.attrib
+            if "credentialCacheSize" in userBackendAttributes:
+                global_data.userBackendCredentialCacheSize = int(userBackendAttributes["credentialCacheSize"])
+            if "credentialCacheTtl" in userBackendAttributes:
+                global_data.userBackendCredentialCacheTtl = float(userBackendAttributes["credentialCacheTtl"])
+
+    except Exception:
+        global_data.logger.exception("[%s]: Configuring user backend failed." % log_tag)
+        return False
+
+    if global_data.userBackendCredentialCacheSize < 0:
+        global_data.logger.error("[%s]: User backend credential cache size has to be at least 0." % log_tag)
+        return False
+
+    if global_data.userBackendCredentialCacheTtl < 0.0:
+        global_data.logger.error("[%s]: User backend credential cache ttl has to be at least 0." % log_tag)
+        return False
+
     # Configure user credentials backend.
     try:
         global_data.logger.debug("[%s]: Initializing user backend." % fileName)
@@ -174,6 +230,34 @@ def configure_user_backend(configRoot: xml.etree.ElementTree.Element, global_dat
 
 def configure_storage(configRoot: xml.etree.ElementTree.Element, global_data: GlobalData) -> bool:
 
+    # Optional settings for the storage backend (fall back to the default values if not set).
+    try:
+        storageElement = configRoot.find("general").find("storage")
+        if storageElement is not None:
+            storageAttributes = storageElement.attrib
+            if "mode" in storageAttributes:
+                global_data.storageBackendSqliteMode = str(storageAttributes["mode"]).lower()
+            if "readConnections" in storageAttributes:
+                global_data.storageBackendSqliteReadConnections = int(storageAttributes["readConnections"])
+            if "commitWindow" in storageAttributes:
+                global_data.storageCommitWindow = float(storageAttributes["commitWindow"])
+
+    except Exception:
+        global_data.logger.exception("[%s]: Configuring storage backend failed." % log_tag)
+        return False
+
+    if global_data.storageBackendSqliteMode not in ["default", "wal"]:
+        global_data.logger.error("[%s]: Storage mode has to be either 'default' or 'wal'." % log_tag)
+        return False
+
+    if global_data.storageBackendSqliteReadConnections <= 0:
+        global_data.logger.error("[%s]: Number of storage read connections has to be greater than 0." % log_tag)
+        return False
+
+    if global_data.storageCommitWindow < 0.0:
+        global_data.logger.error("[%s]: Storage commit window has to be at least 0." % log_tag)
+        return False
+
     # Configure storage backend.
     try:
         global_data.logger.debug("[%s]: Initializing storage backend." % fileName)
@@ -205,6 +289,68 @@ def configure_storage(configRoot: xml.etree.ElementTree.Element, global_data: Gl
     return True
 
 
+def configure_history(configRoot: xml.etree.ElementTree.Element, global_data: GlobalData) -> bool:
+
+    # Optional settings for the history of the sensor data (deactivated if not set).
+    try:
+        historyElement = configRoot.find("general").find("history")
+        if historyElement is not None:
+            historyAttributes = historyElement.attrib
+            global_data.historyActivated = (str(historyAttributes["activated"]).upper() == "TRUE")
+            if "file" in historyAttributes:
+                global_data.historySqliteFile = make_path(str(historyAttributes["file"]))
+            if "chunkSize" in historyAttributes:
+                global_data.historyChunkSize = int(historyAttributes["chunkSize"])
+            if "flushInterval" in historyAttributes:
+                global_data.historyFlushInterval = float(historyAttributes["flushInterval"])
+            if "maxChunkAge" in historyAttributes:
+                global_data.historyMaxChunkAge = float(historyAttributes["maxChunkAge"])
+            if "rawRetention" in historyAttributes:
+                global_data.historyRawRetention = int(historyAttributes["rawRetention"]) * 86400
+            if "minuteRetention" in historyAttributes:
+                global_data.historyMinuteRetention = int(historyAttributes["minuteRetention"]) * 86400
+            if "hourRetention" in historyAttributes:
+                global_data.historyHourRetention = int(historyAttributes["hourRetention"]) * 86400
+            if "dayRetention" in historyAttributes:
+                global_data.historyDayRetention = int(historyAttributes["dayRetention"]) * 86400
+
+    except Exception:
+        global_data.logger.exception("[%s]: Configuring sensor history failed." % log_tag)
+        return False
+
+    if not global_data.historyActivated:
+        return True
+
+    if global_data.historyChunkSize <= 0:
+        global_data.logger.error("[%s]: History chunk size has to be greater than 0." % log_tag)
+        return False
+
+    if global_data.historyFlushInterval <= 0.0:
+        global_data.logger.error("[%s]: History flush interval has to be greater than 0." % log_tag)
+        return False
+
+    if global_data.historyMaxChunkAge <= 0.0:
+        global_data.logger.error("[%s]: History maximum chunk age has to be greater than 0." % log_tag)
+        return False
+
+    if (global_data.historyRawRetention < 0
+            or global_data.historyMinuteRetention < 0
+            or global_data.historyHourRetention < 0
+            or global_data.historyDayRetention < 0):
+        global_data.logger.error("[%s]: History retention has to be at least 0." % log_tag)
+        return False
+
+    try:
+        global_data.logger.debug("[%s]: Initializing sensor history." % fileName)
+        global_data.sensorHistory = SensorHistory(global_data)
+
+    except Exception:
+        global_data.logger.exception("[%s]: Configuring sensor history failed." % log_tag)
+        return False
+
+    return True
+
+
 def configure_survey(configRoot: xml.etree.ElementTree.Element, global_data: GlobalData) -> bool:
 
     # Get survey configurations
@@ -229,10 +375,49 @@ def configure_server(configRoot: xml.etree.ElementTree.Element, global_data: Glo
         global_data.serverKeyFile = make_path(str(configRoot.find("general").find("server").attrib["keyFile"]))
         global_data.server_port = int(configRoot.find("general").find("server").attrib["port"])
 
+        # Optional settings for the server core (fall back to the default values if not set).
+        serverAttributes = configRoot.find("general").find("server").attrib
+        if "mode" in serverAttributes:
+            global_data.serverMode = str(serverAttributes["mode"]).lower()
+        if "workers" in serverAttributes:
+            global_data.asyncServerWorkers = int(serverAttributes["workers"])
+        if "senderWorkers" in serverAttributes:
+            global_data.senderPoolWorkers = int(serverAttributes["senderWorkers"])
+        if "batchFlushWindow" in serverAttributes:
+            global_data.batchFlushWindow = float(serverAttributes["batchFlushWindow"])
+        if "stateChangeInterval" in serverAttributes:
+            global_data.managerStateChangeInterval = float(serverAttributes["stateChangeInterval"])
+        if "transactionTimeout" in serverAttributes:
+            global_data.transactionTimeout = float(serverAttributes["transactionTimeout"])
+
     except Exception:
         global_data.logger.exception("[%s]: Configuring server failed." % log_tag)
         return False
 
+    if global_data.serverMode not in ["threaded", "asyncio"]:
+        global_data.logger.error("[%s]: Server mode has to be either 'threaded' or 'asyncio'." % log_tag)
+        return False
+
+    if global_data.asyncServerWorkers <= 0:
+        global_data.logger.error("[%s]: Number of server workers has to be greater than 0." % log_tag)
+        return False
+
+    if global_data.senderPoolWorkers <= 0:
+        global_data.logger.error("[%s]: Number of sender workers has to be greater than 0." % log_tag)
+        return False
+
+    if global_data.batchFlushWindow < 0.0:
+        global_data.logger.error("[%s]: Batch flush window has to be at least 0." % log_tag)
+        return False
+
+    if global_data.managerStateChangeInterval < 0.0:
+        global_data.logger.error("[%s]: State change interval has to be at least 0." % log_tag)
+        return False
+
+    if global_data.transactionTimeout <= 0.0:
+        global_data.logger.error("[%s]: Transaction timeout has to be greater than 0." % log_tag)
+        return False
+
     if os.path.exists(global_data.serverCertFile) is False or os.path.exists(global_data.serverKeyFile) is False:
         global_data.logger.error("[%s]: Server certificate or key does not exist." % log_tag)
         return False
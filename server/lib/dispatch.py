@@ -0,0 +1,59 @@
+#!/usr/bin/python3
+
+# written by sqall
+# twitter: https://twitter.com/sqall01
+# blog: https://h4des.org
+# github: https://github.com/sqall01
+#
+# Licensed under the GNU Affero General Public License, version 3.
+
+import os
+from typing import Any, Dict, Iterable, List, Optional
+from .localObjects import AlertLevel
+from .globalData import GlobalData
+
+
+# This class maps each configured alert level to its configuration and the
+# manager/alert clients that handle it (taken from the alert level index of the
+# server sessions that is updated when a client session is initialized or closed),
+# so routing a sensor alert only touches the triggered alert levels and their recipients.
+class AlertLevelDispatchTable:
+
+    def __init__(self,
+                 global_data: GlobalData):
+
+        # file nme of this file (used for logging)
+        self.log_tag = os.path.basename(__file__)
+
+        self._logger = global_data.logger
+        self._server_sessions = global_data.serverSessions
+
+        self._alert_levels = dict()  # type: Dict[int, AlertLevel]
+        for alert_level in global_data.alertLevels:
+            self._alert_levels[alert_level.level] = alert_level
+
+    def get_alert_level(self,
+                        level: int) -> Optional[AlertLevel]:
+        """
+        Gets the configuration of the given alert level.
+
+        :param level:
+        :return: alert level object or None if the alert level is not configured
+        """
+        return self._alert_levels.get(level)
+
+    def get_clients(self,
+                    levels: Iterable[int]) -> List[Any]:
+        """
+        Gets all manager and alert clients that handle at least one of the given alert levels.
+
+        :param levels:
+        :return: list of ClientCommunication objects (each client only once)
+        """
+        recipients = list()
+        for server_session in self._server_sessions.get_by_alert_levels(levels):
+            client_comm = server_session.clientComm
+            if client_comm.nodeType == "manager" or client_comm.nodeType == "alert":
+                recipients.append(client_comm)
+
+        return recipients
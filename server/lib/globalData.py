@@ -10,7 +10,8 @@
 import os
 import threading
 import ssl
-from typing import Optional
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from .metrics import MetricsRegistry
 
 
 # Class implements an iterator that iterates over a copy of the
@@ -32,19 +33,158 @@ class ServerSessionsIterator(object):
 
 
 # Class implements the list of server sessions handled by the server.
+# Besides the list, it holds indexes of the sessions by username and (for
+# initialized clients) by node type, node id and alert level. All lookups
+# return a copy of the matching sessions (snapshot).
 class ServerSessions(object):
 
     def __init__(self):
         self._server_sessions = list()
+        self._server_sessions_set = set()
         self._server_sessions_lock = threading.Lock()
 
+        self._by_username = dict()  # type: Dict[str, Set[Any]]
+        self._by_node_type = dict()  # type: Dict[str, Set[Any]]
+        self._by_node_id = dict()  # type: Dict[int, Set[Any]]
+        self._by_alert_level = dict()  # type: Dict[int, Set[Any]]
+
+        # Indexed values of each server session (needed to remove it from the indexes).
+        self._usernames = dict()  # type: Dict[Any, str]
+        self._clients = dict()  # type: Dict[Any, Tuple[str, int, FrozenSet[int]]]
+
+    @staticmethod
+    def _index_add(index: Dict[Any, Set[Any]], key: Any, server_session):
+        sessions = index.get(key)
+        if sessions is None:
+            sessions = set()
+            index[key] = sessions
+        sessions.add(server_session)
+
+    @staticmethod
+    def _index_remove(index: Dict[Any, Set[Any]], key: Any, server_session):
+        sessions = index.get(key)
+        if sessions is None:
+            return
+        sessions.discard(server_session)
+        if not sessions:
+            del index[key]
+
+    def _remove_client(self, server_session):
+        client = self._clients.pop(server_session, None)
+        if client is None:
+            return
+        node_type, node_id, alert_levels = client
+        self._index_remove(self._by_node_type, node_type, server_session)
+        self._index_remove(self._by_node_id, node_id, server_session)
+        for alert_level in alert_levels:
+            self._index_remove(self._by_alert_level, alert_level, server_session)
+
     def append(self, server_session):
         with self._server_sessions_lock:
             self._server_sessions.append(server_session)
+            self._server_sessions_set.add(server_session)
 
     def remove(self, server_session):
         with self._server_sessions_lock:
             self._server_sessions.remove(server_session)
+            self._server_sessions_set.discard(server_session)
+
+            self._remove_client(server_session)
+            username = self._usernames.pop(server_session, None)
+            if username is not None:
+                self._index_remove(self._by_username, username, server_session)
+
+    def add_username(self, server_session, username: str) -> bool:
+        """
+        Adds the username of the client of the given server session to the index.
+
+        :param server_session:
+        :param username:
+        :return: False if the username is already used by another server session
+        """
+        with self._server_sessions_lock:
+            for other_session in self._by_username.get(username, set()):
+                if other_session is not server_session:
+                    return False
+
+            self._usernames[server_session] = username
+            self._index_add(self._by_username, username, server_session)
+            return True
+
+    def add_client(self, server_session):
+        """
+        Adds the initialized client of the given server session to the node type, node id and alert level indexes.
+
+        :param server_session:
+        """
+        client_comm = server_session.clientComm
+        with self._server_sessions_lock:
+            self._remove_client(server_session)
+
+            alert_levels = frozenset(client_comm.clientAlertLevels)
+            self._clients[server_session] = (client_comm.nodeType, client_comm.nodeId, alert_levels)
+            self._index_add(self._by_node_type, client_comm.nodeType, server_session)
+            self._index_add(self._by_node_id, client_comm.nodeId, server_session)
+            for alert_level in alert_levels:
+                self._index_add(self._by_alert_level, alert_level, server_session)
+
+    def remove_client(self, server_session):
+        """
+        Removes the client of the given server session from the node type, node id and alert level indexes
+        (the session itself stays in the list until it is removed).
+
+        :param server_session:
+        """
+        with self._server_sessions_lock:
+            self._remove_client(server_session)
+
+    def get_by_username(self, username: str) -> List[Any]:
+        with self._server_sessions_lock:
+            return list(self._by_username.get(username, set()))
+
+    def get_usernames(self) -> List[str]:
+        with self._server_sessions_lock:
+            return list(self._by_username.keys())
+
+    def get_by_node_type(self, node_type: str) -> List[Any]:
+        with self._server_sessions_lock:
+            return list(self._by_node_type.get(node_type, set()))
+
+    def get_by_node_id(self, node_id: int) -> List[Any]:
+        with self._server_sessions_lock:
+            return list(self._by_node_id.get(node_id, set()))
+
+    def get_by_alert_levels(self, alert_levels: Iterable[int]) -> List[Any]:
+        """
+        Gets the server sessions of all initialized clients that handle at least one of the given alert levels.
+
+        :param alert_levels:
+        :return: list of server sessions (each session only once)
+        """
+        server_sessions = set()
+        with self._server_sessions_lock:
+            for alert_level in alert_levels:
+                sessions = self._by_alert_level.get(alert_level)
+                if sessions:
+                    server_sessions.update(sessions)
+        return list(server_sessions)
+
+    def get_initialized(self) -> List[Any]:
+        """
+        Gets the server sessions of all initialized clients.
+
+        :return:
+        """
+        with self._server_sessions_lock:
+            return list(self._clients.keys())
+
+    def __contains__(self, server_session):
+        with self._server_sessions_lock:
+            return server_session in self._server_sessions_set
+
+    def __len__(self):
+        with self._server_sessions_lock:
+            return len(self._server_sessions)
 
     def __iter__(self):
         with self._server_sessions_lock:
@@ -78,12 +218,40 @@ class GlobalData:
         # instance of the user credential backend
         self.userBackend = None
 
+        # Instance of the cache of the alert system status message that is sent to the managers.
+        self.alertSystemStateCache = None
+
+        # Instance of the table that maps the alert levels to the clients that handle them.
+        self.alertLevelDispatchTable = None
+
+        # Instance of the SSL context that is used for all client connections.
+        self.serverSslContext = None
+
         # instance of the thread that handles sensor alerts
         self.sensorAlertExecuter = None
 
         # instance of the thread that handles manager updates
         self.managerUpdateExecuter = None
 
+        # Instance of the pool of worker threads that send messages to the clients.
+        self.senderPool = None
+
+        # Number of worker threads of the sender pool.
+        self.senderPoolWorkers = 8  # type: int
+
+        # Time in seconds the server waits for the client to acknowledge (CTS) a transaction
+        # the server initiates (a client that does not answer blocks a sender worker this long).
+        self.transactionTimeout = 10.0  # type: float
+
+        # Time in seconds sensor alerts and state changes are collected before they are sent
+        # in one "batch" transaction to clients that support it (only while a burst of messages is sent to the client,
+        # the first message to an idle client is sent immediately; 0 sends only already queued messages in a batch).
+        self.batchFlushWindow = 0.0  # type: float
+
+        # Minimum time in seconds between two state changes of the same sensor that are sent to the managers
+        # (state changes in between are merged and only the last one is sent, 0 sends all state changes).
+        self.managerStateChangeInterval = 1.0  # type: float
+
         # this is the time in seconds when the client times out
         self.connectionTimeout = 90
 
@@ -98,6 +266,10 @@ class GlobalData:
         # are sent updates of the clients (at least)
         self.managerUpdateInterval = 60.0
 
+        # Number of changes of the alert system status that are kept for managers that only
+        # receive the changes (managers that are further behind receive a full status).
+        self.statusChangeLogSize = 10000  # type: int
+
         # This is the interval in seconds in which the configuration
         # files that can be reloaded during runtime are checked
         # for changes and reloaded if changed.
@@ -109,9 +281,46 @@ class GlobalData:
         # path to the csv user credentials file (if csv is used as backend)
         self.userBackendCsvFile = os.path.dirname(os.path.abspath(__file__)) + "/../config/users.csv"
 
+        # Maximum number of successful credential verifications that are cached by the user backend
+        # and the time in seconds they are valid (0 disables the cache).
+        self.userBackendCredentialCacheSize = 1024  # type: int
+        self.userBackendCredentialCacheTtl = 300.0  # type: float
+
         # path to the sqlite database file (if sqlite is used as backend)
         self.storageBackendSqliteFile = os.path.dirname(os.path.abspath(__file__)) + "/../config/database.db"
 
+        # Journal mode of the sqlite database ("default" uses a single connection for all queries,
+        # "wal" uses write-ahead logging and a pool of read connections).
+        self.storageBackendSqliteMode = "default"  # type: str
+
+        # Number of read connections of the sqlite database (only used in "wal" mode).
+        self.storageBackendSqliteReadConnections = 4  # type: int
+
+        # Time in seconds sensor state/data/time updates are collected before they are committed
+        # to the database in one transaction (0 commits each update immediately).
+        self.storageCommitWindow = 0.05  # type: float
+
+        # Instance of the time series store of the sensor data (None if the history is deactivated).
+        self.sensorHistory = None
+
+        # Is the history of the sensor data activated and the path to its sqlite database file.
+        self.historyActivated = False  # type: bool
+        self.historySqliteFile = os.path.dirname(os.path.abspath(__file__)) + "/../config/history.db"
+
+        # Maximum number of values of a sensor that are stored in one chunk, the interval in seconds
+        # in which full chunks are written to the history database and the time in seconds after which
+        # a chunk that is not full yet is written.
+        self.historyChunkSize = 256  # type: int
+        self.historyFlushInterval = 60.0  # type: float
+        self.historyMaxChunkAge = 3600.0  # type: float
+
+        # Time in seconds the raw values and the minute/hour/day rollups of the history are kept
+        # (0 keeps them forever).
+        self.historyRawRetention = 7 * 86400  # type: int
+        self.historyMinuteRetention = 30 * 86400  # type: int
+        self.historyHourRetention = 365 * 86400  # type: int
+        self.historyDayRetention = 0  # type: int
+
         # How often the alertR server should try to connect to the
         # MySQL server when the connection establishment fails.
         self.storageBackendMysqlRetries = 5
@@ -139,6 +348,15 @@ class GlobalData:
         # Port the server is listening on.
         self.server_port = None  # type: Optional[int]
 
+        # Mode of the server core that handles the client connections
+        # ("threaded" uses a thread per connection, "asyncio" handles all
+        # connections in a single event loop).
+        self.serverMode = "threaded"  # type: str
+
+        # Number of worker threads that execute the protocol logic
+        # of the client connections (only used in "asyncio" mode).
+        self.asyncServerWorkers = 16  # type: int
+
         # a list of all alert levels that are configured on this server
         self.alertLevels = list()
 
@@ -173,6 +391,18 @@ class GlobalData:
         # List of all sessions that are handled by the server.
         self.serverSessions = ServerSessions()
 
+        # Registry of the metrics of the server (the metrics are only collected if they are activated).
+        self.metricsRegistry = MetricsRegistry()
+        self.metricsRegistry.function("alertr_server_sessions",
+                                      "Number of client sessions handled by the server.",
+                                      self.serverSessions.__len__)
+
+        # Are the metrics activated, the port of the local HTTP endpoint that serves them
+        # and the instance of the thread that serves them.
+        self.metricsActivated = False  # type: bool
+        self.metricsPort = 9110  # type: int
+        self.metricsServer = None
+
         # Describes if the survey is activated.
         self.survey_activated = None  # type: Optional[bool]
 
@@ -0,0 +1,449 @@
+#!/usr/bin/python3
+
+# written by sqall
+# twitter: https://twitter.com/sqall01
+# blog: https://h4des.org
+# github: https://github.com/sqall01
+#
+# Licensed under the GNU Affero General Public License, version 3.
+
+import array
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple, Union
+from .globalData import GlobalData
+from .localObjects import SensorDataType
+
+
+# This class holds the received values of a single sensor that are not yet written to the history database.
+# Timestamps and values are stored in separate columns (arrays) that are written as one compressed chunk.
+class SensorHistoryChunk:
+
+    __slots__ = ("data_type", "time_created", "timestamps", "values")
+
+    def __init__(self,
+                 data_type: int):
+
+        self.data_type = data_type
+        self.time_created = time.time()
+        self.timestamps = array.array("q")
+        if data_type == SensorDataType.FLOAT:
+            self.values = array.array("d")
+        else:
+            self.values = array.array("q")
+
+    def encode(self) -> Tuple[bytes, bytes]:
+        """
+        Encodes the chunk (timestamps are stored as differences to the previous timestamp).
+
+        :return: tuple of the compressed timestamps and values
+        """
+        deltas = array.array("q", self.timestamps)
+        for i in range(len(deltas) - 1, 0, -1):
+            deltas[i] -= deltas[i - 1]
+        return zlib.compress(deltas.tobytes()), zlib.compress(self.values.tobytes())
+
+    @staticmethod
+    def decode(data_type: int,
+               timestamps_blob: bytes,
+               values_blob: bytes) -> Tuple[array.array, array.array]:
+        """
+        Decodes a chunk that was encoded by encode().
+
+        :param data_type:
+        :param timestamps_blob:
+        :param values_blob:
+        :return: tuple of the timestamps and values
+        """
+        timestamps = array.array("q")
+        timestamps.frombytes(zlib.decompress(timestamps_blob))
+        for i in range(1, len(timestamps)):
+            timestamps[i] += timestamps[i - 1]
+
+        if data_type == SensorDataType.FLOAT:
+            values = array.array("d")
+        else:
+            values = array.array("q")
+        values.frombytes(zlib.decompress(values_blob))
+        return timestamps, values
+
+
+# This class is an append-only time series store for the data of the sensors (the storage backend only
+# keeps the latest value). Received values are collected per sensor and written as compressed chunks
+# into a separate database. Additionally, the minimum, maximum and average of each minute, hour and day
+# are kept as rollups. Old chunks and rollups are removed according to the configured retention.
+class SensorHistory(threading.Thread):
+
+    # Resolutions of the rollups in seconds.
+    RESOLUTION_RAW = 0
+    RESOLUTION_MINUTE = 60
+    RESOLUTION_HOUR = 3600
+    RESOLUTION_DAY = 86400
+    rollup_resolutions = (RESOLUTION_MINUTE, RESOLUTION_HOUR, RESOLUTION_DAY)
+
+    # Interval in seconds in which the retention is applied.
+    retention_interval = 3600.0
+
+    def __init__(self,
+                 global_data: GlobalData):
+        threading.Thread.__init__(self)
+
+        # file nme of this file (used for logging)
+        self.log_tag = os.path.basename(__file__)
+
+        self._logger = global_data.logger
+
+        # Maximum number of values of a chunk, the interval in seconds in which the full chunks
+        # are written to the database and the time in seconds after which a chunk that is not full yet
+        # is written (sensors with few values would otherwise be stored in chunks of single values).
+        self._chunk_size = global_data.historyChunkSize
+        self._flush_interval = global_data.historyFlushInterval
+        self._max_chunk_age = global_data.historyMaxChunkAge
+
+        # Time in seconds raw values and rollups are kept (0 keeps them forever).
+        self._retention = {self.RESOLUTION_RAW: global_data.historyRawRetention,
+                           self.RESOLUTION_MINUTE: global_data.historyMinuteRetention,
+                           self.RESOLUTION_HOUR: global_data.historyHourRetention,
+                           self.RESOLUTION_DAY: global_data.historyDayRetention}
+
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+
+        # Values that are not written to the database yet: sensor id -> open chunk and
+        # list of full chunks (sensor id, chunk).
+        self._open_chunks = dict()  # type: Dict[int, SensorHistoryChunk]
+        self._full_chunks = list()  # type: List[Tuple[int, SensorHistoryChunk]]
+
+        # Rollup values that are not written to the database yet:
+        # (sensor id, resolution, bucket start) -> [min, max, sum, count].
+        self._rollups = dict()  # type: Dict[Tuple[int, int, int], List[Union[int, float]]]
+
+        self._flush_event = threading.Event()
+        self._exit_flag = False
+        self._last_retention = 0.0
+
+        self._conn = sqlite3.connect(global_data.historySqliteFile, check_same_thread=False)
+        self._create_tables()
+
+    def _create_tables(self):
+        """
+        Internal function that creates the tables of the history database if they do not exist.
+        """
+        with self._db_lock:
+            cursor = self._conn.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("CREATE TABLE IF NOT EXISTS sensorsHistoryChunks ("
+                           + "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                           + "sensorId INTEGER NOT NULL, "
+                           + "dataType INTEGER NOT NULL, "
+                           + "startTime INTEGER NOT NULL, "
+                           + "endTime INTEGER NOT NULL, "
+                           + "count INTEGER NOT NULL, "
+                           + "timestamps BLOB NOT NULL, "
+                           + "sensorValues BLOB NOT NULL)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS sensorsHistoryChunksSensorIdEndTime "
+                           + "ON sensorsHistoryChunks (sensorId, endTime)")
+            cursor.execute("CREATE TABLE IF NOT EXISTS sensorsHistoryRollups ("
+                           + "sensorId INTEGER NOT NULL, "
+                           + "resolution INTEGER NOT NULL, "
+                           + "bucketStart INTEGER NOT NULL, "
+                           + "minValue REAL NOT NULL, "
+                           + "maxValue REAL NOT NULL, "
+                           + "sumValue REAL NOT NULL, "
+                           + "count INTEGER NOT NULL, "
+                           + "PRIMARY KEY (sensorId, resolution, bucketStart))")
+            self._conn.commit()
+            cursor.close()
+
+    def _apply_retention(self,
+                         now: float):
+        """
+        Internal function that removes the chunks and rollups that are older than their retention.
+
+        :param now:
+        """
+        with self._db_lock:
+            cursor = self._conn.cursor()
+            if self._retention[self.RESOLUTION_RAW] > 0:
+                cursor.execute("DELETE FROM sensorsHistoryChunks WHERE endTime < ?",
+                               (int(now - self._retention[self.RESOLUTION_RAW]), ))
+
+            for resolution in self.rollup_resolutions:
+                if self._retention[resolution] > 0:
+                    cursor.execute("DELETE FROM sensorsHistoryRollups WHERE resolution = ? AND bucketStart < ?",
+                                   (resolution, int(now - self._retention[resolution]) - resolution))
+            self._conn.commit()
+            cursor.close()
+
+    def add_data(self,
+                 sensor_id: int,
+                 data_type: int,
+                 data: Union[int, float],
+                 timestamp: Optional[int] = None):
+        """
+        Adds a received value of a sensor to the history.
+
+        :param sensor_id: id of the sensor in the database
+        :param data_type: data type of the sensor (values of sensors without data are ignored)
+        :param data:
+        :param timestamp: time the value was received (current time if not given)
+        """
+        if data_type != SensorDataType.INT and data_type != SensorDataType.FLOAT:
+            return
+
+        if timestamp is None:
+            timestamp = int(time.time())
+
+        if data_type == SensorDataType.FLOAT:
+            data = float(data)
+        else:
+            data = int(data)
+
+        with self._lock:
+            chunk = self._open_chunks.get(sensor_id)
+
+            # The data type of a sensor changes if the sensor is registered again with another data type.
+            if chunk is not None and chunk.data_type != data_type:
+                self._full_chunks.append((sensor_id, chunk))
+                chunk = None
+
+            if chunk is None:
+                chunk = SensorHistoryChunk(data_type)
+                self._open_chunks[sensor_id] = chunk
+
+            chunk.timestamps.append(timestamp)
+            chunk.values.append(data)
+            if len(chunk.timestamps) >= self._chunk_size:
+                self._full_chunks.append((sensor_id, chunk))
+                del self._open_chunks[sensor_id]
+
+            for resolution in self.rollup_resolutions:
+                key = (sensor_id, resolution, timestamp - (timestamp % resolution))
+                rollup = self._rollups.get(key)
+                if rollup is None:
+                    self._rollups[key] = [data, data, data, 1]
+                else:
+                    rollup[0] = min(rollup[0], data)
+                    rollup[1] = max(rollup[1], data)
+                    rollup[2] += data
+                    rollup[3] += 1
+
+    def flush(self,
+              force: bool = False):
+        """
+        Writes the full chunks, the chunks that reached the maximum age and the rollups to the database.
+
+        :param force: write all chunks (also the ones that are not full yet)
+        """
+        # The database lock is held during the whole flush, so queries see the values either
+        # in memory or in the database.
+        with self._db_lock:
+            with self._lock:
+                chunks = self._full_chunks
+                oldest_time_created = time.time() - self._max_chunk_age
+                for sensor_id, chunk in list(self._open_chunks.items()):
+                    if force or chunk.time_created <= oldest_time_created:
+                        chunks.append((sensor_id, chunk))
+                        del self._open_chunks[sensor_id]
+                rollups = self._rollups
+                self._full_chunks = list()
+                self._rollups = dict()
+
+            if not chunks and not rollups:
+                return
+
+            chunk_rows = list()
+            for sensor_id, chunk in chunks:
+                timestamps_blob, values_blob = chunk.encode()
+                chunk_rows.append((sensor_id,
+                                   chunk.data_type,
+                                   min(chunk.timestamps),
+                                   max(chunk.timestamps),
+                                   len(chunk.timestamps),
+                                   timestamps_blob,
+                                   values_blob))
+
+            rollup_rows = list()
+            for key, rollup in rollups.items():
+                rollup_rows.append(key + tuple(rollup))
+
+            cursor = self._conn.cursor()
+            try:
+                cursor.executemany("INSERT INTO sensorsHistoryChunks ("
+                                   + "sensorId, dataType, startTime, endTime, count, timestamps, sensorValues) "
+                                   + "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                   chunk_rows)
+
+                # Rollups of a bucket are written each flush and merged with the already written part.
+                cursor.executemany("INSERT INTO sensorsHistoryRollups ("
+                                   + "sensorId, resolution, bucketStart, minValue, maxValue, sumValue, count) "
+                                   + "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                                   + "ON CONFLICT (sensorId, resolution, bucketStart) DO UPDATE SET "
+                                   + "minValue = MIN(minValue, excluded.minValue), "
+                                   + "maxValue = MAX(maxValue, excluded.maxValue), "
+                                   + "sumValue = sumValue + excluded.sumValue, "
+                                   + "count = count + excluded.count",
+                                   rollup_rows)
+                self._conn.commit()
+
+            except Exception as e:
+                self._conn.rollback()
+                self._restore(chunks, rollups)
+                raise
+
+            finally:
+                cursor.close()
+
+    def _restore(self,
+                 chunks: List[Tuple[int, SensorHistoryChunk]],
+                 rollups: Dict[Tuple[int, int, int], List[Union[int, float]]]):
+        """
+        Internal function that puts the chunks and rollups of a failed flush back in front of the
+        values that were collected in the meantime (they are written with the next flush).
+
+        :param chunks:
+        :param rollups:
+        """
+        with self._lock:
+            self._full_chunks = chunks + self._full_chunks
+
+            for key, rollup in rollups.items():
+                new_rollup = self._rollups.get(key)
+                if new_rollup is None:
+                    self._rollups[key] = rollup
+                else:
+                    new_rollup[0] = min(new_rollup[0], rollup[0])
+                    new_rollup[1] = max(new_rollup[1], rollup[1])
+                    new_rollup[2] += rollup[2]
+                    new_rollup[3] += rollup[3]
+
+    def get_range(self,
+                  sensor_id: int,
+                  start_time: int,
+                  end_time: int,
+                  resolution: int = RESOLUTION_RAW) -> List[Tuple]:
+        """
+        Gets the history of a sensor in the given time range (including the values that are not written yet).
+        Only available in-process (e.g., for internal sensors), it is not exposed to the clients.
+
+        :param sensor_id: id of the sensor in the database
+        :param start_time:
+        :param end_time:
+        :param resolution: 0 for the raw values or the resolution of a rollup (60, 3600 or 86400)
+        :return: list of (timestamp, value) tuples for raw values or
+        list of (bucket start, min, max, avg, count) tuples for rollups, sorted by time
+        """
+        if resolution == self.RESOLUTION_RAW:
+            return self._get_raw_range(sensor_id, start_time, end_time)
+
+        if resolution not in self.rollup_resolutions:
+            raise ValueError("Resolution %d is not supported." % resolution)
+
+        first_bucket = start_time - (start_time % resolution)
+        buckets = dict()  # type: Dict[int, List[Union[int, float]]]
+        with self._db_lock:
+            cursor = self._conn.cursor()
+            cursor.execute("SELECT bucketStart, minValue, maxValue, sumValue, count FROM sensorsHistoryRollups "
+                           + "WHERE sensorId = ? AND resolution = ? AND bucketStart >= ? AND bucketStart <= ?",
+                           (sensor_id, resolution, first_bucket, end_time))
+            for bucket_start, min_value, max_value, sum_value, count in cursor.fetchall():
+                buckets[bucket_start] = [min_value, max_value, sum_value, count]
+            cursor.close()
+
+            with self._lock:
+                rollups = [(x[2], list(y)) for x, y in self._rollups.items()
+                           if x[0] == sensor_id and x[1] == resolution and first_bucket <= x[2] <= end_time]
+
+        for bucket_start, rollup in rollups:
+            bucket = buckets.get(bucket_start)
+            if bucket is None:
+                buckets[bucket_start] = rollup
+            else:
+                bucket[0] = min(bucket[0], rollup[0])
+                bucket[1] = max(bucket[1], rollup[1])
+                bucket[2] += rollup[2]
+                bucket[3] += rollup[3]
+
+        result = list()
+        for bucket_start in sorted(buckets.keys()):
+            min_value, max_value, sum_value, count = buckets[bucket_start]
+            result.append((bucket_start, min_value, max_value, float(sum_value) / count, count))
+        return result
+
+    def _get_raw_range(self,
+                       sensor_id: int,
+                       start_time: int,
+                       end_time: int) -> List[Tuple[int, Union[int, float]]]:
+        """
+        Internal function that gets the raw values of a sensor in the given time range.
+
+        :param sensor_id:
+        :param start_time:
+        :param end_time:
+        :return: list of (timestamp, value) tuples sorted by time
+        """
+        with self._db_lock:
+            cursor = self._conn.cursor()
+            cursor.execute("SELECT dataType, timestamps, sensorValues FROM sensorsHistoryChunks "
+                           + "WHERE sensorId = ? AND endTime >= ? AND startTime <= ? ORDER BY id",
+                           (sensor_id, start_time, end_time))
+            rows = cursor.fetchall()
+            cursor.close()
+
+            with self._lock:
+                chunks = [x[1] for x in self._full_chunks if x[0] == sensor_id]
+                open_chunk = self._open_chunks.get(sensor_id)
+                if open_chunk is not None:
+                    chunks.append(open_chunk)
+                memory_columns = [(chunk.timestamps[:], chunk.values[:]) for chunk in chunks]
+
+        # Columns in the order the values were received (written chunks are older than the ones in memory).
+        columns = list()
+        for data_type, timestamps_blob, values_blob in rows:
+            columns.append(SensorHistoryChunk.decode(data_type, timestamps_blob, values_blob))
+        columns.extend(memory_columns)
+
+        result = list()
+        for timestamps, values in columns:
+            for i in range(len(timestamps)):
+                if start_time <= timestamps[i] <= end_time:
+                    result.append((timestamps[i], values[i]))
+
+        # Sorting is stable, so values with the same timestamp keep the order they were received in.
+        result.sort(key=lambda x: x[0])
+        return result
+
+    def run(self):
+        """
+        Writes the full and old chunks to the database in the configured interval and applies the retention.
+        """
+        while not self._exit_flag:
+            self._flush_event.wait(self._flush_interval)
+            self._flush_event.clear()
+
+            try:
+                self.flush()
+
+                now = time.time()
+                if (now - self._last_retention) >= self.retention_interval:
+                    self._last_retention = now
+                    self._apply_retention(now)
+
+            except Exception as e:
+                self._logger.exception("[%s]: Writing sensor history failed." % self.log_tag)
+
+        try:
+            self.flush(force=True)
+
+        except Exception as e:
+            self._logger.exception("[%s]: Writing sensor history failed." % self.log_tag)
+
+    def exit(self):
+        """
+        Sets the exit flag to shut down the thread (all collected values are written before).
+        """
+        self._exit_flag = True
+        self._flush_event.set()
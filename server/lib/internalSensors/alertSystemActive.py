@@ -58,14 +58,14 @@ class AlertSystemActiveSensor(_InternalSensor):
             self.logger.error("[%s]: Not able to change sensor state for internal alert system active sensor."
                               % self.log_tag)
 
-        if self.storage.addSensorAlert(self.nodeId,  # nodeId
-                                       self.sensorId,  # sensorId
-                                       state,  # state
-                                       "",  # dataJson
-                                       True,  # changeState
-                                       False,  # hasLatestData
-                                       SensorDataType.NONE,  # sensorData
-                                       None):  # logger
+        if self.sensor_alert_executer.add_sensor_alert(self.nodeId,  # nodeId
+                                                       self.sensorId,  # sensorId
+                                                       state,  # state
+                                                       "",  # dataJson
+                                                       True,  # changeState
+                                                       False,  # hasLatestData
+                                                       SensorDataType.NONE,  # sensorData
+                                                       None):  # logger
             self.sensor_alert_executer.sensorAlertEvent.set()
 
         else:
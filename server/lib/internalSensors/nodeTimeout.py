@@ -94,14 +94,14 @@ class NodeTimeoutSensor(_InternalSensor):
                                 "nodeType": node_obj.nodeType})
 
         # Add sensor alert to database for processing.
-        if self.storage.addSensorAlert(self.nodeId,  # nodeId
-                                       self.sensorId,  # sensorId
-                                       1,  # state
-                                       data_json,  # dataJson
-                                       change_state,  # changeState
-                                       False,  # hasLatestData
-                                       SensorDataType.NONE,  # sensorData
-                                       self.logger):  # logger
+        if self.sensor_alert_executer.add_sensor_alert(self.nodeId,  # nodeId
+                                                       self.sensorId,  # sensorId
+                                                       1,  # state
+                                                       data_json,  # dataJson
+                                                       change_state,  # changeState
+                                                       False,  # hasLatestData
+                                                       SensorDataType.NONE,  # sensorData
+                                                       self.logger):  # logger
             process_sensor_alerts = True
 
         else:
@@ -145,14 +145,14 @@ class NodeTimeoutSensor(_InternalSensor):
                                 "nodeType": node_obj.nodeType})
 
         # Add sensor alert to database for processing.
-        if self.storage.addSensorAlert(self.nodeId,  # nodeId
-                                       self.sensorId,  # sensorId
-                                       0,  # state
-                                       data_json,  # dataJson
-                                       change_state,  # changeState
-                                       False,  # hasLatestData
-                                       SensorDataType.NONE,  # sensorData
-                                       self.logger):  # logger
+        if self.sensor_alert_executer.add_sensor_alert(self.nodeId,  # nodeId
+                                                       self.sensorId,  # sensorId
+                                                       0,  # state
+                                                       data_json,  # dataJson
+                                                       change_state,  # changeState
+                                                       False,  # hasLatestData
+                                                       SensorDataType.NONE,  # sensorData
+                                                       self.logger):  # logger
             process_sensor_alerts = True
 
         else:
@@ -198,14 +198,14 @@ class NodeTimeoutSensor(_InternalSensor):
                                 "nodes": nodes_field})
 
         # Add sensor alert to database for processing.
-        if self.storage.addSensorAlert(self.nodeId,  # nodeId
-                                       self.sensorId,  # sensorId
-                                       1,  # state
-                                       data_json,  # dataJson
-                                       False,  # changeState
-                                       False,  # hasLatestData
-                                       SensorDataType.NONE,  # sensorData
-                                       self.logger):  # logger
+        if self.sensor_alert_executer.add_sensor_alert(self.nodeId,  # nodeId
+                                                       self.sensorId,  # sensorId
+                                                       1,  # state
+                                                       data_json,  # dataJson
+                                                       False,  # changeState
+                                                       False,  # hasLatestData
+                                                       SensorDataType.NONE,  # sensorData
+                                                       self.logger):  # logger
             process_sensor_alerts = True
 
         else:
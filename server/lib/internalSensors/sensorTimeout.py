@@ -97,14 +97,14 @@ class SensorTimeoutSensor(_InternalSensor):
                                 "nodeType": node_obj.nodeType})
 
         # Add sensor alert to database for processing.
-        if self.storage.addSensorAlert(self.nodeId,  # nodeId
-                                       self.sensorId,  # sensorId
-                                       1,  # state
-                                       data_json,  # dataJson
-                                       change_state,  # changeState
-                                       False,  # hasLatestData
-                                       SensorDataType.NONE,  # sensorData
-                                       self.logger):  # logger
+        if self.sensor_alert_executer.add_sensor_alert(self.nodeId,  # nodeId
+                                                       self.sensorId,  # sensorId
+                                                       1,  # state
+                                                       data_json,  # dataJson
+                                                       change_state,  # changeState
+                                                       False,  # hasLatestData
+                                                       SensorDataType.NONE,  # sensorData
+                                                       self.logger):  # logger
             process_sensor_alerts = True
 
         else:
@@ -150,14 +150,14 @@ class SensorTimeoutSensor(_InternalSensor):
                                 "instance": node_obj.instance,
                                 "nodeType": node_obj.nodeType})
 
-        if self.storage.addSensorAlert(self.nodeId,  # nodeId
-                                       self.sensorId,  # sensorId
-                                       0,  # state
-                                       data_json,  # dataJson
-                                       change_state,  # changeState
-                                       False,  # hasLatestData
-                                       SensorDataType.NONE,  # sensorData
-                                       self.logger):  # logger
+        if self.sensor_alert_executer.add_sensor_alert(self.nodeId,  # nodeId
+                                                       self.sensorId,  # sensorId
+                                                       0,  # state
+                                                       data_json,  # dataJson
+                                                       change_state,  # changeState
+                                                       False,  # hasLatestData
+                                                       SensorDataType.NONE,  # sensorData
+                                                       self.logger):  # logger
             process_sensor_alerts = True
 
         else:
@@ -226,14 +226,14 @@ class SensorTimeoutSensor(_InternalSensor):
                                 "sensors": sensors_field})
 
         # Add sensor alert to database for processing.
-        if self.storage.addSensorAlert(self.nodeId,  # nodeId
-                                       self.sensorId,  # sensorId
-                                       1,  # state
-                                       data_json,  # dataJson
-                                       False,  # changeState
-                                       False,  # hasLatestData
-                                       SensorDataType.NONE,  # sensorData
-                                       self.logger):  # logger
+        if self.sensor_alert_executer.add_sensor_alert(self.nodeId,  # nodeId
+                                                       self.sensorId,  # sensorId
+                                                       1,  # state
+                                                       data_json,  # dataJson
+                                                       False,  # changeState
+                                                       False,  # hasLatestData
+                                                       SensorDataType.NONE,  # sensorData
+                                                       self.logger):  # logger
             process_sensor_alerts = True
 
         else:
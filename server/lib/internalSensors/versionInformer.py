@@ -145,14 +145,14 @@ class VersionInformerSensor(_InternalSensor):
                 # Add sensor alert to database for processing.
                 message = "Update checking failed %d times in a row." % update_fail_count
                 data_json = json.dumps({"message": message})
-                if self.storage.addSensorAlert(self.nodeId,  # nodeId
-                                               self.sensorId,  # sensorId
-                                               self.state,  # state
-                                               data_json,  # dataJson
-                                               change_state,  # changeState
-                                               False,  # hasLatestData
-                                               SensorDataType.NONE,  # sensorData
-                                               self.logger):  # logger
+                if self.sensor_alert_executer.add_sensor_alert(self.nodeId,  # nodeId
+                                                               self.sensorId,  # sensorId
+                                                               self.state,  # state
+                                                               data_json,  # dataJson
+                                                               change_state,  # changeState
+                                                               False,  # hasLatestData
+                                                               SensorDataType.NONE,  # sensorData
+                                                               self.logger):  # logger
 
                     # Manually wake up sensor alert executer to process
                     # sensor alerts immediately.
@@ -278,14 +278,14 @@ class VersionInformerSensor(_InternalSensor):
                                                 "newRev": new_rev})
 
                         # Add sensor alert to database for processing.
-                        if self.storage.addSensorAlert(self.nodeId,  # nodeId
-                                                       self.sensorId,  # sensorId
-                                                       self.state,  # state
-                                                       data_json,  # dataJson
-                                                       change_state,  # changeState
-                                                       False,  # hasLatestData
-                                                       SensorDataType.NONE,  # sensorData
-                                                       self.logger):  # logger
+                        if self.sensor_alert_executer.add_sensor_alert(self.nodeId,  # nodeId
+                                                                       self.sensorId,  # sensorId
+                                                                       self.state,  # state
+                                                                       data_json,  # dataJson
+                                                                       change_state,  # changeState
+                                                                       False,  # hasLatestData
+                                                                       SensorDataType.NONE,  # sensorData
+                                                                       self.logger):  # logger
                             process_sensor_alerts = True
 
                         else:
@@ -314,14 +314,14 @@ class VersionInformerSensor(_InternalSensor):
                                       % self.fileName)
 
                 # Add sensor alert to database for processing.
-                if self.storage.addSensorAlert(self.nodeId,  # nodeId
-                                               self.sensorId,  # sensorId
-                                               self.state,  # state
-                                               data_json,  # dataJson
-                                               True,  # changeState
-                                               False,  # hasLatestData
-                                               SensorDataType.NONE,  # sensorData
-                                               self.logger):  # logger
+                if self.sensor_alert_executer.add_sensor_alert(self.nodeId,  # nodeId
+                                                               self.sensorId,  # sensorId
+                                                               self.state,  # state
+                                                               data_json,  # dataJson
+                                                               True,  # changeState
+                                                               False,  # hasLatestData
+                                                               SensorDataType.NONE,  # sensorData
+                                                               self.logger):  # logger
                     process_sensor_alerts = True
 
                 else:
@@ -11,8 +11,9 @@ import threading
 import os
 import time
 import collections
-from .server import AsynchronousSender
+from typing import Dict, List, Optional, Tuple
 from .globalData import GlobalData
+from .localObjects import SensorData
 
 
 # this class is woken up if a sensor alert or state change is received
@@ -28,6 +29,10 @@ class ManagerUpdateExecuter(threading.Thread):
         self.managerUpdateInterval = self.globalData.managerUpdateInterval
         self.storage = self.globalData.storage
         self.serverSessions = self.globalData.serverSessions
+        self.senderPool = self.globalData.senderPool
+
+        # Minimum time in seconds between two state changes of the same sensor that are sent to the managers.
+        self.stateChangeInterval = self.globalData.managerStateChangeInterval
 
         # file nme of this file (used for logging)
         self.fileName = os.path.basename(__file__)
@@ -48,30 +53,81 @@ class ManagerUpdateExecuter(threading.Thread):
         # the manager clients (ignoring the time interval)
         self.forceStatusUpdate = False
 
-        # this is a queue that is used to signalize the state changes
-        # that should be sent to the manager clients
-        self.queueStateChange = collections.deque()
+        # State changes that should be sent to the manager clients keyed by sensor id
+        # (only the last state change of a sensor is sent) and the time the last state change
+        # of each sensor was sent.
+        self._stateChanges = collections.OrderedDict()  # type: Dict[int, Tuple[int, int, SensorData]]
+        self._stateChangesSent = dict()  # type: Dict[int, float]
+        self._stateChangesLock = threading.Lock()
+
+    def _getStateChangesToSend(self) -> Tuple[List[Tuple[int, int, SensorData]], Optional[float]]:
+        """
+        Internal function that removes all state changes that can be sent from the queue.
+
+        :return: tuple of the list of state change tuples (sensorId, state, sensorDataObj)
+        and the time the next queued state change can be sent (None if none is queued)
+        """
+        stateChanges = list()
+        nextSendTime = None
+        now = time.time()
+        with self._stateChangesLock:
+            for sensorId in list(self._stateChanges.keys()):
+                sendTime = self._stateChangesSent.get(sensorId, 0.0) + self.stateChangeInterval
+                if sendTime > now:
+                    if nextSendTime is None or sendTime < nextSendTime:
+                        nextSendTime = sendTime
+                    continue
+
+                stateChanges.append(self._stateChanges.pop(sensorId))
+                self._stateChangesSent[sensorId] = now
+
+            # Remove send times that no longer delay a state change.
+            if len(self._stateChangesSent) > 2 * len(self._stateChanges) + 1024:
+                for sensorId, sentTime in list(self._stateChangesSent.items()):
+                    if (sentTime + self.stateChangeInterval) <= now and sensorId not in self._stateChanges:
+                        del self._stateChangesSent[sensorId]
+
+        return stateChanges, nextSendTime
+
+    def addStateChange(self,
+                       sensorId: int,
+                       state: int,
+                       sensorDataObj: SensorData):
+        """
+        Adds a state change of a sensor that should be sent to the manager clients and wakes up the thread.
+        A queued state change of the same sensor that was not sent yet is replaced.
+
+        :param sensorId:
+        :param state:
+        :param sensorDataObj:
+        """
+        with self._stateChangesLock:
+            self._stateChanges[sensorId] = (sensorId, state, sensorDataObj)
+        self.managerUpdateEvent.set()
 
     def run(self):
 
+        nextSendTime = None
         while True:
 
             # check if thread should terminate
             if self.exitFlag:
                 return
 
-            # check if state change queue is empty before waiting
-            # for event (or timeout)
-            if len(self.queueStateChange) == 0:
-                # wait 10 seconds before checking if a
-                # status update to all manager nodes has to be sent
-                # or check it when the event is triggered
-                self.managerUpdateEvent.wait(10)
-                self.managerUpdateEvent.clear()
+            # wait 10 seconds before checking if a
+            # status update to all manager nodes has to be sent
+            # or check it when the event is triggered
+            # (or when the next delayed state change can be sent)
+            timeout = 10.0
+            if nextSendTime is not None:
+                timeout = min(timeout, max(0.0, nextSendTime - time.time()))
+            self.managerUpdateEvent.wait(timeout)
+            self.managerUpdateEvent.clear()
 
             # check if last status update has timed out
             # or a status update is forced
             # => send status update to all manager
+            # (managers that support it only get the changes since their last update)
             utcTimestamp = int(time.time())
             if (utcTimestamp - self.managerUpdateInterval) > self.lastStatusUpdateSend or self.forceStatusUpdate:
 
@@ -84,62 +140,48 @@ class ManagerUpdateExecuter(threading.Thread):
                 # empty current state queue
                 # (because the state changes are also transmitted
                 # during the full state update)
-                self.queueStateChange.clear()
+                with self._stateChangesLock:
+                    self._stateChanges.clear()
+                nextSendTime = None
 
-                for serverSession in self.serverSessions:
-                    # ignore sessions which do not exist yet
-                    # and that are not managers
-                    if serverSession.clientComm is None:
-                        continue
-                    if serverSession.clientComm.nodeType != "manager":
-                        continue
+                for serverSession in self.serverSessions.get_by_node_type("manager"):
+                    # ignore clients that are closing their session
                     if not serverSession.clientComm.clientInitialized:
                         continue
 
-                    # sending status update to manager via a thread
+                    # sending status update to manager via the sender pool
                     # to not block the manager update executer
-                    statusUpdateProcess = AsynchronousSender(self.globalData, serverSession.clientComm)
-                    # set thread to daemon
-                    # => threads terminates when main thread terminates
-                    statusUpdateProcess.daemon = True
-                    statusUpdateProcess.sendManagerUpdate = True
-                    statusUpdateProcess.start()
+                    self.senderPool.queue_manager_update(serverSession.clientComm)
+
+                senderStatistics = self.senderPool.get_statistics()
+                self.logger.debug("[%s]: Sender pool queue depth: %d; average send latency: %.3f seconds."
+                                  % (self.fileName, senderStatistics["queue_depth"],
+                                     senderStatistics["send_latency_avg"]))
 
                 # if status update was sent to manager clients
                 # => ignore state changes (because they are also covered
                 # by a status update)
                 continue
 
-            # if status change queue is not empty
-            # => send status changes to manager clients
-            while len(self.queueStateChange) != 0:
-                managerStateTuple = self.queueStateChange.popleft()
+            # send status changes that are not delayed by the minimum interval to manager clients
+            stateChanges, nextSendTime = self._getStateChangesToSend()
+            for managerStateTuple in stateChanges:
                 sensorId = managerStateTuple[0]
                 state = managerStateTuple[1]
                 sensorDataObj = managerStateTuple[2]
 
-                for serverSession in self.serverSessions:
-                    # ignore sessions which do not exist yet
-                    # and that are not managers
-                    if serverSession.clientComm is None:
-                        continue
-                    if serverSession.clientComm.nodeType != "manager":
-                        continue
+                for serverSession in self.serverSessions.get_by_node_type("manager"):
+                    # ignore clients that are closing their session
                     if not serverSession.clientComm.clientInitialized:
                         continue
 
-                    # sending status update to manager via a thread
+                    # sending state change to manager via the sender pool
                     # to not block the manager update executer
-                    stateChangeProcess = AsynchronousSender(self.globalData, serverSession.clientComm)
-                    # set thread to daemon
-                    # => threads terminates when main thread terminates
-                    stateChangeProcess.daemon = True
-                    stateChangeProcess.sendManagerStateChange = True
-                    stateChangeProcess.sendManagerStateChangeSensorId = sensorId
-                    stateChangeProcess.sendManagerStateChangeState = state
-                    stateChangeProcess.sendManagerStateChangeDataType = sensorDataObj.dataType
-                    stateChangeProcess.sendManagerStateChangeData = sensorDataObj.data
-                    stateChangeProcess.start()
+                    self.senderPool.queue_manager_state_change(serverSession.clientComm,
+                                                               sensorId,
+                                                               state,
+                                                               sensorDataObj.dataType,
+                                                               sensorDataObj.data)
 
     # sets the exit flag to shut down the thread
     def exit(self):
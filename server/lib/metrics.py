@@ -0,0 +1,486 @@
+#!/usr/bin/python3
+
+# written by sqall
+# twitter: https://twitter.com/sqall01
+# blog: https://h4des.org
+# github: https://github.com/sqall01
+#
+# Licensed under the GNU Affero General Public License, version 3.
+
+import bisect
+import collections
+import http.server
+import math
+import os
+import threading
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+
+def _format_value(value: float) -> str:
+    """
+    Internal function that formats a sample value in the Prometheus text format.
+
+    :param value:
+    :return:
+    """
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value))
+
+
+def _format_labels(label_names: Sequence[str],
+                   label_values: Sequence[str]) -> str:
+    """
+    Internal function that formats the labels of a sample in the Prometheus text format.
+
+    :param label_names:
+    :param label_values:
+    :return:
+    """
+    if not label_names:
+        return ""
+
+    labels = list()
+    for name, value in zip(label_names, label_values):
+        value = str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        labels.append("%s=\"%s\"" % (name, value))
+    return "{" + ",".join(labels) + "}"
+
+
+# This class is the base of all metrics. A metric with label names holds one child metric per combination
+# of label values (created by labels()). All metrics do nothing as long as they are not enabled.
+class _Metric:
+
+    metric_type = "untyped"
+
+    def __init__(self,
+                 name: str,
+                 description: str,
+                 label_names: Sequence[str] = (),
+                 enabled: bool = False):
+
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._children = collections.OrderedDict()  # type: Dict[Tuple[str, ...], _Metric]
+
+    def _create_child(self) -> Any:
+        """
+        Internal function that creates a child metric for a combination of label values.
+
+        :return:
+        """
+        raise NotImplementedError("Function not implemented yet.")
+
+    def _get_samples(self) -> List[Tuple[str, Tuple[str, ...], Tuple[str, ...], float]]:
+        """
+        Internal function that gets the samples of this metric without labels.
+
+        :return: list of (name suffix, additional label names, additional label values, value)
+        """
+        raise NotImplementedError("Function not implemented yet.")
+
+    def set_enabled(self,
+                    enabled: bool):
+        """
+        Enables or disables the metric and all its children.
+
+        :param enabled:
+        """
+        self.enabled = enabled
+        with self._lock:
+            for child in self._children.values():
+                child.enabled = enabled
+
+    def labels(self,
+               *label_values: Any) -> Any:
+        """
+        Gets the child metric for the given label values (created if it does not exist).
+
+        :param label_values: values in the order of the label names
+        :return:
+        """
+        if len(label_values) != len(self.label_names):
+            raise ValueError("Metric '%s' expects %d label values." % (self.name, len(self.label_names)))
+
+        key = tuple(str(x) for x in label_values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._create_child()
+                    child.enabled = self.enabled
+                    self._children[key] = child
+        return child
+
+    def generate_text(self) -> str:
+        """
+        Generates the samples of the metric in the Prometheus text format.
+
+        :return:
+        """
+        lines = ["# HELP %s %s" % (self.name, self.description.replace("\\", "\\\\").replace("\n", "\\n")),
+                 "# TYPE %s %s" % (self.name, self.metric_type)]
+
+        if self.label_names:
+            with self._lock:
+                children = list(self._children.items())
+
+        else:
+            children = [((), self)]
+
+        for label_values, child in children:
+            for suffix, extra_names, extra_values, value in child._get_samples():
+                lines.append("%s%s%s %s" % (self.name,
+                                            suffix,
+                                            _format_labels(self.label_names + extra_names,
+                                                           label_values + extra_values),
+                                            _format_value(value)))
+        return "\n".join(lines) + "\n"
+
+
+# This class is a metric that can only be increased (e.g., number of processed messages).
+class Counter(_Metric):
+
+    metric_type = "counter"
+
+    def __init__(self,
+                 name: str,
+                 description: str,
+                 label_names: Sequence[str] = (),
+                 enabled: bool = False):
+        super().__init__(name, description, label_names, enabled)
+        self._value = 0.0
+
+    def _create_child(self) -> Any:
+        return Counter(self.name, self.description)
+
+    def _get_samples(self) -> List[Tuple[str, Tuple[str, ...], Tuple[str, ...], float]]:
+        return [("", (), (), self._value)]
+
+    def inc(self,
+            amount: float = 1.0):
+        """
+        Increases the counter.
+
+        :param amount:
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._value += amount
+
+
+# This class is a metric that can go up and down (e.g., number of queued messages).
+class Gauge(_Metric):
+
+    metric_type = "gauge"
+
+    def __init__(self,
+                 name: str,
+                 description: str,
+                 label_names: Sequence[str] = (),
+                 enabled: bool = False):
+        super().__init__(name, description, label_names, enabled)
+        self._value = 0.0
+
+    def _create_child(self) -> Any:
+        return Gauge(self.name, self.description)
+
+    def _get_samples(self) -> List[Tuple[str, Tuple[str, ...], Tuple[str, ...], float]]:
+        return [("", (), (), self._value)]
+
+    def set(self,
+            value: float):
+        """
+        Sets the gauge to the given value.
+
+        :param value:
+        """
+        if not self.enabled:
+            return
+        self._value = value
+
+    def inc(self,
+            amount: float = 1.0):
+        """
+        Increases the gauge.
+
+        :param amount:
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._value += amount
+
+    def dec(self,
+            amount: float = 1.0):
+        """
+        Decreases the gauge.
+
+        :param amount:
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._value -= amount
+
+
+# This class is a metric that counts observed values (e.g., latencies) in buckets.
+class Histogram(_Metric):
+
+    metric_type = "histogram"
+
+    # Default upper bounds of the buckets in seconds.
+    default_buckets = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self,
+                 name: str,
+                 description: str,
+                 label_names: Sequence[str] = (),
+                 enabled: bool = False,
+                 buckets: Sequence[float] = default_buckets):
+        super().__init__(name, description, label_names, enabled)
+        self._buckets = tuple(sorted(buckets))
+        self._bucket_counts = [0] * (len(self._buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+
+    def _create_child(self) -> Any:
+        return Histogram(self.name, self.description, buckets=self._buckets)
+
+    def _get_samples(self) -> List[Tuple[str, Tuple[str, ...], Tuple[str, ...], float]]:
+        with self._lock:
+            bucket_counts = list(self._bucket_counts)
+            observed_sum = self._sum
+            count = self._count
+
+        samples = list()
+        cumulative_count = 0
+        for upper_bound, bucket_count in zip(self._buckets + (float("inf"), ), bucket_counts):
+            cumulative_count += bucket_count
+            samples.append(("_bucket", ("le", ), (_format_value(upper_bound), ), cumulative_count))
+        samples.append(("_sum", (), (), observed_sum))
+        samples.append(("_count", (), (), count))
+        return samples
+
+    def observe(self,
+                value: float):
+        """
+        Adds an observed value.
+
+        :param value:
+        """
+        if not self.enabled:
+            return
+        idx = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self._bucket_counts[idx] += 1
+            self._sum += value
+            self._count += 1
+
+
+# This class is a metric which value is computed by a function each time the metrics are collected
+# (e.g., for values that are already tracked by a component and cost nothing on the hot path).
+class FunctionMetric(_Metric):
+
+    def __init__(self,
+                 name: str,
+                 description: str,
+                 function: Callable[[], float],
+                 metric_type: str = "gauge"):
+        super().__init__(name, description)
+        self.metric_type = metric_type
+        self._function = function
+
+    def _get_samples(self) -> List[Tuple[str, Tuple[str, ...], Tuple[str, ...], float]]:
+        return [("", (), (), self._function())]
+
+
+# This class holds all metrics of the server. The metrics are disabled until the registry is enabled,
+# so instrumented code paths only check a flag as long as the metrics are not activated.
+class MetricsRegistry:
+
+    def __init__(self):
+        self.enabled = False
+
+        self._lock = threading.Lock()
+        self._metrics = collections.OrderedDict()  # type: Dict[str, _Metric]
+
+    def _register(self,
+                  metric: _Metric) -> Any:
+        """
+        Internal function that adds the metric to the registry (or returns the already registered one
+        with the same name).
+
+        :param metric:
+        :return:
+        """
+        with self._lock:
+            registered_metric = self._metrics.get(metric.name)
+            if registered_metric is not None:
+                if type(registered_metric) != type(metric):
+                    raise ValueError("Metric '%s' is already registered with another type." % metric.name)
+                return registered_metric
+
+            metric.set_enabled(self.enabled)
+            self._metrics[metric.name] = metric
+            return metric
+
+    def enable(self):
+        """
+        Enables all registered and future metrics.
+        """
+        with self._lock:
+            self.enabled = True
+            for metric in self._metrics.values():
+                metric.set_enabled(True)
+
+    def counter(self,
+                name: str,
+                description: str,
+                label_names: Sequence[str] = ()) -> Counter:
+        """
+        Gets the counter with the given name (registered if it does not exist).
+
+        :param name:
+        :param description:
+        :param label_names:
+        :return:
+        """
+        return self._register(Counter(name, description, label_names))
+
+    def gauge(self,
+              name: str,
+              description: str,
+              label_names: Sequence[str] = ()) -> Gauge:
+        """
+        Gets the gauge with the given name (registered if it does not exist).
+
+        :param name:
+        :param description:
+        :param label_names:
+        :return:
+        """
+        return self._register(Gauge(name, description, label_names))
+
+    def histogram(self,
+                  name: str,
+                  description: str,
+                  label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = Histogram.default_buckets) -> Histogram:
+        """
+        Gets the histogram with the given name (registered if it does not exist).
+
+        :param name:
+        :param description:
+        :param label_names:
+        :param buckets: upper bounds of the buckets
+        :return:
+        """
+        return self._register(Histogram(name, description, label_names, buckets=buckets))
+
+    def function(self,
+                 name: str,
+                 description: str,
+                 function: Callable[[], float],
+                 metric_type: str = "gauge"):
+        """
+        Registers a metric which value is computed by the given function when the metrics are collected
+        (replaces an already registered function with the same name).
+
+        :param name:
+        :param description:
+        :param function:
+        :param metric_type: "gauge" or "counter"
+        """
+        metric = FunctionMetric(name, description, function, metric_type)
+        with self._lock:
+            self._metrics[name] = metric
+
+    def generate_text(self) -> str:
+        """
+        Generates all metrics in the Prometheus text format.
+
+        :return:
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        texts = list()
+        for metric in metrics:
+            try:
+                texts.append(metric.generate_text())
+
+            except Exception as e:
+                # A failing function metric should not prevent the other metrics from being collected.
+                continue
+
+        return "".join(texts)
+
+
+# This class handles the HTTP requests of the metrics server.
+class MetricsRequestHandler(http.server.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ["/", "/metrics"]:
+            self.send_error(404)
+            return
+
+        data = self.server.metrics_registry.generate_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: Any):
+        # Do not log each scrape.
+        pass
+
+
+# This class is a thread that serves the metrics in the Prometheus text format via HTTP
+# (only reachable from the local host).
+class MetricsServer(threading.Thread):
+
+    def __init__(self,
+                 metrics_registry: MetricsRegistry,
+                 port: int,
+                 logger: Any = None):
+        threading.Thread.__init__(self)
+
+        # file nme of this file (used for logging)
+        self.log_tag = os.path.basename(__file__)
+
+        self._logger = logger
+
+        self._http_server = http.server.ThreadingHTTPServer(("127.0.0.1", port), MetricsRequestHandler)
+        self._http_server.daemon_threads = True
+        self._http_server.metrics_registry = metrics_registry
+
+    def run(self):
+        if self._logger is not None:
+            self._logger.info("[%s]: Serving metrics on 127.0.0.1:%d."
+                              % (self.log_tag, self._http_server.server_address[1]))
+        self._http_server.serve_forever()
+
+    def exit(self):
+        """
+        Shuts down the metrics server.
+        """
+        self._http_server.shutdown()
+        self._http_server.server_close()
+
+    def get_port(self) -> int:
+        """
+        Gets the port the metrics server listens on.
+
+        :return:
+        """
+        return self._http_server.server_address[1]
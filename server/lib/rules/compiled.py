@@ -0,0 +1,235 @@
+#!/usr/bin/python3
+
+# written by sqall
+# twitter: https://twitter.com/sqall01
+# blog: https://h4des.org
+# github: https://github.com/sqall01
+#
+# Licensed under the GNU Affero General Public License, version 3.
+
+import heapq
+import time
+from typing import Dict, List, Optional, Set
+from .elements import RuleElement, RuleStart
+
+
+# Kinds of compiled rule elements (replaces the string compares of the rule element types).
+class RuleKind:
+    SENSOR = 0
+    WEEKDAY = 1
+    MONTHDAY = 2
+    HOUR = 3
+    MINUTE = 4
+    SECOND = 5
+    AND = 6
+    OR = 7
+    NOT = 8
+
+    time_kinds = frozenset([WEEKDAY, MONTHDAY, HOUR, MINUTE, SECOND])
+    boolean_kinds = frozenset([AND, OR, NOT])
+
+
+# This class represents a single rule element in the flat evaluation plan of a compiled rule.
+class CompiledRuleNode:
+
+    __slots__ = ("kind", "rule_element", "children", "parent", "sensor_id", "next_transition")
+
+    def __init__(self,
+                 kind: int,
+                 rule_element: RuleElement):
+
+        self.kind = kind
+
+        # Rule element that holds the state (triggered, time when triggered) of this node.
+        self.rule_element = rule_element
+
+        # Indexes of the child nodes and the parent node in the evaluation plan.
+        self.children = list()  # type: List[int]
+        self.parent = None  # type: Optional[int]
+
+        # Id of the sensor in the database (only used by sensor nodes, resolved by the rule engine).
+        self.sensor_id = None  # type: Optional[int]
+
+        # Time when the triggered value of a time node can change next (only used by time nodes,
+        # None if it is not computed yet and infinite if it never changes).
+        self.next_transition = None  # type: Optional[float]
+
+
+# This class represents a rule (tree of rule elements starting with a rule start) compiled into
+# a flat evaluation plan. The nodes are stored in post-order (children before their parent, the rule start
+# is the last node), so boolean elements can be evaluated bottom-up without recursion and only on
+# the paths of rule elements that have changed.
+class CompiledRule:
+
+    def __init__(self,
+                 rule_start: RuleStart):
+
+        self.rule_start = rule_start
+
+        self.nodes = list()  # type: List[CompiledRuleNode]
+
+        # Indexes of the sensor and time nodes.
+        self.sensor_nodes = list()  # type: List[int]
+        self.time_nodes = list()  # type: List[int]
+
+        # Index of sensor id -> indexes of the sensor nodes that reference the sensor
+        # (built when the sensor ids are resolved).
+        self.sensor_index = dict()  # type: Dict[int, List[int]]
+
+        # Sensor generation of the storage the sensor ids were resolved at and flag
+        # that states if all sensor ids could be resolved.
+        self.sensor_generation = None  # type: Optional[int]
+        self.sensor_ids_resolved = False
+
+        # Indexes of the sensor nodes that are triggered (have to be checked for expiration,
+        # maintained by the rule engine).
+        self.triggered_sensor_nodes = set()  # type: Set[int]
+
+        # The first evaluation has to evaluate all boolean elements (e.g., "not" elements
+        # are triggered without any change of their child).
+        self._needs_full_evaluation = True
+
+        # Number of evaluated boolean elements (statistics).
+        self.evaluation_count = 0
+
+        self._compile(rule_start, None)
+
+    def _compile(self,
+                 rule_element: RuleElement,
+                 parent_node: Optional[CompiledRuleNode]) -> int:
+        """
+        Internal function that adds the given rule element and all its children to the evaluation plan.
+
+        :param rule_element:
+        :param parent_node:
+        :return: index of the node of the rule element
+        """
+        if rule_element.type == "sensor":
+            kind = RuleKind.SENSOR
+        elif rule_element.type == "weekday":
+            kind = RuleKind.WEEKDAY
+        elif rule_element.type == "monthday":
+            kind = RuleKind.MONTHDAY
+        elif rule_element.type == "hour":
+            kind = RuleKind.HOUR
+        elif rule_element.type == "minute":
+            kind = RuleKind.MINUTE
+        elif rule_element.type == "second":
+            kind = RuleKind.SECOND
+        elif rule_element.type == "boolean":
+            if rule_element.element.type == "and":
+                kind = RuleKind.AND
+            elif rule_element.element.type == "or":
+                kind = RuleKind.OR
+            elif rule_element.element.type == "not":
+                kind = RuleKind.NOT
+            else:
+                raise ValueError("Boolean rule element has an invalid type.")
+        else:
+            raise ValueError("Rule element has an invalid type.")
+
+        node = CompiledRuleNode(kind, rule_element)
+
+        if kind in RuleKind.boolean_kinds:
+            for child_element in rule_element.element.elements:
+                node.children.append(self._compile(child_element, node))
+
+        idx = len(self.nodes)
+        self.nodes.append(node)
+        for child_idx in node.children:
+            self.nodes[child_idx].parent = idx
+
+        if kind == RuleKind.SENSOR:
+            self.sensor_nodes.append(idx)
+        elif kind in RuleKind.time_kinds:
+            self.time_nodes.append(idx)
+
+        return idx
+
+    def _evaluate_node(self,
+                       node: CompiledRuleNode,
+                       utc_timestamp: int) -> bool:
+        """
+        Internal function that evaluates a boolean node from the triggered values of its children.
+
+        :param node:
+        :param utc_timestamp:
+        :return: True if the triggered value of the node has changed
+        """
+        self.evaluation_count += 1
+        rule_element = node.rule_element
+
+        if node.kind == RuleKind.AND:
+            triggered = all(self.nodes[x].rule_element.triggered for x in node.children)
+        elif node.kind == RuleKind.OR:
+            triggered = any(self.nodes[x].rule_element.triggered for x in node.children)
+        else:
+            triggered = not self.nodes[node.children[0]].rule_element.triggered
+
+        if triggered == rule_element.triggered:
+            return False
+
+        rule_element.triggered = triggered
+
+        # "and" and "or" elements store the time they have triggered.
+        if triggered and node.kind != RuleKind.NOT:
+            rule_element.timeWhenTriggered = utc_timestamp
+
+        return True
+
+    def evaluate(self,
+                 changed_nodes: List[int]):
+        """
+        Evaluates the boolean elements on the paths from the given changed nodes to the rule start.
+
+        :param changed_nodes: indexes of the nodes which triggered value has changed
+        """
+        utc_timestamp = int(time.time())
+
+        if self._needs_full_evaluation:
+            self._needs_full_evaluation = False
+            for node in self.nodes:
+                if node.kind in RuleKind.boolean_kinds:
+                    self._evaluate_node(node, utc_timestamp)
+            return
+
+        # Process parents in ascending order of their index (post-order guarantees
+        # that all children of a node are evaluated before the node itself).
+        to_evaluate = list()
+        queued = set()
+
+        # The rule start is always evaluated since the rule engine resets it outside of the evaluation
+        # (e.g., rules chain not triggered in time or counter limit reached).
+        root_idx = len(self.nodes) - 1
+        if self.nodes[root_idx].kind in RuleKind.boolean_kinds:
+            queued.add(root_idx)
+            heapq.heappush(to_evaluate, root_idx)
+        for idx in changed_nodes:
+            parent_idx = self.nodes[idx].parent
+            if parent_idx is not None and parent_idx not in queued:
+                queued.add(parent_idx)
+                heapq.heappush(to_evaluate, parent_idx)
+
+        while to_evaluate:
+            idx = heapq.heappop(to_evaluate)
+            node = self.nodes[idx]
+            if not self._evaluate_node(node, utc_timestamp):
+                continue
+
+            if node.parent is not None and node.parent not in queued:
+                queued.add(node.parent)
+                heapq.heappush(to_evaluate, node.parent)
+
+    def has_triggered_element(self) -> bool:
+        """
+        Checks if a sensor or time element of the rule is triggered (the rule can trigger during the next
+        evaluation).
+
+        :return:
+        """
+        if self.triggered_sensor_nodes:
+            return True
+        for idx in self.time_nodes:
+            if self.nodes[idx].rule_element.triggered:
+                return True
+        return False
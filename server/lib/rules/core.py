@@ -8,21 +8,18 @@
 # Licensed under the GNU Affero General Public License, version 3.
 
 import os
+import math
 import time
-from typing import List, Tuple
+from typing import Dict, List, Optional, Set
 from ..globalData import GlobalData
 from ..localObjects import SensorAlert, AlertLevel, SensorDataType
-from ..server import AsynchronousSender
-from .elements import RuleElement
-
-'''
-TODO
-This is old code of the rule engine which worked when I was using it. It is really really terrible with lots of
-old confusing data structures. It needs a complete rewrite and test cases. However, I do not use it currently.
-Hence, I have no incentive to refactor this code at the moment.
-'''
+from .compiled import CompiledRule, CompiledRuleNode, RuleKind
+from .timerWheel import TimerWheel
 
 
+# This class evaluates the rules of the alert levels. The rules are compiled once (see compiled.py),
+# sensor alerts only update the rules that contain their sensor and time based rule elements
+# are re-evaluated by a timer wheel when their state can change.
 class RuleEngine:
 
     def __init__(self,
@@ -31,7 +28,8 @@ class RuleEngine:
         # get global configured data
         self.globalData = globalData
         self.logger = self.globalData.logger
-        self.serverSessions = self.globalData.serverSessions
+        self.alertLevelDispatchTable = self.globalData.alertLevelDispatchTable
+        self.senderPool = self.globalData.senderPool
         self.storage = self.globalData.storage
 
         # file nme of this file (used for logging)
@@ -40,741 +38,350 @@ class RuleEngine:
         # Structure: [ list(sensorAlerts), possible triggered alertLevel ]
         self.sensorAlertsToHandleWithRules = list()
 
-    def _updateRuleValuesRecursively(self,
-                                     sensorAlertList: List[Tuple[int, int, int, int, int, int, str]],
-                                     currentRuleElement: RuleElement) -> bool:
+        # Rules of the alert levels compiled into flat evaluation plans
+        # (key: alert level, value: compiled rules in the order of the rules chain).
+        self._compiledRules = dict()  # type: Dict[int, List[CompiledRule]]
+
+        # Alert levels that received new sensor alerts since they were processed the last time.
+        self._alertLevelsWithNewSensorAlerts = set()  # type: Set[int]
+
+        # Timer wheel with the next time the state of an alert level to handle can change
+        # (e.g., trigger of a sensor element expires, time element starts/ends, counter expires).
+        # Alert levels are only processed if they received new sensor alerts or their time has come.
+        self._timerWheel = TimerWheel(time.time())
+
+    def _getCompiledRules(self,
+                          alertLevel: AlertLevel) -> List[CompiledRule]:
         """
-        this internal function recursively updates all values of
-        the rule elements it processes received sensor alerts,
-        updates the timeWhenTriggered values and sets the rule elements
-        to triggered or not triggered respectively
+        this internal function returns the compiled rules of the given alert level
+        (compiles them on the first call)
 
-        :param sensorAlertList:
-        :param currentRuleElement:
+        :param alertLevel:
         :return:
         """
-        # check if rule element is of type "sensor"
-        # => update values of rule
-        if currentRuleElement.type == "sensor":
-
-            # get node id of sensor client
-            ruleNodeId = self.storage.getNodeId(currentRuleElement.element.username)
-            if ruleNodeId is None:
-                self.logger.error("[%s]: Not able to get node id for sensor to update rule." % self.fileName)
-                return False
-
-            # get sensor id of sensor
-            ruleSensorId = self.storage.getSensorId(ruleNodeId, currentRuleElement.element.remoteSensorId)
-            if ruleSensorId is None:
-                self.logger.error("[%s]: Not able to get sensor id for sensor to update rule." % self.fileName)
-                return False
-
-            # update sensor rule element (set as not triggered)
-            # if sensor does not count as triggered
-            # => unset triggered flag
-            utcTimestamp = int(time.time())
-            if ((currentRuleElement.timeWhenTriggered + currentRuleElement.timeTriggeredFor) < utcTimestamp
-               and currentRuleElement.triggered):
-                self.logger.debug("[%s]: Sensor with id '%d' does not count as triggered anymore."
-                                  % (self.fileName, ruleSensorId))
-                currentRuleElement.triggered = False
-
-            # update sensor rule values with current sensor alerts
-            for sensorAlert in sensorAlertList:
-                sensorAlertNodeId = sensorAlert[2]
-                sensorAlertSensorId = sensorAlert[1]
-                sensorAlertTimeReceived = sensorAlert[3]
-                sensorAlertAlertDelay = sensorAlert[4]
-
-                # check if received sensor alert is triggered by
-                # the sensor of the rule
-                if sensorAlertNodeId == ruleNodeId and sensorAlertSensorId == ruleSensorId:
-                    self.logger.debug("[%s]: Found match for sensor with id '%d' and sensor in rule."
-                                      % (self.fileName, ruleSensorId))
-
-                    # checked if the received sensor alert
-                    # is newer than the stored time when triggered
-                    # => update time when triggered
-                    if (sensorAlertTimeReceived + sensorAlertAlertDelay) > currentRuleElement.timeWhenTriggered:
-
-                        # check if an alert delay has to be considered
-                        utcTimestamp = int(time.time())
-                        if not (utcTimestamp - sensorAlertTimeReceived) > sensorAlertAlertDelay:
-                            self.logger.debug("[%s]: Sensor alert for sensor with id '%d' still delayed for "
-                                              % (self.fileName, ruleSensorId)
-                                              + "'%d' seconds."
-                                              % (sensorAlertAlertDelay - (utcTimestamp - sensorAlertTimeReceived)))
-                            continue
-
-                        self.logger.debug("[%s]: New sensor alert for sensor with id '%d' received."
-                                          % (self.fileName, ruleSensorId))
-
-                        currentRuleElement.timeWhenTriggered = sensorAlertTimeReceived + sensorAlertAlertDelay
-
-                        # check if sensor still counts as triggered
-                        # => set triggered flag
-                        if (currentRuleElement.timeWhenTriggered + currentRuleElement.timeTriggeredFor) > utcTimestamp:
-                            self.logger.debug("[%s]: Sensor with id '%d' counts as triggered."
-                                              % (self.fileName, ruleSensorId))
-                            currentRuleElement.triggered = True
-
-                        # if sensor does not count as triggered
-                        # => unset triggered flag
-                        else:
-                            self.logger.debug("[%s]: Sensor with id '%d' does not count as triggered."
-                                              % (self.fileName, ruleSensorId))
-                            currentRuleElement.triggered = False
-
-        # check if rule element is of type "weekday"
-        # => update values of rule according to the date
-        elif currentRuleElement.type == "weekday":
-
-            weekdayElement = currentRuleElement.element
-
-            if weekdayElement.time == "local":
-
-                # check if week day matches
-                # => set rule element as triggered if it is not yet triggered
-                if weekdayElement.weekday == time.localtime().tm_wday:
-
-                    # check if rule element is not triggered
-                    # => set as triggered
-                    if not currentRuleElement.triggered:
-                        self.logger.debug("[%s]: Week day with value '%d' for '%s' counts as triggered."
-                                          % (self.fileName, weekdayElement.weekday, weekdayElement.time))
-                        utcTimestamp = int(time.time())
-                        currentRuleElement.timeWhenTriggered = utcTimestamp
-                        currentRuleElement.triggered = True
-
-                # check if rule element is triggered
-                # => set rule element as not triggered
-                elif currentRuleElement.triggered:
-                    self.logger.debug("[%s]: Week day with value '%d' for '%s' no longer counts as triggered."
-                                      % (self.fileName, weekdayElement.weekday, weekdayElement.time))
-                    currentRuleElement.triggered = False
-
-            elif weekdayElement.time == "utc":
-
-                # check if week day matches
-                # => set rule element as triggered if it is not yet triggered
-                if weekdayElement.weekday == time.gmtime().tm_wday:
-
-                    # check if rule element is not triggered
-                    # => set as triggered
-                    if not currentRuleElement.triggered:
-                        self.logger.debug("[%s]: Week day with value '%d' for '%s' counts as triggered."
-                                          % (self.fileName, weekdayElement.weekday, weekdayElement.time))
-                        utcTimestamp = int(time.time())
-                        currentRuleElement.timeWhenTriggered = utcTimestamp
-                        currentRuleElement.triggered = True
-
-                # check if rule element is triggered
-                # => set rule element as not triggered
-                elif currentRuleElement.triggered:
-                    self.logger.debug("[%s]: Week day with value '%d' for '%s' no longer counts as triggered."
-                                      % (self.fileName, weekdayElement.weekday, weekdayElement.time))
-                    currentRuleElement.triggered = False
+        compiledRules = self._compiledRules.get(alertLevel.level)
+        if compiledRules is None:
+            compiledRules = [CompiledRule(ruleStart) for ruleStart in alertLevel.rules]
+            self._compiledRules[alertLevel.level] = compiledRules
 
-            else:
-                self.logger.error("[%s]: No valid value for 'time' attribute in weekday tag." % self.fileName)
-                return False
-
-        # check if rule element is of type "monthday"
-        # => update values of rule according to the date
-        elif currentRuleElement.type == "monthday":
-
-            monthdayElement = currentRuleElement.element
-
-            if monthdayElement.time == "local":
-
-                # check if month day matches
-                # => set rule element as triggered if it is not yet triggered
-                if monthdayElement.monthday == time.localtime().tm_mday:
-
-                    # check if rule element is not triggered
-                    # => set as triggered
-                    if not currentRuleElement.triggered:
-                        self.logger.debug("[%s]: Month day with value '%d' for '%s' counts as triggered."
-                                          % (self.fileName, monthdayElement.monthday, monthdayElement.time))
-                        utcTimestamp = int(time.time())
-                        currentRuleElement.timeWhenTriggered = utcTimestamp
-                        currentRuleElement.triggered = True
-
-                # check if rule element is triggered
-                # => set rule element as not triggered
-                elif currentRuleElement.triggered:
-                    self.logger.debug("[%s]: Month day with value '%d' for '%s' no longer counts as triggered."
-                                      % (self.fileName, monthdayElement.monthday, monthdayElement.time))
-                    currentRuleElement.triggered = False
-
-            elif monthdayElement.time == "utc":
-
-                # check if month day matches
-                # => set rule element as triggered if it is not yet triggered
-                if monthdayElement.monthday == time.gmtime().tm_mday:
-
-                    # check if rule element is not triggered
-                    # => set as triggered
-                    if not currentRuleElement.triggered:
-                        self.logger.debug("[%s]: Month day with value '%d' for '%s' counts as triggered."
-                                          % (self.fileName, monthdayElement.monthday, monthdayElement.time))
-                        utcTimestamp = int(time.time())
-                        currentRuleElement.timeWhenTriggered = utcTimestamp
-                        currentRuleElement.triggered = True
-
-                # check if rule element is triggered
-                # => set rule element as not triggered
-                elif currentRuleElement.triggered:
-                    self.logger.debug("[%s]: Month day with value '%d' for '%s' no longer counts as triggered."
-                                      % (self.fileName, monthdayElement.monthday, monthdayElement.time))
-                    currentRuleElement.triggered = False
+            for compiledRule in compiledRules:
+                self._resolveSensorIds(compiledRule)
 
-            else:
-                self.logger.error("[%s]: No valid value for 'time' attribute in monthday tag." % self.fileName)
-                return False
-
-        # check if rule element is of type "hour"
-        # => update values of rule according to the date
-        elif currentRuleElement.type == "hour":
-
-            hourElement = currentRuleElement.element
-
-            if hourElement.time == "local":
-
-                # check if the current hour lies between the start/end
-                # of the hour rule element
-                # => set rule element as triggered if it is not yet triggered
-                if hourElement.start <= time.localtime().tm_hour <= hourElement.end:
-
-                    # check if rule element is not triggered
-                    # => set as triggered
-                    if not currentRuleElement.triggered:
-                        self.logger.debug("[%s]: Hour from '%d' to '%d' for '%s' counts as triggered."
-                                          % (self.fileName, hourElement.start, hourElement.end, hourElement.time))
-                        utcTimestamp = int(time.time())
-                        currentRuleElement.timeWhenTriggered = utcTimestamp
-                        currentRuleElement.triggered = True
-
-                # check if rule element is triggered
-                # => set rule element as not triggered
-                elif currentRuleElement.triggered:
-                    self.logger.debug("[%s]: Hour from '%d' to '%d' for '%s' no longer counts as triggered."
-                                      % (self.fileName, hourElement.start, hourElement.end, hourElement.time))
-                    currentRuleElement.triggered = False
-
-            elif hourElement.time == "utc":
-
-                # check if the current hour lies between the start/end
-                # of the hour rule element
-                # => set rule element as triggered if it is not yet triggered
-                if hourElement.start <= time.gmtime().tm_hour <= hourElement.end:
-
-                    # check if rule element is not triggered
-                    # => set as triggered
-                    if not currentRuleElement.triggered:
-                        self.logger.debug("[%s]: Hour from '%d' to '%d' for '%s' counts as triggered."
-                                          % (self.fileName, hourElement.start, hourElement.end, hourElement.time))
-                        utcTimestamp = int(time.time())
-                        currentRuleElement.timeWhenTriggered = utcTimestamp
-                        currentRuleElement.triggered = True
-
-                # check if rule element is triggered
-                # => set rule element as not triggered
-                elif currentRuleElement.triggered:
-                    self.logger.debug("[%s]: Hour from '%d' to '%d' for '%s' no longer counts as triggered."
-                                      % (self.fileName, hourElement.start, hourElement.end, hourElement.time))
-                    currentRuleElement.triggered = False
+        return compiledRules
 
-            else:
-                self.logger.error("[%s]: No valid value for 'time' attribute in hour tag." % self.fileName)
-                return False
-
-        # check if rule element is of type "minute"
-        # => update values of rule according to the date
-        elif currentRuleElement.type == "minute":
-
-            minuteElement = currentRuleElement.element
-
-            # check if the current minute lies between the start/end
-            # of the minute rule element
-            # => set rule element as triggered if it is not yet triggered
-            if minuteElement.start <= time.localtime().tm_min <= minuteElement.end:
-
-                # check if rule element is not triggered
-                # => set as triggered
-                if not currentRuleElement.triggered:
-                    self.logger.debug("[%s]: Minute from '%d' to '%d' counts as triggered."
-                                      % (self.fileName, minuteElement.start, minuteElement.end))
-                    utcTimestamp = int(time.time())
-                    currentRuleElement.timeWhenTriggered = utcTimestamp
-                    currentRuleElement.triggered = True
-
-            # check if rule element is triggered
-            # => set rule element as not triggered
-            elif currentRuleElement.triggered:
-                self.logger.debug("[%s]: Minute from '%d' to '%d' no longer counts as triggered."
-                                  % (self.fileName, minuteElement.start, minuteElement.end))
-                currentRuleElement.triggered = False
-
-        # check if rule element is of type "second"
-        # => update values of rule according to the date
-        elif currentRuleElement.type == "second":
-
-            secondElement = currentRuleElement.element
-
-            # check if the current second lies between the start/end
-            # of the second rule element
-            # => set rule element as triggered if it is not yet triggered
-            if secondElement.start <= time.localtime().tm_sec <= secondElement.end:
-
-                # check if rule element is not triggered
-                # => set as triggered
-                if not currentRuleElement.triggered:
-                    self.logger.debug("[%s]: Second from '%d' to '%d' counts as triggered."
-                                      % (self.fileName, secondElement.start, secondElement.end))
-                    utcTimestamp = int(time.time())
-                    currentRuleElement.timeWhenTriggered = utcTimestamp
-                    currentRuleElement.triggered = True
-
-            # check if rule element is triggered
-            # => set rule element as not triggered
-            elif currentRuleElement.triggered:
-                self.logger.debug("[%s]: Second from '%d' to '%d' no longer counts as triggered."
-                                  % (self.fileName, secondElement.start, secondElement.end))
-                currentRuleElement.triggered = False
-
-        # check if rule element is of type "boolean"
-        # => traverse rule recursively
-        elif currentRuleElement.type == "boolean":
-
-            # update values of all rule elements in current rule element
-            for ruleElement in currentRuleElement.element.elements:
-                self._updateRuleValuesRecursively(sensorAlertList, ruleElement)
+    def _resolveSensorIds(self,
+                          compiledRule: CompiledRule) -> bool:
+        """
+        this internal function resolves the sensor ids of all sensor rule elements of the given
+        compiled rule and rebuilds its sensor id index (ids resolved at an older sensor generation
+        of the storage are resolved again since nodes or sensors were added or deleted in between)
 
-        else:
-            self.logger.error("[%s]: Rule element has an invalid type." % self.fileName)
-            return False
+        :param compiledRule:
+        :return: True if all sensor ids were resolved
+        """
+        sensorGeneration = self.storage.getSensorGeneration()
+        if compiledRule.sensor_generation != sensorGeneration:
+            for idx in compiledRule.sensor_nodes:
+                compiledRule.nodes[idx].sensor_id = None
+
+        allResolved = True
+        sensorIndex = dict()
+        for idx in compiledRule.sensor_nodes:
+            node = compiledRule.nodes[idx]
+
+            if node.sensor_id is None:
+                sensorElement = node.rule_element.element
+                ruleNodeId = self.storage.getNodeId(sensorElement.username)
+                if ruleNodeId is not None:
+                    node.sensor_id = self.storage.getSensorId(ruleNodeId, sensorElement.remoteSensorId)
+
+            if node.sensor_id is None:
+                allResolved = False
+                continue
 
-        return True
+            sensorIndex.setdefault(node.sensor_id, list()).append(idx)
 
-    def _evaluateRuleElementsRecursively(self,
-                                         currentRuleElement: RuleElement) -> bool:
-        """
-        this internal function evaluates rule elements from type
-        "boolean" recursively
-        (means AND, OR and NOT are evaluated as triggered/not triggered)
+        compiledRule.sensor_index = sensorIndex
+        compiledRule.sensor_generation = sensorGeneration
+        compiledRule.sensor_ids_resolved = allResolved
+        return allResolved
 
-        :param currentRuleElement:
-        :return:
+    def _updateSensorRuleElement(self,
+                                 node: CompiledRuleNode,
+                                 sensorAlerts: List[SensorAlert]) -> bool:
         """
-        # only evaluate rule elements of type "boolean"
-        if currentRuleElement.type == "boolean":
-
-            # evaluate "and" rule element
-            if currentRuleElement.element.type == "and":
+        this internal function updates the values of a sensor rule element with the received sensor alerts
+        for its sensor and sets it to triggered or not triggered respectively
 
-                andElement = currentRuleElement.element
+        :param node:
+        :param sensorAlerts: sensor alerts of the sensor of the rule element
+        :return: True if the triggered value of the rule element has changed
+        """
+        ruleElement = node.rule_element
+        oldTriggered = ruleElement.triggered
+
+        # update sensor rule element (set as not triggered)
+        # if sensor does not count as triggered
+        # => unset triggered flag
+        utcTimestamp = int(time.time())
+        if (ruleElement.timeWhenTriggered + ruleElement.timeTriggeredFor) < utcTimestamp and ruleElement.triggered:
+            self.logger.debug("[%s]: Sensor with id '%d' does not count as triggered anymore."
+                              % (self.fileName, node.sensor_id))
+            ruleElement.triggered = False
+
+        # update sensor rule values with current sensor alerts
+        for sensorAlert in sensorAlerts:
+
+            # checked if the received sensor alert
+            # is newer than the stored time when triggered
+            # => update time when triggered
+            if (sensorAlert.timeReceived + sensorAlert.alertDelay) <= ruleElement.timeWhenTriggered:
+                continue
 
-                # check if all elements of the "and" rule element are triggered
-                for element in andElement.elements:
+            # check if an alert delay has to be considered
+            if (utcTimestamp - sensorAlert.timeReceived) < sensorAlert.alertDelay:
+                self.logger.debug("[%s]: Sensor alert for sensor with id '%d' still delayed for '%d' seconds."
+                                  % (self.fileName, node.sensor_id,
+                                     sensorAlert.alertDelay - (utcTimestamp - sensorAlert.timeReceived)))
+                continue
 
-                    # check if sensor element is not triggered
-                    # => if it is, set current rule element also as
-                    # not triggered (if it was triggered) and return
-                    if element.type == "sensor":
-                        if not element.triggered:
+            self.logger.debug("[%s]: New sensor alert for sensor with id '%d' received."
+                              % (self.fileName, node.sensor_id))
 
-                            if currentRuleElement.triggered:
-                                self.logger.debug("[%s]: Sensor rule element with remote id '%d' and username '%s' "
-                                                  % (self.fileName, element.element.remoteSensorId,
-                                                     element.element.username)
-                                                  + "not triggered. Set 'and' rule also to not triggered.")
-                                currentRuleElement.triggered = False
+            ruleElement.timeWhenTriggered = sensorAlert.timeReceived + sensorAlert.alertDelay
 
-                            return True
+            # check if sensor still counts as triggered
+            # => set triggered flag
+            ruleElement.triggered = (ruleElement.timeWhenTriggered + ruleElement.timeTriggeredFor) > utcTimestamp
 
-                    # check if weekday element is not triggered
-                    # => if it is, set current rule element also as
-                    # not triggered (if it was triggered) and return
-                    elif element.type == "weekday":
+        return ruleElement.triggered != oldTriggered
 
-                        if not element.triggered:
+    def _timeRuleElementMatches(self,
+                                node: CompiledRuleNode,
+                                utcTimestamp: float) -> Optional[bool]:
+        """
+        this internal function checks if the given time rule element (weekday, monthday, hour,
+        minute, second) matches the given time
 
-                            if currentRuleElement.triggered:
-                                self.logger.debug("[%s]: Week day rule element with value '%d' for '%s' not "
-                                                  % (self.fileName, element.element.weekday, element.element.time)
-                                                  + "triggered. Set 'and' rule also to not triggered.")
-                                currentRuleElement.triggered = False
+        :param node:
+        :param utcTimestamp:
+        :return: True if it matches or None if the element is not valid
+        """
+        element = node.rule_element.element
 
-                            return True
+        if node.kind == RuleKind.MINUTE:
+            return element.start <= time.localtime(utcTimestamp).tm_min <= element.end
 
-                    # check if monthday element is not triggered
-                    # => if it is, set current rule element also as
-                    # not triggered (if it was triggered) and return
-                    elif element.type == "monthday":
+        elif node.kind == RuleKind.SECOND:
+            return element.start <= time.localtime(utcTimestamp).tm_sec <= element.end
 
-                        if not element.triggered:
+        if element.time == "local":
+            currentTime = time.localtime(utcTimestamp)
+        elif element.time == "utc":
+            currentTime = time.gmtime(utcTimestamp)
+        else:
+            return None
+
+        if node.kind == RuleKind.WEEKDAY:
+            return element.weekday == currentTime.tm_wday
+        elif node.kind == RuleKind.MONTHDAY:
+            return element.monthday == currentTime.tm_mday
+        return element.start <= currentTime.tm_hour <= element.end
+
+    def _getNextTimeTransition(self,
+                               node: CompiledRuleNode,
+                               utcTimestamp: int,
+                               matches: bool) -> float:
+        """
+        this internal function searches the next time the given time rule element changes its match
+        (the match can only change at the start of a second, minute, hour or day)
 
-                            if currentRuleElement.triggered:
-                                self.logger.debug("[%s]: Month day rule element with value '%d' for '%s' not "
-                                                  % (self.fileName, element.element.monthday, element.element.time)
-                                                  + "triggered. Set 'and' rule also to not triggered.")
-                                currentRuleElement.triggered = False
+        :param node:
+        :param utcTimestamp:
+        :param matches: current match of the rule element
+        :return: utc timestamp or infinite if the match never changes
+        """
+        if node.kind == RuleKind.SECOND:
+            unit, maxSteps = 1, 60
+        elif node.kind == RuleKind.MINUTE:
+            unit, maxSteps = 60, 60
+        elif node.kind == RuleKind.HOUR:
+            unit, maxSteps = 3600, 24
+        elif node.kind == RuleKind.WEEKDAY:
+            unit, maxSteps = 86400, 7
+        else:
+            unit, maxSteps = 86400, 62
 
-                            return True
+        useUtc = (node.kind in (RuleKind.SECOND, RuleKind.MINUTE)
+                  or node.rule_element.element.time == "utc")
 
-                    # check if hour element is not triggered
-                    # => if it is, set current rule element also as
-                    # not triggered (if it was triggered) and return
-                    elif element.type == "hour":
+        candidate = utcTimestamp
+        for _ in range(maxSteps + 1):
 
-                        if not element.triggered:
+            # Start of the next unit in the used time zone (recomputed each step because of
+            # daylight saving time).
+            offset = 0 if useUtc else time.localtime(candidate).tm_gmtoff
+            candidate = candidate - ((candidate + offset) % unit) + unit
 
-                            if currentRuleElement.triggered:
-                                self.logger.debug("[%s]: Hour rule element from '%d' to '%d' for '%s' not "
-                                                  % (self.fileName, element.element.start, element.element.end,
-                                                     element.element.time)
-                                                  + "triggered. Set 'and' rule also to not triggered.")
-                                currentRuleElement.triggered = False
+            if self._timeRuleElementMatches(node, candidate) != matches:
+                return candidate
 
-                            return True
+        return math.inf
 
-                    # check if minute element is not triggered
-                    # => if it is, set current rule element also as
-                    # not triggered (if it was triggered) and return
-                    elif element.type == "minute":
+    def _updateTimeRuleElement(self,
+                               node: CompiledRuleNode) -> bool:
+        """
+        this internal function updates a time rule element (weekday, monthday, hour, minute, second)
+        according to the current time (only if its match can have changed since the last update)
 
-                        if not element.triggered:
+        :param node:
+        :return: True if the triggered value of the rule element has changed
+        """
+        ruleElement = node.rule_element
 
-                            if currentRuleElement.triggered:
-                                self.logger.debug("[%s]: Minute rule element from '%d' to '%d' not "
-                                                  % (self.fileName, element.element.start, element.element.end)
-                                                  + "triggered. Set 'and' rule also to not triggered.")
-                                currentRuleElement.triggered = False
+        utcTimestamp = int(time.time())
+        if node.next_transition is not None and node.next_transition > utcTimestamp:
+            return False
 
-                            return True
+        matches = self._timeRuleElementMatches(node, utcTimestamp)
+        if matches is None:
+            self.logger.error("[%s]: No valid value for 'time' attribute in %s tag."
+                              % (self.fileName, ruleElement.type))
+            return False
 
-                    # check if second element is not triggered
-                    # => if it is, set current rule element also as
-                    # not triggered (if it was triggered) and return
-                    elif element.type == "second":
+        node.next_transition = self._getNextTimeTransition(node, utcTimestamp, matches)
 
-                        if not element.triggered:
+        # check if time matches and rule element is not triggered
+        # => set as triggered
+        if matches and not ruleElement.triggered:
+            self.logger.debug("[%s]: Rule element of type '%s' counts as triggered."
+                              % (self.fileName, ruleElement.type))
+            ruleElement.timeWhenTriggered = utcTimestamp
+            ruleElement.triggered = True
+            return True
 
-                            if currentRuleElement.triggered:
-                                self.logger.debug("[%s]: Second rule element from '%d' to '%d' not "
-                                                  % (self.fileName, element.element.start, element.element.end)
-                                                  + "triggered. Set 'and' rule also to not triggered.")
-                                currentRuleElement.triggered = False
+        # check if rule element is triggered and time does not match anymore
+        # => set rule element as not triggered
+        elif not matches and ruleElement.triggered:
+            self.logger.debug("[%s]: Rule element of type '%s' no longer counts as triggered."
+                              % (self.fileName, ruleElement.type))
+            ruleElement.triggered = False
+            return True
 
-                            return True
+        return False
 
-                    elif element.type == "boolean":
-                        if not self._evaluateRuleElementsRecursively(element):
-                            return False
+    def _updateCompiledRule(self,
+                            sensorAlerts: List[SensorAlert],
+                            compiledRule: CompiledRule):
+        """
+        this internal function updates the rule elements of a compiled rule that can have changed
+        (time elements, triggered sensor elements and sensor elements of the received sensor alerts)
+        and evaluates the boolean elements on their paths
 
-                        # check if rule element was set to not triggered
-                        # => if it was, set current rule element
-                        # also as not triggered (when it was triggered)
-                        # and return
-                        if not element.triggered:
+        :param sensorAlerts:
+        :param compiledRule:
+        """
+        # Resolved sensor ids are outdated if nodes or sensors were added or deleted
+        # (e.g., a node re-added its sensors).
+        if compiledRule.sensor_generation != self.storage.getSensorGeneration():
+            self._resolveSensorIds(compiledRule)
+
+        # Group received sensor alerts by the sensor rule elements that reference their sensor
+        # (resolve sensor ids again if a sensor is not known and not all ids could be resolved).
+        sensorNodeAlerts = dict()
+        for sensorAlert in sensorAlerts:
+            nodeIdxs = compiledRule.sensor_index.get(sensorAlert.sensorId)
+            if nodeIdxs is None:
+                if compiledRule.sensor_ids_resolved:
+                    continue
+                self._resolveSensorIds(compiledRule)
+                nodeIdxs = compiledRule.sensor_index.get(sensorAlert.sensorId, list())
 
-                            if currentRuleElement.triggered:
-                                self.logger.debug("[%s]: Rule element evaluates to not triggered. Set 'and' "
-                                                  % self.fileName
-                                                  + "rule also to not triggered.")
+            for idx in nodeIdxs:
+                self.logger.debug("[%s]: Found match for sensor with id '%d' and sensor in rule."
+                                  % (self.fileName, sensorAlert.sensorId))
+                sensorNodeAlerts.setdefault(idx, list()).append(sensorAlert)
 
-                                currentRuleElement.triggered = False
+        changedNodes = list()
 
-                            return True
+        # Sensor elements with new sensor alerts or that are triggered (can expire).
+        for idx in compiledRule.triggered_sensor_nodes.union(sensorNodeAlerts.keys()):
+            node = compiledRule.nodes[idx]
+            if self._updateSensorRuleElement(node, sensorNodeAlerts.get(idx, list())):
+                changedNodes.append(idx)
 
-                    else:
-                        self.logger.error("[%s]: Type of rule element not valid." % self.fileName)
-                        return False
-
-                # when this point is reached, every element of the "and"
-                # rule is triggered
-                # => set current element as triggered (when not triggered)
-                # and return
-                if not currentRuleElement.triggered:
-                    self.logger.debug("[%s]: Each rule element evaluates to triggered. Set 'and' rule "
-                                      % self.fileName
-                                      + "also to triggered.")
-
-                    currentRuleElement.triggered = True
-                    utcTimestamp = int(time.time())
-                    currentRuleElement.timeWhenTriggered = utcTimestamp
+            if node.rule_element.triggered:
+                compiledRule.triggered_sensor_nodes.add(idx)
+            else:
+                compiledRule.triggered_sensor_nodes.discard(idx)
 
-                return True
+        # Time elements depend on the current time.
+        for idx in compiledRule.time_nodes:
+            if self._updateTimeRuleElement(compiledRule.nodes[idx]):
+                changedNodes.append(idx)
 
-            # evaluate "or" rule element
-            elif currentRuleElement.element.type == "or":
-
-                orElement = currentRuleElement.element
-
-                # first check all elements if there exist a "not rule" element
-                # that is triggered
-                # => if it does, set current rule element
-                # also as triggered (if it was not triggered) and return
-                # (done for optimization)
-                for element in orElement.elements:
-
-                    if element.type == "sensor" and element.triggered is True:
-
-                        if not currentRuleElement.triggered:
-                            self.logger.debug("[%s]: Sensor rule element with remote id '%d' and username '%s' "
-                                              % (self.fileName, element.element.remoteSensorId,
-                                                 element.element.username)
-                                              + "triggered. Set 'or' rule also to triggered.")
-                            currentRuleElement.triggered = True
-                            utcTimestamp = int(time.time())
-                            currentRuleElement.timeWhenTriggered = utcTimestamp
-
-                        return True
-
-                    elif element.type == "weekday" and element.triggered is True:
-
-                        if not currentRuleElement.triggered:
-                            self.logger.debug("[%s]: Week day rule element with value '%d' for '%s' "
-                                              % (self.fileName, element.element.weekday, element.element.time)
-                                              + "triggered. Set 'or' rule also to triggered.")
-                            currentRuleElement.triggered = True
-                            utcTimestamp = int(time.time())
-                            currentRuleElement.timeWhenTriggered = utcTimestamp
-
-                        return True
-
-                    elif element.type == "monthday" and element.triggered is True:
-
-                        if not currentRuleElement.triggered:
-                            self.logger.debug("[%s]: Month day rule element with value '%d' for '%s' "
-                                              % (self.fileName, element.element.monthday, element.element.time)
-                                              + "triggered. Set 'or' rule also to triggered.")
-                            currentRuleElement.triggered = True
-                            utcTimestamp = int(time.time())
-                            currentRuleElement.timeWhenTriggered = utcTimestamp
-
-                        return True
-
-                    elif element.type == "hour" and element.triggered is True:
-
-                        if not currentRuleElement.triggered:
-                            self.logger.debug("[%s]: Hour rule element from '%d' to '%d' for '%s' "
-                                              % (self.fileName, element.element.start, element.element.end,
-                                                 element.element.time)
-                                              + "triggered. Set 'or' rule also to triggered.")
-                            currentRuleElement.triggered = True
-                            utcTimestamp = int(time.time())
-                            currentRuleElement.timeWhenTriggered = utcTimestamp
-
-                        return True
-
-                    elif element.type == "minute" and element.triggered is True:
-
-                        if not currentRuleElement.triggered:
-                            self.logger.debug("[%s]: Minute rule element from '%d' to '%d' "
-                                              % (self.fileName, element.element.start, element.element.end)
-                                              + "triggered. Set 'or' rule also to triggered.")
-                            currentRuleElement.triggered = True
-                            utcTimestamp = int(time.time())
-                            currentRuleElement.timeWhenTriggered = utcTimestamp
-
-                        return True
-
-                    elif element.type == "second" and element.triggered is True:
-
-                        if not currentRuleElement.triggered:
-                            self.logger.debug("[%s]: Second rule element from '%d' to '%d' "
-                                              % (self.fileName, element.element.start, element.element.end)
-                                              + "triggered. Set 'or' rule also to triggered.")
-                            currentRuleElement.triggered = True
-                            utcTimestamp = int(time.time())
-                            currentRuleElement.timeWhenTriggered = utcTimestamp
-
-                        return True
-
-                # if there exists no element that is already triggered
-                # => update rule elements and evaluate them
-                for element in orElement.elements:
-
-                    # only update rule elements
-                    if element.type == "boolean":
-                        if not self._evaluateRuleElementsRecursively(element):
-                            return False
-
-                        # check if rule element was set to triggered
-                        # => if it was, set current rule element
-                        # also as triggered (if it was not triggered)
-                        # and return
-                        if element.triggered:
-
-                            if not currentRuleElement.triggered:
-                                self.logger.debug("[%s]: Rule element evaluates to triggered. Set 'or' rule "
-                                                  % self.fileName
-                                                  + "also to triggered.")
-                                currentRuleElement.triggered = True
-                                utcTimestamp = int(time.time())
-                                currentRuleElement.timeWhenTriggered = utcTimestamp
-
-                            return True
-
-                # when this point is reached, every element of the "or"
-                # rule is not triggered
-                # => set current element as not triggered (if it was triggered)
-                # and return
-                if currentRuleElement.triggered:
-                    self.logger.debug("[%s]: Each rule element evaluates to not triggered. Set 'or' rule "
-                                      % self.fileName
-                                      + "also to not triggered.")
-                    currentRuleElement.triggered = False
+        compiledRule.evaluate(changedNodes)
 
-                return True
+    def _getNextChangeTime(self,
+                           sensorAlertList: List[SensorAlert],
+                           alertLevel: AlertLevel) -> float:
+        """
+        this internal function gets the next time the rules of the given alert level can change without
+        receiving a new sensor alert (sensor element expires, delayed sensor alert counts or is removed,
+        time element starts/ends, counter element expires)
 
-            # evaluate "not" rule element
-            elif currentRuleElement.element.type == "not":
-
-                notElement = currentRuleElement.element
-
-                element = notElement.elements[0]
-
-                # check if sensor rule element and current not rule element
-                # have the same triggered value
-                # => toggle current not element triggered value
-                if element.type == "sensor":
-                    if element.triggered == currentRuleElement.triggered:
-                        self.logger.debug("[%s]: Sensor rule element with remote id '%d' and username '%s' has same "
-                                          % (self.fileName, element.element.remoteSensorId, element.element.username)
-                                          + "triggered value as 'not' rule. Toggle triggered value of 'not' rule.")
-                        # toggle current rule element triggered value
-                        currentRuleElement.triggered = not element.triggered
-
-                    return True
-
-                # check if week day rule element and current not rule element
-                # have the same triggered value
-                # => toggle current not element triggered value
-                elif element.type == "weekday":
-                    if element.triggered == currentRuleElement.triggered:
-                        self.logger.debug("[%s]: Week day rule element with value '%d' for '%s' has same "
-                                          % (self.fileName, element.element.weekday, element.element.time)
-                                          + "triggered value as 'not' rule. Toggle triggered value of 'not' rule.")
-                        # toggle current rule element triggered value
-                        currentRuleElement.triggered = not element.triggered
-
-                    return True
-
-                # check if month day rule element and current not rule element
-                # have the same triggered value
-                # => toggle current not element triggered value
-                elif element.type == "monthday":
-                    if element.triggered == currentRuleElement.triggered:
-                        self.logger.debug("[%s]: Month day rule element with value '%d' for '%s' has same "
-                                          % (self.fileName, element.element.monthday, element.element.time)
-                                          + "triggered value as 'not' rule. Toggle triggered value of 'not' rule.")
-                        # toggle current rule element triggered value
-                        currentRuleElement.triggered = not element.triggered
-
-                    return True
-
-                # check if hour rule element and current not rule element
-                # have the same triggered value
-                # => toggle current not element triggered value
-                elif element.type == "hour":
-                    if element.triggered == currentRuleElement.triggered:
-                        self.logger.debug("[%s]: Hour rule element from '%d' to '%d' for '%s' has same "
-                                          % (self.fileName, element.element.start, element.element.end,
-                                             element.element.time)
-                                          + "triggered value as 'not' rule. Toggle triggered value of 'not' rule.")
-                        # toggle current rule element triggered value
-                        currentRuleElement.triggered = not element.triggered
-
-                    return True
-
-                # check if minute rule element and current not rule element
-                # have the same triggered value
-                # => toggle current not element triggered value
-                elif element.type == "minute":
-                    if element.triggered == currentRuleElement.triggered:
-                        self.logger.debug("[%s]: Minute rule element from '%d' to '%d' has same "
-                                          % (self.fileName, element.element.start, element.element.end)
-                                          + "triggered value as 'not' rule. Toggle triggered value of 'not' rule.")
-                        # toggle current rule element triggered value
-                        currentRuleElement.triggered = not element.triggered
-
-                    return True
-
-                # check if second rule element and current not rule element
-                # have the same triggered value
-                # => toggle current not element triggered value
-                elif element.type == "second":
-                    if element.triggered == currentRuleElement.triggered:
-                        self.logger.debug("[%s]: Second rule element from '%d' to '%d' has same "
-                                          % (self.fileName, element.element.start, element.element.end)
-                                          + "triggered value as 'not' rule. Toggle triggered value of 'not' rule.")
-                        # toggle current rule element triggered value
-                        currentRuleElement.triggered = not element.triggered
-
-                    return True
-
-                # check if rule element evaluates to the same triggered value
-                # as the current not rule element
-                # => toggle current not element triggered value
-                elif element.type == "boolean":
-                    if not self._evaluateRuleElementsRecursively(element):
-                        return False
-
-                    # check if rule element was evaluated to the same
-                    # triggered value as the not rule element
-                    # => toggle current not element triggered value
-                    if element.triggered == currentRuleElement.triggered:
-                        self.logger.debug("[%s]: Rule element evaluates to the same triggered value as 'not' rule. "
-                                          % self.fileName
-                                          + "Toggle triggered value of 'not' rule.")
-                        # toggle current rule element triggered value
-                        currentRuleElement.triggered = not element.triggered
-
-                    return True
+        :param sensorAlertList:
+        :param alertLevel:
+        :return: utc timestamp or infinite if nothing changes
+        """
+        utcTimestamp = int(time.time())
+        nextChangeTime = math.inf
+
+        for compiledRule in self._getCompiledRules(alertLevel):
+
+            # A sensor element does not count as triggered anymore one second after its time has passed.
+            for idx in compiledRule.triggered_sensor_nodes:
+                ruleElement = compiledRule.nodes[idx].rule_element
+                nextChangeTime = min(nextChangeTime,
+                                     math.floor(ruleElement.timeWhenTriggered + ruleElement.timeTriggeredFor) + 1)
+
+            for idx in compiledRule.time_nodes:
+                nextTransition = compiledRule.nodes[idx].next_transition
+                if nextTransition is not None:
+                    nextChangeTime = min(nextChangeTime, nextTransition)
+
+        # Delayed sensor alerts count when their delay has passed and are removed 5 seconds afterwards.
+        for sensorAlert in sensorAlertList:
+            if (utcTimestamp - sensorAlert.timeReceived) < sensorAlert.alertDelay:
+                nextChangeTime = min(nextChangeTime, sensorAlert.timeReceived + sensorAlert.alertDelay)
+            else:
+                nextChangeTime = min(nextChangeTime, sensorAlert.timeReceived + sensorAlert.alertDelay + 6)
 
-                else:
-                    self.logger.error("[%s]: Type of rule element not valid." % self.fileName)
-                    return False
+        for ruleStart in alertLevel.rules:
+            if not ruleStart.counterActivated:
+                continue
+            for counterTimeWhenTriggered in ruleStart.counterList:
+                nextChangeTime = min(nextChangeTime,
+                                     math.floor(counterTimeWhenTriggered + ruleStart.counterWaitTime) + 1)
 
-        # if current rule element is not of type "boolean"
-        # => just return
-        else:
-            return True
+        return nextChangeTime
 
     def _updateRule(self,
-                    sensorAlertList: List[Tuple[int, int, int, int, int, int, str]],
-                    alertLevel: AlertLevel) -> bool:
+                    sensorAlertList: List[SensorAlert],
+                    alertLevel: AlertLevel):
         """
         this internal function updates all rules and their rule elements
         (sets new values for them, evaluates the boolean elements etc)
 
         :param sensorAlertList:
         :param alertLevel:
-        :return:
         """
         self.logger.debug("[%s]: Updating rule values for alert level '%d'."
                           % (self.fileName, alertLevel.level))
 
         # update and evaluate all rules of the alert level
-        for ruleStart in alertLevel.rules:
-
-            # update all rule values (sets also the sensors as triggered
-            # or not triggered)
-            if not self._updateRuleValuesRecursively(sensorAlertList, ruleStart):
-                self.logger.error("[%s]: Not able to update values for rule with order '%d' "
-                                  % (self.fileName, ruleStart.order)
-                                  + "for alert level '%d'."
-                                  % alertLevel.level)
-                return False
-
-            # evaluate all and/or/not rule elements
-            if not self._evaluateRuleElementsRecursively(ruleStart):
-                self.logger.error("[%s]: Not able to evaluate rule with order '%d' for alert level '%d'."
-                                  % (self.fileName, ruleStart.order, alertLevel.level))
-                return False
+        for compiledRule in self._getCompiledRules(alertLevel):
+            self._updateCompiledRule(sensorAlertList, compiledRule)
 
         # if more than one rule exists
         # => check if they had triggered in the correct time frame
@@ -813,8 +420,8 @@ class RuleEngine:
         # check if all received sensor alerts count as triggered
         # and therefore can be removed
         for sensorAlert in list(sensorAlertList):
-            sensorAlertTimeReceived = sensorAlert[3]
-            sensorAlertAlertDelay = sensorAlert[4]
+            sensorAlertTimeReceived = sensorAlert.timeReceived
+            sensorAlertAlertDelay = sensorAlert.alertDelay
 
             # if there does not exist an alert delay
             # => remove sensor alert
@@ -904,68 +511,9 @@ class RuleEngine:
         else:
             return False
 
-    def _checkRulesCanTriggerRecursively(self,
-                                         currentRuleElement: RuleElement) -> bool:
-        """
-        this internal function checks recusrively if a rule element is triggered
-        and therefore the rule is likely to trigger during the next evaluation
-
-        :param currentRuleElement:
-        :return:
-        """
-        # check if rule element is of type "sensor"
-        # => return if it is triggered
-        if currentRuleElement.type == "sensor":
-            return currentRuleElement.triggered
-
-        # check if rule element is of type "weekday"
-        # => return if it is triggered
-        elif currentRuleElement.type == "weekday":
-            return currentRuleElement.triggered
-
-        # check if rule element is of type "monthday"
-        # => return if it is triggered
-        elif currentRuleElement.type == "monthday":
-            return currentRuleElement.triggered
-
-        # check if rule element is of type "hour"
-        # => return if it is triggered
-        elif currentRuleElement.type == "hour":
-            return currentRuleElement.triggered
-
-        # check if rule element is of type "minute"
-        # => return if it is triggered
-        elif currentRuleElement.type == "minute":
-            return currentRuleElement.triggered
-
-        # check if rule element is of type "second"
-        # => return if it is triggered
-        elif currentRuleElement.type == "second":
-            return currentRuleElement.triggered
-
-        # check if rule element is of type "boolean"
-        # => traverse rule recursively
-        elif currentRuleElement.type == "boolean":
-
-            # check all rule elements of the current rule element
-            # if one rule element is triggered => rule can still trigger
-            for ruleElement in currentRuleElement.element.elements:
-
-                if self._checkRulesCanTriggerRecursively(ruleElement):
-                    return True
-
-            # when this point is reached, no rule element of the current one
-            # is triggered
-            return False
-
-        else:
-            self.logger.error("[%s]: Rule element has an invalid type while checking."
-                              % self.fileName)
-            return False
-
     def _checkRulesCanTrigger(self,
-                              sensorAlertList: List[Tuple[int, int, int, int, int, int, str]],
-                              alertLevel) -> bool:
+                              sensorAlertList: List[SensorAlert],
+                              alertLevel: AlertLevel) -> bool:
         """
         this internal function checks if a rule is likely to trigger
         during the next check (means an element of it counts still as triggered)
@@ -984,8 +532,8 @@ class RuleEngine:
 
         # check all rules if they can still trigger
         # if one of the rules chain can => complete rules chain can trigger
-        for ruleElement in alertLevel.rules:
-            if self._checkRulesCanTriggerRecursively(ruleElement):
+        for compiledRule in self._getCompiledRules(alertLevel):
+            if compiledRule.has_triggered_element():
                 return True
 
         # when this point is reached, no rule of the rules chain can trigger
@@ -997,29 +545,25 @@ class RuleEngine:
         Function that processes all sensor alerts handled by the rule engine
         (meaning all sensor alerts that are affected by rules).
         """
+        # only process alert levels that received new sensor alerts or
+        # which rules can have changed since the last processing
+        alertLevelsToProcess = self._alertLevelsWithNewSensorAlerts
+        alertLevelsToProcess.update(self._timerWheel.pop_expired(time.time()))
+        self._alertLevelsWithNewSensorAlerts = set()
+
         # check all sensor alerts to handle with alert levels that have
         # rules if they have to be triggered
         for sensorAlertToHandle in list(self.sensorAlertsToHandleWithRules):
 
-            # Convert sensor alerts back to tuple list because
-            # the rule engine works on a tuple list
-            # (has to be done until rule engine is re-factored).
-            sensorAlertTupleList = list()
-            for sensorAlert in sensorAlertToHandle[0]:
-                temp = (sensorAlert.sensorAlertId,
-                        sensorAlert.sensorId,
-                        sensorAlert.nodeId,
-                        sensorAlert.timeReceived,
-                        sensorAlert.alertDelay,
-                        sensorAlert.state,
-                        sensorAlert.description)
-                sensorAlertTupleList.append(temp)
-
+            sensorAlertList = sensorAlertToHandle[0]
             alertLevel = sensorAlertToHandle[1]
 
+            if alertLevel.level not in alertLevelsToProcess:
+                continue
+
             # update the rule chain of the alert level with
             # the received sensor alerts
-            self._updateRule(sensorAlertTupleList, alertLevel)
+            self._updateRule(sensorAlertList, alertLevel)
 
             # check if the rule chain evaluates to triggered
             # => trigger sensor alert for the alert level
@@ -1042,52 +586,42 @@ class RuleEngine:
                 ruleSensorAlert.sensorData = None
 
                 # send sensor alert to all manager and alert clients
-                for serverSession in self.serverSessions:
-                    # ignore sessions which do not exist yet
-                    # and that are not managers
-                    if serverSession.clientComm is None:
-                        continue
-                    if serverSession.clientComm.nodeType != "manager" and serverSession.clientComm.nodeType != "alert":
-                        continue
-                    if not serverSession.clientComm.clientInitialized:
-                        continue
-
-                    # Only send a sensor alert to a client that actually
-                    # handles a triggered alert level.
-                    clientAlertLevels = serverSession.clientComm.clientAlertLevels
-                    atLeastOne = alertLevel.level in clientAlertLevels
-                    if not atLeastOne:
+                # that actually handle the triggered alert level
+                for clientComm in self.alertLevelDispatchTable.get_clients([alertLevel.level]):
+                    # ignore clients that are closing their session
+                    if not clientComm.clientInitialized:
                         continue
 
                     # sending sensor alert to manager/alert node
-                    # via a thread to not block the sensor alert executer
-                    sensorAlertProcess = AsynchronousSender(self.globalData,
-                                                            serverSession.clientComm)
-                    # set thread to daemon
-                    # => threads terminates when main thread terminates
-                    sensorAlertProcess.daemon = True
-                    sensorAlertProcess.sendSensorAlert = True
-                    sensorAlertProcess.sensorAlert = ruleSensorAlert
-
+                    # via the sender pool to not block the sensor alert executer
                     self.logger.debug("[%s]: Sending sensor alert to manager/alert (%s:%d)."
-                                      % (self.fileName, serverSession.clientComm.clientAddress,
-                                         serverSession.clientComm.clientPort))
-                    sensorAlertProcess.start()
+                                      % (self.fileName, clientComm.clientAddress, clientComm.clientPort))
+                    self.senderPool.queue_sensor_alert(clientComm, ruleSensorAlert)
 
                 # remove sensor alert to handle from list
                 # after it has triggered
                 self.sensorAlertsToHandleWithRules.remove(sensorAlertToHandle)
+                self._timerWheel.cancel(alertLevel.level)
 
             # if rule chain did not evaluate to triggered
             # => check if it is likely that it can trigger during the
             # next evaluation if not => remove the sensor alert to handle
-            elif not self._checkRulesCanTrigger(sensorAlertTupleList, alertLevel):
+            elif not self._checkRulesCanTrigger(sensorAlertList, alertLevel):
                     self.logger.debug("[%s]: Alert level '%d' rules can not trigger at the moment."
                                       % (self.fileName, alertLevel.level))
 
                     # remove sensor alert to handle from list
                     # when it can not trigger at the current state
                     self.sensorAlertsToHandleWithRules.remove(sensorAlertToHandle)
+                    self._timerWheel.cancel(alertLevel.level)
+
+            # wake up when the rules of the alert level can change next
+            else:
+                nextChangeTime = self._getNextChangeTime(sensorAlertList, alertLevel)
+                if nextChangeTime == math.inf:
+                    self._timerWheel.cancel(alertLevel.level)
+                else:
+                    self._timerWheel.schedule(alertLevel.level, nextChangeTime)
 
     def add_sensor_alert(self,
                          sensorAlert: SensorAlert,
@@ -1102,6 +636,8 @@ class RuleEngine:
         if not alertLevel.rulesActivated:
             return
 
+        self._alertLevelsWithNewSensorAlerts.add(alertLevel.level)
+
         # check if an alert level with a rule is already triggered
         # => add current sensor alert to it
         found = False
@@ -1124,3 +660,18 @@ class RuleEngine:
         :return: Are sensor alerts to handle by the rule engine?
         """
         return len(self.sensorAlertsToHandleWithRules) != 0
+
+    def get_wait_timeout(self) -> Optional[float]:
+        """
+        Gets the time until the rules of an alert level to handle can change next.
+
+        :return: time in seconds or None if no rule changes without a new sensor alert
+        """
+        if self._alertLevelsWithNewSensorAlerts:
+            return 0.0
+
+        nextDeadline = self._timerWheel.next_deadline()
+        if nextDeadline is None:
+            return None
+
+        return max(0.0, nextDeadline - time.time())
@@ -0,0 +1,107 @@
+#!/usr/bin/python3
+
+# written by sqall
+# twitter: https://twitter.com/sqall01
+# blog: https://h4des.org
+# github: https://github.com/sqall01
+#
+# Licensed under the GNU Affero General Public License, version 3.
+
+import math
+from typing import Any, Dict, List, Optional, Set
+
+
+# This class is a hashed timer wheel with a resolution of one second. Each key
+# has at most one deadline (scheduling a key again replaces its deadline). Keys
+# with deadlines further away than the wheel size are stored in the same slots
+# and skipped until their round is reached.
+class TimerWheel:
+
+    def __init__(self,
+                 current_time: float,
+                 slot_count: int = 512):
+
+        self._slot_count = slot_count
+        self._slots = [set() for _ in range(slot_count)]  # type: List[Set[Any]]
+
+        # Deadline (tick) of each scheduled key.
+        self._deadlines = dict()  # type: Dict[Any, int]
+
+        # All ticks before the current tick are already processed.
+        self._current_tick = int(current_time)
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def schedule(self,
+                 key: Any,
+                 deadline: float):
+        """
+        Schedules the given key for the given deadline (replaces an already scheduled deadline of the key).
+
+        :param key:
+        :param deadline: utc timestamp
+        """
+        self.cancel(key)
+
+        # Deadlines in the past expire with the next processed tick.
+        tick = max(int(math.ceil(deadline)), self._current_tick)
+        self._deadlines[key] = tick
+        self._slots[tick % self._slot_count].add(key)
+
+    def cancel(self,
+               key: Any):
+        """
+        Removes the deadline of the given key (if it is scheduled).
+
+        :param key:
+        """
+        tick = self._deadlines.pop(key, None)
+        if tick is not None:
+            self._slots[tick % self._slot_count].discard(key)
+
+    def pop_expired(self,
+                    current_time: float) -> List[Any]:
+        """
+        Removes and returns all keys which deadline has been reached.
+
+        :param current_time: utc timestamp
+        :return:
+        """
+        now_tick = int(current_time)
+        if now_tick < self._current_tick:
+            return list()
+
+        expired = list()
+        if (now_tick - self._current_tick) >= self._slot_count:
+            expired = [key for key, tick in self._deadlines.items() if tick <= now_tick]
+
+        else:
+            for tick in range(self._current_tick, now_tick + 1):
+                for key in self._slots[tick % self._slot_count]:
+                    if self._deadlines[key] <= now_tick:
+                        expired.append(key)
+
+        for key in expired:
+            self.cancel(key)
+
+        self._current_tick = now_tick + 1
+
+        return expired
+
+    def next_deadline(self) -> Optional[int]:
+        """
+        Gets the earliest scheduled deadline.
+
+        :return: utc timestamp or None if no key is scheduled
+        """
+        if not self._deadlines:
+            return None
+
+        for tick in range(self._current_tick, self._current_tick + self._slot_count):
+            for key in self._slots[tick % self._slot_count]:
+                if self._deadlines[key] == tick:
+                    return tick
+
+        # All deadlines are at least one round away.
+        return min(self._deadlines.values())
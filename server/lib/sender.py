@@ -0,0 +1,519 @@
+#!/usr/bin/python3
+
+# written by sqall
+# twitter: https://twitter.com/sqall01
+# blog: https://h4des.org
+# github: https://github.com/sqall01
+#
+# Licensed under the GNU Affero General Public License, version 3.
+
+import threading
+import os
+import time
+import queue
+import heapq
+from typing import Any, Dict, List, Optional
+from .server import ClientCommunication
+from .localObjects import SensorAlert
+from .globalData import GlobalData
+
+
+class OutboundMessageType:
+    MANAGER_UPDATE = 0
+    MANAGER_STATE_CHANGE = 1
+    SENSOR_ALERT = 2
+    ALERT_SENSOR_ALERTS_OFF = 3
+
+
+# This class describes a message that is queued to be sent to a client.
+class OutboundMessage:
+
+    def __init__(self,
+                 message_type: int):
+        self.message_type = message_type
+        self.time_queued = time.time()
+
+        # Used for sensor alert messages.
+        self.sensor_alert = None  # type: Optional[SensorAlert]
+
+        # Used for state change messages.
+        self.sensor_id = None  # type: Optional[int]
+        self.state = None  # type: Optional[int]
+        self.data_type = None  # type: Optional[int]
+        self.data = None  # type: Any
+
+
+# This class is a worker thread of the sender pool that sends
+# the queued messages of the sessions.
+class SenderWorker(threading.Thread):
+
+    def __init__(self,
+                 sender_pool):
+        threading.Thread.__init__(self)
+        self._sender_pool = sender_pool
+
+    def run(self):
+        while True:
+            client_comm = self._sender_pool._ready_sessions.get()
+
+            # A None element signals that the worker should terminate.
+            if client_comm is None:
+                return
+
+            self._sender_pool._process_session(client_comm)
+
+
+# This class is a thread of the sender pool that hands sessions to the workers
+# after their batch flush window has passed.
+class SenderFlushTimer(threading.Thread):
+
+    def __init__(self,
+                 sender_pool):
+        threading.Thread.__init__(self)
+        self._sender_pool = sender_pool
+        self.exit_flag = False
+
+    def run(self):
+        sender_pool = self._sender_pool
+        while True:
+            with sender_pool._delayed_condition:
+                if self.exit_flag:
+                    return
+
+                if not sender_pool._delayed_sessions:
+                    sender_pool._delayed_condition.wait()
+                    continue
+
+                flush_time = sender_pool._delayed_sessions[0][0]
+                wait_time = flush_time - time.time()
+                if wait_time > 0:
+                    sender_pool._delayed_condition.wait(wait_time)
+                    continue
+
+                _, _, client_comm = heapq.heappop(sender_pool._delayed_sessions)
+
+            sender_pool._ready_sessions.put(client_comm)
+
+
+# This class sends messages to the clients via a per-session outbound queue that
+# is drained by a fixed number of worker threads (instead of a thread per message).
+# Only one worker processes the queue of a session at a time which keeps
+# the messages of a session in order. Consecutive sensor alerts and state changes
+# for clients that support it are sent in one "batch" transaction.
+class SenderPool:
+
+    _batch_message_types = frozenset([OutboundMessageType.SENSOR_ALERT,
+                                      OutboundMessageType.MANAGER_STATE_CHANGE])
+
+    def __init__(self,
+                 global_data: GlobalData,
+                 worker_count: int,
+                 batch_flush_window: float = 0.0):
+
+        # file nme of this file (used for logging)
+        self.log_tag = os.path.basename(__file__)
+
+        self._global_data = global_data
+        self._logger = self._global_data.logger
+        self._worker_count = worker_count
+        self._workers = list()
+
+        # Maximum number of transactions a worker initiates with a session
+        # before it continues with the next session (for fairness).
+        self._max_messages_per_turn = 10
+
+        # Maximum number of messages that are sent in one batch transaction.
+        self._max_batch_size = 100
+
+        # Time in seconds messages for a client that supports batch messages are collected
+        # before they are sent in one transaction.
+        self._batch_flush_window = batch_flush_window
+
+        # Heap of sessions (flush time, sequence number, session) that are handed to the workers
+        # after their batch flush window has passed.
+        self._delayed_sessions = list()
+        self._delayed_condition = threading.Condition()
+        self._delayed_sequence = 0
+        self._flush_timer = None  # type: Optional[SenderFlushTimer]
+
+        # Queue of sessions that have messages queued and are not processed by a worker.
+        self._ready_sessions = queue.Queue()
+
+        # Lock that protects the outbound queues of the sessions and the statistics.
+        self._queue_lock = threading.Lock()
+
+        # Statistics of the sender pool.
+        self._queue_depth = 0
+        self._send_count = 0
+        self._send_failed_count = 0
+        self._send_latency_sum = 0.0
+        self._send_latency_max = 0.0
+
+        # Metrics of the sender pool (only collected if the metrics are activated).
+        metrics_registry = self._global_data.metricsRegistry
+        self._send_latency_metric = metrics_registry.histogram("alertr_sender_send_seconds",
+                                                               "Time from queueing a message until it was sent "
+                                                               + "to the client.",
+                                                               ("node_type", "username"))
+        metrics_registry.function("alertr_sender_queue_depth",
+                                  "Number of messages queued for the clients.",
+                                  lambda: self._queue_depth)
+        metrics_registry.function("alertr_sender_messages_total",
+                                  "Number of messages processed by the sender pool.",
+                                  lambda: self._send_count,
+                                  "counter")
+        metrics_registry.function("alertr_sender_failed_messages_total",
+                                  "Number of messages that could not be sent to the client.",
+                                  lambda: self._send_failed_count,
+                                  "counter")
+
+    def _queue_message(self,
+                       client_comm: ClientCommunication,
+                       message: OutboundMessage):
+        """
+        Internal function that adds the message to the outbound queue of the session and schedules
+        the session for a worker if necessary.
+
+        :param client_comm:
+        :param message:
+        """
+        with self._queue_lock:
+
+            # Sending to the client already failed and its connection is closed => drop the message.
+            if client_comm.outboundFailed:
+                self._send_count += 1
+                self._send_failed_count += 1
+                return
+
+            # A full status update contains all state changes that are not yet sent
+            # => remove them and only keep one status update in the queue.
+            if message.message_type == OutboundMessageType.MANAGER_UPDATE:
+                old_length = len(client_comm.outboundQueue)
+                for queued_message in list(client_comm.outboundQueue):
+                    if queued_message.message_type in [OutboundMessageType.MANAGER_UPDATE,
+                                                       OutboundMessageType.MANAGER_STATE_CHANGE]:
+                        client_comm.outboundQueue.remove(queued_message)
+                self._queue_depth -= old_length - len(client_comm.outboundQueue)
+
+            client_comm.outboundQueue.append(message)
+            self._queue_depth += 1
+
+            if client_comm.outboundScheduled:
+                return
+            client_comm.outboundScheduled = True
+
+        # An idle session gets the message immediately. Only if a transaction was sent to the client
+        # within the batch flush window (a burst of messages is in progress) further messages get the chance
+        # to be sent in the same batch transaction.
+        flush_time = client_comm.outboundLastSent + self._batch_flush_window
+        if (self._batch_flush_window > 0.0
+                and client_comm.supportsBatch
+                and message.message_type in self._batch_message_types
+                and flush_time > message.time_queued):
+            with self._delayed_condition:
+                self._delayed_sequence += 1
+                heapq.heappush(self._delayed_sessions, (flush_time,
+                                                        self._delayed_sequence,
+                                                        client_comm))
+                self._delayed_condition.notify()
+            return
+
+        self._ready_sessions.put(client_comm)
+
+    def _process_session(self,
+                         client_comm: ClientCommunication):
+        """
+        Internal function that sends the queued messages of a session.
+
+        :param client_comm:
+        """
+        for _ in range(self._max_messages_per_turn):
+            with self._queue_lock:
+                if not client_comm.outboundQueue:
+                    client_comm.outboundScheduled = False
+                    return
+                messages = [client_comm.outboundQueue.popleft()]
+
+                # Collect all following messages that can be sent in the same batch transaction.
+                if client_comm.supportsBatch and messages[0].message_type in self._batch_message_types:
+                    while (client_comm.outboundQueue
+                           and len(messages) < self._max_batch_size
+                           and client_comm.outboundQueue[0].message_type in self._batch_message_types):
+                        messages.append(client_comm.outboundQueue.popleft())
+                self._queue_depth -= len(messages)
+
+            if len(messages) > 1:
+                result = self._send_batch(client_comm, messages)
+            else:
+                result = self._send_message(client_comm, messages[0])
+
+            time_sent = time.time()
+            client_comm.outboundLastSent = time_sent
+            with self._queue_lock:
+                for message in messages:
+                    send_latency = time_sent - message.time_queued
+                    self._send_count += 1
+                    if not result:
+                        self._send_failed_count += 1
+                    self._send_latency_sum += send_latency
+                    self._send_latency_max = max(self._send_latency_max, send_latency)
+
+            if self._send_latency_metric.enabled:
+                session_metric = self._send_latency_metric.labels(client_comm.nodeType, client_comm.username)
+                for message in messages:
+                    session_metric.observe(time_sent - message.time_queued)
+
+            if not result:
+                self._fail_session(client_comm)
+                return
+
+        # Messages are still queued for this session => let other sessions be processed first.
+        self._ready_sessions.put(client_comm)
+
+    def _fail_session(self,
+                      client_comm: ClientCommunication):
+        """
+        Internal function that drops all queued messages of a session a message could not be sent to
+        and closes its connection (the state of the transaction is unknown and further messages
+        would block a worker until they time out as well).
+
+        :param client_comm:
+        """
+        with self._queue_lock:
+            client_comm.outboundFailed = True
+            client_comm.outboundScheduled = False
+            dropped_count = len(client_comm.outboundQueue)
+            client_comm.outboundQueue.clear()
+            self._queue_depth -= dropped_count
+            self._send_count += dropped_count
+            self._send_failed_count += dropped_count
+
+        self._logger.error("[%s]: Closing connection to client after failed send (%d queued messages dropped) "
+                           % (self.log_tag, dropped_count)
+                           + "(%s:%d)." % (client_comm.clientAddress, client_comm.clientPort))
+
+        server_session = client_comm.serverSession
+        if server_session is not None:
+            try:
+                server_session.closeConnection()
+
+            except Exception as e:
+                self._logger.exception("[%s]: Closing connection to client failed (%s:%d)."
+                                       % (self.log_tag, client_comm.clientAddress, client_comm.clientPort))
+
+    def _send_batch(self,
+                    client_comm: ClientCommunication,
+                    messages: List[OutboundMessage]) -> bool:
+        """
+        Internal function that sends the given sensor alerts and state changes in one batch transaction.
+
+        :param client_comm:
+        :param messages:
+        :return: success or failure
+        """
+        batch_items = list()
+        for message in messages:
+            if message.message_type == OutboundMessageType.SENSOR_ALERT:
+                batch_items.append(message.sensor_alert)
+
+            else:
+                batch_items.append((message.sensor_id, message.state, message.data_type, message.data))
+
+        try:
+            if not client_comm.sendBatch(batch_items):
+                self._logger.error("[%s]: Sending batch of %d messages failed (%s:%d)."
+                                   % (self.log_tag, len(batch_items), client_comm.clientAddress,
+                                      client_comm.clientPort))
+                return False
+
+        except Exception as e:
+            self._logger.exception("[%s]: Sending batch to client failed (%s:%d)."
+                                   % (self.log_tag, client_comm.clientAddress, client_comm.clientPort))
+            return False
+
+        return True
+
+    def _send_message(self,
+                      client_comm: ClientCommunication,
+                      message: OutboundMessage) -> bool:
+        """
+        Internal function that sends the given message to the client.
+
+        :param client_comm:
+        :param message:
+        :return: success or failure
+        """
+        try:
+            if message.message_type == OutboundMessageType.MANAGER_UPDATE:
+                if client_comm.nodeType != "manager":
+                    self._logger.error("[%s]: Sending status update to manager failed. Client is not a "
+                                       % self.log_tag
+                                       + "'manager' node (%s:%d)."
+                                       % (client_comm.clientAddress, client_comm.clientPort))
+                    return False
+
+                if not client_comm.sendManagerUpdate():
+                    self._logger.error("[%s]: Sending status update to manager failed (%s:%d)."
+                                       % (self.log_tag, client_comm.clientAddress, client_comm.clientPort))
+                    return False
+
+            elif message.message_type == OutboundMessageType.SENSOR_ALERT:
+                if client_comm.nodeType != "manager" and client_comm.nodeType != "alert":
+                    self._logger.error("[%s]: Sending sensor alert failed. Client is not a 'manager'/'alert' "
+                                       % self.log_tag
+                                       + "node (%s:%d)."
+                                       % (client_comm.clientAddress, client_comm.clientPort))
+                    return False
+
+                if not client_comm.sendSensorAlert(message.sensor_alert):
+                    self._logger.error("[%s]: Sending sensor alert to manager/alert failed (%s:%d)."
+                                       % (self.log_tag, client_comm.clientAddress, client_comm.clientPort))
+                    return False
+
+            elif message.message_type == OutboundMessageType.MANAGER_STATE_CHANGE:
+                if client_comm.nodeType != "manager":
+                    self._logger.error("[%s]: Sending state change to manager failed. Client is not a "
+                                       % self.log_tag
+                                       + "'manager' node (%s:%d)."
+                                       % (client_comm.clientAddress, client_comm.clientPort))
+                    return False
+
+                if not client_comm.sendManagerStateChange(message.sensor_id,
+                                                          message.state,
+                                                          message.data_type,
+                                                          message.data):
+                    self._logger.error("[%s]: Sending state change to manager failed (%s:%d)."
+                                       % (self.log_tag, client_comm.clientAddress, client_comm.clientPort))
+                    return False
+
+            elif message.message_type == OutboundMessageType.ALERT_SENSOR_ALERTS_OFF:
+                if client_comm.nodeType != "alert":
+                    self._logger.error("[%s]: Sending sensor alert off to alert failed. Client is not an "
+                                       % self.log_tag
+                                       + "'alert' node (%s:%d)."
+                                       % (client_comm.clientAddress, client_comm.clientPort))
+                    return False
+
+                if not client_comm.sendAlertSensorAlertsOff():
+                    self._logger.error("[%s]: Sending sensor alert off to alert client failed (%s:%d)."
+                                       % (self.log_tag, client_comm.clientAddress, client_comm.clientPort))
+                    return False
+
+        except Exception as e:
+            self._logger.exception("[%s]: Sending message to client failed (%s:%d)."
+                                   % (self.log_tag, client_comm.clientAddress, client_comm.clientPort))
+            return False
+
+        return True
+
+    def start(self):
+        """
+        Starts the worker threads of the sender pool.
+        """
+        for _ in range(self._worker_count):
+            worker = SenderWorker(self)
+            # set thread to daemon
+            # => threads terminates when main thread terminates
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+        if self._batch_flush_window > 0.0:
+            self._flush_timer = SenderFlushTimer(self)
+            # set thread to daemon
+            # => threads terminates when main thread terminates
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def exit(self):
+        """
+        Signals all worker threads to terminate.
+        """
+        if self._flush_timer is not None:
+            with self._delayed_condition:
+                self._flush_timer.exit_flag = True
+                self._delayed_condition.notify()
+
+        for _ in self._workers:
+            self._ready_sessions.put(None)
+
+    def queue_manager_update(self,
+                             client_comm: ClientCommunication):
+        """
+        Queues a full status update for a manager client.
+
+        :param client_comm:
+        """
+        self._queue_message(client_comm, OutboundMessage(OutboundMessageType.MANAGER_UPDATE))
+
+    def queue_manager_state_change(self,
+                                   client_comm: ClientCommunication,
+                                   sensor_id: int,
+                                   state: int,
+                                   data_type: int,
+                                   data: Any):
+        """
+        Queues a state change for a manager client.
+
+        :param client_comm:
+        :param sensor_id:
+        :param state:
+        :param data_type:
+        :param data:
+        """
+        message = OutboundMessage(OutboundMessageType.MANAGER_STATE_CHANGE)
+        message.sensor_id = sensor_id
+        message.state = state
+        message.data_type = data_type
+        message.data = data
+        self._queue_message(client_comm, message)
+
+    def queue_sensor_alert(self,
+                           client_comm: ClientCommunication,
+                           sensor_alert: SensorAlert):
+        """
+        Queues a sensor alert for an alert/manager client.
+
+        :param client_comm:
+        :param sensor_alert:
+        """
+        message = OutboundMessage(OutboundMessageType.SENSOR_ALERT)
+        message.sensor_alert = sensor_alert
+        self._queue_message(client_comm, message)
+
+    def queue_alert_sensor_alerts_off(self,
+                                      client_comm: ClientCommunication):
+        """
+        Queues a sensor alerts off message for an alert client.
+
+        :param client_comm:
+        """
+        self._queue_message(client_comm, OutboundMessage(OutboundMessageType.ALERT_SENSOR_ALERTS_OFF))
+
+    def get_queue_depth(self) -> int:
+        """
+        Returns the number of messages that are queued over all sessions.
+
+        :return:
+        """
+        with self._queue_lock:
+            return self._queue_depth
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Returns the statistics of the sender pool (queue depth and send latency in seconds).
+
+        :return:
+        """
+        with self._queue_lock:
+            send_latency_avg = 0.0
+            if self._send_count > 0:
+                send_latency_avg = self._send_latency_sum / self._send_count
+
+            return {"workers": self._worker_count,
+                    "batch_flush_window": self._batch_flush_window,
+                    "queue_depth": self._queue_depth,
+                    "send_count": self._send_count,
+                    "send_failed_count": self._send_failed_count,
+                    "send_latency_avg": send_latency_avg,
+                    "send_latency_max": self._send_latency_max}
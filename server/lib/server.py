@@ -9,20 +9,35 @@
 
 import ssl
 import socket
+import asyncio
+import concurrent.futures
 import threading
 import socketserver
+import selectors
 import time
 import logging
 import os
 import random
 import json
+import collections
 from .localObjects import SensorDataType, Sensor, SensorData, SensorAlert
-from .internalSensors import AlertSystemActiveSensor
 from .globalData import GlobalData
-from typing import Optional, Dict, Tuple, Any, List, Type
+from typing import Optional, Dict, Tuple, Any, List, Type, Union
 
 BUFSIZE = 4096
 
+# Maximal number of bytes that are allocated in advance for a message
+# (the buffer grows up to the announced size if more data arrives).
+MAX_PREALLOC_SIZE = 1048576
+
+# Maximal number of RTS messages that are sent again when the client does not answer with
+# the matching CTS before the transaction initiation fails.
+MAX_RTS_RETRIES = 10
+
+# Maximal number of bytes the asyncio server buffers for a client that are not consumed yet
+# (reading from the connection pauses until a worker consumed the data).
+MAX_BRIDGE_BUFFER_SIZE = 1048576
+
 
 # this class handles the communication with the incoming client connection
 class ClientCommunication:
@@ -49,6 +64,8 @@ class ClientCommunication:
         self.asyncOptionExecutersLock = self.globalData.asyncOptionExecutersLock
         self.connectionWatchdog = self.globalData.connectionWatchdog
         self.serverSessions = self.globalData.serverSessions
+        self.alertSystemStateCache = self.globalData.alertSystemStateCache
+        self.sensorHistory = self.globalData.sensorHistory
 
         # Time the last message was received by the server. Since the 
         # connection counts as a message, set it to the current time
@@ -58,6 +75,9 @@ class ClientCommunication:
         # username that is used by the client to authorize itself
         self.username = None
 
+        # Server session that handles the connection of this client (set by the server session).
+        self.serverSession = None
+
         # Set of alert levels (integer) the client responds to
         # (in case of a sensor client, all alert levels the client triggers,
         # in case of an alert client, all alert levels the client handles,
@@ -79,6 +99,16 @@ class ClientCommunication:
         # Flag that indicates if this node is registered as persistent.
         self.persistent = 0
 
+        # Flag that indicates if the client supports receiving multiple
+        # messages in one "batch" transaction (negotiated during registration).
+        self.supportsBatch = False
+
+        # Flag that indicates if the (manager) client supports receiving only the changes of the
+        # alert system status (negotiated during registration) and the revision of the alert system status
+        # it has acknowledged last (None if it has to get a full status).
+        self.supportsStatusDelta = False
+        self.statusRevision = None  # type: Optional[int]
+
         # version and revision of client
         self.clientVersion = None
         self.clientRev = None
@@ -100,18 +130,44 @@ class ClientCommunication:
         # time the server is waiting on receives until a time out occurs
         self.serverReceiveTimeout = self.globalData.serverReceiveTimeout
 
-        # Flag that states if the server is already trying to initiate a
-        # transaction with the client.
-        self.transactionInitiation = False
+        # time the server is waiting for the CTS of a transaction it initiates
+        self.transactionTimeout = self.globalData.transactionTimeout
+
+        # Socket that wakes up the thread waiting for data of the client (set while the thread waits
+        # without holding the lock) and the id of this thread.
+        self.receiverWakeup = None  # type: Optional[socket.socket]
+        self.receiverThreadId = None  # type: Optional[int]
 
         # List of all sensors this client manages (is only used if the client
         # is of type "sensor").
         self.sensors = list()
 
+        # Queue of messages that are sent to the client by the sender pool
+        # and flag that states if the session is already scheduled for a sender worker.
+        self.outboundQueue = collections.deque()
+        self.outboundScheduled = False
+
+        # Time the sender pool sent the last transaction to the client (used to decide
+        # if further messages are collected for a batch transaction).
+        self.outboundLastSent = 0.0
+
+        # Flag that states if sending a message to the client failed (further messages are dropped
+        # and the connection is closed).
+        self.outboundFailed = False
+
         # Needed for logging.
         self.logger = self.globalData.logger
         self.loggerFileHandler = None
 
+        # Metrics of the transaction initiation (only collected if the metrics are activated).
+        metricsRegistry = self.globalData.metricsRegistry
+        self.transactionRetryMetric = metricsRegistry.counter("alertr_transaction_retries_total",
+                                                              "Number of RTS messages that were not acknowledged "
+                                                              + "by a CTS and were sent again.")
+        self.transactionInitiationMetric = metricsRegistry.histogram("alertr_transaction_initiation_seconds",
+                                                                     "Time needed to initiate a transaction "
+                                                                     + "with a client (RTS/CTS).")
+
     def _acquireLock(self):
         """
         internal function that acquires the lock
@@ -126,6 +182,34 @@ class ClientCommunication:
         self.logger.debug("[%s]: Release lock (%s:%d)." % (self.fileName, self.clientAddress, self.clientPort))
         self.connectionLock.release()
 
+        # Data of the client could have been buffered by the ssl socket while another thread
+        # communicated with the client => let the receiving thread check it.
+        if self.receiverThreadId != threading.get_ident():
+            self.wakeUpReceiver()
+
+    def _hasPendingData(self,
+                        selector: selectors.BaseSelector) -> bool:
+        """
+        Internal function that checks if data of the client can be received without blocking
+        (has to be called while holding the lock).
+
+        :param selector: selector with the socket of the client registered
+        :return:
+        """
+        try:
+            # A closed socket has to be handled by the receive function.
+            if self.sslSocket.fileno() == -1 or self.sslSocket.pending() > 0:
+                return True
+
+            for key, _ in selector.select(timeout=0):
+                if key.fileobj is self.sslSocket:
+                    return True
+
+        except Exception as e:
+            return True
+
+        return False
+
     def _send(self, data: str):
         """
         Wrapper around socket send to handle bytes/string encoding.
@@ -142,6 +226,54 @@ class ClientCommunication:
         """
         return self.sslSocket.recv(BUFSIZE).decode("ascii")
 
+    def _recvMessage(self,
+                     messageSize: int) -> Optional[str]:
+        """
+        Receives a message of the size announced by the RTS message. The data is received
+        directly into one buffer and decoded once when the message is complete.
+
+        :param messageSize: size of the message in bytes
+        :return: received message or None if the connection was closed before the message was complete
+        """
+        buffer = bytearray(max(0, min(messageSize, MAX_PREALLOC_SIZE)))
+        received = 0
+        while received < messageSize:
+
+            # Grow the buffer (doubles its size up to the announced size of the message).
+            if received == len(buffer):
+                buffer.extend(bytes(min(len(buffer), messageSize - len(buffer))))
+
+            with memoryview(buffer) as view:
+                with view[received:] as chunkView:
+                    count = self.sslSocket.recv_into(chunkView)
+
+            # Connection was closed before the complete message was received.
+            if count == 0:
+                return None
+
+            received += count
+
+        return buffer.decode("ascii")
+
+    def _addSensorHistory(self,
+                          sensors: List[Sensor]):
+        """
+        Internal function that adds the current data of the given sensors to the history of the sensor data
+        (if activated).
+
+        :param sensors:
+        """
+        if self.sensorHistory is None:
+            return
+
+        try:
+            for sensor in sensors:
+                self.sensorHistory.add_data(sensor.sensorId, sensor.dataType, sensor.data)
+
+        except Exception as e:
+            self.logger.exception("[%s]: Not able to add sensor data to history (%s:%d)."
+                                  % (self.fileName, self.clientAddress, self.clientPort))
+
     def _checkMsgAlertDelay(self,
                             alertDelay: int,
                             messageType: str) -> bool:
@@ -975,6 +1107,10 @@ class ClientCommunication:
         # the client is finished as false
         self.clientInitialized = False
 
+        # remove client from the indexes of initialized clients
+        # (no recipient of sensor alerts and manager updates anymore)
+        self.serverSessions.remove_client(self.serverSession)
+
         # wake up manager update executer
         self.managerUpdateExecuter.forceStatusUpdate = True
         self.managerUpdateExecuter.managerUpdateEvent.set()
@@ -985,52 +1121,26 @@ class ClientCommunication:
                              acquireLock: bool = False) -> bool:
         """
         this internal function that tries to initiate a transaction with the client
-        (and acquires a lock if it is told to do so)
+        (and acquires a lock if it is told to do so). The lock is held until the transaction
+        is initiated, so only one thread at a time communicates with the client.
 
         :param messageType:
         :param messageSize:
         :param acquireLock:
         :return:
         """
-        # try to get the exclusive state to be allowed to initiate a
-        # transaction with the client
-        while True:
-
-            # check if locks should be handled or not
-            if acquireLock:
-                self._acquireLock()
-
-            # check if another thread is already trying to initiate a
-            # transaction with the client
-            if self.transactionInitiation:
-
-                self.logger.warning("[%s]: Transaction initiation "
-                                % self.fileName
-                                + "already tried by another thread. Backing off.")
+        startTime = time.perf_counter() if self.transactionInitiationMetric.enabled else None
 
-                # check if locks should be handled or not
-                if acquireLock:
-                    self._releaseLock()
-
-                # wait 0.5 seconds before trying again to initiate a
-                # transaction with the client
-                time.sleep(0.5)
-                continue
-
-            # if transaction flag is not set
-            # => start to initiate transaction with client
-            else:
-                self.logger.debug("[%s]: Got exclusive transaction initiation state (%s:%d)."
-                                  % (self.fileName, self.clientAddress, self.clientPort))
+        # check if locks should be handled or not
+        if acquireLock:
+            self._acquireLock()
 
-                # set transaction initiation flag to true
-                # to signal other threads that a transaction is already
-                # tried to initiate
-                self.transactionInitiation = True
-                break
+        self.logger.debug("[%s]: Got exclusive transaction initiation state (%s:%d)."
+                          % (self.fileName, self.clientAddress, self.clientPort))
 
         # now we are in a exclusive state to initiate a transaction with
         # the client
+        retries = 0
         while True:
 
             # generate a random "unique" transaction id
@@ -1054,10 +1164,6 @@ class ClientCommunication:
                 self.logger.exception("[%s]: Sending RTS failed (%s:%d)."
                                       % (self.fileName, self.clientAddress, self.clientPort))
 
-                # set transaction initiation flag as false so other
-                # threads can try to initiate a transaction with the client
-                self.transactionInitiation = False
-
                 # check if locks should be handled or not
                 if acquireLock:
                     self._releaseLock()
@@ -1071,7 +1177,12 @@ class ClientCommunication:
             receivedMessageType = ""
             receivedPayloadType = ""
             try:
-                data = self._recv()
+                self.sslSocket.settimeout(self.transactionTimeout)
+                try:
+                    data = self._recv()
+
+                finally:
+                    self.sslSocket.settimeout(self.serverReceiveTimeout)
                 message = json.loads(data)
 
                 # check if an error was received
@@ -1090,10 +1201,6 @@ class ClientCommunication:
                 self.logger.exception("[%s]: Receiving CTS failed (%s:%d)."
                                       % (self.fileName, self.clientAddress, self.clientPort))
 
-                # set transaction initiation flag as false so other
-                # threads can try to initiate a transaction with the client
-                self.transactionInitiation = False
-
                 # check if locks should be handled or not
                 if acquireLock:
                     self._releaseLock()
@@ -1109,36 +1216,38 @@ class ClientCommunication:
                 self.logger.debug("[%s]: Initiate transaction succeeded (%s:%d)."
                                   % (self.fileName, self.clientAddress, self.clientPort))
 
-                # set transaction initiation flag as false so other
-                # threads can try to initiate a transaction with the client
-                self.transactionInitiation = False
+                if startTime is not None:
+                    self.transactionInitiationMetric.observe(time.perf_counter() - startTime)
                 break
 
-            # if RTS was not acknowledged
-            # => release lock and backoff for a random time then retry again
+            # if RTS was not acknowledged (i.e., the client tried to initiate a transaction at the same time)
+            # => send a new RTS right away (the client backs off before it tries again and
+            # answers the RTS in the meantime)
             else:
 
-                self.logger.warning("[%s]: Initiate transaction failed. Backing off (%s:%d)."
-                                    % (self.fileName, self.clientAddress, self.clientPort))
+                # Give up if the client does not stick to the protocol (the lock would be held forever).
+                if retries >= MAX_RTS_RETRIES:
+                    self.logger.error("[%s]: Initiate transaction failed %d times. Giving up (%s:%d)."
+                                      % (self.fileName, retries + 1, self.clientAddress, self.clientPort))
 
-                # check if locks should be handled or not
-                if acquireLock:
-                    self._releaseLock()
+                    # check if locks should be handled or not
+                    if acquireLock:
+                        self._releaseLock()
+
+                    return False
 
-                # backoff random time between 0 and 0.5 second
-                backoffTime = float(random.randint(0, 50)) / 100
-                time.sleep(backoffTime)
+                retries += 1
+                self.logger.warning("[%s]: Initiate transaction failed. Retrying (%s:%d)."
+                                    % (self.fileName, self.clientAddress, self.clientPort))
 
-                # check if locks should be handled or not
-                if acquireLock:
-                    self._acquireLock()
+                self.transactionRetryMetric.inc()
 
         return True
 
-    def _buildSensorAlertMessage(self,
-                                 sensorAlert: SensorAlert) -> str:
+    def _buildSensorAlertPayload(self,
+                                 sensorAlert: SensorAlert) -> Dict[str, Any]:
         """
-        Internal function that builds the sensor alert message.
+        Internal function that builds the payload of the sensor alert message.
 
         :param sensorAlert:
         :return:
@@ -1189,10 +1298,20 @@ class ClientCommunication:
                            "data": sensorAlert.sensorData
                            }
 
+        return payload
+
+    def _buildSensorAlertMessage(self,
+                                 sensorAlert: SensorAlert) -> str:
+        """
+        Internal function that builds the sensor alert message.
+
+        :param sensorAlert:
+        :return:
+        """
         utcTimestamp = int(time.time())
         message = {"serverTime": utcTimestamp,
                    "message": "sensoralert",
-                   "payload": payload}
+                   "payload": self._buildSensorAlertPayload(sensorAlert)}
         return json.dumps(message)
 
     def _buildSensorAlertsOffMessage(self) -> str:
@@ -1209,13 +1328,13 @@ class ClientCommunication:
 
         return json.dumps(message)
 
-    def _buildStateChangeMessage(self,
+    def _buildStateChangePayload(self,
                                  sensorId: int,
                                  state: int,
                                  dataType: int,
-                                 data: Any) -> str:
+                                 data: Any) -> Dict[str, Any]:
         """
-        Internal function that builds the state change message.
+        Internal function that builds the payload of the state change message.
 
         :param sensorId:
         :param state:
@@ -1229,28 +1348,62 @@ class ClientCommunication:
                    "dataType": dataType}
         if dataType != SensorDataType.NONE:
             payload["data"] = data
+
+        return payload
+
+    def _buildStateChangeMessage(self,
+                                 sensorId: int,
+                                 state: int,
+                                 dataType: int,
+                                 data: Any) -> str:
+        """
+        Internal function that builds the state change message.
+
+        :param sensorId:
+        :param state:
+        :param dataType:
+        :param data:
+        :return:
+        """
         utcTimestamp = int(time.time())
         message = {"serverTime": utcTimestamp,
                    "message": "statechange",
+                   "payload": self._buildStateChangePayload(sensorId, state, dataType, data)}
+
+        return json.dumps(message)
+
+    def _buildBatchMessage(self,
+                           batchMessages: List[Tuple[str, Dict[str, Any]]]) -> str:
+        """
+        Internal function that builds the batch message which carries multiple messages in one transaction.
+
+        :param batchMessages: list of tuples (message type, payload)
+        :return:
+        """
+        messages = list()
+        for messageType, messagePayload in batchMessages:
+            messages.append({"message": messageType,
+                             "payload": messagePayload})
+
+        payload = {"type": "request",
+                   "messages": messages}
+        utcTimestamp = int(time.time())
+        message = {"serverTime": utcTimestamp,
+                   "message": "batch",
                    "payload": payload}
 
         return json.dumps(message)
 
-    def _buildAlertSystemStateMessage(self) -> Optional[str]:
+    def _buildAlertSystemStateMessage(self) -> Optional[Tuple[str, int]]:
         """
         Internal function that builds the alert system state message.
+        The payload is shared between all manager clients and only rebuilt if the alert system information
+        has changed.
 
-        :return:
+        :return: tuple of message and revision of the alert system state
         """
-        # Get a list from database of
-        # list[0] = list(option objects)
-        # list[1] = list(node objects)
-        # list[2] = list(sensor objects)
-        # list[3] = list(manager objects)
-        # list[4] = list(alert objects)
-        # or None
-        alertSystemInformation = self.storage.getAlertSystemInformation(logger=self.logger)
-        if alertSystemInformation is None:
+        status = self.alertSystemStateCache.get_status(logger=self.logger)
+        if status is None:
             self.logger.error("[%s]: Getting alert system information from database failed (%s:%d)."
                               % (self.fileName, self.clientAddress, self.clientPort))
 
@@ -1266,92 +1419,38 @@ class ClientCommunication:
                 pass
 
             return None
-        optionList = alertSystemInformation[0]
-        nodesList = alertSystemInformation[1]
-        sensorList = alertSystemInformation[2]
-        managerList = alertSystemInformation[3]
-        alertList = alertSystemInformation[4]
-
-        # Generating options list.
-        options = list()
-        for optionObj in optionList:
-            tempDict = {"type": optionObj.type,
-                        "value": optionObj.value}
-            options.append(tempDict)
-
-        # Generating nodes list.
-        nodes = list()
-        for nodeObj in nodesList:
-            tempDict = {"nodeId": nodeObj.id,
-                        "hostname": nodeObj.hostname,
-                        "username": nodeObj.username,
-                        "nodeType": nodeObj.nodeType,
-                        "instance": nodeObj.instance,
-                        "connected": nodeObj.connected,
-                        "version": nodeObj.version,
-                        "rev": nodeObj.rev,
-                        "persistent": nodeObj.persistent}
-
-            nodes.append(tempDict)
-
-        # Generating sensors list.
-        sensors = list()
-        for sensorObj in sensorList:
-            tempDict = {"sensorId": sensorObj.sensorId,
-                        "nodeId": sensorObj.nodeId,
-                        "remoteSensorId": sensorObj.remoteSensorId,
-                        "description": sensorObj.description,
-                        "state": sensorObj.state,
-                        "lastStateUpdated": sensorObj.lastStateUpdated,
-                        "alertDelay": sensorObj.alertDelay,
-                        "alertLevels": sensorObj.alertLevels,
-                        "dataType": sensorObj.dataType,
-                        "data": sensorObj.data}
-
-            sensors.append(tempDict)
-
-        # Generating managers list.
-        managers = list()
-        for managerObj in managerList:
-            tempDict = {"managerId": managerObj.managerId,
-                        "nodeId": managerObj.nodeId,
-                        "description": managerObj.description}
-            managers.append(tempDict)
-
-        # Generating alerts list.
-        alerts = list()
-        for alertObj in alertList:
-            tempDict = {"alertId": alertObj.alertId,
-                        "nodeId": alertObj.nodeId,
-                        "remoteAlertId": alertObj.remoteAlertId,
-                        "description": alertObj.description,
-                        "alertLevels": alertObj.alertLevels}
-            alerts.append(tempDict)
-
-        # Generating alertLevels list.
-        alertLevels = list()
-        for i in range(len(self.alertLevels)):
-            tempDict = {"alertLevel": self.alertLevels[i].level,
-                        "name": self.alertLevels[i].name,
-                        "triggerAlways": (1 if self.alertLevels[i].triggerAlways else 0),
-                        "rulesActivated": self.alertLevels[i].rulesActivated}
-            alertLevels.append(tempDict)
+
+        payloadJson, revision = status
 
         self.logger.debug("[%s]: Sending status message (%s:%d)." % (self.fileName, self.clientAddress, self.clientPort))
 
-        payload = {"type": "request",
-                   "options": options,
-                   "nodes": nodes,
-                   "sensors": sensors,
-                   "managers": managers,
-                   "alerts": alerts,
-                   "alertLevels": alertLevels}
+        # Embed the already serialized payload into the message.
         utcTimestamp = int(time.time())
-        message = {"serverTime": utcTimestamp,
-                   "message": "status",
-                   "payload": payload}
+        return ("{\"serverTime\": %d, \"message\": \"status\", \"payload\": %s}" % (utcTimestamp, payloadJson),
+                revision)
 
-        return json.dumps(message)
+    def _buildAlertSystemStateDeltaMessage(self,
+                                           fromRevision: int) -> Optional[Tuple[str, int]]:
+        """
+        Internal function that builds the alert system state message that only contains the changes since
+        the given revision.
+
+        :param fromRevision:
+        :return: tuple of message and revision of the alert system state or None if a full status has to be sent
+        """
+        delta = self.alertSystemStateCache.get_delta(fromRevision, logger=self.logger)
+        if delta is None:
+            return None
+
+        payloadJson, revision = delta
+
+        self.logger.debug("[%s]: Sending status changes since revision %d (%s:%d)."
+                          % (self.fileName, fromRevision, self.clientAddress, self.clientPort))
+
+        # Embed the already serialized payload into the message.
+        utcTimestamp = int(time.time())
+        return ("{\"serverTime\": %d, \"message\": \"status\", \"payload\": %s}" % (utcTimestamp, payloadJson),
+                revision)
 
     def _initializeCommunication(self) -> bool:
         """
@@ -1388,10 +1487,8 @@ class ClientCommunication:
         self.loggerFileHandler = fh
 
         # Set the logger instance also for the server session.
-        for serverSession in self.serverSessions:
-            if serverSession.clientComm == self:
-                serverSession.setLogger(self.logger)
-                break
+        if self.serverSession is not None:
+            self.serverSession.setLogger(self.logger)
 
     def _finalizeLogger(self):
         """
@@ -1573,31 +1670,25 @@ class ClientCommunication:
         self.logger.debug("[%s]: Received username and password for '%s' (%s:%d)."
                           % (self.fileName, self.username, self.clientAddress, self.clientPort))
 
-        # check if username is already in use
+        # check if username is already in use (and index it for this session otherwise)
         # => terminate connection
-        for serverSession in self.serverSessions:
-
-            # ignore THIS server session and not existing once
-            if serverSession.clientComm is None or serverSession.clientComm == self:
-                continue
+        if not self.serverSessions.add_username(self.serverSession, self.username):
 
-            if serverSession.clientComm.username == self.username:
-
-                self.logger.error("[%s]: Username '%s' already in use (%s:%d)."
-                                  % (self.fileName, self.username, self.clientAddress, self.clientPort))
+            self.logger.error("[%s]: Username '%s' already in use (%s:%d)."
+                              % (self.fileName, self.username, self.clientAddress, self.clientPort))
 
-                # send error message back
-                try:
-                    utcTimestamp = int(time.time())
-                    message = {"serverTime": utcTimestamp,
-                               "message": message["message"],
-                               "error": "username already in use"}
-                    self._send(json.dumps(message))
+            # send error message back
+            try:
+                utcTimestamp = int(time.time())
+                message = {"serverTime": utcTimestamp,
+                           "message": message["message"],
+                           "error": "username already in use"}
+                self._send(json.dumps(message))
 
-                except Exception as e:
-                    pass
+            except Exception as e:
+                pass
 
-                return False, 0
+            return False, 0
 
         # check if the given user credentials are valid
         if not self.userBackend.areUserCredentialsValid(self.username, password):
@@ -1646,22 +1737,13 @@ class ClientCommunication:
         """
         # get registration from client
         try:
-            data = ""
-            lastSize = 0
-            while len(data) < messageSize:
-                data += self._recv()
-
-                # Check if the size of the received data has changed.
-                # If not we detected a possible dead lock.
-                if lastSize != len(data):
-                    lastSize = len(data)
-
-                else:
-                    self.logger.error("[%s]: Possible dead lock detected while receiving data. Closing "
-                                      % self.fileName
-                                      + "connection to client (%s:%d)."
-                                      % (self.clientAddress, self.clientPort))
-                    return False
+            data = self._recvMessage(messageSize)
+            if data is None:
+                self.logger.error("[%s]: Possible dead lock detected while receiving data. Closing "
+                                  % self.fileName
+                                  + "connection to client (%s:%d)."
+                                  % (self.clientAddress, self.clientPort))
+                return False
 
             message = json.loads(data)
             # check if an error was received
@@ -1760,6 +1842,12 @@ class ClientCommunication:
             self.instance = message["payload"]["instance"]
             self.persistent = message["payload"]["persistent"]
 
+            # Optional capability of newer clients.
+            if "supportsBatch" in message["payload"].keys():
+                self.supportsBatch = (message["payload"]["supportsBatch"] is True)
+            if "supportsStatusDelta" in message["payload"].keys():
+                self.supportsStatusDelta = (message["payload"]["supportsStatusDelta"] is True)
+
         except Exception as e:
             self.logger.exception("[%s]: Registration message not valid (%s:%d)."
                                   % (self.fileName, self.clientAddress, self.clientPort))
@@ -2457,6 +2545,7 @@ class ClientCommunication:
         # Extract sensor data.
         # Generate a list of tuples with (remoteSensorId, sensorData).
         dataList = list()
+        dataSensors = list()
         try:
             for i in range(self.sensorCount):
                 remoteSensorId = sensors[i]["clientSensorId"]
@@ -2502,6 +2591,7 @@ class ClientCommunication:
                     sensor.data = sensors[i]["data"]
 
                 dataList.append((remoteSensorId, sensor.data))
+                dataSensors.append(sensor)
 
         except Exception as e:
             self.logger.exception("[%s]: Received sensor data invalid (%s:%d)."
@@ -2544,6 +2634,8 @@ class ClientCommunication:
 
                 return False
 
+            self._addSensorHistory(dataSensors)
+
         # send status response
         try:
             payload = {"type": "response",
@@ -2756,6 +2848,8 @@ class ClientCommunication:
 
                 return False
 
+            self._addSensorHistory([sensor])
+
         if not self.storage.updateSensorTime(sensor.sensorId,
                                              logger=self.logger):
             self.logger.error("[%s]: Not able to update sensor time (%s:%d)."
@@ -2775,15 +2869,15 @@ class ClientCommunication:
             return False
 
         # add sensor alert to database
-        if not self.storage.addSensorAlert(self.nodeId,
-                                           sensor.sensorId,
-                                           state,
-                                           dataJson,
-                                           changeState,
-                                           hasLatestData,
-                                           sensorDataType,
-                                           sensorData,
-                                           logger=self.logger):
+        if not self.sensorAlertExecuter.add_sensor_alert(self.nodeId,
+                                                         sensor.sensorId,
+                                                         state,
+                                                         dataJson,
+                                                         changeState,
+                                                         hasLatestData,
+                                                         sensorDataType,
+                                                         sensorData,
+                                                         logger=self.logger):
             self.logger.error("[%s]: Not able to add sensor alert (%s:%d)."
                               % (self.fileName, self.clientAddress, self.clientPort))
 
@@ -2985,6 +3079,8 @@ class ClientCommunication:
 
                 return False
 
+            self._addSensorHistory([sensor])
+
         # get sensorId from database => append to state change queue
         # => wake up manager update executer
         sensorId = self.storage.getSensorId(self.nodeId,
@@ -3027,9 +3123,7 @@ class ClientCommunication:
         sensorDataObj.data = sensor.data
 
         # add state change to queue and wake up manager update executer
-        managerStateTuple = (sensor.sensorId, sensor.state, sensorDataObj)
-        self.managerUpdateExecuter.queueStateChange.append(managerStateTuple)
-        self.managerUpdateExecuter.managerUpdateEvent.set()
+        self.managerUpdateExecuter.addStateChange(sensor.sensorId, sensor.state, sensorDataObj)
 
         return True
 
@@ -3278,6 +3372,125 @@ class ClientCommunication:
 
         return True
 
+    def _sendBatch(self,
+                   batchMessage: str) -> bool:
+        """
+        internal function to send a batch of messages to an alert/manager client
+
+        :param batchMessage:
+        :return:
+        """
+        # Send batch message.
+        try:
+            self.logger.debug("[%s]: Sending batch message (%s:%d)."
+                              % (self.fileName, self.clientAddress, self.clientPort))
+            self._send(batchMessage)
+
+        except Exception as e:
+            self.logger.exception("[%s]: Sending batch failed (%s:%d)."
+                                  % (self.fileName, self.clientAddress, self.clientPort))
+            return False
+
+        # receive batch response message
+        try:
+            data = self._recv()
+            message = json.loads(data)
+            # check if an error was received
+            if "error" in message.keys():
+                self.logger.error("[%s]: Error received: '%s' (%s:%d)."
+                                  % (self.fileName, message["error"], self.clientAddress, self.clientPort))
+                return False
+
+            # check if the received message type is the correct one
+            if str(message["message"]).upper() != "BATCH":
+                self.logger.error("[%s]: batch message expected (%s:%d)."
+                                  % (self.fileName, self.clientAddress, self.clientPort))
+
+                # send error message back
+                try:
+                    utcTimestamp = int(time.time())
+                    message = {"serverTime": utcTimestamp,
+                               "message": message["message"],
+                               "error": "batch message expected"}
+                    self._send(json.dumps(message))
+
+                except Exception as e:
+                    pass
+
+                return False
+
+            # check if the received type is the correct one
+            if str(message["payload"]["type"]).upper() != "RESPONSE":
+                self.logger.error("[%s]: response expected (%s:%d)."
+                                  % (self.fileName, self.clientAddress, self.clientPort))
+
+                # send error message back
+                try:
+                    utcTimestamp = int(time.time())
+                    message = {"serverTime": utcTimestamp,
+                               "message": message["message"],
+                               "error": "response expected"}
+                    self._send(json.dumps(message))
+
+                except Exception as e:
+                    pass
+
+                return False
+
+            # check if batch message was correctly received
+            if str(message["payload"]["result"]).upper() != "OK":
+                self.logger.error("[%s]: Result not ok: '%s' (%s:%d)."
+                                  % (self.fileName, message["payload"]["result"], self.clientAddress, self.clientPort))
+                return False
+
+        except Exception as e:
+            self.logger.exception("[%s]: Receiving batch response failed (%s:%d)."
+                                  % (self.fileName, self.clientAddress, self.clientPort))
+            return False
+
+        self.lastRecv = int(time.time())
+
+        return True
+
+    def sendBatch(self,
+                  batchItems: List[Union[SensorAlert, Tuple[int, int, int, Any]]]) -> bool:
+        """
+        function that sends multiple sensor alerts and state changes in one transaction to a client
+        that supports batch messages
+
+        :param batchItems: list of sensor alerts and state change tuples (sensorId, state, dataType, data)
+        :return:
+        """
+        if not self.supportsBatch:
+            self.logger.error("[%s]: Client does not support batch messages (%s:%d)."
+                              % (self.fileName, self.clientAddress, self.clientPort))
+            return False
+
+        batchMessages = list()
+        for batchItem in batchItems:
+            if isinstance(batchItem, SensorAlert):
+                batchMessages.append(("sensoralert", self._buildSensorAlertPayload(batchItem)))
+
+            else:
+                sensorId, state, dataType, data = batchItem
+                batchMessages.append(("statechange", self._buildStateChangePayload(sensorId,
+                                                                                    state,
+                                                                                    dataType,
+                                                                                    data)))
+
+        batchMessage = self._buildBatchMessage(batchMessages)
+
+        # initiate transaction with client and acquire lock
+        if not self._initiateTransaction("batch",
+                                         len(batchMessage),
+                                         acquireLock=True):
+            return False
+
+        returnValue = self._sendBatch(batchMessage)
+
+        self._releaseLock()
+        return returnValue
+
     def sendManagerStateChange(self,
                                sensorId: int,
                                state: int,
@@ -3329,13 +3542,47 @@ class ClientCommunication:
 
     def sendManagerUpdate(self) -> bool:
         """
-        function that sends a full information update to a manager client
+        function that sends an information update to a manager client
+        (only the changes since the last acknowledged update if the client supports it)
 
         :return:
         """
-        alertSystemStateMessage = self._buildAlertSystemStateMessage()
-        if not alertSystemStateMessage:
-            return False
+        # Send only the changes if the client supports it and the changes since its
+        # last acknowledged revision are still available.
+        statusRevision = self.statusRevision
+        if self.supportsStatusDelta and statusRevision is not None:
+            alertSystemStateDelta = self._buildAlertSystemStateDeltaMessage(statusRevision)
+            if alertSystemStateDelta:
+                alertSystemStateMessage, revision = alertSystemStateDelta
+
+                # Client could have received another update in the meantime (checked before the
+                # transaction is initiated, since the client waits for the announced message after the CTS).
+                self._acquireLock()
+                if self.statusRevision == statusRevision:
+
+                    # initiate transaction with client (lock is already acquired)
+                    if not self._initiateTransaction("status",
+                                                     len(alertSystemStateMessage),
+                                                     acquireLock=False):
+                        self._releaseLock()
+                        return False
+
+                    if self._sendManagerAllInformation(alertSystemStateMessage):
+                        self.statusRevision = revision
+                        self._releaseLock()
+                        return True
+
+                    # Client was not able to apply the changes => resync with a full status.
+                    self.logger.error("[%s]: Status changes not acknowledged. Sending full status (%s:%d)."
+                                      % (self.fileName, self.clientAddress, self.clientPort))
+                    self.statusRevision = None
+
+                self._releaseLock()
+
+        alertSystemState = self._buildAlertSystemStateMessage()
+        if not alertSystemState:
+            return False
+        alertSystemStateMessage, revision = alertSystemState
 
         # initiate transaction with client and acquire lock
         if not self._initiateTransaction("status",
@@ -3344,6 +3591,8 @@ class ClientCommunication:
             return False
 
         returnValue = self._sendManagerAllInformation(alertSystemStateMessage)
+        if returnValue:
+            self.statusRevision = revision
 
         self._releaseLock()
         return returnValue
@@ -3443,14 +3692,13 @@ class ClientCommunication:
         self._releaseLock()
         return True
 
-    def handleCommunication(self):
+    def _initializeSession(self) -> bool:
         """
-        this function handles the communication with the client and receives the commands
+        Internal function that initializes the session with the client (authentication, version verification,
+        registration and initial status update). The connection lock has to be held by the caller.
 
-        :return:
+        :return: success or failure
         """
-        self._acquireLock()
-
         # set timeout of the socket to configured seconds
         self.sslSocket.settimeout(self.serverReceiveTimeout)
 
@@ -3459,8 +3707,7 @@ class ClientCommunication:
         if not self._initializeCommunication():
             self.logger.error("[%s]: Communication initialization failed (%s:%d)."
                               % (self.fileName, self.clientAddress, self.clientPort))
-            self._releaseLock()
-            return
+            return False
 
         # Now that the communication is initialized, we can switch to our
         # own logger instance for the client.
@@ -3482,38 +3729,35 @@ class ClientCommunication:
             if self.sensorCount is None:
                 self.logger.error("[%s]: Could not get node with id %d from database."
                                   % (self.fileName, self.nodeId))
-                self._releaseLock()
                 self._finalizeLogger()
-                return
+                return False
 
             if self.sensorCount == 0:
                 self.logger.error("[%s]: Getting sensor count failed (%s:%d)."
                                   % (self.fileName, self.clientAddress, self.clientPort))
-                self._releaseLock()
                 self._finalizeLogger()
-                return
+                return False
 
         # mark node as connected in the database
         if not self.storage.markNodeAsConnected(self.nodeId,
                                                 logger=self.logger):
             self.logger.error("[%s]: Not able to mark node as connected (%s:%d)."
                               % (self.fileName, self.clientAddress, self.clientPort))
-            self._releaseLock()
             self._finalizeLogger()
-            return
+            return False
 
         # check if the type of the node is manager
         # => send all current node information to the manager
         if self.nodeType == "manager":
-            alertSystemStateMessage = self._buildAlertSystemStateMessage()
-            if not alertSystemStateMessage:
+            alertSystemState = self._buildAlertSystemStateMessage()
+            if not alertSystemState:
                 self.logger.error("[%s]: Not able to build status update message (%s:%d)."
                                   % (self.fileName, self.clientAddress, self.clientPort))
                 # clean up session before exiting
                 self._cleanUpSessionForClosing()
-                self._releaseLock()
                 self._finalizeLogger()
-                return
+                return False
+            alertSystemStateMessage, revision = alertSystemState
 
             if not self._initiateTransaction("status",
                                              len(alertSystemStateMessage),
@@ -3522,18 +3766,17 @@ class ClientCommunication:
                                   % (self.fileName, self.clientAddress, self.clientPort))
                 # clean up session before exiting
                 self._cleanUpSessionForClosing()
-                self._releaseLock()
                 self._finalizeLogger()
-                return
+                return False
 
             if not self._sendManagerAllInformation(alertSystemStateMessage):
                 self.logger.error("[%s]: Not able send status update message (%s:%d)."
                                   % (self.fileName, self.clientAddress, self.clientPort))
                 # clean up session before exiting
                 self._cleanUpSessionForClosing()
-                self._releaseLock()
                 self._finalizeLogger()
-                return
+                return False
+            self.statusRevision = revision
 
         # if node is no manager
         # => send full status update to all manager clients
@@ -3545,282 +3788,309 @@ class ClientCommunication:
         # Set flag that the initialization process of the client is finished.
         self.clientInitialized = True
 
+        # Add client to the indexes of initialized clients
+        # (recipient of sensor alerts for the alert levels it handles and of manager updates).
+        self.serverSessions.add_client(self.serverSession)
+
         # If client has registered itself,
         # notify the connection watchdog about the reconnect.
         # NOTE: We do not care if the client is set as "persistent"
         # because it could changed its configuration since the last time seen.
         self.connectionWatchdog.removeNodeTimeout(self.nodeId)
 
-        # handle commands
-        while True:
-            messageSize = 0
-            try:
-                # set timeout of the socket to 0.5 seconds
-                self.sslSocket.settimeout(0.5)
+        return True
 
-                data = self._recv()
-                if not data:
+    def _handleIncomingTransaction(self,
+                                   data: str) -> bool:
+        """
+        Internal function that handles a transaction initiated by the client. The given data is the first
+        received chunk which has to contain the RTS message. The connection lock has to be held by the caller.
+        On failure, the caller has to clean up the session.
 
-                    # clean up session before exiting
-                    self._cleanUpSessionForClosing()
-                    self._releaseLock()
-                    self._finalizeLogger()
-                    return
+        :param data: received RTS message
+        :return: success or failure
+        """
+        messageSize = 0
+        try:
+            data = data.strip()
+            message = json.loads(data)
+            # check if an error was received
+            if "error" in message.keys():
+                self.logger.error("[%s]: Error received: '%s' (%s:%d)."
+                                  % (self.fileName, message["error"], self.clientAddress, self.clientPort))
+                return False
+
+            # check if RTS was received
+            # => acknowledge it
+            if str(message["payload"]["type"]).upper() == "rts".upper():
+                receivedTransactionId = int(message["payload"]["id"])
+                messageSize = int(message["size"])
+
+                # received RTS (request to send) message
+                self.logger.debug("[%s]: Received RTS %d message (%s:%d)."
+                                  % (self.fileName, receivedTransactionId, self.clientAddress, self.clientPort))
+                self.logger.debug("[%s]: Sending CTS %d message (%s:%d)."
+                                  % (self.fileName, receivedTransactionId, self.clientAddress, self.clientPort))
+
+                # send CTS (clear to send) message
+                payload = {"type": "cts",
+                           "id": receivedTransactionId}
+                utcTimestamp = int(time.time())
+                message = {"serverTime": utcTimestamp,
+                           "message": str(message["message"]),
+                           "payload": payload}
+                self._send(json.dumps(message))
 
-                # change timeout of the socket back to configured seconds
-                self.sslSocket.settimeout(self.serverReceiveTimeout)
+                # After initiating transaction receive actual command.
+                data = self._recvMessage(messageSize)
+                if data is None:
+                    self.logger.error("[%s]: Possible dead lock detected while receiving data. Closing "
+                                      % self.fileName
+                                      + "connection to client (%s:%d)."
+                                      % (self.clientAddress, self.clientPort))
+                    return False
 
-                data = data.strip()
-                message = json.loads(data)
-                # check if an error was received
-                if "error" in message.keys():
-                    self.logger.error("[%s]: Error received: '%s' (%s:%d)."
-                                      % (self.fileName, message["error"], self.clientAddress, self.clientPort))
-                    # clean up session before exiting
-                    self._cleanUpSessionForClosing()
-                    self._releaseLock()
-                    self._finalizeLogger()
-                    return
+            # if no RTS was received
+            # => client does not stick to protocol
+            # => terminate session
+            else:
+                self.logger.error("[%s]: Did not receive RTS. Client sent: '%s' (%s:%d)."
+                                  % (self.fileName, data, self.clientAddress, self.clientPort))
+                return False
 
-                # check if RTS was received
-                # => acknowledge it
-                if str(message["payload"]["type"]).upper() == "rts".upper():
-                    receivedTransactionId = int(message["payload"]["id"])
-                    messageSize = int(message["size"])
+        except Exception as e:
+            self.logger.exception("[%s]: Receiving failed (%s:%d)."
+                                  % (self.fileName, self.clientAddress, self.clientPort))
+            return False
 
-                    # received RTS (request to send) message
-                    self.logger.debug("[%s]: Received RTS %d message (%s:%d)."
-                                      % (self.fileName, receivedTransactionId, self.clientAddress, self.clientPort))
-                    self.logger.debug("[%s]: Sending CTS %d message (%s:%d)."
-                                      % (self.fileName, receivedTransactionId, self.clientAddress, self.clientPort))
+        # extract message type
+        try:
+            message = json.loads(data)
+            # check if an error was received
+            if "error" in message.keys():
+                self.logger.error("[%s]: Error received: '%s' (%s:%d)."
+                                  % (self.fileName, message["error"], self.clientAddress, self.clientPort))
+                return False
+
+            # check if the received type is the correct one
+            if str(message["payload"]["type"]).upper() != "REQUEST":
+                self.logger.error("[%s]: request expected (%s:%d)."
+                                  % (self.fileName, self.clientAddress, self.clientPort))
 
-                    # send CTS (clear to send) message
-                    payload = {"type": "cts",
-                               "id": receivedTransactionId}
+                # send error message back
+                try:
                     utcTimestamp = int(time.time())
                     message = {"serverTime": utcTimestamp,
-                               "message": str(message["message"]),
-                               "payload": payload}
+                               "message": message["message"],
+                               "error": "request expected"}
                     self._send(json.dumps(message))
 
-                    # After initiating transaction receive actual command.
-                    data = ""
-                    lastSize = 0
-                    while len(data) < messageSize:
-                        data += self._recv()
-
-                        # Check if the size of the received data has changed.
-                        # If not we detected a possible dead lock.
-                        if lastSize != len(data):
-                            lastSize = len(data)
-
-                        else:
-                            self.logger.error("[%s]: Possible dead lock detected while receiving data. Closing "
-                                              % self.fileName
-                                              + "connection to client (%s:%d)."
-                                              % (self.clientAddress, self.clientPort))
-                            # clean up session before exiting
-                            self._cleanUpSessionForClosing()
-                            self._releaseLock()
-                            self._finalizeLogger()
-                            return
-
-                # if no RTS was received
-                # => client does not stick to protocol
-                # => terminate session
-                else:
-                    self.logger.error("[%s]: Did not receive RTS. Client sent: '%s' (%s:%d)."
-                                      % (self.fileName, data, self.clientAddress, self.clientPort))
-                    # clean up session before exiting
-                    self._cleanUpSessionForClosing()
-                    self._releaseLock()
-                    self._finalizeLogger()
-                    return
+                except Exception as e:
+                    pass
 
-            except socket.timeout as e:
-                # change timeout of the socket back to configured seconds
-                # before releasing the lock
-                self.sslSocket.settimeout(self.serverReceiveTimeout)
-
-                # release lock and acquire to let other threads send
-                # data to the client
-                # (wait 0.5 seconds in between, because semaphore
-                # are released in random order => other threads could be
-                # unlucky and not be chosen => this has happened when
-                # loglevel was not debug => hdd I/O has slowed this process
-                # down)
-                self._releaseLock()
-                time.sleep(0.5)
-                self._acquireLock()
+                return False
 
-                # continue receiving
-                continue
+            # extract the command/message type of the message
+            command = str(message["message"]).upper()
 
-            except Exception as e:
-                self.logger.exception("[%s]: Receiving failed (%s:%d)."
-                                      % (self.fileName, self.clientAddress, self.clientPort))
+        except Exception as e:
+            self.logger.exception("[%s]: Received data not valid: '%s' (%s:%d)."
+                                  % (self.fileName, data, self.clientAddress, self.clientPort))
+            return False
 
-                # clean up session before exiting
-                self._cleanUpSessionForClosing()
-                self._releaseLock()
-                self._finalizeLogger()
-                return
+        # check if PING was received => send PONG back
+        if command == "PING":
+            self.logger.debug("[%s]: Received ping request (%s:%d)."
+                              % (self.fileName, self.clientAddress, self.clientPort))
+            self.logger.debug("[%s]: Sending ping response (%s:%d)."
+                              % (self.fileName, self.clientAddress, self.clientPort))
 
-            # extract message type
             try:
-                message = json.loads(data)
-                # check if an error was received
-                if "error" in message.keys():
-                    self.logger.error("[%s]: Error received: '%s' (%s:%d)."
-                                      % (self.fileName, message["error"], self.clientAddress, self.clientPort))
-
-                    # clean up session before exiting
-                    self._cleanUpSessionForClosing()
-                    self._releaseLock()
-                    self._finalizeLogger()
-                    return
+                payload = {"type": "response",
+                           "result": "ok"}
+                utcTimestamp = int(time.time())
+                message = {"serverTime": utcTimestamp,
+                           "message": "ping",
+                           "payload": payload}
+                self._send(json.dumps(message))
 
-                # check if the received type is the correct one
-                if str(message["payload"]["type"]).upper() != "REQUEST":
-                    self.logger.error("[%s]: request expected (%s:%d)."
+            except Exception as e:
+                self.logger.exception("[%s]: Sending ping response to client failed (%s:%d)."
                                       % (self.fileName, self.clientAddress, self.clientPort))
+                return False
 
-                    # send error message back
-                    try:
-                        utcTimestamp = int(time.time())
-                        message = {"serverTime": utcTimestamp,
-                                   "message": message["message"],
-                                   "error": "request expected"}
-                        self._send(json.dumps(message))
+        # check if SENSORALERT was received
+        # => add to database and wake up alertExecuter
+        elif command == "SENSORALERT" and self.nodeType == "sensor":
+            self.logger.debug("[%s]: Received sensor alert message (%s:%d)."
+                              % (self.fileName, self.clientAddress, self.clientPort))
 
-                    except Exception as e:
-                        pass
+            if not self._sensorAlertHandler(message):
+                self.logger.error("[%s]: Handling sensor alert failed (%s:%d)."
+                                  % (self.fileName, self.clientAddress, self.clientPort))
+                return False
 
-                    # clean up session before exiting
-                    self._cleanUpSessionForClosing()
-                    self._releaseLock()
-                    self._finalizeLogger()
-                    return
+        # check if STATECHANGE was received
+        # => change state of sensor in database
+        elif command == "STATECHANGE" and self.nodeType == "sensor":
+            self.logger.debug("[%s]: Received state change message (%s:%d)."
+                              % (self.fileName, self.clientAddress, self.clientPort))
 
-                # extract the command/message type of the message
-                command = str(message["message"]).upper()
+            if not self._stateChangeHandler(message):
+                self.logger.error("[%s]: Handling sensor state change failed (%s:%d)."
+                                  % (self.fileName, self.clientAddress, self.clientPort))
+                return False
 
-            except Exception as e:
-                self.logger.exception("[%s]: Received data not valid: '%s' (%s:%d)."
-                                      % (self.fileName, data, self.clientAddress, self.clientPort))
-                # clean up session before exiting
-                self._cleanUpSessionForClosing()
-                self._releaseLock()
-                self._finalizeLogger()
-                return
+        # check if STATUS was received
+        # => add new state to the database
+        elif command == "STATUS" and self.nodeType == "sensor":
+            self.logger.debug("[%s]: Received status message (%s:%d)."
+                              % (self.fileName, self.clientAddress, self.clientPort))
 
-            # check if PING was received => send PONG back
-            if command == "PING":
-                self.logger.debug("[%s]: Received ping request (%s:%d)."
+            if not self._statusHandler(message):
+                self.logger.error("[%s]: Handling status failed (%s:%d)."
                                   % (self.fileName, self.clientAddress, self.clientPort))
-                self.logger.debug("[%s]: Sending ping response (%s:%d)."
+                return False
+
+        # check if OPTION was received (for manager only)
+        # => change option in the database
+        elif command == "OPTION" and self.nodeType == "manager":
+            self.logger.debug("[%s]: Received option message (%s:%d)."
+                              % (self.fileName, self.clientAddress, self.clientPort))
+
+            if not self._optionHandler(message):
+                self.logger.error("[%s]: Handling option failed (%s:%d)."
                                   % (self.fileName, self.clientAddress, self.clientPort))
+                return False
 
-                try:
-                    payload = {"type": "response",
-                               "result": "ok"}
-                    utcTimestamp = int(time.time())
-                    message = {"serverTime": utcTimestamp,
-                               "message": "ping",
-                               "payload": payload}
-                    self._send(json.dumps(message))
+        # command is unknown => close connection
+        else:
+            self.logger.error("[%s]: Received unknown command. Client sent: '%s' (%s:%d)."
+                              % (self.fileName, data, self.clientAddress, self.clientPort))
 
-                except Exception as e:
-                    self.logger.exception("[%s]: Sending ping response to client failed (%s:%d)."
-                                          % (self.fileName, self.clientAddress, self.clientPort))
-                    # clean up session before exiting
-                    self._cleanUpSessionForClosing()
-                    self._releaseLock()
-                    self._finalizeLogger()
-                    return
+            try:
+                utcTimestamp = int(time.time())
+                message = {"serverTime": utcTimestamp,
+                           "message": message["message"],
+                           "error": "unknown command/message type"}
+                self._send(json.dumps(message))
 
-            # check if SENSORALERT was received
-            # => add to database and wake up alertExecuter
-            elif command == "SENSORALERT" and self.nodeType == "sensor":
-                self.logger.debug("[%s]: Received sensor alert message (%s:%d)."
-                                  % (self.fileName, self.clientAddress, self.clientPort))
+            except Exception as e:
+                pass
 
-                if not self._sensorAlertHandler(message):
-                    self.logger.error("[%s]: Handling sensor alert failed (%s:%d)."
-                                      % (self.fileName, self.clientAddress, self.clientPort))
-                    # clean up session before exiting
-                    self._cleanUpSessionForClosing()
-                    self._releaseLock()
-                    self._finalizeLogger()
-                    return
+            return False
 
-            # check if STATECHANGE was received
-            # => change state of sensor in database
-            elif command == "STATECHANGE" and self.nodeType == "sensor":
-                self.logger.debug("[%s]: Received state change message (%s:%d)."
-                                  % (self.fileName, self.clientAddress, self.clientPort))
+        self.lastRecv = int(time.time())
 
-                if not self._stateChangeHandler(message):
-                    self.logger.error("[%s]: Handling sensor state change failed (%s:%d)."
-                                      % (self.fileName, self.clientAddress, self.clientPort))
-                    # clean up session before exiting
-                    self._cleanUpSessionForClosing()
-                    self._releaseLock()
-                    self._finalizeLogger()
-                    return
+        return True
 
-            # check if STATUS was received
-            # => add new state to the database
-            elif command == "STATUS" and self.nodeType == "sensor":
-                self.logger.debug("[%s]: Received status message (%s:%d)."
-                                  % (self.fileName, self.clientAddress, self.clientPort))
+    def handleCommunication(self):
+        """
+        this function handles the communication with the client and receives the commands
 
-                if not self._statusHandler(message):
-                    self.logger.error("[%s]: Handling status failed (%s:%d)."
-                                      % (self.fileName, self.clientAddress, self.clientPort))
-                    # clean up session before exiting
-                    self._cleanUpSessionForClosing()
-                    self._releaseLock()
-                    self._finalizeLogger()
-                    return
+        :return:
+        """
+        self._acquireLock()
 
-            # check if OPTION was received (for manager only)
-            # => change option in the database
-            elif command == "OPTION" and self.nodeType == "manager":
-                self.logger.debug("[%s]: Received option message (%s:%d)."
-                                  % (self.fileName, self.clientAddress, self.clientPort))
+        if not self._initializeSession():
+            self._releaseLock()
+            return
+
+        # Wait for data of the client without holding the lock (other threads can send data to the client
+        # in the meantime and wake this thread up afterwards).
+        wakeupReader, wakeupWriter = socket.socketpair()
+        wakeupReader.setblocking(False)
+        wakeupWriter.setblocking(False)
+        selector = selectors.DefaultSelector()
+        selector.register(self.sslSocket, selectors.EVENT_READ)
+        selector.register(wakeupReader, selectors.EVENT_READ)
+        self.receiverThreadId = threading.get_ident()
+        self.receiverWakeup = wakeupWriter
+
+        try:
+            self._handleIncomingData(selector, wakeupReader)
+
+        finally:
+            self.receiverWakeup = None
+            selector.close()
+            wakeupReader.close()
+            wakeupWriter.close()
+
+    def _handleIncomingData(self,
+                            selector: selectors.BaseSelector,
+                            wakeupReader: socket.socket):
+        """
+        Internal function that receives the commands of the client (is called while holding the lock
+        and returns after the session was cleaned up).
+
+        :param selector: selector with the socket of the client and the wakeup socket registered
+        :param wakeupReader: socket that is readable if this thread was woken up
+        """
+        # handle commands
+        while True:
+
+            # The data could already be consumed by a thread that initiated a transaction with the client.
+            if not self._hasPendingData(selector):
+                self._releaseLock()
+                try:
+                    selector.select()
+                    wakeupReader.recv(BUFSIZE)
+
+                except (BlockingIOError, InterruptedError):
+                    pass
+
+                except Exception as e:
+                    self.logger.exception("[%s]: Waiting for data failed (%s:%d)."
+                                          % (self.fileName, self.clientAddress, self.clientPort))
+
+                self._acquireLock()
+                continue
+
+            try:
+                data = self._recv()
+                if not data:
 
-                if not self._optionHandler(message):
-                    self.logger.error("[%s]: Handling option failed (%s:%d)."
-                                      % (self.fileName, self.clientAddress, self.clientPort))
                     # clean up session before exiting
                     self._cleanUpSessionForClosing()
                     self._releaseLock()
                     self._finalizeLogger()
                     return
 
-            # command is unknown => close connection
-            else:
-                self.logger.error("[%s]: Received unknown command. Client sent: '%s' (%s:%d)."
-                                  % (self.fileName, data, self.clientAddress, self.clientPort))
+            except socket.timeout as e:
+                # Only a part of the data was received in time => continue waiting for data.
+                continue
 
-                try:
-                    utcTimestamp = int(time.time())
-                    message = {"serverTime": utcTimestamp,
-                               "message": message["message"],
-                               "error": "unknown command/message type"}
-                    self._send(json.dumps(message))
+            except Exception as e:
+                self.logger.exception("[%s]: Receiving failed (%s:%d)."
+                                      % (self.fileName, self.clientAddress, self.clientPort))
 
-                except Exception as e:
-                    pass
+                # clean up session before exiting
+                self._cleanUpSessionForClosing()
+                self._releaseLock()
+                self._finalizeLogger()
+                return
 
+            if not self._handleIncomingTransaction(data):
                 # clean up session before exiting
                 self._cleanUpSessionForClosing()
                 self._releaseLock()
                 self._finalizeLogger()
                 return
 
-            self.lastRecv = int(time.time())
+    def wakeUpReceiver(self):
+        """
+        Wakes up the thread that waits for data of the client (if any).
+        """
+        receiverWakeup = self.receiverWakeup
+        if receiverWakeup is None:
+            return
+
+        try:
+            receiverWakeup.send(b"\x00")
+
+        except OSError as e:
+            # Buffer full (thread is already woken up) or the wakeup socket was closed.
+            pass
 
 
 # this class is used for the threaded tcp server and extends the constructor
@@ -3867,26 +4137,18 @@ class ServerSession(socketserver.BaseRequestHandler):
         self.globalData = server.globalData
         self.logger = self.globalData.logger
 
-        # get server certificate/key file
-        self.serverCertFile = self.globalData.serverCertFile
-        self.serverKeyFile = self.globalData.serverKeyFile
+        # SSL context shared by all connections.
+        self.serverSslContext = self.globalData.serverSslContext
 
-        # get client certificate settings
-        self.useClientCertificates = self.globalData.useClientCertificates
-        self.clientCAFile = self.globalData.clientCAFile
-
-        # Get TLS/SSL setting.
-        self.sslProtocol = self.globalData.sslProtocol
-        self.sslCiphers = self.globalData.sslCiphers
-        self.sslOptions = self.globalData.sslOptions
+        # Get reference to the connection watchdog object
+        # to inform it about disconnects.
+        self.connectionWatchdog = self.globalData.connectionWatchdog
 
         # add own server session to the global list of server sessions
+        # (and let the connection watchdog track its connection timeout)
         self.serverSessions = self.globalData.serverSessions
         self.serverSessions.append(self)
-
-        # Get reference to the connection watchdog object
-        # to inform it about disconnects.
-        self.connectionWatchdog = self.globalData.connectionWatchdog
+        self.connectionWatchdog.addServerSession(self)
 
         socketserver.BaseRequestHandler.__init__(self,
                                                  request,
@@ -3898,23 +4160,17 @@ class ServerSession(socketserver.BaseRequestHandler):
         self.logger.info("[%s]: Client connected (%s:%d)." % (self.fileName, self.clientAddress, self.clientPort))
 
         # Set SSL context.
-        self.sslContext = ssl.SSLContext(self.sslProtocol)
-        self.sslContext.load_cert_chain(certfile=self.serverCertFile,
-                                        keyfile=self.serverKeyFile)
-        self.sslContext.set_ciphers(self.sslCiphers)
-        self.sslContext.options = self.sslOptions
-
-        # If activated, require a client certificate.
-        if self.useClientCertificates:
-            self.sslContext.verify_mode = ssl.CERT_REQUIRED
-            self.sslContext.load_verify_locations(cafile=self.clientCAFile)
+        self.sslContext = self.serverSslContext.get_context()
 
         # try to initiate ssl with client
+        handshakeStart = time.time()
         try:
             self.sslSocket = self.sslContext.wrap_socket(self.request,
                                                          server_side=True)
+            self.serverSslContext.handshake_completed(self.sslSocket, handshakeStart)
 
         except Exception as e:
+            self.serverSslContext.handshake_failed()
             self.logger.exception("[%s]: Unable to initialize SSL connection (%s:%d)."
                                   % (self.fileName, self.clientAddress, self.clientPort))
 
@@ -3933,6 +4189,7 @@ class ServerSession(socketserver.BaseRequestHandler):
                                               self.clientAddress,
                                               self.clientPort,
                                               self.globalData)
+        self.clientComm.serverSession = self
         self.clientComm.handleCommunication()
 
         # close ssl connection gracefully
@@ -3973,6 +4230,10 @@ class ServerSession(socketserver.BaseRequestHandler):
         except Exception as e:
             pass
 
+        # Wake up the thread that waits for data of the client to handle the closed connection.
+        if self.clientComm is not None:
+            self.clientComm.wakeUpReceiver()
+
         try:
             self.serverSessions.remove(self)
         except Exception as e:
@@ -3987,214 +4248,430 @@ class ServerSession(socketserver.BaseRequestHandler):
         self.logger = logger
 
 
-# this class is used to send messages to the client
-# in an asynchronous way to avoid blockings
-class AsynchronousSender(threading.Thread):
+# this class provides a socket-like interface for the client communication
+# on top of an asyncio stream (all network I/O is done by the event loop,
+# the blocking protocol logic is executed in worker threads)
+class AsyncSocketBridge:
 
     def __init__(self,
-                 globalData: GlobalData,
-                 clientComm: ClientCommunication):
-        threading.Thread.__init__(self)
+                 loop: asyncio.AbstractEventLoop,
+                 writer: asyncio.StreamWriter):
+        self._loop = loop
+        self._writer = writer
+
+        # Data received by the event loop that was not yet consumed.
+        self._buffer = bytearray()
+        self._bufferCondition = threading.Condition()
+        self._closed = False
+        self._timeout = None  # type: Optional[float]
+
+        # Event is set by the event loop each time new data arrives
+        # or the connection is closed.
+        self.dataEvent = asyncio.Event()
+
+        # Event that is cleared while the buffer is full (reading from the connection pauses).
+        self._bufferSpaceEvent = asyncio.Event()
+        self._bufferSpaceEvent.set()
+        self._readPaused = False
+
+    async def _write(self, data: bytes):
+        self._writer.write(data)
+        await self._writer.drain()
+
+    def feedData(self, data: bytes):
+        """
+        Adds received data to the buffer (has to be called from the event loop).
+
+        :param data:
+        """
+        with self._bufferCondition:
+            self._buffer.extend(data)
+            if len(self._buffer) >= MAX_BRIDGE_BUFFER_SIZE:
+                self._readPaused = True
+                self._bufferSpaceEvent.clear()
+            self._bufferCondition.notify_all()
+        self.dataEvent.set()
+
+    async def waitForBufferSpace(self):
+        """
+        Waits until the buffer can take more data (has to be called from the event loop).
+        """
+        await self._bufferSpaceEvent.wait()
+
+    def _consumed(self):
+        """
+        Internal function that resumes reading from the connection if the buffer has space again
+        (has to be called while holding the buffer condition).
+        """
+        if self._readPaused and len(self._buffer) < MAX_BRIDGE_BUFFER_SIZE:
+            self._readPaused = False
+            self._loop.call_soon_threadsafe(self._bufferSpaceEvent.set)
+
+    def feedEof(self):
+        """
+        Marks the connection as closed (has to be called from the event loop).
+        """
+        with self._bufferCondition:
+            self._closed = True
+            self._bufferCondition.notify_all()
+        self.dataEvent.set()
+
+    def hasPendingData(self) -> bool:
+        with self._bufferCondition:
+            return len(self._buffer) > 0
+
+    def isClosed(self) -> bool:
+        with self._bufferCondition:
+            return self._closed
+
+    def settimeout(self, timeout: Optional[float]):
+        self._timeout = timeout
+
+    def recv(self, bufsize: int) -> bytes:
+        """
+        Blocks until data was received by the event loop (has to be called from a worker thread).
+
+        :param bufsize:
+        :return: received data or empty bytes if the connection was closed
+        """
+        with self._bufferCondition:
+            if not self._bufferCondition.wait_for(lambda: self._buffer or self._closed, self._timeout):
+                raise socket.timeout("timed out")
+
+            if not self._buffer:
+                return b""
+
+            data = bytes(self._buffer[:bufsize])
+            del self._buffer[:bufsize]
+            self._consumed()
+            return data
+
+    def recv_into(self, buffer: Any, nbytes: int = 0) -> int:
+        """
+        Blocks until data was received by the event loop and copies it into the given buffer
+        (has to be called from a worker thread).
+
+        :param buffer: writable buffer (e.g., bytearray or memoryview)
+        :param nbytes: maximal number of bytes to copy (0 means the size of the buffer)
+        :return: number of copied bytes or 0 if the connection was closed
+        """
+        with memoryview(buffer) as view:
+            if nbytes <= 0 or nbytes > len(view):
+                nbytes = len(view)
+
+            with self._bufferCondition:
+                if not self._bufferCondition.wait_for(lambda: self._buffer or self._closed, self._timeout):
+                    raise socket.timeout("timed out")
+
+                count = min(nbytes, len(self._buffer))
+                view[:count] = self._buffer[:count]
+                del self._buffer[:count]
+                self._consumed()
+                return count
+
+    def send(self, data: bytes) -> int:
+        """
+        Hands the data to the event loop and waits until it is written (has to be called from a worker thread).
+
+        :param data:
+        :return: number of bytes sent
+        """
+        if self.isClosed():
+            raise ConnectionError("connection closed")
+
+        future = asyncio.run_coroutine_threadsafe(self._write(data), self._loop)
+        future.result(self._timeout)
+        return len(data)
+
+    def shutdown(self, how: int):
+        self.close()
+
+    def close(self):
+        with self._bufferCondition:
+            self._closed = True
+            self._bufferCondition.notify_all()
+        self._loop.call_soon_threadsafe(self._writer.close)
+
+
+# this class is used for incoming client connections of the asyncio server
+# (provides the same interface as the ServerSession class)
+class AsyncServerSession:
+
+    def __init__(self,
+                 reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter,
+                 executor: concurrent.futures.ThreadPoolExecutor,
+                 globalData: GlobalData):
 
         # file nme of this file (used for logging)
         self.fileName = os.path.basename(__file__)
 
-        # get global configured data
+        self.reader = reader
+        self.writer = writer
+        self.executor = executor
+        self.socketBridge = None  # type: Optional[AsyncSocketBridge]
+
+        # instance of the client communication object
+        self.clientComm = None  # type: Optional[ClientCommunication]
+
+        # get client ip address and port
+        clientAddress = writer.get_extra_info("peername")
+        self.clientAddress = clientAddress[0]
+        self.clientPort = clientAddress[1]
+
+        # Get reference to global data object.
         self.globalData = globalData
         self.logger = self.globalData.logger
+        self.serverReceiveTimeout = self.globalData.serverReceiveTimeout
 
-        # the communication instance to the client
-        self.clientComm = clientComm
+        self.serverSessions = self.globalData.serverSessions
 
-        # this option is used when the thread should
-        # send a manager update
-        self.sendManagerUpdate = False
+        # Get reference to the connection watchdog object
+        # to inform it about disconnects.
+        self.connectionWatchdog = self.globalData.connectionWatchdog
 
-        # this options are used when the thread should
-        # send a sensor alert to the client
-        self.sendSensorAlert = False
-        self.sensorAlert = None
+    async def _readData(self):
+        """
+        Internal coroutine that moves all received data into the socket bridge.
+        """
+        try:
+            while True:
+                data = await self.reader.read(BUFSIZE)
+                if not data:
+                    break
+                self.socketBridge.feedData(data)
 
-        # this options are used when the thread should
-        # send a state change to a manager client
-        self.sendManagerStateChange = False
-        self.sendManagerStateChangeSensorId = None
-        self.sendManagerStateChangeState = None
-        self.sendManagerStateChangeDataType = None
-        self.sendManagerStateChangeData = None
+                # Do not buffer more data of the client than a worker consumes.
+                await self.socketBridge.waitForBufferSpace()
 
-        # this option is used when the thread should
-        # send a sensor alert off to the client
-        self.sendAlertSensorAlertsOff = False
+        except Exception as e:
+            pass
 
-    def run(self):
+        finally:
+            self.socketBridge.feedEof()
 
-        # check if a status update to a manager should be send
-        if self.sendManagerUpdate:
-            if self.clientComm.nodeType != "manager":
-                self.logger.error("[%s]: Sending status update to manager failed. Client is not a "
-                                  % self.fileName
-                                  + "'manager' node (%s:%d)."
-                                  % (self.clientComm.clientAddress, self.clientComm.clientPort))
-                return
+    def _initializeSession(self) -> bool:
+        """
+        Internal function that initializes the session with the client (executed by a worker thread).
 
-            # sending status update to manager
-            if not self.clientComm.sendManagerUpdate():
-                self.logger.error("[%s]: Sending status update to manager failed (%s:%d)."
-                                  % (self.fileName, self.clientComm.clientAddress, self.clientComm.clientPort))
-                return
+        :return: success or failure
+        """
+        self.clientComm._acquireLock()
+        result = self.clientComm._initializeSession()
+        self.clientComm._releaseLock()
+        return result
 
-        # check if a sensor alert to a manager/alert should be send
-        elif self.sendSensorAlert:
-            if self.clientComm.nodeType != "manager" and self.clientComm.nodeType != "alert":
-                self.logger.error("[%s]: Sending sensor alert failed. Client is not a 'manager'/'alert' node (%s:%d)."
-                                  % (self.fileName, self.clientComm.clientAddress, self.clientComm.clientPort))
-                return
+    def _processIncomingData(self) -> bool:
+        """
+        Internal function that handles a transaction initiated by the client (executed by a worker thread).
 
-            if not self.clientComm.sendSensorAlert(self.sensorAlert):
-                self.logger.error("[%s]: Sending sensor alert to manager/alert failed (%s:%d)."
-                                  % (self.fileName, self.clientComm.clientAddress, self.clientComm.clientPort))
+        :return: False if the session has to be closed
+        """
+        self.clientComm._acquireLock()
+
+        # The received data could already be consumed by a thread that initiated a transaction with the client
+        # while we were waiting for the lock.
+        if not self.socketBridge.hasPendingData():
+            if self.socketBridge.isClosed():
+                self.clientComm._cleanUpSessionForClosing()
+                self.clientComm._releaseLock()
+                self.clientComm._finalizeLogger()
+                return False
 
-        # check if a state change to a manager should be send
-        elif self.sendManagerStateChange:
-            if self.clientComm.nodeType != "manager":
-                self.logger.error("[%s]: Sending state change to manager failed. Client is not a "
-                                  % self.fileName
-                                  + "'manager' node (%s:%d)."
-                                  % (self.clientComm.clientAddress, self.clientComm.clientPort))
-                return
+            self.clientComm._releaseLock()
+            return True
 
-            # sending state change to manager
-            if not self.clientComm.sendManagerStateChange(self.sendManagerStateChangeSensorId,
-                                                          self.sendManagerStateChangeState,
-                                                          self.sendManagerStateChangeDataType,
-                                                          self.sendManagerStateChangeData):
-                self.logger.error("[%s]: Sending state change to manager failed (%s:%d)."
-                                  % (self.fileName, self.clientComm.clientAddress, self.clientComm.clientPort))
-                return
+        try:
+            self.socketBridge.settimeout(self.serverReceiveTimeout)
+            data = self.clientComm._recv()
 
-        # check if a sensor alert off to an alert client should be send
-        elif self.sendAlertSensorAlertsOff:
-            if self.clientComm.nodeType != "alert":
-                self.logger.error("[%s]: Sending sensor alert off to alert failed. Client is not a "
-                                  % self.fileName
-                                  + "'alert' node (%s:%d)."
-                                  % (self.clientComm.clientAddress, self.clientComm.clientPort))
-                return
+        except Exception as e:
+            self.logger.exception("[%s]: Receiving failed (%s:%d)."
+                                  % (self.fileName, self.clientAddress, self.clientPort))
+            data = ""
 
-            # sending sensor alert off to alert client
-            if not self.clientComm.sendAlertSensorAlertsOff():
-                self.logger.error("[%s]: Sending sensor alert off to alert client failed (%s:%d)."
-                                  % (self.fileName, self.clientComm.clientAddress, self.clientComm.clientPort))
-                return
+        if not data or not self.clientComm._handleIncomingTransaction(data):
+            # clean up session before exiting
+            self.clientComm._cleanUpSessionForClosing()
+            self.clientComm._releaseLock()
+            self.clientComm._finalizeLogger()
+            return False
+
+        self.clientComm._releaseLock()
+        return True
 
+    async def handle(self):
 
-# this class is used to change an option
-# in an asynchronous way to avoid blockings
-class AsynchronousOptionExecuter(threading.Thread):
+        self.logger.info("[%s]: Client connected (%s:%d)." % (self.fileName, self.clientAddress, self.clientPort))
+
+        loop = asyncio.get_running_loop()
+
+        # add own server session to the global list of server sessions
+        # (and let the connection watchdog track its connection timeout)
+        self.serverSessions.append(self)
+        self.connectionWatchdog.addServerSession(self)
+
+        # give incoming connection to client communication handler
+        self.socketBridge = AsyncSocketBridge(loop, self.writer)
+        self.clientComm = ClientCommunication(self.socketBridge,
+                                              self.clientAddress,
+                                              self.clientPort,
+                                              self.globalData)
+        self.clientComm.serverSession = self
+        readTask = loop.create_task(self._readData())
+
+        try:
+            # Wait without occupying a worker thread until the client starts the initialization
+            # (connections that do not send anything would block the workers otherwise).
+            try:
+                await asyncio.wait_for(self.socketBridge.dataEvent.wait(), self.serverReceiveTimeout)
+                initialized = await loop.run_in_executor(self.executor, self._initializeSession)
+
+            except asyncio.TimeoutError:
+                self.logger.error("[%s]: Client did not start the initialization in time (%s:%d)."
+                                  % (self.fileName, self.clientAddress, self.clientPort))
+                initialized = False
+
+            if initialized:
+
+                # Wait without occupying a thread until the client initiates a transaction
+                # or closes the connection.
+                while True:
+                    await self.socketBridge.dataEvent.wait()
+                    self.socketBridge.dataEvent.clear()
+
+                    if not self.socketBridge.hasPendingData() and not self.socketBridge.isClosed():
+                        continue
+
+                    # One call handles one transaction => handle all transactions of the client that
+                    # are already buffered (they do not set the data event again).
+                    keepSession = await loop.run_in_executor(self.executor, self._processIncomingData)
+                    while keepSession and self.socketBridge.hasPendingData():
+                        keepSession = await loop.run_in_executor(self.executor, self._processIncomingData)
+
+                    if not keepSession:
+                        break
+
+        except Exception as e:
+            self.logger.exception("[%s]: Handling client failed (%s:%d)."
+                                  % (self.fileName, self.clientAddress, self.clientPort))
+
+        readTask.cancel()
+
+        # close ssl connection gracefully
+        try:
+            self.writer.close()
+            await asyncio.wait_for(self.writer.wait_closed(), self.serverReceiveTimeout)
+
+        except Exception as e:
+            self.logger.debug("[%s]: Unable to close SSL connection gracefully with %s:%d."
+                              % (self.fileName, self.clientAddress, self.clientPort))
+
+        # remove own server session from the global list of server sessions
+        # before closing server session
+        try:
+            self.serverSessions.remove(self)
+
+        except Exception as e:
+            pass
+
+        self.logger.info("[%s]: Client disconnected (%s:%d)." % (self.fileName, self.clientAddress, self.clientPort))
+
+        # If client was registered and set as "persistent",
+        # notify the connection watchdog about the disconnect.
+        if self.clientComm.nodeId is not None and self.clientComm.persistent == 1:
+            self.connectionWatchdog.addNodePreTimeout(self.clientComm.nodeId)
+
+    def closeConnection(self):
+        self.logger.info("[%s]: Closing connection to client (%s:%d)."
+                         % (self.fileName, self.clientAddress, self.clientPort))
+        try:
+            self.socketBridge.close()
+
+        except Exception as e:
+            pass
+
+        try:
+            self.serverSessions.remove(self)
+        except Exception as e:
+            pass
+
+    def setLogger(self, logger):
+        """
+        Overwrites the used logger instance.
+
+        :param logger:
+        """
+        self.logger = logger
+
+
+# this class is an asyncio based server that handles all client connections
+# in a single event loop (instead of a thread per connection)
+# and executes the blocking protocol logic in a bounded pool of worker threads
+class AsyncServer:
 
     def __init__(self,
                  globalData: GlobalData,
-                 optionType: str,
-                 optionValue: float,
-                 optionDelay: int):
-        threading.Thread.__init__(self)
+                 serverAddress: Tuple[str, int]):
 
         # file nme of this file (used for logging)
         self.fileName = os.path.basename(__file__)
 
-        # get global configured data
+        # get reference to global data object
         self.globalData = globalData
         self.logger = self.globalData.logger
-        self.storage = self.globalData.storage
-        self.asyncOptionExecuters = self.globalData.asyncOptionExecuters
-        self.asyncOptionExecutersLock = self.globalData.asyncOptionExecutersLock
-        self.managerUpdateExecuter = self.globalData.managerUpdateExecuter
-        self.sensorAlertExecuter = self.globalData.sensorAlertExecuter
-        self.internalSensors = self.globalData.internalSensors
-        self.serverSessions = self.globalData.serverSessions
 
-        # get option data to change
-        self.optionType = optionType
-        self.optionValue = optionValue
-        self.optionDelay = optionDelay
+        self.serverAddress = serverAddress
+        self.executor = None  # type: Optional[concurrent.futures.ThreadPoolExecutor]
 
-        # this flag tells the asynchronous option executer
-        # if the option should still be changed or the change be aborted
-        # (for example if the option was changed in the time
-        # this thread was waiting the given delay time before
-        # it changes the option)
-        self.abortOptionChange = False
+        # Set of the sessions currently handled by the event loop.
+        self._activeSessions = set()
 
-    def run(self):
-        self.logger.debug("[%s]: Changing option '%s' to %d in %d seconds."
-                          % (self.fileName, self.optionType, self.optionValue, self.optionDelay))
+    async def _handleConnection(self,
+                                reader: asyncio.StreamReader,
+                                writer: asyncio.StreamWriter):
+        # The handshake is already done when the connection is handed over.
+        self.globalData.serverSslContext.handshake_completed(writer.get_extra_info("ssl_object"))
 
-        # wait time before changing option
-        time.sleep(self.optionDelay)
-
-        # remove this thread from the list of active async option executers
-        # (acquire and release lock to make the list operations thread safe)
-        self.asyncOptionExecutersLock.acquire()
-        self.asyncOptionExecuters.remove(self)
-        self.asyncOptionExecutersLock.release()
+        serverSession = AsyncServerSession(reader, writer, self.executor, self.globalData)
+        self._activeSessions.add(serverSession)
+        try:
+            await serverSession.handle()
 
-        # check if the option change should be aborted
-        if self.abortOptionChange:
-            self.logger.debug("[%s]: Changing option '%s' to %d was aborted."
-                              % (self.fileName, self.optionType, self.optionValue))
-            return
+        finally:
+            self._activeSessions.discard(serverSession)
 
-        self.logger.debug("[%s]: Changing option '%s' to %d now."
-                          % (self.fileName, self.optionType, self.optionValue))
+    async def _serve(self):
+        server = await asyncio.start_server(self._handleConnection,
+                                            host=self.serverAddress[0],
+                                            port=self.serverAddress[1],
+                                            ssl=self.globalData.serverSslContext.get_initial_context(),
+                                            ssl_handshake_timeout=self.globalData.serverReceiveTimeout,
+                                            reuse_address=True)
 
-        # change option in the database
-        if not self.storage.changeOption(self.optionType, self.optionValue):
-            self.logger.error("[%s]: Not able to change option." % self.fileName)
+        self.logger.info("[%s]: Asyncio server listening on port %d with %d worker threads."
+                         % (self.fileName, self.serverAddress[1], self.globalData.asyncServerWorkers))
 
-        # check if the alert system was deactivated
-        # => send sensor alerts off to alert clients
-        if self.optionType == "alertSystemActive" and self.optionValue == 0:
-            for serverSession in self.serverSessions:
-                # ignore sessions which do not exist yet
-                # and that are not managers
-                if serverSession.clientComm is None:
-                    continue
-                if serverSession.clientComm.nodeType != "alert":
-                    continue
-                if not serverSession.clientComm.clientInitialized:
-                    continue
-
-                # sending sensor alerts off to alert client
-                # via a thread to not block this one
-                sensorAlertsOffProcess = AsynchronousSender(self.globalData, serverSession.clientComm)
-                # set thread to daemon
-                # => threads terminates when main thread terminates
-                sensorAlertsOffProcess.daemon = True
-                sensorAlertsOffProcess.sendAlertSensorAlertsOff = True
-                self.logger.debug("[%s]: Sending sensor alerts off to alert client (%s:%d)."
-                                  % (self.fileName, serverSession.clientComm.clientAddress,
-                                     serverSession.clientComm.clientPort))
-                sensorAlertsOffProcess.start()
-
-        # Check if the alert system was acitvated/deactivated
-        # => generate sensor alert if internal sensor is activated.
-        if self.optionType == "alertSystemActive":
-            # Get internal sensor object if activated.
-            alertSystemActiveSensor = None
-            for internalSensor in self.internalSensors:
-                if isinstance(internalSensor, AlertSystemActiveSensor):
-                    alertSystemActiveSensor = internalSensor
-                    break
+        try:
+            async with server:
+                await server.serve_forever()
 
-            # Change sensor state and add sensor alert to database for processing if internal sensor is active.
-            if alertSystemActiveSensor:
-                if self.optionValue == 0.0:
-                    alertSystemActiveSensor.set_state(0)
+        finally:
+            # Wake up all worker threads that wait for data of a client.
+            for serverSession in list(self._activeSessions):
+                if serverSession.socketBridge is not None:
+                    serverSession.socketBridge.feedEof()
 
-                else:
-                    alertSystemActiveSensor.set_state(1)
+    def serve_forever(self):
+        """
+        Runs the event loop of the server (blocks forever).
+        """
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.globalData.asyncServerWorkers,
+                                                              thread_name_prefix="AsyncServerWorker")
+        while True:
+            try:
+                asyncio.run(self._serve())
 
-        # wake up manager update executer
-        self.managerUpdateExecuter.forceStatusUpdate = True
-        self.managerUpdateExecuter.managerUpdateEvent.set()
+            except Exception as e:
+                self.logger.exception("[%s]: Starting server failed. Try again in 5 seconds." % self.fileName)
+                time.sleep(5)
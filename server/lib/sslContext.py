@@ -0,0 +1,241 @@
+#!/usr/bin/python3
+
+# written by sqall
+# twitter: https://twitter.com/sqall01
+# blog: https://h4des.org
+# github: https://github.com/sqall01
+#
+# Licensed under the GNU Affero General Public License, version 3.
+
+import os
+import ssl
+import time
+import threading
+import weakref
+from typing import Any, Dict, Optional
+from .globalData import GlobalData
+
+
+# This class holds the SSL context that is used for all incoming client connections.
+# The context is created once (instead of loading the certificate files for each connection),
+# which also allows clients to resume their TLS sessions when they reconnect. It is recreated
+# when the certificate, key or CA file changes. Additionally, it keeps statistics of the handshakes.
+class ServerSslContext:
+
+    def __init__(self,
+                 global_data: GlobalData):
+
+        # file nme of this file (used for logging)
+        self.log_tag = os.path.basename(__file__)
+
+        self._global_data = global_data
+        self._logger = global_data.logger
+
+        # Interval in seconds in which the certificate files are checked for changes.
+        self._check_interval = global_data.configCheckInterval
+        self._last_check = 0.0
+        self._file_times = dict()  # type: Dict[str, Optional[float]]
+
+        self._lock = threading.Lock()
+        self._context = None  # type: Optional[ssl.SSLContext]
+
+        # Context that was created first (given to servers that use one context for all connections,
+        # connections switch to the current context during the handshake).
+        self._initial_context = None  # type: Optional[ssl.SSLContext]
+
+        # Start times of the handshakes in progress (set when the client hello is received).
+        self._handshake_starts = weakref.WeakKeyDictionary()  # type: Dict[Any, float]
+
+        self._stats_lock = threading.Lock()
+        self._handshakes_started = 0
+        self._handshakes_completed = 0
+        self._handshakes_resumed = 0
+        self._handshakes_failed = 0
+        self._handshake_duration_total = 0.0
+        self._handshake_duration_max = 0.0
+        self._context_reloads = 0
+
+        # Handshake statistics as metrics (collected when the metrics are requested).
+        metrics_registry = global_data.metricsRegistry
+        for name, key, description in [("alertr_ssl_handshakes_completed_total", "completed",
+                                        "Number of completed TLS handshakes."),
+                                       ("alertr_ssl_handshakes_resumed_total", "resumed",
+                                        "Number of completed TLS handshakes that resumed a session."),
+                                       ("alertr_ssl_handshakes_failed_total", "failed",
+                                        "Number of failed TLS handshakes.")]:
+            metrics_registry.function(name,
+                                      description,
+                                      lambda key=key: self.get_handshake_stats()[key],
+                                      "counter")
+
+        self._reload()
+
+    def _get_files(self) -> Dict[str, Optional[float]]:
+        """
+        Internal function that gets the modification times of all files the context is created from.
+
+        :return: file path -> modification time (None if the file does not exist)
+        """
+        files = [self._global_data.serverCertFile, self._global_data.serverKeyFile]
+        if self._global_data.useClientCertificates:
+            files.append(self._global_data.clientCAFile)
+
+        file_times = dict()
+        for file_path in files:
+            try:
+                file_times[file_path] = os.stat(file_path).st_mtime
+            except OSError:
+                file_times[file_path] = None
+        return file_times
+
+    def _create_context(self) -> ssl.SSLContext:
+        """
+        Internal function that creates a new SSL context from the configured files and settings.
+
+        :return:
+        """
+        ssl_context = ssl.SSLContext(self._global_data.sslProtocol)
+        ssl_context.load_cert_chain(certfile=self._global_data.serverCertFile,
+                                    keyfile=self._global_data.serverKeyFile)
+        ssl_context.set_ciphers(self._global_data.sslCiphers)
+
+        # Session tickets are needed to resume sessions.
+        ssl_context.options = self._global_data.sslOptions & ~ssl.OP_NO_TICKET
+
+        # If activated, require a client certificate.
+        if self._global_data.useClientCertificates:
+            ssl_context.verify_mode = ssl.CERT_REQUIRED
+            ssl_context.load_verify_locations(cafile=self._global_data.clientCAFile)
+
+        # Called for each received client hello (also without a server name).
+        ssl_context.sni_callback = self._handshake_started
+
+        return ssl_context
+
+    def _reload(self):
+        """
+        Internal function that creates the SSL context (again).
+        """
+        file_times = self._get_files()
+        ssl_context = self._create_context()
+
+        with self._lock:
+            self._file_times = file_times
+            self._context = ssl_context
+            if self._initial_context is None:
+                self._initial_context = ssl_context
+
+            else:
+                self._context_reloads += 1
+
+    def _handshake_started(self,
+                           ssl_object: Any,
+                           server_name: Optional[str],
+                           ssl_context: ssl.SSLContext):
+        """
+        Internal function that is called by the ssl module when a client hello is received.
+
+        :param ssl_object:
+        :param server_name:
+        :param ssl_context:
+        """
+        with self._stats_lock:
+            self._handshakes_started += 1
+            try:
+                self._handshake_starts[ssl_object] = time.time()
+            except TypeError:
+                pass
+
+        # Switch connections of the initial context to the current context if it was reloaded.
+        current_context = self.get_context()
+        if ssl_context is not current_context:
+            ssl_object.context = current_context
+
+    def get_context(self) -> ssl.SSLContext:
+        """
+        Gets the current SSL context (recreates it if the certificate files have changed).
+
+        :return:
+        """
+        now = time.time()
+        if (now - self._last_check) >= self._check_interval:
+            self._last_check = now
+
+            if self._get_files() != self._file_times:
+                self._logger.info("[%s]: Certificate files have changed. Reloading SSL context." % self.log_tag)
+                try:
+                    self._reload()
+                except Exception as e:
+                    self._logger.exception("[%s]: Reloading SSL context failed. Using old one." % self.log_tag)
+
+        return self._context
+
+    def get_initial_context(self) -> ssl.SSLContext:
+        """
+        Gets the SSL context that was created first. Connections of this context use the current context
+        after the client hello (for servers that can only be given one context).
+
+        :return:
+        """
+        self.get_context()
+        return self._initial_context
+
+    def handshake_completed(self,
+                            ssl_object: Any,
+                            start_time: Optional[float] = None):
+        """
+        Records a completed handshake.
+
+        :param ssl_object: SSLSocket or SSLObject of the connection
+        :param start_time: time the handshake started (if not given the time the client hello was received is used)
+        """
+        resumed = False
+        try:
+            resumed = ssl_object.session_reused
+        except Exception as e:
+            pass
+
+        with self._stats_lock:
+            client_hello_time = None
+            if ssl_object is not None:
+                client_hello_time = self._handshake_starts.pop(ssl_object, None)
+            if start_time is None:
+                start_time = client_hello_time
+
+            duration = None
+            if start_time is not None:
+                duration = max(0.0, time.time() - start_time)
+
+            self._handshakes_completed += 1
+            if resumed:
+                self._handshakes_resumed += 1
+            if duration is not None:
+                self._handshake_duration_total += duration
+                self._handshake_duration_max = max(self._handshake_duration_max, duration)
+
+    def handshake_failed(self):
+        """
+        Records a failed handshake.
+        """
+        with self._stats_lock:
+            self._handshakes_failed += 1
+
+    def get_handshake_stats(self) -> Dict[str, Any]:
+        """
+        Gets the statistics of the handshakes.
+
+        :return: dictionary with the number of started, completed, resumed and failed handshakes,
+        the average and maximum duration of the completed handshakes in seconds and the number of reloads
+        """
+        with self._stats_lock:
+            average_duration = 0.0
+            if self._handshakes_completed > 0:
+                average_duration = self._handshake_duration_total / self._handshakes_completed
+
+            return {"started": self._handshakes_started,
+                    "completed": self._handshakes_completed,
+                    "resumed": self._handshakes_resumed,
+                    "failed": self._handshakes_failed,
+                    "duration_avg": average_duration,
+                    "duration_max": self._handshake_duration_max,
+                    "reloads": self._context_reloads}
@@ -0,0 +1,325 @@
+#!/usr/bin/python3
+
+# written by sqall
+# twitter: https://twitter.com/sqall01
+# blog: https://h4des.org
+# github: https://github.com/sqall01
+#
+# Licensed under the GNU Affero General Public License, version 3.
+
+import threading
+import os
+import json
+import logging
+import collections
+from typing import Any, Dict, Optional, Tuple
+from .globalData import GlobalData
+
+
+# This class caches the serialized payload of the alert system status message
+# that is sent to the manager clients. The payload is only rebuilt if the change
+# generation of the storage has changed since the last build, all managers
+# that request the status in between share the same serialized payload.
+# Each rebuild is compared with the previous one and the differences are recorded
+# in a change log with increasing revision numbers, so managers that support it
+# only get the changes since the revision they have acknowledged last.
+class AlertSystemStateCache:
+
+    # Lists of the status payload and the key that identifies their entries.
+    status_keys = (("options", "type"),
+                   ("nodes", "nodeId"),
+                   ("sensors", "sensorId"),
+                   ("managers", "managerId"),
+                   ("alerts", "alertId"),
+                   ("alertLevels", "alertLevel"))
+
+    def __init__(self,
+                 global_data: GlobalData):
+
+        # file nme of this file (used for logging)
+        self.log_tag = os.path.basename(__file__)
+
+        self._global_data = global_data
+        self._logger = self._global_data.logger
+        self._storage = self._global_data.storage
+        self._alert_levels = self._global_data.alertLevels
+
+        # Lock that makes sure that the payload is only built once per change generation.
+        self._cache_lock = threading.Lock()
+
+        self._payload_json = None  # type: Optional[str]
+        self._payload_generation = None  # type: Optional[int]
+
+        # Entries of the last built payload: list name -> entry key -> entry.
+        self._snapshot = None  # type: Optional[Dict[str, Dict[Any, Dict[str, Any]]]]
+
+        # Revision of the last built payload and the changes that lead to it
+        # (tuples of revision, list name, action, entry key, entry).
+        self._revision = 0
+        self._change_log = collections.deque()
+        self._change_log_size = self._global_data.statusChangeLogSize
+
+        # Statistics of the cache.
+        self._build_count = 0
+        self._hit_count = 0
+
+    def _build_payload(self,
+                       logger: logging.Logger) -> Optional[Dict[str, Any]]:
+        """
+        Internal function that builds the payload of the alert system status message.
+
+        :param logger:
+        :return: payload or None
+        """
+        # Get a list from database of
+        # list[0] = list(option objects)
+        # list[1] = list(node objects)
+        # list[2] = list(sensor objects)
+        # list[3] = list(manager objects)
+        # list[4] = list(alert objects)
+        # or None
+        alert_system_information = self._storage.getAlertSystemInformation(logger=logger)
+        if alert_system_information is None:
+            return None
+        option_list = alert_system_information[0]
+        node_list = alert_system_information[1]
+        sensor_list = alert_system_information[2]
+        manager_list = alert_system_information[3]
+        alert_list = alert_system_information[4]
+
+        # Generating options list.
+        options = list()
+        for option_obj in option_list:
+            options.append({"type": option_obj.type,
+                            "value": option_obj.value})
+
+        # Generating nodes list.
+        nodes = list()
+        for node_obj in node_list:
+            nodes.append({"nodeId": node_obj.id,
+                          "hostname": node_obj.hostname,
+                          "username": node_obj.username,
+                          "nodeType": node_obj.nodeType,
+                          "instance": node_obj.instance,
+                          "connected": node_obj.connected,
+                          "version": node_obj.version,
+                          "rev": node_obj.rev,
+                          "persistent": node_obj.persistent})
+
+        # Generating sensors list.
+        sensors = list()
+        for sensor_obj in sensor_list:
+            sensors.append({"sensorId": sensor_obj.sensorId,
+                            "nodeId": sensor_obj.nodeId,
+                            "remoteSensorId": sensor_obj.remoteSensorId,
+                            "description": sensor_obj.description,
+                            "state": sensor_obj.state,
+                            "lastStateUpdated": sensor_obj.lastStateUpdated,
+                            "alertDelay": sensor_obj.alertDelay,
+                            "alertLevels": sensor_obj.alertLevels,
+                            "dataType": sensor_obj.dataType,
+                            "data": sensor_obj.data})
+
+        # Generating managers list.
+        managers = list()
+        for manager_obj in manager_list:
+            managers.append({"managerId": manager_obj.managerId,
+                             "nodeId": manager_obj.nodeId,
+                             "description": manager_obj.description})
+
+        # Generating alerts list.
+        alerts = list()
+        for alert_obj in alert_list:
+            alerts.append({"alertId": alert_obj.alertId,
+                           "nodeId": alert_obj.nodeId,
+                           "remoteAlertId": alert_obj.remoteAlertId,
+                           "description": alert_obj.description,
+                           "alertLevels": alert_obj.alertLevels})
+
+        # Generating alertLevels list.
+        alert_levels = list()
+        for alert_level in self._alert_levels:
+            alert_levels.append({"alertLevel": alert_level.level,
+                                 "name": alert_level.name,
+                                 "triggerAlways": (1 if alert_level.triggerAlways else 0),
+                                 "rulesActivated": alert_level.rulesActivated})
+
+        payload = {"type": "request",
+                   "options": options,
+                   "nodes": nodes,
+                   "sensors": sensors,
+                   "managers": managers,
+                   "alerts": alerts,
+                   "alertLevels": alert_levels}
+
+        return payload
+
+    def _update_change_log(self,
+                           payload: Dict[str, Any]):
+        """
+        Internal function that records the differences of the given payload to the last built payload
+        in the change log.
+
+        :param payload:
+        """
+        snapshot = dict()
+        for list_name, key in self.status_keys:
+            snapshot[list_name] = collections.OrderedDict((entry[key], entry) for entry in payload[list_name])
+
+        # The first payload has no changes (managers always get a full status first).
+        if self._snapshot is not None:
+            for list_name, _ in self.status_keys:
+                old_entries = self._snapshot[list_name]
+                new_entries = snapshot[list_name]
+
+                for key, entry in new_entries.items():
+                    old_entry = old_entries.get(key)
+                    if old_entry is None:
+                        self._revision += 1
+                        self._change_log.append((self._revision, list_name, "add", key, entry))
+
+                    elif old_entry != entry:
+                        self._revision += 1
+                        self._change_log.append((self._revision, list_name, "change", key, entry))
+
+                for key in old_entries.keys():
+                    if key not in new_entries:
+                        self._revision += 1
+                        self._change_log.append((self._revision, list_name, "delete", key, None))
+
+            while len(self._change_log) > self._change_log_size:
+                self._change_log.popleft()
+
+        self._snapshot = snapshot
+
+    def _update(self,
+                logger: logging.Logger) -> bool:
+        """
+        Internal function that rebuilds the payload if the change generation has changed.
+        Has to be called with the cache lock acquired.
+
+        :param logger:
+        :return: False if the alert system information could not be retrieved
+        """
+        # The generation has to be read before the data is fetched. A change in between leads to
+        # a newer payload marked with an older generation which is only rebuilt once more.
+        generation = self._storage.getChangeGeneration()
+        if self._payload_json is not None and generation == self._payload_generation:
+            self._hit_count += 1
+            return True
+
+        payload = self._build_payload(logger)
+        if payload is None:
+            logger.error("[%s]: Getting alert system information from database failed." % self.log_tag)
+            return False
+
+        self._update_change_log(payload)
+        payload["revision"] = self._revision
+
+        self._payload_json = json.dumps(payload)
+        self._payload_generation = generation
+        self._build_count += 1
+
+        logger.debug("[%s]: Built alert system status for change generation %d (revision %d)."
+                     % (self.log_tag, generation, self._revision))
+
+        return True
+
+    def get_payload(self,
+                    logger: logging.Logger = None) -> Optional[str]:
+        """
+        Returns the serialized payload of the alert system status message for the current change generation.
+
+        :param logger:
+        :return: serialized payload or None if the alert system information could not be retrieved
+        """
+        status = self.get_status(logger)
+        if status is None:
+            return None
+        return status[0]
+
+    def get_status(self,
+                   logger: logging.Logger = None) -> Optional[Tuple[str, int]]:
+        """
+        Returns the serialized payload of the alert system status message for the current change generation
+        together with its revision.
+
+        :param logger:
+        :return: tuple of serialized payload and revision or None if the alert system information
+        could not be retrieved
+        """
+        if not logger:
+            logger = self._logger
+
+        with self._cache_lock:
+            if not self._update(logger):
+                return None
+
+            return self._payload_json, self._revision
+
+    def get_delta(self,
+                  from_revision: int,
+                  logger: logging.Logger = None) -> Optional[Tuple[str, int]]:
+        """
+        Returns the serialized payload of the changes of the alert system status since the given revision
+        together with the current revision.
+
+        :param from_revision: revision the manager has acknowledged last
+        :param logger:
+        :return: tuple of serialized payload and revision or None if the changes are no longer available
+        (or the alert system information could not be retrieved) and a full status has to be sent
+        """
+        if not logger:
+            logger = self._logger
+
+        with self._cache_lock:
+            if not self._update(logger):
+                return None
+
+            if from_revision > self._revision:
+                return None
+
+            # Changes since the given revision have to be still in the change log.
+            if from_revision < self._revision:
+                if not self._change_log or self._change_log[0][0] > from_revision + 1:
+                    return None
+
+            changes = list()
+            for revision, list_name, action, key, entry in reversed(self._change_log):
+                if revision <= from_revision:
+                    break
+                changes.append({"revision": revision,
+                                "list": list_name,
+                                "action": action,
+                                "key": key,
+                                "entry": entry})
+            changes.reverse()
+
+            payload = {"type": "request",
+                       "delta": True,
+                       "fromRevision": from_revision,
+                       "revision": self._revision,
+                       "changes": changes}
+
+            return json.dumps(payload), self._revision
+
+    def invalidate(self):
+        """
+        Removes the cached payload (next request rebuilds it, the change log is kept).
+        """
+        with self._cache_lock:
+            self._payload_json = None
+            self._payload_generation = None
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Returns the number of payload builds and cache hits.
+
+        :return:
+        """
+        with self._cache_lock:
+            return {"build_count": self._build_count,
+                    "hit_count": self._hit_count,
+                    "generation": self._payload_generation,
+                    "revision": self._revision,
+                    "change_log_size": len(self._change_log)}
@@ -118,6 +118,33 @@ class _Storage:
         """
         raise NotImplemented("Function not implemented yet.")
 
+    def createSensorAlert(self,
+                          nodeId: int,
+                          sensorId: int,
+                          state: int,
+                          dataJson: str,
+                          changeState: bool,
+                          hasLatestData: bool,
+                          dataType: int,
+                          sensorData: Any,
+                          logger: logging.Logger = None) -> Optional[SensorAlert]:
+        """
+        Adds a sensor alert to the database (like addSensorAlert()) and returns it
+        as sensor alert object (used to process it without reading it back from the database).
+
+        :param nodeId:
+        :param sensorId:
+        :param state:
+        :param dataJson:
+        :param changeState:
+        :param hasLatestData:
+        :param dataType:
+        :param sensorData:
+        :param logger:
+        :return sensor alert object or None
+        """
+        raise NotImplemented("Function not implemented yet.")
+
     def getNodeId(self,
                   username: str,
                   logger: logging.Logger = None) -> Optional[int]:
@@ -288,6 +315,17 @@ class _Storage:
         """
         raise NotImplemented("Function not implemented yet.")
 
+    def getOldestSensorUpdate(self,
+                              logger: logging.Logger = None) -> Optional[int]:
+        """
+        Gets the time of the oldest last state update of all sensors that are not returned as timed out
+        by getSensorsUpdatedOlderThan() (can be older than the actual time, but never newer).
+
+        :param logger:
+        :return: utc timestamp or None if no sensor exists
+        """
+        raise NotImplemented("Function not implemented yet.")
+
     def getAlertById(self,
                      alertId: int,
                      logger: logging.Logger = None) -> Optional[Alert]:
@@ -502,6 +540,23 @@ class _Storage:
         """
         raise NotImplemented("Function not implemented yet.")
 
+    def getChangeGeneration(self) -> int:
+        """
+        Returns a counter that is increased each time data that is part of the alert system information changes.
+
+        :return:
+        """
+        raise NotImplemented("Function not implemented yet.")
+
+    def getSensorGeneration(self) -> int:
+        """
+        Returns a counter that is increased each time nodes or sensors are added or deleted
+        (ids of sensors resolved before can be outdated).
+
+        :return:
+        """
+        raise NotImplemented("Function not implemented yet.")
+
     def close(self,
               logger: logging.Logger = None):
         """
@@ -16,12 +16,43 @@ import hashlib
 import json
 import logging
 import sqlite3
-from typing import Any, Optional, List, Union, Tuple, Dict
+import queue
+import heapq
+from typing import Any, Optional, List, Union, Tuple, Dict, Set
 from .core import _Storage
 from ..globalData import GlobalData
 from ..localObjects import Node, Alert, Manager, Sensor, SensorAlert, SensorData, SensorDataType, Option
 
 
+# This class is a thread of the sqlite storage that commits the pending
+# sensor state/data/time updates after the commit window has passed.
+class SqliteCommitFlusher(threading.Thread):
+
+    def __init__(self,
+                 storage):
+        threading.Thread.__init__(self)
+        self._storage = storage
+        self.exit_flag = False
+
+    def run(self):
+        storage = self._storage
+        while True:
+            with storage._commitCondition:
+                if self.exit_flag:
+                    return
+
+                if storage._commitDeadline is None:
+                    storage._commitCondition.wait()
+                    continue
+
+                wait_time = storage._commitDeadline - time.time()
+                if wait_time > 0:
+                    storage._commitCondition.wait(wait_time)
+                    continue
+
+            storage._flushPendingCommit()
+
+
 # class for using sqlite as storage backend
 class Sqlite(_Storage):
 
@@ -47,6 +78,51 @@ class Sqlite(_Storage):
         # sqlite is not thread safe => use lock
         self.dbLock = threading.Semaphore(1)
 
+        # Time waited for the lock (only collected if the metrics are activated).
+        self._lockWaitMetric = self.globalData.metricsRegistry.histogram("alertr_storage_lock_wait_seconds",
+                                                                        "Time waited for the database lock.")
+
+        # Counter that is increased with each change of the data that is part
+        # of the alert system information (options, nodes, sensors, alerts, managers).
+        # It is increased after the change is committed in order to never mark old data with a new generation.
+        self._changeGeneration = 0
+
+        # In "wal" mode the database uses write-ahead logging and read-only functions get
+        # their own connection from a pool (they run in parallel to each other and to writes).
+        # Writes still use the single connection protected by the lock.
+        self._walMode = (self.globalData.storageBackendSqliteMode == "wal") and not read_only
+        self._readConnections = list()  # type: List[sqlite3.Connection]
+        self._readCursors = queue.Queue()  # type: queue.Queue
+
+        # Time in seconds sensor state/data/time updates are collected before they are
+        # committed in one transaction (0 commits each update immediately).
+        self._commitWindow = self.globalData.storageCommitWindow
+        self._pendingCommit = False
+
+        # Deadline of the pending commit. The long-lived flusher thread waits on the condition
+        # until the deadline has passed and commits the pending updates.
+        self._commitDeadline = None  # type: Optional[float]
+        self._commitCondition = threading.Condition()
+        self._commitFlusher = None  # type: Optional[SqliteCommitFlusher]
+
+        # In-memory index of the nodes and sensors that is used to resolve ids without
+        # querying the database. It is invalidated by all functions that add or delete nodes or sensors
+        # and rebuilt from the database on the next lookup (only accessed while holding the lock).
+        self._indexValid = False
+        self._sensorGeneration = 0
+        self._nodeIdIndex = dict()  # type: Dict[str, int]
+        self._sensorIdIndex = dict()  # type: Dict[Tuple[int, int], int]
+        self._sensorDataTypeIndex = dict()  # type: Dict[int, int]
+        self._sensorAlertLevelsIndex = dict()  # type: Dict[int, Set[int]]
+
+        # Time of the last state update of each sensor (part of the in-memory index and updated together
+        # with the database). The heap holds one (time, sensor id) entry for each sensor that is not
+        # timed out (the time of an entry can be older than the actual time, entries are only corrected when
+        # they reach the top). Sensors that were returned as timed out are kept in the set until they are updated.
+        self._sensorTimeIndex = dict()  # type: Dict[int, int]
+        self._sensorTimeHeap = list()  # type: List[Tuple[int, int]]
+        self._timedOutSensorIds = set()  # type: Set[int]
+
         mode = ""
         if read_only:
             mode = "?mode=ro"
@@ -64,6 +140,12 @@ class Sqlite(_Storage):
                                     uri=True)
         self.cursor = self.conn.cursor()
 
+        if not read_only:
+            if self._walMode:
+                self.cursor.execute("PRAGMA journal_mode=WAL")
+            else:
+                self.cursor.execute("PRAGMA journal_mode=DELETE")
+
         if create_new:
             uniqueID = self._generateUniqueId()
             self._createStorage(uniqueID)
@@ -71,6 +153,18 @@ class Sqlite(_Storage):
         # check if the versions are compatible
         self.checkVersionAndClearConflict()
 
+        # Open pool of read connections (after the database layout is up to date).
+        if self._walMode:
+            self.logger.info("[%s]: Using write-ahead logging with %d read connections."
+                             % (self.log_tag, self.globalData.storageBackendSqliteReadConnections))
+            for _ in range(self.globalData.storageBackendSqliteReadConnections):
+                readConn = sqlite3.connect(uri,
+                                           check_same_thread=False,
+                                           isolation_level=None,
+                                           uri=True)
+                self._readConnections.append(readConn)
+                self._readCursors.put(readConn.cursor())
+
     def _usernameInDb(self,
                       username: str) -> bool:
         """
@@ -128,6 +222,99 @@ class Sqlite(_Storage):
         node.persistent = nodeTuple[8]
         return node
 
+    def _buildIndex(self):
+        """
+        Internal function that rebuilds the in-memory index of nodes and sensors from the database.
+        """
+        nodeIdIndex = dict()
+        self.cursor.execute("SELECT id, username FROM nodes")
+        for nodeId, username in self.cursor.fetchall():
+            nodeIdIndex[username] = nodeId
+
+        sensorIdIndex = dict()
+        sensorDataTypeIndex = dict()
+        sensorAlertLevelsIndex = dict()
+        sensorTimeIndex = dict()
+        self.cursor.execute("SELECT id, nodeId, remoteSensorId, dataType, lastStateUpdated FROM sensors")
+        for sensorId, nodeId, remoteSensorId, dataType, lastStateUpdated in self.cursor.fetchall():
+            sensorIdIndex[(nodeId, remoteSensorId)] = sensorId
+            sensorDataTypeIndex[sensorId] = dataType
+            sensorAlertLevelsIndex[sensorId] = set()
+            sensorTimeIndex[sensorId] = lastStateUpdated
+
+        self.cursor.execute("SELECT sensorId, alertLevel FROM sensorsAlertLevels")
+        for sensorId, alertLevel in self.cursor.fetchall():
+            sensorAlertLevelsIndex.setdefault(sensorId, set()).add(alertLevel)
+
+        self._nodeIdIndex = nodeIdIndex
+        self._sensorIdIndex = sensorIdIndex
+        self._sensorDataTypeIndex = sensorDataTypeIndex
+        self._sensorAlertLevelsIndex = sensorAlertLevelsIndex
+        self._sensorTimeIndex = sensorTimeIndex
+        self._sensorTimeHeap = [(lastStateUpdated, sensorId) for sensorId, lastStateUpdated in sensorTimeIndex.items()]
+        heapq.heapify(self._sensorTimeHeap)
+        self._timedOutSensorIds = set()
+        self._indexValid = True
+
+    def _setSensorTime(self,
+                       sensorId: int,
+                       utcTimestamp: int):
+        """
+        Internal function that updates the time of the last state update of the sensor in the index.
+        A timed out sensor is tracked in the heap again. Has to be called with the lock acquired and a valid index.
+
+        :param sensorId:
+        :param utcTimestamp:
+        """
+        self._sensorTimeIndex[sensorId] = utcTimestamp
+        if sensorId in self._timedOutSensorIds:
+            self._timedOutSensorIds.remove(sensorId)
+            heapq.heappush(self._sensorTimeHeap, (utcTimestamp, sensorId))
+
+    def _invalidateIndex(self):
+        """
+        Internal function that marks the in-memory index of nodes and sensors as outdated.
+        """
+        self._indexValid = False
+        self._sensorGeneration += 1
+
+    def _getIndexedNodeId(self,
+                          username: str) -> int:
+        """
+        Internal function that gets the id of a node when a username is given by using the in-memory index.
+
+        :param username:
+        :return: node id corresponding to username or raised Exception
+        """
+        if not self._indexValid:
+            self._buildIndex()
+
+        nodeId = self._nodeIdIndex.get(username)
+        if nodeId is None:
+            raise ValueError("Node id was not found.")
+
+        return nodeId
+
+    def _getIndexedSensorId(self,
+                            nodeId: int,
+                            remoteSensorId: int) -> int:
+        """
+        Internal function that gets the sensor id of a sensor when the id of a node is given and the
+        remote sensor id that is used by the node internally by using the in-memory index.
+
+        :param nodeId:
+        :param remoteSensorId:
+        :return: sensorId or raised Exception
+        """
+        if not self._indexValid:
+            self._buildIndex()
+
+        sensorId = self._sensorIdIndex.get((nodeId, remoteSensorId))
+        if sensorId is None:
+            raise ValueError("Sensor does not exist in database.")
+
+        return sensorId
+
     def _getNodeId(self,
                    username: str) -> int:
         """
@@ -328,6 +515,150 @@ class Sqlite(_Storage):
 
         return sensor
 
+    def _getAllAlerts(self,
+                      cursor: sqlite3.Cursor) -> List[Alert]:
+        """
+        Internal function that gets all alerts from the database. The alerts and their alert levels
+        are fetched with one query each instead of querying each alert separately.
+
+        :param cursor:
+        :return: list of alert objects or raised Exception
+        """
+        cursor.execute("SELECT alertId, "
+                       + "alertLevel "
+                       + "FROM alertsAlertLevels "
+                       + "ORDER BY alertId, alertLevel")
+        alertLevelsMap = dict()
+        for alertId, alertLevel in cursor.fetchall():
+            alertLevelsMap.setdefault(alertId, list()).append(alertLevel)
+
+        cursor.execute("SELECT id, "
+                       + "nodeId, "
+                       + "remoteAlertId, "
+                       + "description "
+                       + "FROM alerts "
+                       + "ORDER BY id")
+        alertList = list()
+        for resultTuple in cursor.fetchall():
+            alert = Alert()
+            alert.alertId = resultTuple[0]
+            alert.nodeId = resultTuple[1]
+            alert.remoteAlertId = resultTuple[2]
+            alert.description = resultTuple[3]
+            alert.alertLevels = alertLevelsMap.get(alert.alertId, list())
+            alertList.append(alert)
+
+        return alertList
+
+    def _getAllManagers(self,
+                        cursor: sqlite3.Cursor) -> List[Manager]:
+        """
+        Internal function that gets all managers from the database with a single query.
+
+        :param cursor:
+        :return: list of manager objects or raised Exception
+        """
+        cursor.execute("SELECT id, "
+                       + "nodeId, "
+                       + "description "
+                       + "FROM managers "
+                       + "ORDER BY id")
+        managerList = list()
+        for resultTuple in cursor.fetchall():
+            manager = Manager()
+            manager.managerId = resultTuple[0]
+            manager.nodeId = resultTuple[1]
+            manager.description = resultTuple[2]
+            managerList.append(manager)
+
+        return managerList
+
+    def _getAllSensors(self,
+                       cursor: sqlite3.Cursor,
+                       updatedBefore: Optional[int] = None,
+                       sensorIds: Optional[List[int]] = None) -> List[Sensor]:
+        """
+        Internal function that gets all sensors from the database. The sensor data is joined
+        into the sensor query and the alert levels of all sensors are fetched with one additional query
+        instead of querying each sensor separately.
+
+        :param cursor:
+        :param updatedBefore: only get sensors which state was updated before this time (if given)
+        :param sensorIds: only get sensors with the given ids (if given)
+        :return: list of sensor objects or raised Exception
+        """
+        conditions = list()
+        arguments = list()
+        if updatedBefore is not None:
+            conditions.append("sensors.lastStateUpdated < ?")
+            arguments.append(updatedBefore)
+        if sensorIds is not None:
+            conditions.append("sensors.id IN (%s)" % ", ".join("?" * len(sensorIds)))
+            arguments.extend(sensorIds)
+
+        cursor.execute("SELECT sensorId, "
+                       + "alertLevel "
+                       + "FROM sensorsAlertLevels "
+                       + ("WHERE sensorId IN (%s) " % ", ".join("?" * len(sensorIds))
+                          if sensorIds is not None else "")
+                       + "ORDER BY sensorId, alertLevel",
+                       sensorIds if sensorIds is not None else ())
+        alertLevelsMap = dict()
+        for sensorId, alertLevel in cursor.fetchall():
+            alertLevelsMap.setdefault(sensorId, list()).append(alertLevel)
+
+        cursor.execute("SELECT sensors.id, "
+                       + "sensors.nodeId, "
+                       + "sensors.remoteSensorId, "
+                       + "sensors.description, "
+                       + "sensors.state, "
+                       + "sensors.lastStateUpdated, "
+                       + "sensors.alertDelay, "
+                       + "sensors.dataType, "
+                       + "sensorsDataInt.data, "
+                       + "sensorsDataFloat.data "
+                       + "FROM sensors "
+                       + "LEFT JOIN sensorsDataInt "
+                       + "ON sensors.id = sensorsDataInt.sensorId "
+                       + "LEFT JOIN sensorsDataFloat "
+                       + "ON sensors.id = sensorsDataFloat.sensorId "
+                       + ("WHERE " + " AND ".join(conditions) + " " if conditions else "")
+                       + "ORDER BY sensors.id",
+                       arguments)
+        sensorList = list()
+        for resultTuple in cursor.fetchall():
+            sensor = Sensor()
+            sensor.sensorId = resultTuple[0]
+            sensor.nodeId = resultTuple[1]
+            sensor.remoteSensorId = resultTuple[2]
+            sensor.description = resultTuple[3]
+            sensor.state = resultTuple[4]
+            sensor.lastStateUpdated = resultTuple[5]
+            sensor.alertDelay = resultTuple[6]
+            sensor.dataType = resultTuple[7]
+            sensor.alertLevels = alertLevelsMap.get(sensor.sensorId, list())
+
+            # Extract sensor data.
+            if sensor.dataType == SensorDataType.NONE:
+                sensor.data = None
+
+            elif sensor.dataType == SensorDataType.INT:
+                if resultTuple[8] is None:
+                    raise ValueError("Sensor data for sensor with id %d was not found." % sensor.sensorId)
+                sensor.data = resultTuple[8]
+
+            elif sensor.dataType == SensorDataType.FLOAT:
+                if resultTuple[9] is None:
+                    raise ValueError("Sensor data for sensor with id %d was not found." % sensor.sensorId)
+                sensor.data = resultTuple[9]
+
+            else:
+                raise ValueError("Data type of sensor with id %d in database unknown." % sensor.sensorId)
+
+            sensorList.append(sensor)
+
+        return sensorList
+
     def _getSensorId(self,
                      nodeId: int,
                      remoteSensorId: int) -> int:
@@ -425,7 +756,13 @@ class Sqlite(_Storage):
             logger = self.logger
 
         logger.debug("[%s]: Acquire lock." % self.log_tag)
-        self.dbLock.acquire()
+        if self._lockWaitMetric.enabled:
+            startTime = time.perf_counter()
+            self.dbLock.acquire()
+            self._lockWaitMetric.observe(time.perf_counter() - startTime)
+
+        else:
+            self.dbLock.acquire()
 
     def _releaseLock(self,
                      logger: logging.Logger = None):
@@ -441,6 +778,109 @@ class Sqlite(_Storage):
         logger.debug("[%s]: Release lock." % self.log_tag)
         self.dbLock.release()
 
+    def _acquireReadCursor(self,
+                           logger: logging.Logger = None) -> sqlite3.Cursor:
+        """
+        Internal function that acquires a cursor for read-only queries. In "wal" mode a cursor of the
+        read connection pool is used (all queries until it is released see the same snapshot
+        of the database), otherwise the lock is acquired and the cursor of the single connection is used.
+
+        :param logger:
+        :return: cursor for read-only queries
+        """
+        # Set logger instance to use.
+        if not logger:
+            logger = self.logger
+
+        if not self._walMode:
+            self._acquireLock(logger)
+            return self.cursor
+
+        logger.debug("[%s]: Acquire read connection." % self.log_tag)
+        cursor = self._readCursors.get()
+        try:
+            cursor.execute("BEGIN")
+
+        except Exception as e:
+            self._readCursors.put(cursor)
+            raise
+
+        return cursor
+
+    def _releaseReadCursor(self,
+                           cursor: sqlite3.Cursor,
+                           logger: logging.Logger = None):
+        """
+        Internal function that releases a cursor acquired by _acquireReadCursor().
+
+        :param cursor:
+        :param logger:
+        """
+        # Set logger instance to use.
+        if not logger:
+            logger = self.logger
+
+        if not self._walMode:
+            self._releaseLock(logger)
+            return
+
+        logger.debug("[%s]: Release read connection." % self.log_tag)
+        try:
+            if cursor.connection.in_transaction:
+                cursor.execute("COMMIT")
+
+        except Exception as e:
+            logger.exception("[%s]: Not able to end read transaction." % self.log_tag)
+
+        self._readCursors.put(cursor)
+
+    def _commitDeferred(self):
+        """
+        Internal function that commits the changes of a sensor state/data/time update. If a commit window
+        is configured, the commit is deferred until the window elapsed and all updates in it are committed
+        in one transaction (lock has to be held by the caller). Any other commit in between also
+        commits the pending updates.
+        """
+        if self._commitWindow <= 0.0:
+            self.conn.commit()
+            self._changeGeneration += 1
+            return
+
+        self._pendingCommit = True
+        if self._commitFlusher is None:
+            self._commitFlusher = SqliteCommitFlusher(self)
+
+            # set thread to daemon
+            # => threads terminates when main thread terminates
+            self._commitFlusher.daemon = True
+            self._commitFlusher.start()
+
+        with self._commitCondition:
+            if self._commitDeadline is None:
+                self._commitDeadline = time.time() + self._commitWindow
+                self._commitCondition.notify()
+
+    def _flushPendingCommit(self):
+        """
+        Internal function that commits all pending sensor state/data/time updates (executed by the commit flusher).
+        """
+        self._acquireLock(self.logger)
+
+        with self._commitCondition:
+            self._commitDeadline = None
+
+        if self._pendingCommit:
+            try:
+                self.conn.commit()
+                self._changeGeneration += 1
+
+            except Exception as e:
+                self.logger.exception("[%s]: Not able to commit pending changes." % self.log_tag)
+
+            self._pendingCommit = False
+
+        self._releaseLock(self.logger)
+
     def _createStorage(self,
                        uniqueID: str):
         """
@@ -885,6 +1325,7 @@ class Sqlite(_Storage):
             logger = self.logger
 
         self._acquireLock(logger)
+        self._invalidateIndex()
 
         # get version from the current database
         self.cursor.execute("SELECT value FROM internals WHERE type = ?", ("dbversion", ))
@@ -918,6 +1359,7 @@ class Sqlite(_Storage):
 
             # commit all changes
             self.conn.commit()
+            self._changeGeneration += 1
 
         # Raise an exception if database layout version
         # is newer than the one we need.
@@ -942,6 +1384,7 @@ class Sqlite(_Storage):
             logger = self.logger
 
         self._acquireLock(logger)
+        self._invalidateIndex()
 
         # check if a node with the same username already exists
         # => if not add node
@@ -1136,6 +1579,7 @@ class Sqlite(_Storage):
 
         # commit all changes
         self.conn.commit()
+        self._changeGeneration += 1
 
         self._releaseLock(logger)
         return True
@@ -1150,6 +1594,7 @@ class Sqlite(_Storage):
             logger = self.logger
 
         self._acquireLock(logger)
+        self._invalidateIndex()
 
         # get the id of the node
         try:
@@ -1450,6 +1895,7 @@ class Sqlite(_Storage):
 
         # commit all changes
         self.conn.commit()
+        self._changeGeneration += 1
         self._releaseLock(logger)
         return True
 
@@ -1672,6 +2118,7 @@ class Sqlite(_Storage):
 
         # commit all changes
         self.conn.commit()
+        self._changeGeneration += 1
         self._releaseLock(logger)
         return True
 
@@ -1758,6 +2205,7 @@ class Sqlite(_Storage):
 
         # commit all changes
         self.conn.commit()
+        self._changeGeneration += 1
         self._releaseLock(logger)
         return True
 
@@ -1773,7 +2221,7 @@ class Sqlite(_Storage):
 
         nodeId = None
         try:
-            nodeId = self._getNodeId(username)
+            nodeId = self._getIndexedNodeId(username)
 
         except Exception as e:
             logger.exception("[%s]: Not able to get node id." % self.log_tag)
@@ -1883,11 +2331,10 @@ class Sqlite(_Storage):
             try:
 
                 # check if the sensor does exist in the database
-                self.cursor.execute("SELECT id FROM sensors "
-                                    + "WHERE nodeId = ? "
-                                    + "AND remoteSensorId = ?", (nodeId, stateTuple[0]))
-                result = self.cursor.fetchall()
-                if len(result) != 1:
+                if not self._indexValid:
+                    self._buildIndex()
+                sensorId = self._sensorIdIndex.get((nodeId, stateTuple[0]))
+                if sensorId is None:
                     logger.error("[%s]: Sensor does not exist in database." % self.log_tag)
                     self._releaseLock(logger)
                     return False
@@ -1896,17 +2343,17 @@ class Sqlite(_Storage):
                 self.cursor.execute("UPDATE sensors SET "
                                     + "state = ?, "
                                     + "lastStateUpdated = ? "
-                                    + "WHERE nodeId = ? "
-                                    + "AND remoteSensorId = ?",
-                                    (stateTuple[1], utcTimestamp, nodeId, stateTuple[0]))
+                                    + "WHERE id = ?",
+                                    (stateTuple[1], utcTimestamp, sensorId))
+                self._setSensorTime(sensorId, utcTimestamp)
 
             except Exception as e:
                 logger.exception("[%s]: Not able to update sensor state." % self.log_tag)
                 self._releaseLock(logger)
                 return False
 
-        # commit all changes
-        self.conn.commit()
+        # commit all changes (together with other updates in the commit window)
+        self._commitDeferred()
         self._releaseLock(logger)
         return True
 
@@ -1927,18 +2374,15 @@ class Sqlite(_Storage):
             try:
                 # Check if the sensor does exist in the database and get its
                 # data type.
-                self.cursor.execute("SELECT id, dataType FROM sensors "
-                                    + "WHERE nodeId = ? "
-                                    + "AND remoteSensorId = ?", (nodeId, dataTuple[0]))
-                result = self.cursor.fetchall()
-
-                if len(result) != 1:
+                if not self._indexValid:
+                    self._buildIndex()
+                sensorId = self._sensorIdIndex.get((nodeId, dataTuple[0]))
+                if sensorId is None:
                     logger.error("[%s]: Sensor does not exist in database." % self.log_tag)
                     self._releaseLock(logger)
                     return False
 
-                sensorId = result[0][0]
-                dataType = result[0][1]
+                dataType = self._sensorDataTypeIndex[sensorId]
 
                 if dataType == SensorDataType.NONE:
                     logger.error("[%s]: Sensor with remote id %d holds no data. Ignoring it."
@@ -1963,8 +2407,8 @@ class Sqlite(_Storage):
                 self._releaseLock(logger)
                 return False
 
-        # commit all changes
-        self.conn.commit()
+        # commit all changes (together with other updates in the commit window)
+        self._commitDeferred()
         self._releaseLock(logger)
         return True
 
@@ -1985,14 +2429,16 @@ class Sqlite(_Storage):
                                 + "lastStateUpdated = ? "
                                 + "WHERE id = ?",
                                 (utcTimestamp, sensorId))
+            if self._indexValid and sensorId in self._sensorTimeIndex:
+                self._setSensorTime(sensorId, utcTimestamp)
 
         except Exception as e:
             logger.exception("[%s]: Not able to update sensor time." % self.log_tag)
             self._releaseLock(logger)
             return False
 
-        # commit all changes
-        self.conn.commit()
+        # commit all changes (together with other updates in the commit window)
+        self._commitDeferred()
         self._releaseLock(logger)
         return True
 
@@ -2008,7 +2454,7 @@ class Sqlite(_Storage):
         self._acquireLock(logger)
 
         try:
-            sensorId = self._getSensorId(nodeId, remoteSensorId)
+            sensorId = self._getIndexedSensorId(nodeId, remoteSensorId)
 
         except Exception as e:
             logger.exception("[%s]: Not able to get sensorId from database." % self.log_tag)
@@ -2050,7 +2496,19 @@ class Sqlite(_Storage):
 
         self._acquireLock(logger)
 
-        result = self._getSensorAlertLevels(sensorId, logger)
+        result = None
+        try:
+            if not self._indexValid:
+                self._buildIndex()
+
+            if sensorId in self._sensorAlertLevelsIndex:
+                result = sorted(self._sensorAlertLevelsIndex[sensorId])
+
+            else:
+                result = self._getSensorAlertLevels(sensorId, logger)
+
+        except Exception as e:
+            logger.exception("[%s]: Not able to get alert levels for sensor with id %d." % (self.log_tag, sensorId))
 
         self._releaseLock(logger)
 
@@ -2085,6 +2543,28 @@ class Sqlite(_Storage):
                        sensorData: Any,
                        logger: logging.Logger = None) -> bool:
 
+        sensorAlert = self.createSensorAlert(nodeId,
+                                             sensorId,
+                                             state,
+                                             dataJson,
+                                             changeState,
+                                             hasLatestData,
+                                             dataType,
+                                             sensorData,
+                                             logger)
+        return sensorAlert is not None
+
+    def createSensorAlert(self,
+                          nodeId: int,
+                          sensorId: int,
+                          state: int,
+                          dataJson: str,
+                          changeState: bool,
+                          hasLatestData: bool,
+                          dataType: int,
+                          sensorData: Any,
+                          logger: logging.Logger = None) -> Optional[SensorAlert]:
+
         # Set logger instance to use.
         if not logger:
             logger = self.logger
@@ -2093,6 +2573,52 @@ class Sqlite(_Storage):
 
         # add sensor alert to database
         try:
+            # Get the sensor information the sensor alert object consists of.
+            self.cursor.execute("SELECT description, "
+                                + "alertDelay "
+                                + "FROM sensors "
+                                + "WHERE id = ? "
+                                + "AND nodeId = ?",
+                                (sensorId, nodeId))
+            result = self.cursor.fetchall()
+            if len(result) != 1:
+                logger.error("[%s]: Sensor with id %d for sensor alert does not exist." % (self.log_tag, sensorId))
+                self._releaseLock(logger)
+                return None
+
+            if not self._indexValid:
+                self._buildIndex()
+
+            sensorAlert = SensorAlert()
+            sensorAlert.nodeId = nodeId
+            sensorAlert.sensorId = sensorId
+            sensorAlert.description = result[0][0]
+            sensorAlert.alertDelay = result[0][1]
+            sensorAlert.state = state
+            sensorAlert.changeState = changeState
+            sensorAlert.hasLatestData = hasLatestData
+            sensorAlert.dataType = dataType
+            sensorAlert.rulesActivated = False
+            sensorAlert.alertLevels = sorted(self._sensorAlertLevelsIndex.get(sensorId, set()))
+
+            # Set optional data for sensor alert.
+            sensorAlert.hasOptionalData = False
+            sensorAlert.optionalData = None
+            if dataJson != "":
+                try:
+                    sensorAlert.optionalData = json.loads(dataJson)
+                    sensorAlert.hasOptionalData = True
+
+                except Exception as e:
+                    self.logger.exception("[%s]: Optional data not a valid json string. "
+                                          % self.log_tag
+                                          + "Ignoring data.")
+
+            if dataType == SensorDataType.NONE:
+                sensorAlert.sensorData = None
+            else:
+                sensorAlert.sensorData = sensorData
+
             if changeState:
                 dbChangeState = 1
             else:
@@ -2102,6 +2628,7 @@ class Sqlite(_Storage):
             else:
                 dbHasLatestData = 0
             utcTimestamp = int(time.time())
+            sensorAlert.timeReceived = utcTimestamp
             self.cursor.execute("INSERT INTO sensorAlerts ("
                                 + "nodeId, "
                                 + "sensorId, "
@@ -2122,21 +2649,26 @@ class Sqlite(_Storage):
 
             # Get sensorAlertId of current added sensor alert.
             sensorAlertId = self.cursor.lastrowid
+            sensorAlert.sensorAlertId = sensorAlertId
 
             if not self._insertSensorAlertData(sensorAlertId, dataType, sensorData, logger):
                 logger.error("[%s]: Not able to add data for newly added sensor alert." % self.log_tag)
                 self._releaseLock(logger)
-                return False
+                return None
 
         except Exception as e:
             logger.exception("[%s]: Not able to add sensor alert." % self.log_tag)
             self._releaseLock(logger)
-            return False
+            return None
 
-        # commit all changes
+        # commit all changes immediately (also commits pending updates of the commit window)
+        # => sensor alert is stored durably before it is processed
         self.conn.commit()
+        if self._pendingCommit:
+            self._pendingCommit = False
+            self._changeGeneration += 1
         self._releaseLock(logger)
-        return True
+        return sensorAlert
 
     def getSensorAlerts(self,
                         logger: logging.Logger = None) -> Optional[List[SensorAlert]]:
@@ -2149,6 +2681,16 @@ class Sqlite(_Storage):
 
         returnList = list()
         try:
+            # Get alert levels of all sensors that have pending sensor alerts.
+            self.cursor.execute("SELECT sensorId, "
+                                + "alertLevel "
+                                + "FROM sensorsAlertLevels "
+                                + "WHERE sensorId IN (SELECT sensorId FROM sensorAlerts) "
+                                + "ORDER BY sensorId, alertLevel")
+            alertLevelsMap = dict()
+            for sensorId, alertLevel in self.cursor.fetchall():
+                alertLevelsMap.setdefault(sensorId, list()).append(alertLevel)
+
             self.cursor.execute("SELECT "
                                 + "sensorAlerts.id, "
                                 + "sensors.id, "
@@ -2160,11 +2702,17 @@ class Sqlite(_Storage):
                                 + "sensorAlerts.dataJson, "
                                 + "sensorAlerts.changeState, "
                                 + "sensorAlerts.hasLatestData, "
-                                + "sensorAlerts.dataType "
+                                + "sensorAlerts.dataType, "
+                                + "sensorAlertsDataInt.data, "
+                                + "sensorAlertsDataFloat.data "
                                 + "FROM sensorAlerts "
                                 + "INNER JOIN sensors "
                                 + "ON sensorAlerts.nodeId == sensors.nodeId "
-                                + "AND sensorAlerts.sensorId == sensors.id")
+                                + "AND sensorAlerts.sensorId == sensors.id "
+                                + "LEFT JOIN sensorAlertsDataInt "
+                                + "ON sensorAlerts.id == sensorAlertsDataInt.sensorAlertId "
+                                + "LEFT JOIN sensorAlertsDataFloat "
+                                + "ON sensorAlerts.id == sensorAlertsDataFloat.sensorAlertId")
             result = self.cursor.fetchall()
 
             # Extract for each sensor alert the corresponding data.
@@ -2197,46 +2745,27 @@ class Sqlite(_Storage):
                                               + "Ignoring data.")
 
                 # Set alert levels for sensor alert.
-                alertLevels = self._getSensorAlertLevels(sensorAlert.sensorId, logger)
-                if alertLevels is None:
-                    logger.error("[%s]: Not able to get alert levels for sensor alert with id %d."
-                                 % (self.log_tag, sensorAlert.sensorAlertId))
-                    self._releaseLock(logger)
-                    return None
-
-                sensorAlert.alertLevels = alertLevels
+                sensorAlert.alertLevels = alertLevelsMap.get(sensorAlert.sensorId, list())
 
                 # Extract sensor alert data.
                 if sensorAlert.dataType == SensorDataType.NONE:
                     sensorAlert.sensorData = None
 
                 elif sensorAlert.dataType == SensorDataType.INT:
-                    self.cursor.execute("SELECT data "
-                                        + "FROM sensorAlertsDataInt "
-                                        + "WHERE sensorAlertId = ?",
-                                        (sensorAlert.sensorAlertId, ))
-                    subResult = self.cursor.fetchall()
-
-                    if len(subResult) != 1:
+                    if resultTuple[11] is None:
                         logger.error("[%s]: Sensor alert data was not found." % self.log_tag)
                         self._releaseLock(logger)
                         return None
 
-                    sensorAlert.sensorData = subResult[0][0]
+                    sensorAlert.sensorData = resultTuple[11]
 
                 elif sensorAlert.dataType == SensorDataType.FLOAT:
-                    self.cursor.execute("SELECT data "
-                                        + "FROM sensorAlertsDataFloat "
-                                        + "WHERE sensorAlertId = ?",
-                                        (sensorAlert.sensorAlertId, ))
-                    subResult = self.cursor.fetchall()
-
-                    if len(subResult) != 1:
+                    if resultTuple[12] is None:
                         logger.error("[%s]: Sensor alert data was not found." % self.log_tag)
                         self._releaseLock(logger)
                         return None
 
-                    sensorAlert.sensorData = subResult[0][0]
+                    sensorAlert.sensorData = resultTuple[12]
 
                 else:
                     logger.error("[%s]: Not able to get sensor alerts. Data type in database unknown." % self.log_tag)
@@ -2280,6 +2809,7 @@ class Sqlite(_Storage):
             logger = self.logger
 
         self._acquireLock(logger)
+        self._invalidateIndex()
 
         # Get node type from database.
         nodeObj = self._getNodeById(nodeId, logger)
@@ -2330,6 +2860,7 @@ class Sqlite(_Storage):
 
         # commit all changes
         self.conn.commit()
+        self._changeGeneration += 1
         self._releaseLock(logger)
         return True
 
@@ -2487,6 +3018,7 @@ class Sqlite(_Storage):
 
         # commit all changes
         self.conn.commit()
+        self._changeGeneration += 1
         self._releaseLock(logger)
         return True
 
@@ -2512,6 +3044,7 @@ class Sqlite(_Storage):
 
         # commit all changes
         self.conn.commit()
+        self._changeGeneration += 1
         self._releaseLock(logger)
         return True
 
@@ -2525,20 +3058,33 @@ class Sqlite(_Storage):
 
         self._acquireLock(logger)
 
-        sensorList = list()
         try:
-            self.cursor.execute("SELECT id "
-                                + "FROM sensors "
-                                + "WHERE lastStateUpdated < ?",
-                                (oldestTimeUpdated, ))
-
-            results = self.cursor.fetchall()
+            if not self._indexValid:
+                self._buildIndex()
+
+            # Sensors that were timed out and got updated in the meantime are tracked in the heap again.
+            for sensorId in list(self._timedOutSensorIds):
+                lastStateUpdated = self._sensorTimeIndex.get(sensorId)
+                if lastStateUpdated is None or lastStateUpdated >= oldestTimeUpdated:
+                    self._timedOutSensorIds.remove(sensorId)
+                    if lastStateUpdated is not None:
+                        heapq.heappush(self._sensorTimeHeap, (lastStateUpdated, sensorId))
+
+            # Only process heap entries which time is older than the given time
+            # (entries with an outdated time are pushed again with the current time).
+            while self._sensorTimeHeap and self._sensorTimeHeap[0][0] < oldestTimeUpdated:
+                entryTime, sensorId = heapq.heappop(self._sensorTimeHeap)
+                lastStateUpdated = self._sensorTimeIndex.get(sensorId)
+                if lastStateUpdated is None:
+                    continue
+                if lastStateUpdated != entryTime:
+                    heapq.heappush(self._sensorTimeHeap, (lastStateUpdated, sensorId))
+                    continue
+                self._timedOutSensorIds.add(sensorId)
 
-            for resultTuple in results:
-                sensorId = resultTuple[0]
-                sensor = self._getSensorById(sensorId, logger)
-                if sensor is not None:
-                    sensorList.append(sensor)
+            sensorList = list()
+            if self._timedOutSensorIds:
+                sensorList = self._getAllSensors(self.cursor, sensorIds=sorted(self._timedOutSensorIds))
 
         except Exception as e:
             logger.exception("[%s]: Not able to get sensors from database which update was older than %d."
@@ -2551,6 +3097,31 @@ class Sqlite(_Storage):
         # return list of sensor objects
         return sensorList
 
+    def getOldestSensorUpdate(self,
+                              logger: logging.Logger = None) -> Optional[int]:
+
+        # Set logger instance to use.
+        if not logger:
+            logger = self.logger
+
+        self._acquireLock(logger)
+
+        try:
+            if not self._indexValid:
+                self._buildIndex()
+
+            oldestTime = None
+            if self._sensorTimeHeap:
+                oldestTime = self._sensorTimeHeap[0][0]
+
+        except Exception as e:
+            logger.exception("[%s]: Not able to get oldest sensor update." % self.log_tag)
+            self._releaseLock(logger)
+            return None
+
+        self._releaseLock(logger)
+        return oldestTime
+
     def getAlertById(self,
                      alertId: int,
                      logger: logging.Logger = None) -> Optional[Alert]:
@@ -2659,16 +3230,16 @@ class Sqlite(_Storage):
         if not logger:
             logger = self.logger
 
-        self._acquireLock(logger)
+        cursor = self._acquireReadCursor(logger)
 
         try:
 
             # Get all options.
             optionList = list()
-            self.cursor.execute("SELECT type, "
-                                + "value "
-                                + "FROM options")
-            results = self.cursor.fetchall()
+            cursor.execute("SELECT type, "
+                           + "value "
+                           + "FROM options")
+            results = cursor.fetchall()
             for resultTuple in results:
                 optionObj = Option()
                 optionObj.type = resultTuple[0]
@@ -2677,44 +3248,16 @@ class Sqlite(_Storage):
 
             # Get all nodes.
             nodeList = list()
-            self.cursor.execute("SELECT * FROM nodes")
-            results = self.cursor.fetchall()
+            cursor.execute("SELECT * FROM nodes")
+            results = cursor.fetchall()
             for resultTuple in results:
                 nodeObj = self._convertNodeTupleToObj(resultTuple)
                 nodeList.append(nodeObj)
 
-            # Get all sensors.
-            sensorList = list()
-            self.cursor.execute("SELECT id FROM sensors")
-            results = self.cursor.fetchall()
-            for resultTuple in results:
-                sensorObj = self._getSensorById(resultTuple[0], logger)
-                if sensorObj is None:
-                    raise ValueError("Can not retrieve sensor with id %d." % resultTuple[0])
-
-                sensorList.append(sensorObj)
-
-            # Get all managers.
-            managerList = list()
-            self.cursor.execute("SELECT id FROM managers")
-            results = self.cursor.fetchall()
-            for resultTuple in results:
-                managerObj = self._getManagerById(resultTuple[0], logger)
-                if managerObj is None:
-                    raise ValueError("Can not retrieve manager with id %d." % resultTuple[0])
-
-                managerList.append(managerObj)
-
-            # Get all alerts.
-            alertList = list()
-            self.cursor.execute("SELECT id FROM alerts")
-            results = self.cursor.fetchall()
-            for resultTuple in results:
-                alertObj = self._getAlertById(resultTuple[0], logger)
-                if alertObj is None:
-                    raise ValueError("Can not retrieve alert with id %d." % resultTuple[0])
-
-                alertList.append(alertObj)
+            # Get all sensors, managers and alerts with a fixed number of queries.
+            sensorList = self._getAllSensors(cursor)
+            managerList = self._getAllManagers(cursor)
+            alertList = self._getAllAlerts(cursor)
 
             # Generate a list with system information.
             alertSystemInformation = list()
@@ -2726,10 +3269,10 @@ class Sqlite(_Storage):
 
         except Exception as e:
             logger.exception("[%s]: Not able to get complete system information from database." % self.log_tag)
-            self._releaseLock(logger)
+            self._releaseReadCursor(cursor, logger)
             return None
 
-        self._releaseLock(logger)
+        self._releaseReadCursor(cursor, logger)
 
         # return a list of
         # list[0] = list(option objects)
@@ -2739,6 +3282,22 @@ class Sqlite(_Storage):
         # list[4] = list(alert objects)
         return alertSystemInformation
 
+    def getChangeGeneration(self) -> int:
+        """
+        Returns the current change generation of the alert system information.
+
+        :return:
+        """
+        return self._changeGeneration
+
+    def getSensorGeneration(self) -> int:
+        """
+        Returns the current generation of the nodes and sensors (increased each time they are added or deleted).
+
+        :return:
+        """
+        return self._sensorGeneration
+
     def changeOption(self,
                      optionType: str,
                      optionValue: float,
@@ -2775,6 +3334,7 @@ class Sqlite(_Storage):
 
         # commit all changes
         self.conn.commit()
+        self._changeGeneration += 1
         self._releaseLock(logger)
         return True
 
@@ -2818,25 +3378,25 @@ class Sqlite(_Storage):
         if not logger:
             logger = self.logger
 
-        self._acquireLock(logger)
+        cursor = self._acquireReadCursor(logger)
 
         try:
             # Get data type from database.
-            self.cursor.execute("SELECT dataType "
-                                + "FROM sensors "
-                                + "WHERE id = ?",
-                                (sensorId, ))
-            result = self.cursor.fetchall()
+            cursor.execute("SELECT dataType "
+                           + "FROM sensors "
+                           + "WHERE id = ?",
+                           (sensorId, ))
+            result = cursor.fetchall()
             if len(result) != 1:
                 logger.error("[%s]: Sensor was not found." % self.log_tag)
-                self._releaseLock(logger)
+                self._releaseReadCursor(cursor, logger)
                 return None
 
             dataType = result[0][0]
 
         except Exception as e:
             logger.exception("[%s]: Not able to get sensor data type from database." % self.log_tag)
-            self._releaseLock(logger)
+            self._releaseReadCursor(cursor, logger)
             return None
 
         data = SensorData()
@@ -2848,44 +3408,44 @@ class Sqlite(_Storage):
         elif dataType == SensorDataType.INT:
             try:
                 # Get data type from database.
-                self.cursor.execute("SELECT data "
-                                    + "FROM sensorsDataInt "
-                                    + "WHERE sensorId = ?",
-                                    (sensorId, ))
-                result = self.cursor.fetchall()
+                cursor.execute("SELECT data "
+                               + "FROM sensorsDataInt "
+                               + "WHERE sensorId = ?",
+                               (sensorId, ))
+                result = cursor.fetchall()
                 if len(result) != 1:
                     logger.error("[%s]: Sensor data was not found." % self.log_tag)
-                    self._releaseLock(logger)
+                    self._releaseReadCursor(cursor, logger)
                     return None
 
                 data.data = result[0][0]
 
             except Exception as e:
                 logger.exception("[%s]: Not able to get sensor data from database." % self.log_tag)
-                self._releaseLock(logger)
+                self._releaseReadCursor(cursor, logger)
                 return None
 
         elif dataType == SensorDataType.FLOAT:
             try:
                 # Get data type from database.
-                self.cursor.execute("SELECT data "
-                                    + "FROM sensorsDataFloat "
-                                    + "WHERE sensorId = ?",
-                                    (sensorId, ))
-                result = self.cursor.fetchall()
+                cursor.execute("SELECT data "
+                               + "FROM sensorsDataFloat "
+                               + "WHERE sensorId = ?",
+                               (sensorId, ))
+                result = cursor.fetchall()
                 if len(result) != 1:
                     logger.error("[%s]: Sensor data was not found." % self.log_tag)
-                    self._releaseLock(logger)
+                    self._releaseReadCursor(cursor, logger)
                     return None
 
                 data.data = result[0][0]
 
             except Exception as e:
                 logger.exception("[%s]: Not able to get sensor data from database." % self.log_tag)
-                self._releaseLock(logger)
+                self._releaseReadCursor(cursor, logger)
                 return None
 
-        self._releaseLock(logger)
+        self._releaseReadCursor(cursor, logger)
 
         # return a sensor data object or None
         return data
@@ -2899,7 +3459,23 @@ class Sqlite(_Storage):
 
         self._acquireLock(logger)
 
+        # Commit pending updates of the commit window.
+        if self._commitFlusher is not None:
+            with self._commitCondition:
+                self._commitFlusher.exit_flag = True
+                self._commitDeadline = None
+                self._commitCondition.notify()
+            self._commitFlusher = None
+        if self._pendingCommit:
+            self.conn.commit()
+            self._changeGeneration += 1
+            self._pendingCommit = False
+
         self.cursor.close()
         self.conn.close()
 
+        for readConn in self._readConnections:
+            readConn.close()
+        self._readConnections = list()
+
         self._releaseLock(logger)
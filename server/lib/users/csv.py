@@ -12,10 +12,18 @@ import os
 import io
 import bcrypt
 import threading
+import time
+import hmac
+import hashlib
+import collections
+from typing import Dict, Tuple
 from .core import _userBackend, UserData
 
 
 # User backend that uses a simple csv file.
+# Successful verifications are cached for a short time (keyed by a keyed digest of the password,
+# the password itself is never stored) so that reconnecting clients do not have to be
+# verified with bcrypt again.
 class CSVBackend(_userBackend):
 
     def __init__(self, globalData, csvLocation):
@@ -33,7 +41,15 @@ class CSVBackend(_userBackend):
         # file nme of this file (used for logging)
         self.fileName = os.path.basename(__file__)
 
-        self.userCredentials = list()
+        # Username -> user data.
+        self.userCredentials = dict()  # type: Dict[str, UserData]
+
+        # Cache of successful verifications: username -> (password hash, password digest, expiration time).
+        # Entries are only valid as long as the password hash of the user has not changed.
+        self._credentialCache = collections.OrderedDict()  # type: Dict[str, Tuple[str, bytes, float]]
+        self._credentialCacheSize = self.globalData.userBackendCredentialCacheSize
+        self._credentialCacheTtl = self.globalData.userBackendCredentialCacheTtl
+        self._credentialCacheKey = os.urandom(32)
 
         self.readUserdata()
 
@@ -70,13 +86,13 @@ class CSVBackend(_userBackend):
             instance = row[3].replace(' ', '')
 
             # Check if username has a duplicate.
-            if any([x.username == username for x in self.userCredentials]):
+            if username in self.userCredentials:
                 self.logger.error("[%s]: Username '%s' already exists in CSV file." % (self.fileName, username))
                 continue
 
             pwhash = bcrypt.hashpw(password.encode("ascii"), bcrypt.gensalt())
             userData = UserData(username, pwhash, nodeType, instance)
-            self.userCredentials.append(userData)
+            self.userCredentials[username] = userData
 
     def _parseVersion1(self, csvData):
         """
@@ -96,12 +112,12 @@ class CSVBackend(_userBackend):
             instance = row[3].replace(' ', '')
 
             # Check if username has a duplicate.
-            if any([x.username == username for x in self.userCredentials]):
+            if username in self.userCredentials:
                 self.logger.error("[%s]: Username '%s' already exists in CSV file." % (self.fileName, username))
                 continue
 
             userData = UserData(username, pwhash, nodeType, instance)
-            self.userCredentials.append(userData)
+            self.userCredentials[username] = userData
 
     def _getVersion(self, csvData) -> int:
         """
@@ -123,6 +139,54 @@ class CSVBackend(_userBackend):
 
         return version
 
+    def _getPasswordDigest(self, password: str) -> bytes:
+        """
+        Internal function that computes the keyed digest of the password that is stored in the credential cache.
+
+        :param password:
+        :return: digest of the password
+        """
+        return hmac.new(self._credentialCacheKey, password.encode("ascii"), hashlib.sha256).digest()
+
+    def _isCredentialCached(self, username: str, pwhash: str, passwordDigest: bytes) -> bool:
+        """
+        Internal function that checks if a successful verification of the credentials is cached.
+        Does not acquire or release the lock.
+
+        :param username:
+        :param pwhash: current password hash of the user
+        :param passwordDigest:
+        :return True or False
+        """
+        cachedCredential = self._credentialCache.get(username)
+        if cachedCredential is None:
+            return False
+
+        cachedPwhash, cachedDigest, expirationTime = cachedCredential
+        if cachedPwhash != pwhash or expirationTime < time.time():
+            del self._credentialCache[username]
+            return False
+
+        self._credentialCache.move_to_end(username)
+        return hmac.compare_digest(cachedDigest, passwordDigest)
+
+    def _addCredentialToCache(self, username: str, pwhash: str, passwordDigest: bytes):
+        """
+        Internal function that caches a successful verification of the credentials.
+        Does not acquire or release the lock.
+
+        :param username:
+        :param pwhash: password hash the credentials were verified with
+        :param passwordDigest:
+        """
+        if self._credentialCacheSize <= 0 or self._credentialCacheTtl <= 0:
+            return
+
+        self._credentialCache[username] = (pwhash, passwordDigest, time.time() + self._credentialCacheTtl)
+        self._credentialCache.move_to_end(username)
+        while len(self._credentialCache) > self._credentialCacheSize:
+            self._credentialCache.popitem(last=False)
+
     def areUserCredentialsValid(self, username: str, password: str) -> bool:
         """
         This function checks if the user credentials are valid
@@ -131,26 +195,38 @@ class CSVBackend(_userBackend):
         :param password: password of the user
         :return True or False
         """
+        passwordDigest = self._getPasswordDigest(password)
+
         self._acquireLock()
 
-        # Check all usernames if the given username exist
-        # and then if the password is the correct one.
-        for userData in self.userCredentials:
+        # Check if the given username exists.
+        userData = self.userCredentials.get(username)
+        if userData is None:
+            self._releaseLock()
+            return False
 
-            if userData.username != username:
-                continue
+        # Check if the credentials were already verified recently.
+        pwhash = userData.pwhash
+        if self._isCredentialCached(username, pwhash, passwordDigest):
+            self._releaseLock()
+            return True
 
-            else:
-                if bcrypt.checkpw(password.encode("ascii"), userData.pwhash.encode("ascii")):
-                    self._releaseLock()
-                    return True
+        self._releaseLock()
 
-                else:
-                    self._releaseLock()
-                    return False
+        # Check the password without holding the lock (bcrypt is slow by design
+        # and would serialize all logins otherwise).
+        if not bcrypt.checkpw(password.encode("ascii"), pwhash.encode("ascii")):
+            return False
+
+        self._acquireLock()
+
+        # Only cache the verification if the password was not changed in the meantime.
+        userData = self.userCredentials.get(username)
+        if userData is not None and userData.pwhash == pwhash:
+            self._addCredentialToCache(username, pwhash, passwordDigest)
 
         self._releaseLock()
-        return False
+        return True
 
     def checkNodeTypeAndInstance(self, username: str, nodeType: str, instance: str) -> bool:
         """
@@ -163,20 +239,16 @@ class CSVBackend(_userBackend):
         """
         self._acquireLock()
 
-        # check all usernames if the given username exists
+        # check if the given username exists
         # and then check the given node type and instance
-        for userData in self.userCredentials:
-            if userData.username != username:
-                continue
-
-            else:
-                if userData.nodeType.upper() == nodeType.upper() and userData.instance.upper() == instance.upper():
-                    self._releaseLock()
-                    return True
+        userData = self.userCredentials.get(username)
+        if userData is None:
+            self._releaseLock()
+            return False
 
-                else:
-                    self._releaseLock()
-                    return False
+        if userData.nodeType.upper() == nodeType.upper() and userData.instance.upper() == instance.upper():
+            self._releaseLock()
+            return True
 
         self._releaseLock()
         return False
@@ -190,12 +262,7 @@ class CSVBackend(_userBackend):
         """
         self._acquireLock()
 
-        # Check all usernames if the given username exists.
-        found = False
-        for userData in self.userCredentials:
-            if userData.username == username:
-                found = True
-                break
+        found = username in self.userCredentials
 
         self._releaseLock()
 
@@ -210,7 +277,7 @@ class CSVBackend(_userBackend):
         self._acquireLock()
 
         # Stores all user credentials as an object.
-        self.userCredentials = list()
+        self.userCredentials = dict()
 
         # Check users.csv file exists before parsing.
         version = 0
@@ -273,7 +340,7 @@ class CSVBackend(_userBackend):
                                delimiter=",",
                                quoting=csv.QUOTE_ALL)
 
-        for userData in self.userCredentials:
+        for userData in self.userCredentials.values():
             csvWriter.writerow(userData.toList())
 
         # Add csv data to the final file data.
@@ -302,7 +369,7 @@ class CSVBackend(_userBackend):
         self._acquireLock()
 
         # Check if username has a duplicate.
-        if any([x.username == username for x in self.userCredentials]):
+        if username in self.userCredentials:
             self.logger.error("[%s]: Username '%s' already exists in CSV file." % (self.fileName, username))
 
             self._releaseLock()
@@ -310,7 +377,7 @@ class CSVBackend(_userBackend):
 
         pwhash = bcrypt.hashpw(password.encode("ascii"), bcrypt.gensalt()).decode("ascii")
         userData = UserData(username, pwhash, nodeType, instance)
-        self.userCredentials.append(userData)
+        self.userCredentials[username] = userData
 
         self._releaseLock()
         return True
@@ -326,12 +393,12 @@ class CSVBackend(_userBackend):
 
         self._acquireLock()
 
-        for userData in self.userCredentials:
-            if userData.username == username:
-                self.userCredentials.remove(userData)
+        if username in self.userCredentials:
+            del self.userCredentials[username]
+            self._credentialCache.pop(username, None)
 
-                self._releaseLock()
-                return True
+            self._releaseLock()
+            return True
 
         self.logger.error("[%s]: Not able to find username '%s'." % (self.fileName, username))
 
@@ -350,13 +417,14 @@ class CSVBackend(_userBackend):
 
         self._acquireLock()
 
-        for userData in self.userCredentials:
-            if userData.username == username:
-                pwhash = bcrypt.hashpw(password.encode("ascii"), bcrypt.gensalt()).decode("ascii")
-                userData.pwhash = pwhash
+        userData = self.userCredentials.get(username)
+        if userData is not None:
+            pwhash = bcrypt.hashpw(password.encode("ascii"), bcrypt.gensalt()).decode("ascii")
+            userData.pwhash = pwhash
+            self._credentialCache.pop(username, None)
 
-                self._releaseLock()
-                return True
+            self._releaseLock()
+            return True
 
         self.logger.error("[%s]: Not able to find username '%s'." % (self.fileName, username))
 
@@ -385,13 +453,13 @@ class CSVBackend(_userBackend):
 
         self._acquireLock()
 
-        for userData in self.userCredentials:
-            if userData.username == username:
-                userData.nodeType = nodeType
-                userData.instance = instance
+        userData = self.userCredentials.get(username)
+        if userData is not None:
+            userData.nodeType = nodeType
+            userData.instance = instance
 
-                self._releaseLock()
-                return True
+            self._releaseLock()
+            return True
 
         self.logger.error("[%s]: Not able to find username '%s'." % (self.fileName, username))
 
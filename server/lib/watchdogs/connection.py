@@ -10,13 +10,18 @@
 import threading
 import time
 import os
-from typing import List, Optional, Set, Tuple
+import heapq
+import itertools
+from typing import Any, List, Optional, Set, Tuple
 from ..localObjects import Sensor
 from ..globalData import GlobalData
 from ..internalSensors import NodeTimeoutSensor, SensorTimeoutSensor
 
 
 # This class handles all timeouts of nodes, sensors, and so on.
+# Instead of scanning all connections and sensors periodically, it keeps
+# the deadlines of the connections in a heap (and the storage keeps the
+# deadlines of the sensors) and sleeps until the next deadline is reached.
 class ConnectionWatchdog(threading.Thread):
 
     def __init__(self,
@@ -42,6 +47,21 @@ class ConnectionWatchdog(threading.Thread):
 
         # set exit flag as false
         self.exitFlag = False
+        self._exitEvent = threading.Event()
+
+        # Interval in which the internal sensors are updated (and the watchdog wakes up at the latest).
+        self._tickInterval = 5
+
+        # Interval in which the connected nodes in the database are synchronized with the actual connections.
+        self._syncInterval = 60
+        self._lastSync = 0
+
+        # Heap of the connection deadlines of the server sessions (deadline, sequence number, server session).
+        # The deadline of an entry can be older than the actual deadline (the time of the data last
+        # received is only checked when the entry reaches the top).
+        self._sessionDeadlines = list()  # type: List[Tuple[int, int, Any]]
+        self._sessionDeadlinesCounter = itertools.count()
+        self._sessionDeadlinesLock = threading.Lock()
 
         # Flag that indicates if the connection watchdog is initialized.
         self._isInitialized = False
@@ -107,44 +127,94 @@ class ConnectionWatchdog(threading.Thread):
         for nodeId in newTimeouts:
             self.addNodeTimeout(nodeId)
 
-        # Check all server sessions if the connection timed out.
-        for serverSession in self.serverSessions:
+        # Check all server sessions which connection deadline is reached if the connection timed out.
+        for serverSession in self._popExpiredServerSessions():
+
+            self.logger.error("[%s]: Connection to client timed out. Closing connection (%s:%d)."
+                              % (self.fileName, serverSession.clientAddress, serverSession.clientPort))
 
-            # Check if client communication object exists.
-            if serverSession.clientComm is None:
+            serverSession.closeConnection()
+
+            nodeId = serverSession.clientComm.nodeId
+            if nodeId is None or nodeId in self._timeoutNodeIds:
                 continue
 
-            # Check if the time of the data last received lies
-            # too far in the past => kill connection.
-            utcTimestamp = int(time.time())
-            if (utcTimestamp - serverSession.clientComm.lastRecv) >= self.connectionTimeout:
-                self.logger.error("[%s]: Connection to client timed out. Closing connection (%s:%d)."
-                                  % (self.fileName, serverSession.clientAddress, serverSession.clientPort))
+            self.addNodeTimeout(nodeId)
 
-                serverSession.closeConnection()
+    def _popExpiredServerSessions(self) -> List[Any]:
+        """
+        Internal function that removes all server sessions which connection timed out from the deadline heap.
 
-                nodeId = serverSession.clientComm.nodeId
-                if nodeId is None or nodeId in self._timeoutNodeIds:
+        :return: list of server sessions which connection timed out
+        """
+        expiredSessions = list()
+        utcTimestamp = int(time.time())
+        with self._sessionDeadlinesLock:
+            while self._sessionDeadlines and self._sessionDeadlines[0][0] <= utcTimestamp:
+                _, _, serverSession = heapq.heappop(self._sessionDeadlines)
+
+                # Server session is already closed.
+                if serverSession not in self.serverSessions:
                     continue
 
-                self.addNodeTimeout(nodeId)
+                # Client communication object does not exist yet => check again in one second.
+                if serverSession.clientComm is None:
+                    deadline = utcTimestamp + 1
 
-    def _processOldNodeTimeouts(self):
+                else:
+                    # Check if the time of the data last received lies
+                    # too far in the past => kill connection.
+                    deadline = int(serverSession.clientComm.lastRecv) + self.connectionTimeout
+                    if deadline <= utcTimestamp:
+                        expiredSessions.append(serverSession)
+                        continue
+
+                heapq.heappush(self._sessionDeadlines,
+                               (deadline, next(self._sessionDeadlinesCounter), serverSession))
+
+        return expiredSessions
+
+    def _getNextDeadline(self) -> float:
         """
-        Internal function that processes old occurred node timeouts and raises alarm when they are no longer timed out.
+        Internal function that gets the time when the next timeout can occur.
+
+        :return: utc timestamp
         """
-        # Check all server sessions if a timed out connection reconnected.
-        for serverSession in self.serverSessions:
+        utcTimestamp = int(time.time())
+        deadline = utcTimestamp + self._tickInterval
 
-            # Check if client communication object exists.
-            if serverSession.clientComm is None:
-                continue
+        with self._sessionDeadlinesLock:
+            if self._sessionDeadlines:
+                deadline = min(deadline, self._sessionDeadlines[0][0])
 
-            nodeId = serverSession.clientComm.nodeId
-            if nodeId is None or nodeId not in self._timeoutNodeIds:
-                continue
+        # Nodes are timed out when they are longer in the pre-timeout set than the grace period.
+        self._acquireNodeTimeoutLock()
+        for preTuple in self._preTimeoutNodeIds:
+            deadline = min(deadline, preTuple[1] + self.gracePeriodTimeout + 1)
+        self._releaseNodeTimeoutLock()
+
+        # Sensors are timed out when their state was not updated for 1.5 times the grace period.
+        oldestSensorUpdate = self.storage.getOldestSensorUpdate()
+        if oldestSensorUpdate is not None:
+            deadline = min(deadline, oldestSensorUpdate + int(1.5 * self.gracePeriodTimeout) + 1)
 
-            self.removeNodeTimeout(nodeId)
+        if self._timeoutSensorIds:
+            deadline = min(deadline, self.lastSensorTimeoutReminder + self.timeoutReminderTime)
+        if self._timeoutNodeIds:
+            deadline = min(deadline, self._lastNodeTimeoutReminder + self.timeoutReminderTime)
+
+        deadline = min(deadline, self._lastSync + self._syncInterval)
+
+        return max(deadline, utcTimestamp)
+
+    def _processOldNodeTimeouts(self):
+        """
+        Internal function that processes old occurred node timeouts and raises alarm when they are no longer timed out.
+        """
+        # Check all timed out nodes if they reconnected.
+        for nodeId in list(self._timeoutNodeIds):
+            if self.serverSessions.get_by_node_id(nodeId):
+                self.removeNodeTimeout(nodeId)
 
     def _processNewSensorTimeouts(self,
                                   sensorsTimeoutList: Optional[List[Sensor]]):
@@ -209,17 +279,14 @@ class ConnectionWatchdog(threading.Thread):
         if sensorsTimeoutList is None:
             return
 
+        timeoutSensorIds = set([x.sensorId for x in sensorsTimeoutList])
+
         # check if a timed out sensor has reconnected and
         # updated its state and generate a notification
         for sensorId in set(self._timeoutSensorIds):
 
             # Skip if an old timed out sensor is still timed out.
-            found = False
-            for sensorObj in sensorsTimeoutList:
-                if sensorId == sensorObj.sensorId:
-                    found = True
-                    break
-            if found:
+            if sensorId in timeoutSensorIds:
                 continue
 
             # Sensor is no longer timed out.
@@ -355,7 +422,6 @@ class ConnectionWatchdog(threading.Thread):
             # Check if node marked as connected got a connection
             # to the server.
             for nodeId in nodeIds:
-                found = False
 
                 # Skip node id of this server instance.
                 if nodeId == self.serverNodeId:
@@ -363,17 +429,7 @@ class ConnectionWatchdog(threading.Thread):
 
                 # Skip node ids that have an active connection
                 # to this server.
-                for serverSession in self.serverSessions:
-
-                    # Check if client communication object exists and
-                    # client is initialized.
-                    if serverSession.clientComm is None or not serverSession.clientComm.clientInitialized:
-                        continue
-
-                    if serverSession.clientComm.nodeId == nodeId:
-                        found = True
-                        break
-                if found:
+                if self.serverSessions.get_by_node_id(nodeId):
                     continue
 
                 # If no server session was found with the node id
@@ -387,12 +443,7 @@ class ConnectionWatchdog(threading.Thread):
 
             # Check if all connections to the server are marked as connected
             # in the database.
-            for serverSession in self.serverSessions:
-
-                # Check if client communication object exists and
-                # client is initialized.
-                if serverSession.clientComm is None or not serverSession.clientComm.clientInitialized:
-                    continue
+            for serverSession in self.serverSessions.get_initialized():
 
                 nodeId = serverSession.clientComm.nodeId
                 if nodeId not in nodeIds:
@@ -528,6 +579,18 @@ class ConnectionWatchdog(threading.Thread):
 
         self._releaseNodeTimeoutLock()
 
+    def addServerSession(self,
+                         serverSession: Any):
+        """
+        Public function that adds a new server session to the connection timeout tracking.
+
+        :param serverSession:
+        """
+        utcTimestamp = int(time.time())
+        with self._sessionDeadlinesLock:
+            heapq.heappush(self._sessionDeadlines,
+                           (utcTimestamp + self.connectionTimeout, next(self._sessionDeadlinesCounter), serverSession))
+
     def isInitialized(self) -> bool:
         """
         Returns if the connection watchdog is initialized.
@@ -608,17 +671,20 @@ class ConnectionWatchdog(threading.Thread):
         # start and accept connections.
         self._isInitialized = True
 
+        lastTick = 0
         while True:
-            # wait 5 seconds before checking time of last received data
-            for i in range(5):
-                if self.exitFlag:
-                    self.logger.info("[%s]: Exiting ConnectionWatchdog." % self.fileName)
-                    return
-                time.sleep(1)
+            # wait until the next timeout can occur
+            self._exitEvent.wait(max(0.0, self._getNextDeadline() - time.time()))
+            if self.exitFlag:
+                self.logger.info("[%s]: Exiting ConnectionWatchdog." % self.fileName)
+                return
 
             # Synchronize view on connected nodes (actual connected nodes
             # and database)
-            self._syncDbAndConnections()
+            utcTimestamp = int(time.time())
+            if (utcTimestamp - self._lastSync) >= self._syncInterval:
+                self._lastSync = utcTimestamp
+                self._syncDbAndConnections()
 
             # Check all server sessions if the connection timed out.
             self._processNewNodeTimeouts()
@@ -626,7 +692,8 @@ class ConnectionWatchdog(threading.Thread):
             # Process nodes that timed out but reconnected.
             self._processOldNodeTimeouts()
 
-            # Get list of sensor objects that have timed out.
+            # Get list of sensor objects that have timed out (only sensors which
+            # deadline was reached or which timed out before are fetched).
             utcTimestamp = int(time.time())
             sensorsTimeoutList = self.storage.getSensorsUpdatedOlderThan(utcTimestamp
                                                                          - int(1.5 * self.gracePeriodTimeout))
@@ -642,14 +709,18 @@ class ConnectionWatchdog(threading.Thread):
 
             # Update time of all internal sensors in order to avoid
             # timeouts of these sensors.
-            for internalSensor in self.internalSensors:
-                if not self.storage.updateSensorTime(internalSensor.sensorId):
-                    self.logger.error("[%s]: Not able to update sensor time for internal sensor with sensor id %d "
-                                      % (self.fileName, internalSensor.sensorId)
-                                      + "sensors.")
+            utcTimestamp = int(time.time())
+            if (utcTimestamp - lastTick) >= self._tickInterval:
+                lastTick = utcTimestamp
+                for internalSensor in self.internalSensors:
+                    if not self.storage.updateSensorTime(internalSensor.sensorId):
+                        self.logger.error("[%s]: Not able to update sensor time for internal sensor "
+                                          % self.fileName
+                                          + "with sensor id %d." % internalSensor.sensorId)
 
     def exit(self):
         """
         sets the exit flag to shut down the thread
         """
         self.exitFlag = True
+        self._exitEvent.set()
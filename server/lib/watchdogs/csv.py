@@ -68,22 +68,15 @@ class CSVWatchdog(threading.Thread):
         This function synchronizes the existing usernames with existing connections.
         When a connection still exists with a username which does not exist anymore, it is closed.
         """
-        for serverSession in self.serverSessions:
-
-            # Check if client communication object exists.
-            if serverSession.clientComm is None:
-                continue
-
-            username = serverSession.clientComm.username
-            if username is None:
-                continue
+        for username in self.serverSessions.get_usernames():
 
             # Close connection to the client if the username
             # does no longer exist.
             if not self.userBackend.userExists(username):
                 self.logger.info("[%s]: Username '%s' does not exist anymore. Closing connection to client."
                                  % (self.fileName, username))
-                serverSession.closeConnection()
+                for serverSession in self.serverSessions.get_by_username(username):
+                    serverSession.closeConnection()
 
     def _syncUsernamesAndDatabase(self):
         """
@@ -473,7 +473,7 @@ def listUsers(userBackend: CSVBackend) -> List[str]:
     managers = list()
     sensors = list()
     others = list()
-    for userData in userBackend.userCredentials:
+    for userData in userBackend.userCredentials.values():
         userDataDict[userData.username] = userData
         if userData.nodeType == "alert":
             alerts.append(userData.username)